@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import platformdirs
+
+APP_AUTHOR = "aoirint"
+APP_NAME = "MultiAudioTrackRecorder"
+
+
+def get_config_file_path() -> Path:
+    """シーンなどの設定を保存するファイル"""
+    config_dir = platformdirs.user_config_path(
+        appauthor=APP_AUTHOR,
+        appname=APP_NAME,
+    )
+    return config_dir / "config.json"
+
+
+def get_default_spool_dir() -> Path:
+    """
+    シーンで spool_dir を指定しない場合に、録音のスプールディレクトリを作るディレクトリ。
+    GUI とヘッドレスの CLI で共有し、どちらで異常終了した録音も GUI の起動時に書き出せるようにする
+    """
+    cache_dir = platformdirs.user_cache_path(
+        appauthor=APP_AUTHOR,
+        appname=APP_NAME,
+    )
+    return cache_dir / "spool"
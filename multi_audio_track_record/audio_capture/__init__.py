@@ -0,0 +1,10 @@
+from ._pyaudio import PORTAUDIO_LOCK, AudioCaptureEnginePyAudio
+from .base import AudioCaptureEngine, AudioCaptureStream, get_reference_time
+
+__all__ = [
+    "PORTAUDIO_LOCK",
+    "AudioCaptureEngine",
+    "AudioCaptureStream",
+    "AudioCaptureEnginePyAudio",
+    "get_reference_time",
+]
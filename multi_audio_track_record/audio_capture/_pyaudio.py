@@ -0,0 +1,163 @@
+import threading
+import time
+from logging import getLogger
+from typing import TYPE_CHECKING, Mapping
+
+import numpy as np
+
+from ..dsp import AudioRingBuffer, BlockTimestampRing
+from .base import AudioCaptureEngine, AudioCaptureStream, get_reference_time
+
+if TYPE_CHECKING:
+    import pyaudio
+
+logger = getLogger(__name__)
+
+PORTAUDIO_LOCK = threading.Lock()
+"""
+PortAudio の初期化と終了は参照カウントを共有し、スレッドセーフではない。
+PyAudio のインスタンスを作る時と終了する時は、プロセス全体でこのロックを取る
+"""
+
+
+class _AudioCaptureStreamPyAudio(AudioCaptureStream):
+    def __init__(
+        self,
+        pyaudio_instance: "pyaudio.PyAudio",
+        portaudio_index: int,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ):
+        super().__init__(
+            ring_buffer=AudioRingBuffer(
+                capacity_frames=ring_buffer_frames,
+                channels=channels,
+                dtype=np.float32,
+            ),
+            block_timestamp_ring=BlockTimestampRing(
+                capacity=ring_buffer_frames // frames_per_buffer * 2 + 16,
+            ),
+        )
+
+        import pyaudio
+
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+
+        # 音声入力スレッドのコールバックで使う定数は、開く時に取り出しておく
+        self.__pa_continue: int = pyaudio.paContinue
+        self.__pa_input_overflow: int = pyaudio.paInputOverflow
+
+        self.__stream = pyaudio_instance.open(
+            input=True,
+            input_device_index=portaudio_index,
+            rate=sampling_rate,
+            channels=channels,
+            format=pyaudio.paFloat32,
+            frames_per_buffer=frames_per_buffer,
+            start=False,
+            stream_callback=self.__stream_callback,
+        )
+
+    def __stream_callback(
+        self,
+        in_data: bytes | None,
+        frame_count: int,
+        time_info: Mapping[str, float],
+        status_flags: int,
+    ) -> tuple[None, int]:
+        # PortAudioの音声入力スレッドから呼ばれる。ブロックする処理を行わないこと
+        callback_started_at = time.perf_counter()
+
+        if in_data is not None:
+            reference_time = get_reference_time()
+
+            # ストリーム時計での「現在時刻 - ADC時刻」を入力遅延とみなし、基準時計に換算する
+            input_buffer_adc_time = time_info.get("input_buffer_adc_time", 0.0)
+            current_time = time_info.get("current_time", 0.0)
+            if input_buffer_adc_time > 0 and current_time >= input_buffer_adc_time:
+                input_latency = current_time - input_buffer_adc_time
+            else:
+                # ADC時刻を提供しないホストAPIでは、ブロックの長さを遅延とみなす
+                input_latency = frame_count / self.sampling_rate
+
+            frames = np.frombuffer(in_data, dtype=np.float32).reshape(
+                frame_count,
+                self.channels,
+            )
+
+            ring_buffer = self.ring_buffer
+            self.block_timestamp_ring.push(
+                frame_position=ring_buffer.write_position,
+                capture_time=reference_time - input_latency,
+            )
+            ring_buffer.write(frames)
+            self._notify_data_written()
+
+        self._record_callback(
+            callback_seconds=time.perf_counter() - callback_started_at,
+            is_input_overflow=(status_flags & self.__pa_input_overflow) != 0,
+        )
+
+        return (None, self.__pa_continue)
+
+    def start(self) -> None:
+        self.__stream.start_stream()
+
+    def stop(self) -> None:
+        if not self.__stream.is_stopped():
+            self.__stream.stop_stream()
+
+    def close(self) -> None:
+        self.__stream.close()
+
+
+class AudioCaptureEnginePyAudio(AudioCaptureEngine):
+    """
+    PortAudio は最初にストリームを開く時に初期化する。
+    ストリームは録音スレッドから開かれるため、初期化で画面の操作を止めない
+    """
+
+    def __init__(self) -> None:
+        self.__pyaudio_instance: "pyaudio.PyAudio | None" = None
+        self.__pyaudio_instance_lock = threading.Lock()
+
+    def __get_pyaudio_instance(self) -> "pyaudio.PyAudio":
+        with self.__pyaudio_instance_lock:
+            pyaudio_instance = self.__pyaudio_instance
+            if pyaudio_instance is None:
+                import pyaudio
+
+                with PORTAUDIO_LOCK:
+                    pyaudio_instance = pyaudio.PyAudio()
+                self.__pyaudio_instance = pyaudio_instance
+
+            return pyaudio_instance
+
+    def open_stream(
+        self,
+        portaudio_index: int,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ) -> AudioCaptureStream:
+        return _AudioCaptureStreamPyAudio(
+            pyaudio_instance=self.__get_pyaudio_instance(),
+            portaudio_index=portaudio_index,
+            sampling_rate=sampling_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+            ring_buffer_frames=ring_buffer_frames,
+        )
+
+    def terminate(self) -> None:
+        with self.__pyaudio_instance_lock:
+            pyaudio_instance = self.__pyaudio_instance
+            self.__pyaudio_instance = None
+
+        if pyaudio_instance is not None:
+            with PORTAUDIO_LOCK:
+                pyaudio_instance.terminate()
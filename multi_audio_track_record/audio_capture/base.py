@@ -0,0 +1,87 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from ..dsp import AudioRingBuffer, BlockTimestampRing
+
+
+def get_reference_time() -> float:
+    """
+    全デバイスで共通の基準時計。ブロックの取り込み時刻はこの時計の値で表す
+    """
+    return time.monotonic()
+
+
+class AudioCaptureStream(ABC):
+    """
+    コールバック方式で音声入力を受け取り、リングバッファに書き込むストリーム。
+    データリスナーは音声入力スレッド上で呼ばれるため、軽い処理にとどめること。
+
+    ブロックごとに、リングバッファ上の先頭フレーム位置と基準時計での取り込み時刻を
+    block_timestamp_ring に書き込む。
+    """
+
+    callback_count: int
+    input_overflow_count: int
+    """ホストAPIが入力オーバーフローを報告したコールバックの回数"""
+    callback_seconds_total: float
+    callback_seconds_max: float
+
+    def __init__(
+        self,
+        ring_buffer: AudioRingBuffer,
+        block_timestamp_ring: BlockTimestampRing,
+    ):
+        self.ring_buffer = ring_buffer
+        self.block_timestamp_ring = block_timestamp_ring
+        self.__data_listeners: list[Callable[[], None]] = []
+
+        # 以下のカウンタは音声入力スレッドだけが更新する
+        self.callback_count = 0
+        self.input_overflow_count = 0
+        self.callback_seconds_total = 0.0
+        self.callback_seconds_max = 0.0
+
+    def add_data_listener(self, listener: Callable[[], None]) -> None:
+        self.__data_listeners.append(listener)
+
+    def _notify_data_written(self) -> None:
+        for listener in self.__data_listeners:
+            listener()
+
+    def _record_callback(
+        self,
+        callback_seconds: float,
+        is_input_overflow: bool,
+    ) -> None:
+        self.callback_count += 1
+        if is_input_overflow:
+            self.input_overflow_count += 1
+
+        self.callback_seconds_total += callback_seconds
+        if callback_seconds > self.callback_seconds_max:
+            self.callback_seconds_max = callback_seconds
+
+    @abstractmethod
+    def start(self) -> None: ...
+
+    @abstractmethod
+    def stop(self) -> None: ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+
+class AudioCaptureEngine(ABC):
+    @abstractmethod
+    def open_stream(
+        self,
+        portaudio_index: int,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ) -> AudioCaptureStream: ...
+
+    @abstractmethod
+    def terminate(self) -> None: ...
@@ -1,11 +1,17 @@
+import asyncio
+import threading
+from dataclasses import dataclass
 from logging import getLogger
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
-import pyaudio
 from pydantic import BaseModel, Field
 
+from ..audio_capture import PORTAUDIO_LOCK
 from .base import AudioInputDevice, AudioInputDeviceManager
 
+if TYPE_CHECKING:
+    import pyaudio
+
 logger = getLogger(__name__)
 
 
@@ -54,77 +60,153 @@ class _PyAudioDeviceInfo(BaseModel):
     default_sample_rate: Annotated[float, Field(alias="defaultSampleRate")]
 
 
+@dataclass
+class _AudioInputDeviceList:
+    """列挙したデバイスの一覧"""
+
+    audio_input_devices: list[AudioInputDevice]
+    default_input_device_index: int
+    """既定の音声入力デバイスの PortAudio のデバイス番号"""
+    invalidation_count: int
+    """列挙を始めた時点の invalidate_audio_input_devices の呼び出し回数"""
+
+
 class AudioInputDeviceManagerPyAudio(AudioInputDeviceManager):
+    """
+    PortAudio の初期化はデバイスを列挙するため時間がかかる。
+    起動を遅くしないよう、最初に使う時に別スレッドで初期化する。
+
+    列挙したデバイスはキャッシュし、 invalidate_audio_input_devices で破棄するまで使い回す。
+    列挙し直す時は、抜き差しを反映するため別スレッドで PortAudio を初期化し直す。
+    PortAudio は全てのインスタンスを終了するまでデバイスを列挙し直さず、
+    開いているストリームがある間の初期化と終了は安全ではないため、
+    呼び出し側は録音エンジンのストリームを閉じて終了してから列挙し直す。
+    自動で列挙し直す場合は、 run_periodic_rescan でストリームを開いていない間だけ行う
+    """
+
     def __init__(self) -> None:
-        self.__pyaudio_instance = pyaudio.PyAudio()
+        self.__pyaudio_instance: "pyaudio.PyAudio | None" = None
+        self.__pyaudio_instance_lock = threading.Lock()
 
-    async def __get_default_host_api_info(self) -> _PyAudioHostApiInfo:
-        __pyaudio_instance = self.__pyaudio_instance
+        self.__audio_input_device_list: _AudioInputDeviceList | None = None
+        self.__invalidation_count = 0
+        self.__rescan_task: "asyncio.Task[_AudioInputDeviceList] | None" = None
 
-        default_host_api_info_dict = __pyaudio_instance.get_default_host_api_info()
-        default_host_api_info = _PyAudioHostApiInfo.model_validate(
-            default_host_api_info_dict
-        )
+    def __scan_audio_input_devices(
+        self,
+        invalidation_count: int,
+        is_reinitialized: bool,
+    ) -> _AudioInputDeviceList:
+        """別スレッドで呼び出す。 PortAudio を初期化してデバイスを列挙する"""
+        import pyaudio
+
+        with self.__pyaudio_instance_lock:
+            pyaudio_instance = self.__pyaudio_instance
+            if pyaudio_instance is not None and is_reinitialized:
+                with PORTAUDIO_LOCK:
+                    pyaudio_instance.terminate()
+                pyaudio_instance = None
+
+            if pyaudio_instance is None:
+                with PORTAUDIO_LOCK:
+                    pyaudio_instance = pyaudio.PyAudio()
+                self.__pyaudio_instance = pyaudio_instance
+
+            host_api_info = _PyAudioHostApiInfo.model_validate(
+                pyaudio_instance.get_default_host_api_info()
+            )
 
-        return default_host_api_info
+            audio_input_devices: list[AudioInputDevice] = []
+            for host_api_device_index in range(host_api_info.device_count):
+                device_info = _PyAudioDeviceInfo.model_validate(
+                    pyaudio_instance.get_device_info_by_host_api_device_index(
+                        host_api_index=host_api_info.index,
+                        host_api_device_index=host_api_device_index,
+                    )
+                )
 
-    async def __get_audio_input_devices_with_host_api_info(
-        self,
-        host_api_info: _PyAudioHostApiInfo,
-    ) -> list[AudioInputDevice]:
-        __pyaudio_instance = self.__pyaudio_instance
-
-        device_count = host_api_info.device_count
-
-        audio_input_devices: list[AudioInputDevice] = []
-        for host_api_device_index in range(device_count):
-            device_info_dict = (
-                __pyaudio_instance.get_device_info_by_host_api_device_index(
-                    host_api_index=host_api_info.index,
-                    host_api_device_index=host_api_device_index,
+                if device_info.max_input_channels == 0:
+                    continue
+
+                audio_input_devices.append(
+                    AudioInputDevice(
+                        portaudio_name=device_info.name,
+                        portaudio_index=device_info.index,
+                        portaudio_host_api_type=host_api_info.type,
+                        portaudio_host_api_index=host_api_info.index,
+                        portaudio_host_api_device_index=host_api_device_index,
+                        default_sampling_rate=device_info.default_sample_rate,
+                        max_channels=device_info.max_input_channels,
+                    )
                 )
+
+        return _AudioInputDeviceList(
+            audio_input_devices=audio_input_devices,
+            default_input_device_index=host_api_info.default_input_device,
+            invalidation_count=invalidation_count,
+        )
+
+    async def __rescan(self) -> _AudioInputDeviceList:
+        previous_audio_input_device_list = self.__audio_input_device_list
+
+        try:
+            audio_input_device_list = await asyncio.to_thread(
+                self.__scan_audio_input_devices,
+                self.__invalidation_count,
+                previous_audio_input_device_list is not None,
             )
-            device_info = _PyAudioDeviceInfo.model_validate(device_info_dict)
-
-            if device_info.max_input_channels == 0:
-                continue
-
-            audio_input_devices.append(
-                AudioInputDevice(
-                    portaudio_name=device_info.name,
-                    portaudio_index=device_info.index,
-                    portaudio_host_api_type=host_api_info.type,
-                    portaudio_host_api_index=host_api_info.index,
-                    portaudio_host_api_device_index=host_api_device_index,
-                    default_sampling_rate=device_info.default_sample_rate,
-                    max_channels=device_info.max_input_channels,
-                )
+        finally:
+            self.__rescan_task = None
+
+        if (
+            previous_audio_input_device_list is not None
+            and previous_audio_input_device_list.audio_input_devices
+            != audio_input_device_list.audio_input_devices
+        ):
+            logger.info(
+                "Audio input devices changed: "
+                f"{len(audio_input_device_list.audio_input_devices)} devices"
             )
 
-        return audio_input_devices
+        self.__audio_input_device_list = audio_input_device_list
+        return audio_input_device_list
 
-    async def get_audio_input_devices(self) -> list[AudioInputDevice]:
-        default_host_api_info = await self.__get_default_host_api_info()
-        audio_input_devices = await self.__get_audio_input_devices_with_host_api_info(
-            host_api_info=default_host_api_info,
-        )
+    async def __start_rescan(self) -> _AudioInputDeviceList:
+        """列挙中の場合は、その結果を待つ"""
+        rescan_task = self.__rescan_task
+        if rescan_task is None:
+            rescan_task = asyncio.create_task(self.__rescan())
+            self.__rescan_task = rescan_task
 
-        return audio_input_devices
+        # 呼び出し元がキャンセルされても、他の呼び出し元のために列挙は続ける
+        return await asyncio.shield(rescan_task)
 
-    async def get_default_audio_input_device(self) -> AudioInputDevice:
-        __pyaudio_instance = self.__pyaudio_instance
+    async def __get_audio_input_device_list(self) -> _AudioInputDeviceList:
+        audio_input_device_list = self.__audio_input_device_list
+        if (
+            audio_input_device_list is not None
+            and audio_input_device_list.invalidation_count == self.__invalidation_count
+        ):
+            return audio_input_device_list
 
-        default_host_api_info_dict = __pyaudio_instance.get_default_host_api_info()
-        default_host_api_info = _PyAudioHostApiInfo.model_validate(
-            default_host_api_info_dict
-        )
-        default_input_device_index = default_host_api_info.default_input_device
+        return await self.__start_rescan()
 
-        audio_input_devices = await self.__get_audio_input_devices_with_host_api_info(
-            host_api_info=default_host_api_info,
-        )
+    def invalidate_audio_input_devices(self) -> None:
+        self.__invalidation_count += 1
+
+    async def rescan_audio_input_devices(self) -> list[AudioInputDevice]:
+        audio_input_device_list = await self.__start_rescan()
+        return list(audio_input_device_list.audio_input_devices)
+
+    async def get_audio_input_devices(self) -> list[AudioInputDevice]:
+        audio_input_device_list = await self.__get_audio_input_device_list()
+        return list(audio_input_device_list.audio_input_devices)
+
+    async def get_default_audio_input_device(self) -> AudioInputDevice:
+        audio_input_device_list = await self.__get_audio_input_device_list()
+        default_input_device_index = audio_input_device_list.default_input_device_index
 
-        for audio_input_device in audio_input_devices:
+        for audio_input_device in audio_input_device_list.audio_input_devices:
             if audio_input_device.portaudio_index == default_input_device_index:
                 return audio_input_device
 
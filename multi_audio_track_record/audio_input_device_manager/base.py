@@ -1,5 +1,11 @@
+import asyncio
+import traceback
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable
+
+logger = getLogger(__name__)
 
 
 @dataclass
@@ -19,3 +25,37 @@ class AudioInputDeviceManager(ABC):
 
     @abstractmethod
     async def get_default_audio_input_device(self) -> AudioInputDevice: ...
+
+    @abstractmethod
+    def invalidate_audio_input_devices(self) -> None:
+        """
+        列挙済みのデバイスを破棄し、次に取得する時に列挙し直す。
+        録音やレベルの表示のために開いているストリームを閉じてから呼び出すこと
+        """
+        ...
+
+    @abstractmethod
+    async def rescan_audio_input_devices(self) -> list[AudioInputDevice]:
+        """デバイスを列挙し直して返す。イベントループをブロックしない"""
+        ...
+
+    async def run_periodic_rescan(
+        self,
+        prepare_rescan: Callable[[], bool],
+        interval_seconds: float = 10.0,
+    ) -> None:
+        """
+        キャンセルされるまで interval_seconds ごとにデバイスを列挙し直し、抜き差しを反映する。
+
+        列挙し直す前にイベントループ上で prepare_rescan を呼び出す。
+        prepare_rescan は、ストリームを開いていなければ列挙の妨げになる他の PortAudio の
+        インスタンスを終了して真を返し、録音中やレベルの表示中は偽を返してその回の列挙を見送らせる
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+
+            try:
+                if prepare_rescan():
+                    await self.rescan_audio_input_devices()
+            except Exception:
+                logger.warning(traceback.format_exc())
@@ -1,14 +1,148 @@
 import logging
-from argparse import ArgumentParser
+import sys
+import time
+from argparse import ArgumentParser, Namespace
 from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 from . import __version__ as APP_VERSION
-from .gui.run_app import run_app
+
+# 起動を速くするため、ここでは標準ライブラリだけを読み込む。
+# GUI や PortAudio、エンコーダなどのモジュールは、使うサブコマンドの中で読み込む
+if TYPE_CHECKING:
+    from .config_store_manager import Config
+    from .scene import Scene
+
+APP_STARTED_AT = time.perf_counter()
+"""このモジュールを読み込んだ時刻。起動にかかった時間の計測に使う"""
 
 logger = getLogger(__name__)
 
 
-async def main() -> None:
+class CommandLineError(Exception):
+    """引数や設定ファイルの誤り。使い方の誤りとして終了コード 2 で終了する"""
+
+
+async def load_config(config_file_path: Path | None) -> "Config":
+    from .app_dirs import get_config_file_path
+    from .config_store_manager import ConfigStoreManagerFile
+
+    if config_file_path is None:
+        config_file_path = get_config_file_path()
+
+    if not config_file_path.exists():
+        raise CommandLineError(
+            f"Config file not found: {config_file_path}. "
+            "Create a scene with the GUI first."
+        )
+
+    config_store_manager = ConfigStoreManagerFile(path=config_file_path)
+    return await config_store_manager.load_config()
+
+
+def select_scene(config: "Config", scene_name: str | None) -> "Scene":
+    """scene_name を省略した場合は、 GUI で選択中のシーンを使う"""
+    from .scene import find_scene
+
+    if scene_name is not None:
+        try:
+            return find_scene(scenes=config.scenes, scene_name=scene_name)
+        except ValueError as error:
+            raise CommandLineError(str(error)) from error
+
+    if config.selected_scene_index is None:
+        raise CommandLineError("No scene is selected. Specify --scene.")
+
+    return config.scenes[config.selected_scene_index]
+
+
+async def run_gui(args: Namespace) -> int:
+    # GUI を使わないサブコマンドでは flet を読み込まない
+    from .gui.run_app import run_app
+
+    await run_app(started_at=APP_STARTED_AT)
+    return 0
+
+
+async def run_list_devices(args: Namespace) -> int:
+    from .audio_input_device_manager import AudioInputDeviceManagerPyAudio
+    from .headless import print_audio_input_devices
+
+    await print_audio_input_devices(
+        audio_input_device_manager=AudioInputDeviceManagerPyAudio(),
+        output=sys.stdout,
+    )
+    return 0
+
+
+async def run_list_scenes(args: Namespace) -> int:
+    from .headless import print_scenes
+
+    config = await load_config(config_file_path=args.config)
+    print_scenes(
+        scenes=config.scenes,
+        selected_scene_index=config.selected_scene_index,
+        output=sys.stdout,
+    )
+    return 0
+
+
+async def run_record(args: Namespace) -> int:
+    from .app_dirs import get_default_spool_dir
+    from .headless import record_scene
+
+    config = await load_config(config_file_path=args.config)
+    scene = select_scene(config=config, scene_name=args.scene)
+
+    if args.output_dir is not None:
+        scene = scene.model_copy(update={"output_dir": str(args.output_dir)})
+    if args.journal_sync_interval is not None:
+        if args.journal_sync_interval <= 0:
+            raise CommandLineError("--journal-sync-interval must be positive.")
+        scene = scene.model_copy(
+            update={"spool_journal_sync_interval_seconds": args.journal_sync_interval}
+        )
+
+    return_code, output_path = await record_scene(
+        scene=scene,
+        spool_root_dir=(
+            Path(scene.spool_dir)
+            if scene.spool_dir is not None
+            else get_default_spool_dir()
+        ),
+        duration_seconds=args.duration,
+        is_muted=args.muted,
+        status_interval_seconds=args.status_interval,
+        status_output=sys.stderr,
+    )
+    if return_code == 0:
+        print(output_path)
+
+    return return_code
+
+
+async def run_serve(args: Namespace) -> int:
+    from .app_dirs import get_default_spool_dir
+    from .headless import serve_control_api
+
+    config = await load_config(config_file_path=args.config)
+    scene = select_scene(config=config, scene_name=args.scene)
+
+    return await serve_control_api(
+        scenes=config.scenes,
+        scene=scene,
+        spool_root_dir=get_default_spool_dir(),
+        host=args.host,
+        port=args.port,
+        unix_socket_path=args.unix_socket,
+        is_armed=args.arm,
+        event_interval_seconds=args.event_interval,
+        status_output=sys.stderr,
+    )
+
+
+async def main() -> int:
     parser = ArgumentParser(
         prog="MultiAudioTrackRecorder",
     )
@@ -17,12 +151,112 @@ async def main() -> None:
         action="version",
         version=f"%(prog)s {APP_VERSION}",
     )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        help="Path to the config file shared with the GUI.",
+    )
+    parser.set_defaults(handler=run_gui)
+
+    subparsers = parser.add_subparsers(title="commands")
+
+    record_parser = subparsers.add_parser(
+        "record",
+        help="Record a scene without the GUI.",
+    )
+    record_parser.add_argument(
+        "--scene",
+        type=str,
+        help="Scene name or index. Defaults to the scene selected in the GUI.",
+    )
+    record_parser.add_argument(
+        "--duration",
+        type=float,
+        help="Seconds to record. Records until SIGINT (Ctrl+C) if omitted.",
+    )
+    record_parser.add_argument(
+        "--output-dir",
+        type=Path,
+        help="Overrides the output directory of the scene.",
+    )
+    record_parser.add_argument(
+        "--journal-sync-interval",
+        type=float,
+        help=(
+            "Overrides the seconds between spool file syncs (fsync) of the scene. "
+            "Shorter intervals lose less audio on a crash."
+        ),
+    )
+    record_parser.add_argument(
+        "--muted",
+        action="store_true",
+        help="Start recording with all devices muted.",
+    )
+    record_parser.add_argument(
+        "--status-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between progress and level reports.",
+    )
+    record_parser.set_defaults(handler=run_record)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve a local control API (HTTP, JSON and Server-Sent Events).",
+    )
+    serve_parser.add_argument(
+        "--scene",
+        type=str,
+        help="Scene name or index. Defaults to the scene selected in the GUI.",
+    )
+    serve_parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+    )
+    serve_parser.add_argument(
+        "--unix-socket",
+        type=Path,
+        help="Listen on a UNIX domain socket instead of TCP.",
+    )
+    serve_parser.add_argument(
+        "--arm",
+        action="store_true",
+        help="Arm the scene on start to keep its pre-roll.",
+    )
+    serve_parser.add_argument(
+        "--event-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between meter events.",
+    )
+    serve_parser.set_defaults(handler=run_serve)
+
+    list_devices_parser = subparsers.add_parser(
+        "list-devices",
+        help="List audio input devices.",
+    )
+    list_devices_parser.set_defaults(handler=run_list_devices)
+
+    list_scenes_parser = subparsers.add_parser(
+        "list-scenes",
+        help="List scenes in the config file.",
+    )
+    list_scenes_parser.set_defaults(handler=run_list_scenes)
 
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s : %(message)s",
     )
 
-    parser.parse_args()
+    args = parser.parse_args()
 
-    await run_app()
+    try:
+        return int(await args.handler(args))
+    except CommandLineError as error:
+        parser.exit(status=2, message=f"{parser.prog}: error: {error}\n")
@@ -0,0 +1,25 @@
+from .http_server import (
+    ControlHttpError,
+    ControlHttpRequest,
+    ControlHttpServer,
+    format_control_http_response,
+    read_control_http_request,
+)
+from .recording_controller import (
+    ControlEvent,
+    RecordingControlError,
+    RecordingController,
+    RecordingControllerState,
+)
+
+__all__ = [
+    "ControlEvent",
+    "ControlHttpError",
+    "ControlHttpRequest",
+    "ControlHttpServer",
+    "RecordingControlError",
+    "RecordingController",
+    "RecordingControllerState",
+    "format_control_http_response",
+    "read_control_http_request",
+]
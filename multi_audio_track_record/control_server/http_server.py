@@ -0,0 +1,344 @@
+import asyncio
+import json
+import traceback
+from dataclasses import dataclass
+from http import HTTPStatus
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from .recording_controller import RecordingControlError, RecordingController
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class ControlHttpRequest:
+    method: str
+    path: str
+    headers: dict[str, str]
+    """ヘッダ名は小文字にそろえる"""
+    body: bytes
+
+    @property
+    def is_keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def get_json(self) -> dict[str, Any]:
+        if len(self.body) == 0:
+            return {}
+
+        payload = json.loads(self.body)
+        if not isinstance(payload, dict):
+            raise ValueError("The request body must be a JSON object.")
+
+        return payload
+
+
+class ControlHttpError(Exception):
+    """リクエストを解釈できない。 status で応答して接続を閉じる"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(status, message)
+
+        self.status = status
+        self.message = message
+
+
+async def read_control_http_request(
+    reader: asyncio.StreamReader,
+    max_body_byte_count: int,
+) -> ControlHttpRequest | None:
+    """
+    HTTP/1.1 のリクエストを1件読み取る。接続が閉じられた場合は None を返す
+    """
+    try:
+        header_bytes = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError as error:
+        raise ControlHttpError(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+            "The request header is too large.",
+        ) from error
+
+    request_line, *header_lines = header_bytes.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError as error:
+        raise ControlHttpError(
+            HTTPStatus.BAD_REQUEST, f"Invalid request line: {request_line}"
+        ) from error
+
+    headers: dict[str, str] = {}
+    for header_line in header_lines:
+        if header_line == "":
+            continue
+
+        name, _, value = header_line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        content_length = int(headers.get("content-length", "0"))
+    except ValueError as error:
+        raise ControlHttpError(
+            HTTPStatus.BAD_REQUEST, "Invalid Content-Length."
+        ) from error
+    if content_length > max_body_byte_count:
+        raise ControlHttpError(
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            f"The request body exceeds {max_body_byte_count} bytes.",
+        )
+
+    body = await reader.readexactly(content_length) if content_length > 0 else b""
+
+    return ControlHttpRequest(
+        method=method.upper(),
+        path=target.split("?", 1)[0],
+        headers=headers,
+        body=body,
+    )
+
+
+def format_control_http_response(
+    status: HTTPStatus,
+    payload: dict[str, Any],
+    is_keep_alive: bool,
+) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    header = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if is_keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return header.encode("latin-1") + body
+
+
+ControlHttpHandler = Callable[[ControlHttpRequest], Awaitable[dict[str, Any]]]
+
+
+class ControlHttpServer:
+    """
+    録音を操作する制御API。標準ライブラリの asyncio だけで HTTP/1.1 を話す。
+
+    コマンドは JSON の POST で受け付け、録音の状態を変え終えてから応答する。
+    自動化から続けてコマンドを送る際に接続し直さないよう、 keep-alive で接続を使い回せる。
+    GET /events は Server-Sent Events (text/event-stream) で状態、レベル、マーカー、書き出しの状況を配信する。
+
+    POST /arm {"scene": "..."} /disarm /start /stop /pause /resume
+    POST /mute /unmute /markers {"label": "..."}
+    GET /status /events
+    """
+
+    def __init__(
+        self,
+        controller: RecordingController,
+        max_body_byte_count: int = 64 * 1024,
+    ):
+        self.controller = controller
+        self.max_body_byte_count = max_body_byte_count
+
+        self.__event_stream_tasks: set[asyncio.Task[Any]] = set()
+
+        self.__routes: dict[tuple[str, str], ControlHttpHandler] = {
+            ("GET", "/status"): self.__handle_status,
+            ("POST", "/arm"): self.__handle_arm,
+            ("POST", "/disarm"): self.__handle_disarm,
+            ("POST", "/start"): self.__handle_start,
+            ("POST", "/stop"): self.__handle_stop,
+            ("POST", "/pause"): self.__handle_pause,
+            ("POST", "/resume"): self.__handle_resume,
+            ("POST", "/mute"): self.__handle_mute,
+            ("POST", "/unmute"): self.__handle_unmute,
+            ("POST", "/markers"): self.__handle_add_marker,
+        }
+
+    async def start_server(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket_path: Path | None = None,
+    ) -> asyncio.Server:
+        """
+        unix_socket_path を指定した場合は UNIX ドメインソケットで待ち受ける。
+        それ以外はローカルホストの TCP で待ち受ける (asyncio は TCP_NODELAY を有効にする)
+        """
+        if unix_socket_path is not None:
+            return await asyncio.start_unix_server(
+                self.handle_connection,
+                path=unix_socket_path,
+            )
+
+        return await asyncio.start_server(
+            self.handle_connection,
+            host=host,
+            port=port,
+        )
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_control_http_request(
+                        reader=reader,
+                        max_body_byte_count=self.max_body_byte_count,
+                    )
+                except ControlHttpError as error:
+                    writer.write(
+                        format_control_http_response(
+                            status=error.status,
+                            payload={"error": error.message},
+                            is_keep_alive=False,
+                        )
+                    )
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                if request.method == "GET" and request.path == "/events":
+                    event_stream_task = asyncio.current_task()
+                    assert event_stream_task is not None
+                    self.__event_stream_tasks.add(event_stream_task)
+                    try:
+                        await self.__stream_events(writer=writer)
+                    finally:
+                        self.__event_stream_tasks.discard(event_stream_task)
+                    break
+
+                status, payload = await self.__dispatch(request=request)
+                writer.write(
+                    format_control_http_response(
+                        status=status,
+                        payload=payload,
+                        is_keep_alive=request.is_keep_alive,
+                    )
+                )
+                await writer.drain()
+
+                if not request.is_keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def close_event_streams(self, timeout_seconds: float = 1.0) -> None:
+        """
+        GET /events の配信を終え、送り残したイベントを書き込んで接続を閉じるまで待つ。
+        server.close() は開いている接続を閉じないため、終了時に呼び出す
+        """
+        self.controller.close_event_queues()
+
+        event_stream_tasks = set(self.__event_stream_tasks)
+        if len(event_stream_tasks) > 0:
+            await asyncio.wait(event_stream_tasks, timeout=timeout_seconds)
+
+    async def __dispatch(
+        self,
+        request: ControlHttpRequest,
+    ) -> tuple[HTTPStatus, dict[str, Any]]:
+        handler = self.__routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.__routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {
+                    "error": f"Method not allowed: {request.method}",
+                }
+            return HTTPStatus.NOT_FOUND, {"error": f"Not found: {request.path}"}
+
+        try:
+            return HTTPStatus.OK, await handler(request)
+        except ValueError as error:
+            # JSON の誤りも含む
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except RecordingControlError as error:
+            return HTTPStatus.CONFLICT, {"error": str(error)}
+        except Exception:
+            logger.error(traceback.format_exc())
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                "error": "Internal server error.",
+            }
+
+    async def __stream_events(self, writer: asyncio.StreamWriter) -> None:
+        controller = self.controller
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n"
+            b"\r\n"
+        )
+        await writer.drain()
+
+        event_queue = controller.subscribe()
+        try:
+            while True:
+                event = await event_queue.get()
+                if event is None:
+                    break
+
+                writer.write(
+                    f"event: {event['type']}\n"
+                    f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+                )
+                await writer.drain()
+        finally:
+            controller.unsubscribe(event_queue)
+
+    async def __handle_status(self, request: ControlHttpRequest) -> dict[str, Any]:
+        return self.controller.get_status()
+
+    async def __handle_arm(self, request: ControlHttpRequest) -> dict[str, Any]:
+        scene_name = request.get_json().get("scene")
+        if scene_name is not None and not isinstance(scene_name, str):
+            raise ValueError("scene must be a string.")
+
+        await self.controller.arm(scene_name=scene_name)
+        return self.controller.get_status()
+
+    async def __handle_disarm(self, request: ControlHttpRequest) -> dict[str, Any]:
+        await self.controller.disarm()
+        return self.controller.get_status()
+
+    async def __handle_start(self, request: ControlHttpRequest) -> dict[str, Any]:
+        await self.controller.start()
+        return self.controller.get_status()
+
+    async def __handle_stop(self, request: ControlHttpRequest) -> dict[str, Any]:
+        await self.controller.stop()
+        return self.controller.get_status()
+
+    async def __handle_pause(self, request: ControlHttpRequest) -> dict[str, Any]:
+        self.controller.set_paused(is_paused=True)
+        return self.controller.get_status()
+
+    async def __handle_resume(self, request: ControlHttpRequest) -> dict[str, Any]:
+        self.controller.set_paused(is_paused=False)
+        return self.controller.get_status()
+
+    async def __handle_mute(self, request: ControlHttpRequest) -> dict[str, Any]:
+        self.controller.set_muted(is_muted=True)
+        return self.controller.get_status()
+
+    async def __handle_unmute(self, request: ControlHttpRequest) -> dict[str, Any]:
+        self.controller.set_muted(is_muted=False)
+        return self.controller.get_status()
+
+    async def __handle_add_marker(
+        self,
+        request: ControlHttpRequest,
+    ) -> dict[str, Any]:
+        label = request.get_json().get("label")
+        if label is not None and not isinstance(label, str):
+            raise ValueError("label must be a string.")
+
+        marker = self.controller.add_marker(label=label)
+        return marker.model_dump(mode="json")
@@ -0,0 +1,357 @@
+import asyncio
+import traceback
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Literal
+
+from ..encoder import ENCODE_JOB_PRIORITY_RECORDING, EncodeJob, EncodeJobQueue
+from ..recorder import Recorder
+from ..recording_marker import RecordingMarker
+from ..recording_session import RecordingSession
+from ..scene import Scene, find_scene
+
+logger = getLogger(__name__)
+
+RecordingControllerState = Literal["idle", "armed", "recording", "stopping"]
+
+ControlEvent = dict[str, Any]
+"""制御APIのクライアントに送るイベント。 type で種類を区別する JSON のオブジェクト"""
+
+
+class RecordingControlError(Exception):
+    """現在の状態では実行できない操作"""
+
+
+class RecordingController:
+    """
+    GUI を使わずに録音を操作する。制御APIの各リクエストは、イベントループ上でこのクラスのメソッドを呼び出す。
+
+    録音は GUI と同じ RecordingSession を通して行い、書き出しは EncodeJobQueue に任せる。
+    stop は録音スレッドに停止を伝えるとすぐに戻り、スプールファイルの書き込みを待つ処理は裏で行う。
+    run を動かしている間、 event_interval_seconds ごとにレベルと書き出しの状況をイベントとして配信する
+    """
+
+    def __init__(
+        self,
+        recorder: Recorder,
+        scenes: list[Scene],
+        scene: Scene,
+        spool_root_dir: Path,
+        encode_job_queue: EncodeJobQueue,
+        event_interval_seconds: float = 0.1,
+        event_queue_size: int = 256,
+    ):
+        self.recorder = recorder
+        self.scenes = scenes
+        self.scene = scene
+        self.spool_root_dir = spool_root_dir
+        self.encode_job_queue = encode_job_queue
+        self.event_interval_seconds = event_interval_seconds
+        self.event_queue_size = event_queue_size
+        """クライアントごとに溜めるイベントの上限。読み出しが遅いクライアントには古いものから捨てる"""
+
+        self.is_armed = False
+        """録音していない間もストリームを開いてプリロールを保持するか"""
+        self.is_muted = False
+
+        # ストリームを開き直している間に、別のリクエストが状態を変えないようにする
+        self.__command_lock = asyncio.Lock()
+        self.__recording_session: RecordingSession | None = None
+        self.__finish_recording_task: asyncio.Task[None] | None = None
+        self.__event_queues: list["asyncio.Queue[ControlEvent | None]"] = []
+        self.__is_event_queues_closed = False
+        self.__encode_jobs_event: ControlEvent | None = None
+
+    @property
+    def state(self) -> RecordingControllerState:
+        if self.__finish_recording_task is not None:
+            return "stopping"
+        if self.__recording_session is not None:
+            return "recording"
+        if self.is_armed:
+            return "armed"
+        return "idle"
+
+    def subscribe(self) -> "asyncio.Queue[ControlEvent | None]":
+        """
+        イベントを受け取るキューを返す。最初に現在の状態が届く。
+        配信を終える時は None が届く
+        """
+        event_queue: "asyncio.Queue[ControlEvent | None]" = asyncio.Queue(
+            maxsize=self.event_queue_size,
+        )
+        event_queue.put_nowait(self.get_status_event())
+        if self.__is_event_queues_closed:
+            event_queue.put_nowait(None)
+        else:
+            self.__event_queues.append(event_queue)
+        return event_queue
+
+    def unsubscribe(self, event_queue: "asyncio.Queue[ControlEvent | None]") -> None:
+        if event_queue in self.__event_queues:
+            self.__event_queues.remove(event_queue)
+
+    def publish(self, event: ControlEvent) -> None:
+        for event_queue in self.__event_queues:
+            if event_queue.full():
+                event_queue.get_nowait()
+            event_queue.put_nowait(event)
+
+    def close_event_queues(self) -> None:
+        """全てのキューに None を送って配信を終え、以後の購読にもすぐに None を返す"""
+        self.__is_event_queues_closed = True
+
+        for event_queue in self.__event_queues:
+            if event_queue.full():
+                event_queue.get_nowait()
+            event_queue.put_nowait(None)
+        self.__event_queues = []
+
+    def get_status(self) -> dict[str, Any]:
+        recording_session = self.__recording_session
+
+        return {
+            "state": self.state,
+            "scene": self.scene.name,
+            "is_armed": self.is_armed,
+            "is_muted": self.is_muted,
+            "is_paused": (
+                recording_session.is_paused if recording_session is not None else False
+            ),
+            "position_seconds": (
+                recording_session.get_position_seconds()
+                if recording_session is not None
+                else None
+            ),
+            "output_path": (
+                str(recording_session.output_path)
+                if recording_session is not None
+                else None
+            ),
+            "markers": (
+                [marker.model_dump(mode="json") for marker in recording_session.markers]
+                if recording_session is not None
+                else []
+            ),
+        }
+
+    def get_status_event(self) -> ControlEvent:
+        return {"type": "status", **self.get_status()}
+
+    def __on_status_changed(self) -> None:
+        self.publish(self.get_status_event())
+
+    def __raise_if_recording(self) -> None:
+        if self.state in ("recording", "stopping"):
+            raise RecordingControlError(f"Not allowed while {self.state}.")
+
+    def __get_recording_session(self) -> RecordingSession:
+        recording_session = self.__recording_session
+        if recording_session is None or self.state != "recording":
+            raise RecordingControlError("Not recording.")
+
+        return recording_session
+
+    async def __reopen_streams(self) -> None:
+        """
+        アーム状態やシーンに合わせて音声入力ストリームを開き直す。
+        アームしていない場合も、レベルを配信するためにプリロール無しで開いておく
+        """
+        recorder = self.recorder
+
+        recorder.stop()
+        await recorder.wait_stopped()
+
+        recorder.arm(
+            scene=self.scene,
+            is_muted=self.is_muted,
+            pre_roll_seconds=None if self.is_armed else 0.0,
+        )
+
+    async def arm(self, scene_name: str | None = None) -> None:
+        async with self.__command_lock:
+            self.__raise_if_recording()
+
+            if scene_name is not None:
+                try:
+                    self.scene = find_scene(scenes=self.scenes, scene_name=scene_name)
+                except ValueError as error:
+                    raise RecordingControlError(str(error)) from error
+
+            self.is_armed = True
+            await self.__reopen_streams()
+
+        self.__on_status_changed()
+
+    async def disarm(self) -> None:
+        async with self.__command_lock:
+            self.__raise_if_recording()
+
+            self.is_armed = False
+            await self.__reopen_streams()
+
+        self.__on_status_changed()
+
+    async def start(self) -> None:
+        async with self.__command_lock:
+            self.__raise_if_recording()
+
+            scene = self.scene
+            recorder = self.recorder
+            if recorder.armed_scene is not scene:
+                # 別のシーンで開いていたストリームは閉じ、録音の開始時に開き直す
+                recorder.stop()
+                await recorder.wait_stopped()
+
+            recording_session = RecordingSession(
+                recorder=recorder,
+                scene=scene,
+                spool_root_dir=(
+                    Path(scene.spool_dir)
+                    if scene.spool_dir is not None
+                    else self.spool_root_dir
+                ),
+            )
+            await recording_session.start(is_muted=self.is_muted)
+            self.__recording_session = recording_session
+
+        self.__on_status_changed()
+
+    async def stop(self) -> None:
+        """
+        録音スレッドに停止を伝えてすぐに戻る。
+        スプールファイルを書き終えると書き出しを始め、状態が idle または armed に戻る
+        """
+        recording_session = self.__get_recording_session()
+
+        recording_session.request_stop()
+        self.__finish_recording_task = asyncio.create_task(
+            self.__finish_recording(recording_session=recording_session),
+        )
+
+        self.__on_status_changed()
+
+    async def __finish_recording(self, recording_session: RecordingSession) -> None:
+        try:
+            await recording_session.stop()
+
+            async def encode_job_run(job: EncodeJob) -> int:
+                return await recording_session.encode(on_progress=job.set_progress)
+
+            spool_dir = recording_session.spool_dir
+            assert spool_dir is not None
+
+            await self.encode_job_queue.submit(
+                spool_dir=spool_dir,
+                output_path=recording_session.output_path,
+                run=encode_job_run,
+                priority=ENCODE_JOB_PRIORITY_RECORDING,
+                duration_seconds=recording_session.recording_seconds,
+            )
+
+            # レベルの配信と次の録音に備えて、再びストリームを開く
+            await self.__reopen_streams()
+        except Exception:
+            logger.error(traceback.format_exc())
+            self.publish({"type": "error", "message": traceback.format_exc()})
+        finally:
+            self.__recording_session = None
+            self.__finish_recording_task = None
+            self.__on_status_changed()
+
+    async def wait_stopped(self) -> None:
+        """stop した録音のスプールファイルを書き終えるまで待つ"""
+        finish_recording_task = self.__finish_recording_task
+        if finish_recording_task is not None:
+            await asyncio.shield(finish_recording_task)
+
+    def set_paused(self, is_paused: bool) -> None:
+        recording_session = self.__get_recording_session()
+        recording_session.set_paused(is_paused=is_paused)
+        self.__on_status_changed()
+
+    def set_muted(self, is_muted: bool) -> None:
+        self.is_muted = is_muted
+
+        recording_session = self.__recording_session
+        if recording_session is not None and self.state == "recording":
+            recording_session.set_muted(is_muted=is_muted)
+        else:
+            self.recorder.set_muted(is_muted=is_muted)
+
+        self.__on_status_changed()
+
+    def add_marker(self, label: str | None = None) -> RecordingMarker:
+        recording_session = self.__get_recording_session()
+
+        marker = recording_session.add_marker(label=label)
+        self.publish({"type": "marker", "marker": marker.model_dump(mode="json")})
+        return marker
+
+    async def shutdown(self) -> None:
+        """録音中の場合は録音を終えてスプールファイルを書き終えるまで待ち、ストリームを閉じる"""
+        if self.state == "recording":
+            await self.stop()
+        await self.wait_stopped()
+
+        recorder = self.recorder
+        recorder.stop()
+        await recorder.wait_stopped()
+
+    async def run(self) -> None:
+        """レベルと書き出しの状況を定期的に配信し、キャンセルされるまで動かし続ける"""
+        while True:
+            await asyncio.sleep(self.event_interval_seconds)
+
+            recording_session = self.__recording_session
+            if recording_session is not None and self.state == "recording":
+                recording_session.poll()
+
+            if len(self.__event_queues) == 0:
+                continue
+
+            self.publish(self.__get_meter_event())
+
+            encode_jobs_event = self.__get_encode_jobs_event()
+            if encode_jobs_event != self.__encode_jobs_event:
+                self.__encode_jobs_event = encode_jobs_event
+                self.publish(encode_jobs_event)
+
+    def __get_meter_event(self) -> ControlEvent:
+        scene = self.scene
+        track_meter_readings = self.recorder.get_track_meter_readings()
+
+        return {
+            "type": "meter",
+            "tracks": [
+                {
+                    "index": track_index,
+                    "name": track.name,
+                    "peak_decibel": track_meter_readings[track_index].peak_decibel,
+                    "rms_decibel": track_meter_readings[track_index].rms_decibel,
+                    "peak_hold_decibel": (
+                        track_meter_readings[track_index].peak_hold_decibel
+                    ),
+                }
+                for track_index, track in enumerate(scene.tracks)
+                if track_index in track_meter_readings
+            ],
+        }
+
+    def __get_encode_jobs_event(self) -> ControlEvent:
+        return {
+            "type": "encode",
+            "jobs": [
+                {
+                    "job_id": job.record.job_id,
+                    "output_path": job.record.output_path,
+                    "state": job.record.state,
+                    "progress_ratio": (
+                        round(job.progress_ratio, 2)
+                        if job.progress_ratio is not None
+                        else None
+                    ),
+                }
+                for job in self.encode_job_queue.get_active_jobs()
+            ],
+        }
@@ -0,0 +1,42 @@
+from .alignment import (
+    BlockTimestampRing,
+    ClockDriftEstimator,
+    get_clock_correction_ratio,
+)
+from .gain import GainProcessor, decibel_to_amplitude
+from .metering import (
+    MIN_METER_DECIBEL,
+    SILENT_METER_READING,
+    LevelMeter,
+    MeterReading,
+    decibel_to_meter_value,
+    merge_meter_readings,
+)
+from .mix_bus import MixBus
+from .resampler import StreamingResampler
+from .ring_buffer import AudioRingBuffer
+from .sample_format import (
+    SampleFormat,
+    SampleFormatConverter,
+    get_sample_format_byte_count,
+)
+
+__all__ = [
+    "MIN_METER_DECIBEL",
+    "SILENT_METER_READING",
+    "AudioRingBuffer",
+    "BlockTimestampRing",
+    "ClockDriftEstimator",
+    "GainProcessor",
+    "LevelMeter",
+    "MeterReading",
+    "MixBus",
+    "SampleFormat",
+    "SampleFormatConverter",
+    "StreamingResampler",
+    "decibel_to_amplitude",
+    "decibel_to_meter_value",
+    "get_clock_correction_ratio",
+    "get_sample_format_byte_count",
+    "merge_meter_readings",
+]
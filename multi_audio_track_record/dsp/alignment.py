@@ -0,0 +1,165 @@
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+
+class BlockTimestampRing:
+    """
+    ブロックごとの (先頭フレーム位置, 取り込み時刻) を受け渡す単一生産者・単一消費者のリングバッファ。
+    AudioRingBuffer と同様に、書き込み位置と読み込み位置をそれぞれ片側のスレッドだけが更新する。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive: {capacity}")
+
+        self.capacity = capacity
+
+        self.__frame_positions: npt.NDArray[np.int64] = np.zeros(
+            capacity, dtype=np.int64
+        )
+        self.__capture_times: npt.NDArray[np.float64] = np.zeros(
+            capacity, dtype=np.float64
+        )
+
+        self.__write_position = 0
+        self.__read_position = 0
+
+        self.overflow_count = 0
+
+    def push(self, frame_position: int, capture_time: float) -> bool:
+        """生産者側から呼び出す。満杯の場合は捨てて False を返す"""
+        if self.__write_position - self.__read_position >= self.capacity:
+            self.overflow_count += 1
+            return False
+
+        index = self.__write_position % self.capacity
+        self.__frame_positions[index] = frame_position
+        self.__capture_times[index] = capture_time
+
+        self.__write_position += 1
+
+        return True
+
+    def pop(self) -> tuple[int, float] | None:
+        """消費者側から呼び出す"""
+        if self.__write_position == self.__read_position:
+            return None
+
+        index = self.__read_position % self.capacity
+        item = (
+            int(self.__frame_positions[index]),
+            float(self.__capture_times[index]),
+        )
+
+        self.__read_position += 1
+
+        return item
+
+
+class ClockDriftEstimator:
+    """
+    フレーム位置と取り込み時刻 (共通の基準時計) の組から、
+    デバイスの実際のサンプリングレートを指数重み付き最小二乗法で逐次推定する。
+
+    clock_ratio は「実際のサンプリングレート / 公称サンプリングレート」であり、
+    他のスレッドから読み出してよい。
+    """
+
+    def __init__(
+        self,
+        nominal_sampling_rate: int,
+        time_constant_seconds: float = 30.0,
+        warmup_seconds: float = 2.0,
+        max_clock_ratio_deviation: float = 0.005,
+    ):
+        self.nominal_sampling_rate = nominal_sampling_rate
+        self.time_constant_seconds = time_constant_seconds
+        self.warmup_seconds = warmup_seconds
+        self.max_clock_ratio_deviation = max_clock_ratio_deviation
+
+        self.clock_ratio = 1.0
+
+        # 桁落ちを避けるため、最初の観測を原点とした相対値で集計する
+        self.__origin: tuple[int, float] | None = None
+        self.__last_frame_position = 0
+        self.__weight = 0.0
+        self.__mean_x = 0.0
+        self.__mean_y = 0.0
+        self.__cov_xx = 0.0
+        self.__cov_xy = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        origin = self.__origin
+        if origin is None:
+            return False
+
+        observed_frames = self.__last_frame_position - origin[0]
+        return observed_frames >= self.warmup_seconds * self.nominal_sampling_rate
+
+    def add(self, frame_position: int, capture_time: float) -> None:
+        origin = self.__origin
+        if origin is None:
+            origin = (frame_position, capture_time)
+            self.__origin = origin
+
+        x = float(frame_position - origin[0])
+        y = capture_time - origin[1]
+
+        elapsed_frames = frame_position - self.__last_frame_position
+        self.__last_frame_position = frame_position
+
+        decay = math.exp(
+            -max(elapsed_frames, 0)
+            / (self.time_constant_seconds * self.nominal_sampling_rate)
+        )
+
+        self.__weight = decay * self.__weight + 1.0
+
+        dx = x - self.__mean_x
+        self.__mean_x += dx / self.__weight
+        self.__mean_y += (y - self.__mean_y) / self.__weight
+
+        self.__cov_xx = decay * self.__cov_xx + dx * (x - self.__mean_x)
+        self.__cov_xy = decay * self.__cov_xy + dx * (y - self.__mean_y)
+
+        if self.is_ready and self.__cov_xx > 0 and self.__cov_xy > 0:
+            seconds_per_frame = self.__cov_xy / self.__cov_xx
+            clock_ratio = 1.0 / (seconds_per_frame * self.nominal_sampling_rate)
+
+            max_deviation = self.max_clock_ratio_deviation
+            self.clock_ratio = min(
+                max(clock_ratio, 1.0 - max_deviation),
+                1.0 + max_deviation,
+            )
+
+    def get_capture_time(self, frame_position: int) -> float | None:
+        """
+        推定したレートに基づいて、フレーム位置の取り込み時刻を返す。
+        観測が無い場合は None を返す
+        """
+        origin = self.__origin
+        if origin is None:
+            return None
+
+        x = float(frame_position - origin[0])
+        seconds_per_frame = 1.0 / (self.clock_ratio * self.nominal_sampling_rate)
+
+        return origin[1] + self.__mean_y + (x - self.__mean_x) * seconds_per_frame
+
+
+def get_clock_correction_ratio(
+    reference_clock_ratio: float,
+    clock_ratio: float,
+    max_ratio: float,
+) -> float:
+    """
+    デバイスのフレームを基準デバイスのクロックに合わせる変換比 (入力1フレームあたりの出力フレーム数) を返す。
+
+    それぞれの推定値は ClockDriftEstimator の上限で制限されるが、
+    2つが逆向きに上限に達すると比が上限の約2倍になるため、 [1 / max_ratio, max_ratio] に収める
+    """
+    ratio = reference_clock_ratio / clock_ratio
+    return min(max(ratio, 1.0 / max_ratio), max_ratio)
@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+
+def decibel_to_amplitude(decibel: float) -> float:
+    return math.pow(10.0, decibel / 20.0)
+
+
+class GainProcessor:
+    """
+    ゲイン (dB) とミュートをブロックにその場で適用する。
+
+    ゲインやミュートが変わったときは ramp_seconds 秒かけて線形に移行し、クリックノイズを防ぐ。
+    ランプ用のバッファは生成時に確保し、 process ではメモリを確保しない。
+    """
+
+    def __init__(
+        self,
+        sampling_rate: int,
+        max_frames: int,
+        gain_decibel: float = 0.0,
+        is_muted: bool = False,
+        ramp_seconds: float = 0.01,
+    ):
+        self.max_frames = max_frames
+        self.ramp_frames = max(int(sampling_rate * ramp_seconds), 1)
+
+        self.__gain_decibel = gain_decibel
+        self.__is_muted = is_muted
+
+        self.__current_amplitude = self.__get_target_amplitude()
+        self.__ramp_step = 0.0
+        self.__remaining_ramp_frames = 0
+
+        self.__arange = np.arange(1, max_frames + 1, dtype=np.float32).reshape(-1, 1)
+        self.__ramp_array = np.empty((max_frames, 1), dtype=np.float32)
+
+    @property
+    def gain_decibel(self) -> float:
+        return self.__gain_decibel
+
+    @property
+    def is_muted(self) -> bool:
+        return self.__is_muted
+
+    def __get_target_amplitude(self) -> float:
+        if self.__is_muted:
+            return 0.0
+
+        return decibel_to_amplitude(self.__gain_decibel)
+
+    def __start_ramp(self) -> None:
+        target_amplitude = self.__get_target_amplitude()
+        self.__ramp_step = (
+            target_amplitude - self.__current_amplitude
+        ) / self.ramp_frames
+        self.__remaining_ramp_frames = self.ramp_frames
+
+    def set_gain_decibel(self, gain_decibel: float) -> None:
+        if self.__gain_decibel == gain_decibel:
+            return
+
+        self.__gain_decibel = gain_decibel
+        self.__start_ramp()
+
+    def set_muted(self, is_muted: bool) -> None:
+        if self.__is_muted == is_muted:
+            return
+
+        self.__is_muted = is_muted
+        self.__start_ramp()
+
+    def process(self, frames: npt.NDArray[np.float32]) -> None:
+        frame_count = len(frames)
+        if frame_count > self.max_frames:
+            raise ValueError(f"Too many frames: {frame_count} > {self.max_frames}")
+
+        ramp_frame_count = min(frame_count, self.__remaining_ramp_frames)
+        if ramp_frame_count > 0:
+            ramp_array = self.__ramp_array[:ramp_frame_count]
+            np.multiply(
+                self.__arange[:ramp_frame_count], self.__ramp_step, out=ramp_array
+            )
+            ramp_array += self.__current_amplitude
+
+            frames[:ramp_frame_count] *= ramp_array
+
+            self.__remaining_ramp_frames -= ramp_frame_count
+            if self.__remaining_ramp_frames == 0:
+                # 誤差を残さないよう、ランプの終わりで目標値に合わせる
+                self.__current_amplitude = self.__get_target_amplitude()
+            else:
+                self.__current_amplitude += self.__ramp_step * ramp_frame_count
+
+        rest_frames = frames[ramp_frame_count:]
+        if len(rest_frames) == 0:
+            return
+
+        current_amplitude = self.__current_amplitude
+        if current_amplitude == 0.0:
+            rest_frames.fill(0)
+        elif current_amplitude != 1.0:
+            rest_frames *= np.float32(current_amplitude)
@@ -0,0 +1,200 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+MIN_METER_DECIBEL = -120.0
+"""メーターが表す最小のレベル。無音はこの値になる"""
+
+
+@dataclass(frozen=True)
+class MeterReading:
+    """
+    1チャンネル分のレベル (dBFS)
+    """
+
+    peak_decibel: float
+    """減衰の特性を適用したピーク"""
+    rms_decibel: float
+    """直近のブロックのRMS"""
+    peak_hold_decibel: float
+    """一定時間保持するピーク"""
+
+
+def decibel_to_meter_value(decibel: float, floor_decibel: float = -60.0) -> float:
+    """
+    レベルを、 floor_decibel を 0 、 0 dBFS を 1 とするメーターの表示値に変換する
+    """
+    if decibel <= floor_decibel:
+        return 0.0
+
+    return min((decibel - floor_decibel) / -floor_decibel, 1.0)
+
+
+SILENT_METER_READING = MeterReading(
+    peak_decibel=MIN_METER_DECIBEL,
+    rms_decibel=MIN_METER_DECIBEL,
+    peak_hold_decibel=MIN_METER_DECIBEL,
+)
+
+
+class LevelMeter:
+    """
+    ブロックごとにチャンネル別のピークとRMSを求め、メーターの特性 (ピークの保持と減衰) を適用する。
+
+    ピークは即座に立ち上がり、 decay_decibel_per_second で減衰する。
+    ピークホールドは hold_seconds 秒保持したのち、同じ速さで減衰する。
+    計算用のバッファは生成時に確保し、 process ではブロックの長さに比例するメモリを確保しない。
+    """
+
+    def __init__(
+        self,
+        sampling_rate: int,
+        channels: int,
+        max_frames: int,
+        decay_decibel_per_second: float = 20.0,
+        hold_seconds: float = 1.5,
+    ):
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.max_frames = max_frames
+        self.decay_decibel_per_second = decay_decibel_per_second
+        self.hold_seconds = hold_seconds
+
+        self.__scratch_array = np.empty((max_frames, channels), dtype=np.float32)
+        self.__block_peak_array = np.empty(channels, dtype=np.float32)
+        self.__block_mean_square_array = np.empty(channels, dtype=np.float32)
+
+        self.__block_peak_decibel_array = np.full(
+            channels, MIN_METER_DECIBEL, dtype=np.float64
+        )
+        self.__rms_decibel_array = np.full(
+            channels, MIN_METER_DECIBEL, dtype=np.float64
+        )
+        self.__peak_decibel_array = np.full(
+            channels, MIN_METER_DECIBEL, dtype=np.float64
+        )
+        self.__peak_hold_decibel_array = np.full(
+            channels, MIN_METER_DECIBEL, dtype=np.float64
+        )
+        self.__hold_remaining_seconds_array = np.zeros(channels, dtype=np.float64)
+        self.__is_new_peak_array = np.zeros(channels, dtype=np.bool_)
+
+    def reset(self) -> None:
+        self.__rms_decibel_array.fill(MIN_METER_DECIBEL)
+        self.__peak_decibel_array.fill(MIN_METER_DECIBEL)
+        self.__peak_hold_decibel_array.fill(MIN_METER_DECIBEL)
+        self.__hold_remaining_seconds_array.fill(0.0)
+
+    def __to_decibel(
+        self,
+        amplitude_array: npt.NDArray[np.float32],
+        out: npt.NDArray[np.float64],
+        factor: float,
+    ) -> None:
+        # log10(0) を避けるため、最小レベル相当の値で下限を設ける
+        np.maximum(amplitude_array, 10.0 ** (MIN_METER_DECIBEL / factor), out=out)
+        np.log10(out, out=out)
+        out *= factor
+        np.maximum(out, MIN_METER_DECIBEL, out=out)
+
+    def process(self, frames: npt.NDArray[np.float32]) -> None:
+        frame_count = len(frames)
+        if frame_count == 0:
+            return
+        if frame_count > self.max_frames:
+            raise ValueError(f"Too many frames: {frame_count} > {self.max_frames}")
+
+        scratch_array = self.__scratch_array[:frame_count]
+        block_peak_decibel_array = self.__block_peak_decibel_array
+        peak_decibel_array = self.__peak_decibel_array
+        peak_hold_decibel_array = self.__peak_hold_decibel_array
+        hold_remaining_seconds_array = self.__hold_remaining_seconds_array
+        is_new_peak_array = self.__is_new_peak_array
+
+        np.abs(frames, out=scratch_array)
+        np.max(scratch_array, axis=0, out=self.__block_peak_array)
+        self.__to_decibel(self.__block_peak_array, block_peak_decibel_array, 20.0)
+
+        np.square(frames, out=scratch_array)
+        np.mean(scratch_array, axis=0, out=self.__block_mean_square_array)
+        self.__to_decibel(
+            self.__block_mean_square_array, self.__rms_decibel_array, 10.0
+        )
+
+        block_seconds = frame_count / self.sampling_rate
+        decay_decibel = self.decay_decibel_per_second * block_seconds
+
+        # ピーク: 即座に立ち上がり、一定の速さで減衰する
+        peak_decibel_array -= decay_decibel
+        np.maximum(peak_decibel_array, block_peak_decibel_array, out=peak_decibel_array)
+
+        # ピークホールド: 新しいピークで更新し、保持時間を過ぎたら減衰する
+        np.greater_equal(
+            block_peak_decibel_array, peak_hold_decibel_array, out=is_new_peak_array
+        )
+        hold_remaining_seconds_array -= block_seconds
+        peak_hold_decibel_array -= np.where(
+            hold_remaining_seconds_array < 0.0, decay_decibel, 0.0
+        )
+        np.copyto(
+            peak_hold_decibel_array, block_peak_decibel_array, where=is_new_peak_array
+        )
+        np.copyto(
+            hold_remaining_seconds_array, self.hold_seconds, where=is_new_peak_array
+        )
+        np.maximum(
+            peak_hold_decibel_array, peak_decibel_array, out=peak_hold_decibel_array
+        )
+
+        np.maximum(peak_decibel_array, MIN_METER_DECIBEL, out=peak_decibel_array)
+
+    def get_readings(self) -> list[MeterReading]:
+        return [
+            MeterReading(
+                peak_decibel=float(peak_decibel),
+                rms_decibel=float(rms_decibel),
+                peak_hold_decibel=float(peak_hold_decibel),
+            )
+            for peak_decibel, rms_decibel, peak_hold_decibel in zip(
+                self.__peak_decibel_array,
+                self.__rms_decibel_array,
+                self.__peak_hold_decibel_array,
+            )
+        ]
+
+
+def merge_meter_readings(
+    meter_readings: list[MeterReading],
+    gain_decibel: float = 0.0,
+) -> MeterReading:
+    """
+    複数チャンネルのレベルを1つにまとめる。
+    ピークは最大値、RMSはパワーの和とし、 gain_decibel を加える
+    """
+    if len(meter_readings) == 0:
+        return SILENT_METER_READING
+
+    power = sum(
+        math.pow(10.0, meter_reading.rms_decibel / 10.0)
+        for meter_reading in meter_readings
+        if meter_reading.rms_decibel > MIN_METER_DECIBEL
+    )
+    rms_decibel = 10.0 * math.log10(power) if power > 0.0 else MIN_METER_DECIBEL
+
+    def apply_gain(decibel: float) -> float:
+        if decibel <= MIN_METER_DECIBEL:
+            return MIN_METER_DECIBEL
+
+        return max(decibel + gain_decibel, MIN_METER_DECIBEL)
+
+    return MeterReading(
+        peak_decibel=apply_gain(
+            max(meter_reading.peak_decibel for meter_reading in meter_readings)
+        ),
+        rms_decibel=apply_gain(rms_decibel),
+        peak_hold_decibel=apply_gain(
+            max(meter_reading.peak_hold_decibel for meter_reading in meter_readings)
+        ),
+    )
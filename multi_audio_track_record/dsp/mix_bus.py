@@ -0,0 +1,177 @@
+import threading
+
+import numpy as np
+import numpy.typing as npt
+
+
+class MixBus:
+    """
+    複数の入力を、フレーム位置を揃えて足し合わせるミックスバス。
+
+    各入力はそれぞれのスレッドから add で先頭から順にフレームを加算し、
+    消費者は read_into で全ての入力が加算し終えたフレームだけを読み出す。
+    モノラルの入力は全チャンネルに加算する。
+    is_normalized が真の場合は、 FFmpeg の amix と同じく入力数で割り、入力を増やしても音量が上がらないようにする。
+
+    遅れている入力があると読み出せるフレームが増えないため、
+    最も進んだ入力との差が max_lag_frames を超えた入力は無音を加えたものとして先に進め、
+    その分のフレームを後から届いたときに読み捨てる。
+    読み出しが追いつかず容量を超えたフレームは捨て、 overflow_frame_count に加算する。
+    """
+
+    def __init__(
+        self,
+        channels: int,
+        input_count: int,
+        capacity_frames: int,
+        max_lag_frames: int | None = None,
+        is_normalized: bool = True,
+    ):
+        if capacity_frames <= 0:
+            raise ValueError(f"capacity_frames must be positive: {capacity_frames}")
+        if input_count <= 0:
+            raise ValueError(f"input_count must be positive: {input_count}")
+
+        self.channels = channels
+        self.input_count = input_count
+        self.capacity_frames = capacity_frames
+        self.max_lag_frames = (
+            max_lag_frames if max_lag_frames is not None else capacity_frames // 2
+        )
+        self.is_normalized = is_normalized
+
+        self.__lock = threading.Lock()
+        self.__buffer = np.zeros((capacity_frames, channels), dtype=np.float32)
+
+        self.__read_position = 0
+        self.__input_positions = [0] * input_count
+        self.__input_pending_skip_frame_counts = [0] * input_count
+        self.__is_input_finished = [False] * input_count
+
+        self.overflow_frame_count = 0
+        """読み出しが追いつかず、加算できずに捨てたフレーム数 (入力ごとの合計)"""
+        self.lagged_frame_count = 0
+        """遅れた入力の代わりに無音とみなしたフレーム数 (入力ごとの合計)"""
+
+    @property
+    def is_finished(self) -> bool:
+        """全ての入力が終わり、全てのフレームを読み出したか"""
+        with self.__lock:
+            return all(self.__is_input_finished) and (
+                self.__get_readable_end_position() == self.__read_position
+            )
+
+    def __get_readable_end_position(self) -> int:
+        # 終わった入力は、以降を無音とみなす
+        active_positions = [
+            position
+            for position, is_finished in zip(
+                self.__input_positions, self.__is_input_finished
+            )
+            if not is_finished
+        ]
+        if len(active_positions) > 0:
+            return min(active_positions)
+
+        return max(self.__input_positions)
+
+    def add(self, input_index: int, frames: npt.NDArray[np.float32]) -> None:
+        """
+        入力側のスレッドから呼び出す。 frames は (フレーム数, チャンネル数) か、
+        モノラルの場合は (フレーム数,) の配列
+        """
+        buffer = self.__buffer
+        capacity_frames = self.capacity_frames
+
+        if frames.ndim == 1:
+            frames = frames.reshape(-1, 1)
+
+        with self.__lock:
+            pending_skip_frame_count = self.__input_pending_skip_frame_counts[
+                input_index
+            ]
+            if pending_skip_frame_count > 0:
+                skip_frame_count = min(pending_skip_frame_count, len(frames))
+                self.__input_pending_skip_frame_counts[input_index] -= skip_frame_count
+                frames = frames[skip_frame_count:]
+
+            frame_count = len(frames)
+            if frame_count == 0:
+                return
+
+            position = self.__input_positions[input_index]
+
+            writable_frame_count = max(
+                min(frame_count, self.__read_position + capacity_frames - position),
+                0,
+            )
+            if writable_frame_count < frame_count:
+                self.overflow_frame_count += frame_count - writable_frame_count
+
+            if writable_frame_count > 0:
+                start = position % capacity_frames
+                first_count = min(writable_frame_count, capacity_frames - start)
+                buffer[start : start + first_count] += frames[:first_count]
+                if first_count < writable_frame_count:
+                    buffer[: writable_frame_count - first_count] += frames[
+                        first_count:writable_frame_count
+                    ]
+
+            position += frame_count
+            self.__input_positions[input_index] = position
+
+            self.__advance_lagging_inputs(leading_position=position)
+
+    def __advance_lagging_inputs(self, leading_position: int) -> None:
+        target_position = leading_position - self.max_lag_frames
+
+        for input_index, position in enumerate(self.__input_positions):
+            if self.__is_input_finished[input_index] or position >= target_position:
+                continue
+
+            lag_frame_count = target_position - position
+            self.__input_positions[input_index] = target_position
+            self.__input_pending_skip_frame_counts[input_index] += lag_frame_count
+            self.lagged_frame_count += lag_frame_count
+
+    def finish_input(self, input_index: int) -> None:
+        """
+        入力側のスレッドから呼び出す。以降、この入力を無音とみなす
+        """
+        with self.__lock:
+            self.__is_input_finished[input_index] = True
+
+    def read_into(self, out: npt.NDArray[np.float32]) -> int:
+        """
+        消費者側から呼び出す。全ての入力が加算し終えたフレームを out の先頭から読み込み、
+        読み込んだフレーム数を返す
+        """
+        buffer = self.__buffer
+        capacity_frames = self.capacity_frames
+
+        with self.__lock:
+            read_position = self.__read_position
+
+            frame_count = min(
+                len(out),
+                self.__get_readable_end_position() - read_position,
+            )
+            if frame_count <= 0:
+                return 0
+
+            start = read_position % capacity_frames
+            first_count = min(frame_count, capacity_frames - start)
+            out[:first_count] = buffer[start : start + first_count]
+            # 次に加算できるよう、読み出した範囲を無音に戻す
+            buffer[start : start + first_count] = 0.0
+            if first_count < frame_count:
+                rest_count = frame_count - first_count
+                out[first_count:frame_count] = buffer[:rest_count]
+                buffer[:rest_count] = 0.0
+
+            self.__read_position = read_position + frame_count
+
+        if self.is_normalized and self.input_count > 1:
+            out[:frame_count] *= 1.0 / self.input_count
+
+        return frame_count
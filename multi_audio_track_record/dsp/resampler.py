@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+
+class StreamingResampler:
+    """
+    ブロック単位で入力を受け取り、線形補間でわずかにサンプリングレートを変換する。
+
+    クロックのずれの補正を目的としており、変換比はブロックごとに 1.0 付近で変更できる。
+    ブロックをまたいで補間位置と直前のフレームを保持するため、ブロック境界で不連続にならない。
+    """
+
+    def __init__(
+        self,
+        channels: int,
+        max_input_frames: int,
+        max_ratio: float = 1.01,
+    ):
+        self.channels = channels
+        self.max_input_frames = max_input_frames
+        self.max_ratio = max_ratio
+
+        self.max_output_frames = math.ceil(max_input_frames * max_ratio) + 2
+
+        # 先頭に直前のブロックの最終フレームを置いた入力バッファ
+        self.__extended_array = np.zeros(
+            (max_input_frames + 1, channels),
+            dtype=np.float32,
+        )
+        self.__output_positions = np.empty(self.max_output_frames, dtype=np.float64)
+        self.__output_floor_positions = np.empty(
+            self.max_output_frames,
+            dtype=np.float64,
+        )
+        self.__output_index_array = np.empty(self.max_output_frames, dtype=np.int64)
+        self.__output_fraction_array = np.empty(
+            (self.max_output_frames, 1),
+            dtype=np.float32,
+        )
+        self.__arange = np.arange(self.max_output_frames, dtype=np.float64)
+        self.__left_array = np.empty(
+            (self.max_output_frames, channels),
+            dtype=np.float32,
+        )
+
+        self.__is_first_block = True
+        # 拡張入力バッファ上での次の出力位置
+        self.__phase = 1.0
+
+    def process(
+        self,
+        frames: npt.NDArray[np.float32],
+        ratio: float,
+        out: npt.NDArray[np.float32],
+    ) -> int:
+        """
+        ratio は入力1フレームあたりの出力フレーム数。
+        out の先頭に出力し、出力したフレーム数を返す
+        """
+        frame_count = len(frames)
+        if frame_count == 0:
+            return 0
+        if frame_count > self.max_input_frames:
+            raise ValueError(
+                f"Too many input frames: {frame_count} > {self.max_input_frames}"
+            )
+        if not (1.0 / self.max_ratio <= ratio <= self.max_ratio):
+            raise ValueError(f"ratio is out of range: {ratio}")
+
+        extended_array = self.__extended_array
+
+        if self.__is_first_block:
+            extended_array[0] = frames[0]
+            self.__is_first_block = False
+
+        extended_array[1 : frame_count + 1] = frames
+
+        step = 1.0 / ratio
+        phase = self.__phase
+
+        # phase + k * step < frame_count を満たす出力位置を求める
+        output_frame_count = max(math.ceil((frame_count - phase) / step), 0)
+        output_frame_count = min(output_frame_count, self.max_output_frames, len(out))
+
+        positions = self.__output_positions[:output_frame_count]
+        np.multiply(self.__arange[:output_frame_count], step, out=positions)
+        positions += phase
+
+        floor_positions = self.__output_floor_positions[:output_frame_count]
+        np.floor(positions, out=floor_positions)
+
+        indexes = self.__output_index_array[:output_frame_count]
+        indexes[:] = floor_positions
+
+        # 補間の重みとなる小数部
+        fractions = self.__output_fraction_array[:output_frame_count]
+        np.subtract(positions, floor_positions, out=positions)
+        fractions[:, 0] = positions
+
+        # 補間する2点を集める。 np.take に out を渡し、ブロックごとにメモリを確保しない
+        left_array = self.__left_array[:output_frame_count]
+        np.take(extended_array, indexes, axis=0, out=left_array)
+
+        indexes += 1
+        output = out[:output_frame_count]
+        np.take(extended_array, indexes, axis=0, out=output)
+
+        output -= left_array
+        output *= fractions
+        output += left_array
+
+        self.__phase = phase + output_frame_count * step - frame_count
+        extended_array[0] = extended_array[frame_count]
+
+        return output_frame_count
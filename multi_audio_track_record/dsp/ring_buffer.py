@@ -0,0 +1,225 @@
+from logging import getLogger
+
+import numpy as np
+import numpy.typing as npt
+
+logger = getLogger(__name__)
+
+
+class AudioRingBuffer:
+    """
+    単一生産者・単一消費者 (SPSC) のリングバッファ。
+
+    PortAudioのコールバックスレッドが write し、別のスレッドが read する。
+    書き込み位置は生産者だけが、読み込み位置は消費者だけが更新するため、ロックを必要としない。
+    バッファは生成時に確保し、書き込み・読み込みで新たにメモリを確保しない。
+
+    空き容量が足りずに捨てたフレームは、捨て始めたフレーム位置とフレーム数の組として記録し、
+    消費者が peek_overflow_event で取り出せる。連続して捨てた分は1つにまとめ、
+    次に書き込めたブロックの直前で公開するため、消費者は記録より先のフレームを読む前に必ず受け取れる。
+    記録する領域が満杯の間は、位置がずれないよう新しいブロックも書き込まずに捨てる。
+    """
+
+    def __init__(
+        self,
+        capacity_frames: int,
+        channels: int,
+        dtype: npt.DTypeLike = np.float32,
+        overflow_event_capacity: int = 64,
+    ):
+        if capacity_frames <= 0:
+            raise ValueError(f"capacity_frames must be positive: {capacity_frames}")
+        if channels <= 0:
+            raise ValueError(f"channels must be positive: {channels}")
+        if overflow_event_capacity <= 0:
+            raise ValueError(
+                f"overflow_event_capacity must be positive: {overflow_event_capacity}"
+            )
+
+        self.capacity_frames = capacity_frames
+        self.channels = channels
+
+        self.__buffer: npt.NDArray[np.generic] = np.zeros(
+            (capacity_frames, channels),
+            dtype=dtype,
+        )
+
+        # 単調増加するフレーム位置。バッファ上の位置は capacity_frames の剰余で求める
+        self.__write_position = 0
+        self.__read_position = 0
+
+        self.overflow_frame_count = 0
+        """空き容量が足りず、書き込めずに捨てたフレーム数"""
+
+        self.__overflow_event_capacity = overflow_event_capacity
+        self.__overflow_event_positions: npt.NDArray[np.int64] = np.zeros(
+            overflow_event_capacity, dtype=np.int64
+        )
+        self.__overflow_event_frame_counts: npt.NDArray[np.int64] = np.zeros(
+            overflow_event_capacity, dtype=np.int64
+        )
+        self.__overflow_event_write_index = 0
+        self.__overflow_event_read_index = 0
+        # 生産者だけが更新する、まだ公開していない取りこぼしのフレーム数
+        self.__pending_overflow_frame_count = 0
+
+    @property
+    def dtype(self) -> np.dtype[np.generic]:
+        return self.__buffer.dtype
+
+    @property
+    def write_position(self) -> int:
+        return self.__write_position
+
+    @property
+    def read_position(self) -> int:
+        return self.__read_position
+
+    @property
+    def readable_frame_count(self) -> int:
+        return self.__write_position - self.__read_position
+
+    @property
+    def writable_frame_count(self) -> int:
+        return self.capacity_frames - self.readable_frame_count
+
+    @property
+    def pending_overflow_frame_count(self) -> int:
+        """
+        最後に書き込めたブロックより後に捨てられ、まだ peek_overflow_event で公開されていないフレーム数。
+        生産者が止まった後に、末尾の取りこぼしを求めるために読み出す
+        """
+        return self.__pending_overflow_frame_count
+
+    def write(self, frames: npt.NDArray[np.generic]) -> int:
+        """
+        生産者側から呼び出す。書き込めたフレーム数を返す。
+        空き容量を超えた分は捨て、 overflow_frame_count に加算する。
+        """
+        buffer = self.__buffer
+        capacity_frames = self.capacity_frames
+
+        frame_count = min(len(frames), self.writable_frame_count)
+        if frame_count > 0 and self.__pending_overflow_frame_count > 0:
+            # 続きのフレームより先に、捨てた位置を公開する
+            if not self.__push_overflow_event():
+                frame_count = 0
+
+        dropped_frame_count = len(frames) - frame_count
+        if dropped_frame_count > 0:
+            self.overflow_frame_count += dropped_frame_count
+            self.__pending_overflow_frame_count += dropped_frame_count
+
+        if frame_count == 0:
+            return 0
+
+        start = self.__write_position % capacity_frames
+        first_count = min(frame_count, capacity_frames - start)
+        buffer[start : start + first_count] = frames[:first_count]
+        if first_count < frame_count:
+            buffer[: frame_count - first_count] = frames[first_count:frame_count]
+
+        # データのコピーを終えてから位置を公開する
+        self.__write_position += frame_count
+
+        return frame_count
+
+    def __push_overflow_event(self) -> bool:
+        write_index = self.__overflow_event_write_index
+        if write_index - self.__overflow_event_read_index >= (
+            self.__overflow_event_capacity
+        ):
+            return False
+
+        index = write_index % self.__overflow_event_capacity
+        self.__overflow_event_positions[index] = self.__write_position
+        self.__overflow_event_frame_counts[index] = self.__pending_overflow_frame_count
+        self.__pending_overflow_frame_count = 0
+
+        self.__overflow_event_write_index = write_index + 1
+
+        return True
+
+    def peek_overflow_event(self) -> tuple[int, int] | None:
+        """
+        消費者側から呼び出す。最も古い取りこぼしの (捨て始めたフレーム位置, 捨てたフレーム数) を返す。
+        捨てたフレームは、位置の直前のフレームと位置のフレームの間にあったものである
+        """
+        read_index = self.__overflow_event_read_index
+        if read_index == self.__overflow_event_write_index:
+            return None
+
+        index = read_index % self.__overflow_event_capacity
+        return (
+            int(self.__overflow_event_positions[index]),
+            int(self.__overflow_event_frame_counts[index]),
+        )
+
+    def pop_overflow_event(self) -> None:
+        """消費者側から呼び出す。 peek_overflow_event で返した取りこぼしを取り除く"""
+        if self.__overflow_event_read_index < self.__overflow_event_write_index:
+            self.__overflow_event_read_index += 1
+
+    def read_into(self, out: npt.NDArray[np.generic]) -> int:
+        """
+        消費者側から呼び出す。 out の先頭から読み込み、読み込んだフレーム数を返す。
+        """
+        buffer = self.__buffer
+        capacity_frames = self.capacity_frames
+
+        frame_count = min(len(out), self.readable_frame_count)
+        if frame_count == 0:
+            return 0
+
+        start = self.__read_position % capacity_frames
+        first_count = min(frame_count, capacity_frames - start)
+        out[:first_count] = buffer[start : start + first_count]
+        if first_count < frame_count:
+            out[first_count:frame_count] = buffer[: frame_count - first_count]
+
+        self.__read_position += frame_count
+
+        return frame_count
+
+    def peek_into(self, out: npt.NDArray[np.generic], position: int) -> int:
+        """
+        消費者側から呼び出す。フレーム位置 position から out に読み込むが、読み込み位置は進めない。
+        読み込んだフレーム数を返す。
+        """
+        buffer = self.__buffer
+        capacity_frames = self.capacity_frames
+
+        if position < self.__read_position:
+            raise ValueError(
+                f"position {position} has already been consumed: "
+                f"read_position={self.__read_position}"
+            )
+
+        frame_count = min(len(out), self.__write_position - position)
+        if frame_count <= 0:
+            return 0
+
+        start = position % capacity_frames
+        first_count = min(frame_count, capacity_frames - start)
+        out[:first_count] = buffer[start : start + first_count]
+        if first_count < frame_count:
+            out[first_count:frame_count] = buffer[: frame_count - first_count]
+
+        return frame_count
+
+    def skip(self, frame_count: int) -> int:
+        """
+        消費者側から呼び出す。最大 frame_count フレームを読み捨て、捨てたフレーム数を返す。
+        読み捨てた範囲の内側で起きた取りこぼしの記録も取り除く
+        """
+        skip_count = min(frame_count, self.readable_frame_count)
+        self.__read_position += skip_count
+
+        while True:
+            overflow_event = self.peek_overflow_event()
+            if overflow_event is None or overflow_event[0] >= self.__read_position:
+                break
+
+            self.pop_overflow_event()
+
+        return skip_count
@@ -0,0 +1,78 @@
+from typing import Literal
+
+import numpy as np
+import numpy.typing as npt
+
+SampleFormat = Literal["f32le", "s16le", "s24le"]
+"""FFmpeg の -f に指定する生PCMの形式名"""
+
+
+def get_sample_format_byte_count(sample_format: SampleFormat) -> int:
+    if sample_format == "f32le":
+        return 4
+    if sample_format == "s16le":
+        return 2
+    if sample_format == "s24le":
+        return 3
+
+    raise ValueError(f"Unsupported sample format: {sample_format}")
+
+
+class SampleFormatConverter:
+    """
+    float32 のブロックを指定の形式のリトルエンディアンのバイト列に変換する。
+    変換用のバッファは生成時に確保し、 convert ではメモリを確保しない。
+    """
+
+    def __init__(
+        self,
+        sample_format: SampleFormat,
+        max_samples: int,
+    ):
+        self.sample_format = sample_format
+        self.max_samples = max_samples
+        self.sample_byte_count = get_sample_format_byte_count(sample_format)
+
+        self.__scaled_array = np.empty(max_samples, dtype=np.float32)
+        self.__int16_array = np.empty(max_samples, dtype="<i2")
+        self.__int32_array = np.empty(max_samples, dtype="<i4")
+        self.__int24_array = np.empty((max_samples, 3), dtype=np.uint8)
+
+    def convert(self, samples: npt.NDArray[np.float32]) -> memoryview:
+        """
+        samples は C 連続な配列であること。返り値は次の convert 呼び出しまで有効
+        """
+        sample_format = self.sample_format
+
+        sample_count = samples.size
+        if sample_count > self.max_samples:
+            raise ValueError(f"Too many samples: {sample_count} > {self.max_samples}")
+
+        if sample_format == "f32le":
+            return samples.data.cast("B")
+
+        flat_samples = samples.reshape(-1)
+        scaled_array = self.__scaled_array[:sample_count]
+        np.clip(flat_samples, -1.0, 1.0, out=scaled_array)
+
+        if sample_format == "s16le":
+            scaled_array *= 32767.0
+            np.rint(scaled_array, out=scaled_array)
+
+            int16_array = self.__int16_array[:sample_count]
+            int16_array[:] = scaled_array
+            return int16_array.data.cast("B")
+
+        if sample_format == "s24le":
+            scaled_array *= 8388607.0
+            np.rint(scaled_array, out=scaled_array)
+
+            int32_array = self.__int32_array[:sample_count]
+            int32_array[:] = scaled_array
+
+            # リトルエンディアンの下位3バイトを取り出す
+            int24_array = self.__int24_array[:sample_count]
+            np.copyto(int24_array, int32_array.view(np.uint8).reshape(-1, 4)[:, :3])
+            return int24_array.data.cast("B")
+
+        raise ValueError(f"Unsupported sample format: {sample_format}")
@@ -0,0 +1,53 @@
+from ._ffmpeg import EncoderFFmpeg
+from ._wave import (
+    EncoderWave,
+    WaveTrack,
+    decode_spool_samples,
+    get_wave_track_path,
+    get_wave_tracks,
+)
+from .base import Encoder
+from .encode_job_queue import (
+    ENCODE_JOB_PRIORITY_RECORDING,
+    ENCODE_JOB_PRIORITY_RECOVERY,
+    EncodeJob,
+    EncodeJobList,
+    EncodeJobQueue,
+    EncodeJobRecord,
+    EncodeJobState,
+    load_encode_job_records,
+    save_encode_job_records,
+)
+from .factory import create_encoder
+from .recovery import (
+    discard_spool_dir,
+    finalize_spool_dir,
+    offset_progress,
+    truncate_spool_file,
+)
+from .wave_file import WaveFileWriter
+
+__all__ = [
+    "ENCODE_JOB_PRIORITY_RECORDING",
+    "ENCODE_JOB_PRIORITY_RECOVERY",
+    "EncodeJob",
+    "EncodeJobList",
+    "EncodeJobQueue",
+    "EncodeJobRecord",
+    "EncodeJobState",
+    "Encoder",
+    "EncoderFFmpeg",
+    "EncoderWave",
+    "WaveFileWriter",
+    "WaveTrack",
+    "create_encoder",
+    "decode_spool_samples",
+    "discard_spool_dir",
+    "finalize_spool_dir",
+    "get_wave_track_path",
+    "get_wave_tracks",
+    "load_encode_job_records",
+    "offset_progress",
+    "save_encode_job_records",
+    "truncate_spool_file",
+]
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import tempfile
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+from ..ffmpeg import (
+    add_progress_args,
+    encode_tracks_in_parallel,
+    format_ffmetadata_chapters,
+    get_chapter_mux_command,
+    get_mixdown_command,
+    read_ffmpeg_progress,
+    run_ffmpeg,
+)
+from ..process_group import get_new_process_group_kwargs
+from ..recording_marker import RecordingMarkerIndex
+from ..scene import Scene
+from .base import Encoder
+
+logger = getLogger(__name__)
+
+
+class EncoderFFmpeg(Encoder):
+    """
+    FFmpeg でトラックごとに AAC にエンコードし、1つの .m4a にまとめる
+    """
+
+    def __init__(self) -> None:
+        self.__proc: asyncio.subprocess.Process | None = None
+        self.__parallel_encode_task: asyncio.Task[int] | None = None
+        self.__progress_task: asyncio.Task[None] | None = None
+
+    def get_output_suffix(self) -> str:
+        return ".m4a"
+
+    def is_streaming_supported(self) -> bool:
+        return True
+
+    async def start(
+        self,
+        scene: Scene,
+        spool_dir: Path,
+        output_path: Path,
+        is_streaming: bool,
+        on_progress: Callable[[float], None] | None = None,
+    ) -> None:
+        if not is_streaming and len(scene.tracks) > 1:
+            # トラックごとに並列にエンコードしてから、再エンコードせずにまとめる
+            self.__parallel_encode_task = asyncio.create_task(
+                encode_tracks_in_parallel(
+                    scene=scene,
+                    spool_dir=spool_dir,
+                    output_path=output_path,
+                    on_progress=on_progress,
+                ),
+            )
+            return
+
+        cmd = get_mixdown_command(
+            scene=scene,
+            spool_dir=spool_dir,
+            output_path=output_path,
+            is_streaming=is_streaming,
+            # 録音中にエンコードする場合は、異常終了してもそれまでの録音が残るよう断片化する
+            fragment_seconds=scene.output_fragment_seconds if is_streaming else None,
+        )
+
+        if on_progress is not None:
+            cmd = add_progress_args(cmd)
+
+        proc = await asyncio.create_subprocess_exec(
+            cmd[0],
+            *cmd[1:],
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE if on_progress is not None else None,
+            **get_new_process_group_kwargs(),
+        )
+        self.__proc = proc
+
+        if on_progress is not None:
+            assert proc.stdout is not None
+            # 標準出力を読み続けないと、パイプが詰まって FFmpeg が止まる
+            self.__progress_task = asyncio.create_task(
+                read_ffmpeg_progress(stream=proc.stdout, on_progress=on_progress),
+            )
+
+    async def wait(self, timeout_seconds: float | None = None) -> int:
+        parallel_encode_task = self.__parallel_encode_task
+        if parallel_encode_task is not None:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(parallel_encode_task),
+                    timeout=timeout_seconds,
+                )
+            except TimeoutError:
+                logger.error("FFmpeg did not finish in time. Cancelling it.")
+                await self.kill()
+                return -1
+
+        proc = self.__proc
+        if proc is None:
+            raise RuntimeError("The encoder is not started.")
+
+        try:
+            return await asyncio.wait_for(proc.wait(), timeout=timeout_seconds)
+        except TimeoutError:
+            logger.error("FFmpeg did not finish in time. Killing it.")
+            proc.kill()
+            return await proc.wait()
+
+    async def kill(self) -> None:
+        parallel_encode_task = self.__parallel_encode_task
+        if parallel_encode_task is not None:
+            parallel_encode_task.cancel()
+
+        proc = self.__proc
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+
+    async def write_chapters(
+        self,
+        output_path: Path,
+        marker_index: RecordingMarkerIndex,
+    ) -> int:
+        """
+        章を加えたファイルを再エンコードせずに書き込み、出力ファイルと置き換える。
+        録音中に書き込んだ断片化した MP4 も、このときに通常の MP4 にまとめ直される
+        """
+        if len(marker_index.markers) == 0:
+            return 0
+
+        with tempfile.TemporaryDirectory(dir=output_path.parent) as temp_dir:
+            metadata_path = Path(temp_dir) / "chapters.txt"
+            metadata_path.write_text(
+                format_ffmetadata_chapters(marker_index=marker_index),
+                encoding="utf-8",
+            )
+
+            chaptered_output_path = Path(temp_dir) / output_path.name
+            return_code = await run_ffmpeg(
+                get_chapter_mux_command(
+                    input_path=output_path,
+                    metadata_path=metadata_path,
+                    output_path=chaptered_output_path,
+                ),
+            )
+            if return_code == 0:
+                os.replace(chaptered_output_path, output_path)
+
+        return return_code
@@ -0,0 +1,411 @@
+import asyncio
+import io
+import os
+import stat
+import threading
+import traceback
+from contextlib import ExitStack
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from ..dsp import SampleFormat
+from ..recorder import SpoolStream, get_spool_streams
+from ..recording_marker import RecordingMarkerIndex
+from ..scene import Scene
+from .base import Encoder
+from .wave_file import WaveFileWriter
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class WaveTrack:
+    """
+    1つの WAV ファイルに書き込むトラック
+    """
+
+    track_index: int
+    sampling_rate: int
+    channels: int
+    spool_stream_indexes: list[int]
+    """ミックスするスプールファイルの番号。空の場合は無音"""
+    sample_format: SampleFormat = "f32le"
+    """
+    WAV ファイルのサンプル形式。
+    1つのスプールファイルをそのまま書き込む場合はスプールファイルと同じ形式、ミックスする場合は f32le
+    """
+
+
+def get_wave_tracks(
+    scene: Scene,
+    spool_streams: list[SpoolStream],
+) -> list[WaveTrack]:
+    """
+    トラックごとの WAV ファイルの形式を決める。
+
+    トラックに入力されるスプールファイルのサンプリングレートが揃っていること、
+    チャンネル数がモノラルか、トラックの最大のチャンネル数と等しいことが条件となる。
+    音声ソースの無いトラックは、最初のスプールファイルのサンプリングレートのモノラルの無音にする。
+    FLAC で圧縮したスプールファイルは読めない
+    """
+    for spool_stream in spool_streams:
+        if spool_stream.is_flac_compressed:
+            raise ValueError(
+                f"The spool file {spool_stream.filename} is FLAC compressed. "
+                "Use the FFmpeg encoder instead."
+            )
+
+    silence_sampling_rate = (
+        spool_streams[0].sampling_rate if len(spool_streams) > 0 else 48000
+    )
+
+    wave_tracks: list[WaveTrack] = []
+    for track_index in range(len(scene.tracks)):
+        spool_stream_indexes = [
+            spool_stream_index
+            for spool_stream_index, spool_stream in enumerate(spool_streams)
+            if track_index in spool_stream.tracks
+        ]
+        if len(spool_stream_indexes) == 0:
+            wave_tracks.append(
+                WaveTrack(
+                    track_index=track_index,
+                    sampling_rate=silence_sampling_rate,
+                    channels=1,
+                    spool_stream_indexes=[],
+                ),
+            )
+            continue
+
+        track_spool_streams = [spool_streams[i] for i in spool_stream_indexes]
+
+        sampling_rates = {
+            spool_stream.sampling_rate for spool_stream in track_spool_streams
+        }
+        if len(sampling_rates) != 1:
+            raise ValueError(
+                f"Track {track_index} has mixed sampling rates {sorted(sampling_rates)}."
+            )
+
+        channels = max(spool_stream.channels for spool_stream in track_spool_streams)
+        if any(
+            spool_stream.channels not in (1, channels)
+            for spool_stream in track_spool_streams
+        ):
+            raise ValueError(f"Track {track_index} has incompatible channel counts.")
+
+        wave_tracks.append(
+            WaveTrack(
+                track_index=track_index,
+                sampling_rate=sampling_rates.pop(),
+                channels=channels,
+                spool_stream_indexes=spool_stream_indexes,
+                sample_format=(
+                    track_spool_streams[0].sample_format
+                    if len(track_spool_streams) == 1
+                    else "f32le"
+                ),
+            ),
+        )
+
+    return wave_tracks
+
+
+def get_wave_track_path(output_path: Path, track_index: int) -> Path:
+    """例: rec_2024-04-01T00-00-00Z.wav -> rec_2024-04-01T00-00-00Z.track0.wav"""
+    return output_path.with_name(f"{output_path.stem}.track{track_index}.wav")
+
+
+def decode_spool_samples(
+    data: bytes | bytearray | memoryview,
+    sample_format: SampleFormat,
+    channels: int,
+) -> npt.NDArray[np.float32]:
+    """
+    スプールファイルの生PCMを、ミックスするために float32 の (フレーム数, チャンネル数) の配列にする
+    """
+    if sample_format == "f32le":
+        return np.frombuffer(data, dtype="<f4").reshape(-1, channels)
+
+    if sample_format == "s16le":
+        int16_array = np.frombuffer(data, dtype="<i2")
+        return (
+            (int16_array / np.float32(32767.0)).astype(np.float32).reshape(-1, channels)
+        )
+
+    if sample_format == "s24le":
+        uint8_array = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        # 上位バイトに詰めて int32 にし、算術シフトで符号を保ったまま戻す
+        int32_array = np.zeros((len(uint8_array), 4), dtype=np.uint8)
+        int32_array[:, 1:] = uint8_array
+        int24_array = int32_array.view("<i4").reshape(-1) >> 8
+        return (
+            (int24_array / np.float32(8388607.0))
+            .astype(np.float32)
+            .reshape(-1, channels)
+        )
+
+    raise ValueError(f"Unsupported sample format: {sample_format}")
+
+
+def read_frames_into(fp: io.FileIO, buffer: bytearray, frame_byte_count: int) -> int:
+    """
+    buffer が埋まるか、終端に達するまで読み込み、読み込んだフレーム数を返す
+    """
+    view = memoryview(buffer)
+
+    read_byte_count = 0
+    while read_byte_count < len(buffer):
+        chunk_byte_count = fp.readinto(view[read_byte_count:])
+        if not chunk_byte_count:
+            break
+
+        read_byte_count += chunk_byte_count
+
+    return read_byte_count // frame_byte_count
+
+
+class EncoderWave(Encoder):
+    """
+    トラックごとに、スプールファイルの生PCMをそのまま WAV (RF64) ファイルに書き込む。
+
+    1つのトラックに複数のスプールファイルが入力される場合だけ、 float32 にして足し合わせて書き込む。
+    出力ファイルのパスの拡張子の前に、トラック番号を加えたファイルに書き込む
+    """
+
+    def __init__(
+        self,
+        block_seconds: float = 0.1,
+        kill_retry_count: int = 20,
+    ):
+        self.block_seconds = block_seconds
+        self.kill_retry_count = kill_retry_count
+
+        self.__thread: threading.Thread | None = None
+        self.__spool_paths: list[Path] = []
+        self.__stop_event = threading.Event()
+        self.error: str | None = None
+
+    def get_output_suffix(self) -> str:
+        return ".wav"
+
+    def is_streaming_supported(self) -> bool:
+        return True
+
+    async def start(
+        self,
+        scene: Scene,
+        spool_dir: Path,
+        output_path: Path,
+        is_streaming: bool,
+        on_progress: Callable[[float], None] | None = None,
+    ) -> None:
+        spool_streams = get_spool_streams(scene=scene)
+        wave_tracks = get_wave_tracks(scene=scene, spool_streams=spool_streams)
+
+        self.__spool_paths = [
+            spool_dir / spool_stream.filename for spool_stream in spool_streams
+        ]
+
+        # 名前付きパイプは書き込み側が開くまで開けないため、読み出しは全てスレッドで行う
+        thread = threading.Thread(
+            target=self.__run,
+            kwargs={
+                "spool_streams": spool_streams,
+                "wave_tracks": wave_tracks,
+                "output_path": output_path,
+                "on_progress": on_progress,
+            },
+            name="EncoderWave",
+            daemon=True,
+        )
+        self.__thread = thread
+        thread.start()
+
+    def __run(
+        self,
+        spool_streams: list[SpoolStream],
+        wave_tracks: list[WaveTrack],
+        output_path: Path,
+        on_progress: Callable[[float], None] | None,
+    ) -> None:
+        try:
+            self.__write(
+                spool_streams=spool_streams,
+                wave_tracks=wave_tracks,
+                output_path=output_path,
+                on_progress=on_progress,
+            )
+        except Exception:
+            self.error = traceback.format_exc()
+            logger.error(self.error)
+
+    def __write(
+        self,
+        spool_streams: list[SpoolStream],
+        wave_tracks: list[WaveTrack],
+        output_path: Path,
+        on_progress: Callable[[float], None] | None,
+    ) -> None:
+        block_seconds = self.block_seconds
+        stop_event = self.__stop_event
+
+        with ExitStack() as exit_stack:
+            writers = [
+                exit_stack.enter_context(
+                    WaveFileWriter(
+                        path=get_wave_track_path(
+                            output_path=output_path,
+                            track_index=wave_track.track_index,
+                        ),
+                        sampling_rate=wave_track.sampling_rate,
+                        channels=wave_track.channels,
+                        sample_format=wave_track.sample_format,
+                    ),
+                )
+                for wave_track in wave_tracks
+            ]
+
+            readers: list[tuple[io.FileIO, bytearray]] = []
+            for spool_stream, spool_path in zip(spool_streams, self.__spool_paths):
+                fp = exit_stack.enter_context(spool_path.open("rb", buffering=0))
+                frames_per_block = max(
+                    int(spool_stream.sampling_rate * block_seconds), 1
+                )
+                readers.append(
+                    (fp, bytearray(frames_per_block * spool_stream.frame_byte_count))
+                )
+
+            # 全てのスプールファイルを同じ時間ずつ読み進め、書き込み側を待たせないようにする
+            stream_frame_counts = [0] * len(spool_streams)
+            while not stop_event.is_set():
+                block_frame_counts = [
+                    read_frames_into(
+                        fp, buffer, frame_byte_count=spool_stream.frame_byte_count
+                    )
+                    for (fp, buffer), spool_stream in zip(readers, spool_streams)
+                ]
+                if sum(block_frame_counts) == 0:
+                    break
+
+                for stream_index, frame_count in enumerate(block_frame_counts):
+                    stream_frame_counts[stream_index] += frame_count
+
+                if on_progress is not None:
+                    on_progress(
+                        max(
+                            frame_count / spool_stream.sampling_rate
+                            for frame_count, spool_stream in zip(
+                                stream_frame_counts, spool_streams
+                            )
+                        )
+                    )
+
+                for wave_track, writer in zip(wave_tracks, writers):
+                    spool_stream_indexes = wave_track.spool_stream_indexes
+                    if len(spool_stream_indexes) == 0:
+                        continue
+
+                    if len(spool_stream_indexes) == 1:
+                        stream_index = spool_stream_indexes[0]
+                        spool_stream = spool_streams[stream_index]
+                        _, buffer = readers[stream_index]
+                        frame_count = block_frame_counts[stream_index]
+                        if spool_stream.channels == wave_track.channels:
+                            # 変換せずにそのまま書き込む
+                            writer.write(
+                                memoryview(buffer)[
+                                    : frame_count * spool_stream.frame_byte_count
+                                ]
+                            )
+                            continue
+
+                    frame_count = max(
+                        block_frame_counts[i] for i in spool_stream_indexes
+                    )
+                    mixed_array = np.zeros(
+                        (frame_count, wave_track.channels), dtype=np.float32
+                    )
+                    for stream_index in spool_stream_indexes:
+                        spool_stream = spool_streams[stream_index]
+                        stream_frame_count = block_frame_counts[stream_index]
+                        _, buffer = readers[stream_index]
+                        mixed_array[:stream_frame_count] += decode_spool_samples(
+                            data=memoryview(buffer)[
+                                : stream_frame_count * spool_stream.frame_byte_count
+                            ],
+                            sample_format=spool_stream.sample_format,
+                            channels=spool_stream.channels,
+                        )
+
+                    writer.write(mixed_array.tobytes())
+
+            # 無音のトラックは、最も長いスプールファイルと同じ長さにする
+            duration_seconds = max(
+                (
+                    frame_count / spool_stream.sampling_rate
+                    for frame_count, spool_stream in zip(
+                        stream_frame_counts, spool_streams
+                    )
+                ),
+                default=0.0,
+            )
+            for wave_track, writer in zip(wave_tracks, writers):
+                if len(wave_track.spool_stream_indexes) > 0:
+                    continue
+
+                silence_frame_count = round(duration_seconds * wave_track.sampling_rate)
+                silence_block = bytes(
+                    max(int(wave_track.sampling_rate * block_seconds), 1)
+                    * writer.block_align
+                )
+                while writer.frame_count < silence_frame_count:
+                    remaining_byte_count = (
+                        silence_frame_count - writer.frame_count
+                    ) * writer.block_align
+                    writer.write(silence_block[:remaining_byte_count])
+
+    async def wait(self, timeout_seconds: float | None = None) -> int:
+        thread = self.__thread
+        if thread is None:
+            raise RuntimeError("The encoder is not started.")
+
+        await asyncio.to_thread(thread.join, timeout_seconds)
+        if thread.is_alive():
+            logger.error("The WAV encoder did not finish in time. Stopping it.")
+            await self.kill()
+            await asyncio.to_thread(thread.join)
+            return -1
+
+        return 0 if self.error is None else 1
+
+    async def kill(self) -> None:
+        self.__stop_event.set()
+
+        # 書き込み側が開いていない名前付きパイプを開こうとしている場合に備え、
+        # 書き込み側として開いて閉じ、読み出し側に終端を知らせる。
+        # 読み出し側はパイプを1つずつ開くため、スレッドが終わるまで何度か繰り返す
+        thread = self.__thread
+        for _ in range(self.kill_retry_count):
+            if thread is None or not thread.is_alive():
+                break
+
+            for spool_path in self.__spool_paths:
+                if spool_path.exists() and stat.S_ISFIFO(spool_path.stat().st_mode):
+                    fd = os.open(spool_path, os.O_RDWR | os.O_NONBLOCK)
+                    os.close(fd)
+
+            await asyncio.sleep(0.05)
+
+    async def write_chapters(
+        self,
+        output_path: Path,
+        marker_index: RecordingMarkerIndex,
+    ) -> int:
+        # WAV には章を書き込まず、マーカーはサイドカーファイルだけに残す
+        return 0
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable
+
+from ..recording_marker import RecordingMarkerIndex
+from ..scene import Scene
+
+
+class Encoder(ABC):
+    """
+    スプールファイルを出力ファイルに変換する。1回の録音ごとに生成する
+    """
+
+    @abstractmethod
+    def get_output_suffix(self) -> str:
+        """出力ファイルの拡張子 (例: ".m4a")"""
+        ...
+
+    @abstractmethod
+    def is_streaming_supported(self) -> bool:
+        """録音中に名前付きパイプのスプールファイルから読み出せるか"""
+        ...
+
+    @abstractmethod
+    async def start(
+        self,
+        scene: Scene,
+        spool_dir: Path,
+        output_path: Path,
+        is_streaming: bool,
+        on_progress: Callable[[float], None] | None = None,
+    ) -> None:
+        """
+        エンコードを開始する。
+
+        is_streaming が真の場合は録音の開始前に呼び出し、スプールファイルを名前付きパイプとして読み出す。
+        偽の場合は録音の終了後、スプールファイルを書き終えてから呼び出す。
+        on_progress には、録音の先頭からエンコードし終えた秒数を通知する。任意のスレッドから呼び出される
+        """
+        ...
+
+    @abstractmethod
+    async def wait(self, timeout_seconds: float | None = None) -> int:
+        """
+        エンコードの終了を待ち、終了コードを返す。0 は成功を表す。
+        timeout_seconds 秒以内に終わらない場合は中断する
+        """
+        ...
+
+    @abstractmethod
+    async def kill(self) -> None:
+        """エンコードを中断する"""
+        ...
+
+    @abstractmethod
+    async def write_chapters(
+        self,
+        output_path: Path,
+        marker_index: RecordingMarkerIndex,
+    ) -> int:
+        """
+        書き出し終えた出力ファイルに、マーカーを章 (チャプター) として書き込み、終了コードを返す。
+        章を持てない形式の場合は何もせずに 0 を返す
+        """
+        ...
@@ -0,0 +1,290 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Literal
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+ENCODE_JOB_PRIORITY_RECORDING = 0
+"""録音し終えたばかりのテイクの書き出し"""
+ENCODE_JOB_PRIORITY_RECOVERY = 10
+"""異常終了した録音や、前回の起動時に終わらなかった書き出し"""
+
+EncodeJobState = Literal["queued", "running", "finished", "failed", "cancelled"]
+
+
+class EncodeJobRecord(BaseModel):
+    """
+    書き出し1件分の記録。待っている間と実行中の書き出しをファイルに保存し、次回の起動時に再開する
+    """
+
+    job_id: str
+    spool_dir: str
+    output_path: str
+    priority: int
+    """小さいほど先に実行する"""
+    state: EncodeJobState
+    created_at: datetime
+
+
+class EncodeJobList(BaseModel):
+    struct_version: int
+    jobs: list[EncodeJobRecord]
+
+
+@dataclass
+class EncodeJob:
+    record: EncodeJobRecord
+    run: "Callable[[EncodeJob], Coroutine[Any, Any, int]]"
+    """書き出しを行い、終了コード (成功は 0) を返す"""
+    duration_seconds: float | None = None
+    """録音の長さ。分からない場合は None"""
+    progress_seconds: float = 0.0
+    """録音の先頭から書き出し終えた秒数"""
+    return_code: int | None = None
+    is_cancel_requested: bool = False
+    task: "asyncio.Task[int] | None" = field(default=None, repr=False)
+
+    @property
+    def progress_ratio(self) -> float | None:
+        duration_seconds = self.duration_seconds
+        if duration_seconds is None or duration_seconds <= 0:
+            return None
+
+        return min(self.progress_seconds / duration_seconds, 1.0)
+
+    def set_progress(self, progress_seconds: float) -> None:
+        """任意のスレッドから呼び出せる"""
+        self.progress_seconds = progress_seconds
+
+
+def load_encode_job_records(path: Path) -> list[EncodeJobRecord]:
+    """保存された書き出しのうち、終わっていないものを返す"""
+    if not path.is_file():
+        return []
+
+    encode_job_list = EncodeJobList.model_validate_json(
+        path.read_text(encoding="utf-8")
+    )
+    return [
+        record
+        for record in encode_job_list.jobs
+        if record.state in ("queued", "running")
+    ]
+
+
+def save_encode_job_records(path: Path, records: list[EncodeJobRecord]) -> None:
+    """書き込み途中で異常終了しても古い一覧が残るよう、一時ファイルから置き換える"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        encoding="utf-8",
+        dir=path.parent,
+        prefix=f"{path.name}.",
+        delete=False,
+    ) as fp:
+        fp.write(EncodeJobList(struct_version=1, jobs=records).model_dump_json())
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    os.replace(fp.name, path)
+
+
+class EncodeJobQueue:
+    """
+    録音の書き出しを、録音とは独立に優先度の順で実行するキュー。
+
+    同時に実行する書き出しは max_workers 件までとする。
+    待っている間と実行中の書き出しは state_path に保存し、
+    アプリが終了しても次回の起動時に pop_restored_records で取り出して再開できる。
+    呼び出しは全てイベントループ上から行う
+    """
+
+    def __init__(
+        self,
+        state_path: Path | None = None,
+        max_workers: int = 1,
+    ):
+        if max_workers <= 0:
+            raise ValueError(f"max_workers must be positive: {max_workers}")
+
+        self.state_path = state_path
+        self.max_workers = max_workers
+
+        self.__jobs: dict[str, EncodeJob] = {}
+        self.__job_queue: "asyncio.PriorityQueue[tuple[int, int, str]]" = (
+            asyncio.PriorityQueue()
+        )
+        # 同じ優先度の書き出しは追加した順に実行する
+        self.__sequence = itertools.count()
+        # 保存が前後して古い状態で上書きしないよう、1件ずつ保存する
+        self.__save_lock = asyncio.Lock()
+
+        self.__restored_records: list[EncodeJobRecord] = []
+        if state_path is not None:
+            try:
+                self.__restored_records = load_encode_job_records(path=state_path)
+            except Exception:
+                logger.error(traceback.format_exc())
+
+        self.updated_count = 0
+        """書き出しの状態が変わるたびに増える。画面の更新が必要かの判定に使う"""
+
+    def pop_restored_records(self) -> list[EncodeJobRecord]:
+        """
+        前回の起動時に終わらなかった書き出しを返す。
+        返した書き出しは、 submit で追加し直さない限り次の保存で一覧から消える
+        """
+        restored_records = self.__restored_records
+        self.__restored_records = []
+        return restored_records
+
+    def get_jobs(self) -> list[EncodeJob]:
+        """追加した順に全ての書き出しを返す"""
+        return list(self.__jobs.values())
+
+    def get_active_jobs(self, priority: int | None = None) -> list[EncodeJob]:
+        """
+        待っている間と実行中の書き出しを返す。
+        priority を指定した場合は、その優先度の書き出しだけを返す
+        """
+        return [
+            job
+            for job in self.__jobs.values()
+            if job.record.state in ("queued", "running")
+            and (priority is None or job.record.priority == priority)
+        ]
+
+    async def submit(
+        self,
+        spool_dir: Path,
+        output_path: Path,
+        run: Callable[[EncodeJob], Coroutine[Any, Any, int]],
+        priority: int = ENCODE_JOB_PRIORITY_RECORDING,
+        duration_seconds: float | None = None,
+    ) -> EncodeJob:
+        job = EncodeJob(
+            record=EncodeJobRecord(
+                job_id=uuid.uuid4().hex,
+                spool_dir=str(spool_dir.resolve()),
+                output_path=str(output_path.resolve()),
+                priority=priority,
+                state="queued",
+                created_at=datetime.now(tz=timezone.utc),
+            ),
+            run=run,
+            duration_seconds=duration_seconds,
+        )
+        self.__jobs[job.record.job_id] = job
+
+        self.__job_queue.put_nowait(
+            (priority, next(self.__sequence), job.record.job_id)
+        )
+        await self.__on_updated()
+
+        return job
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        書き出しを中止する。中止した書き出しのスプールディレクトリは残し、次回の起動時に書き出せるようにする。
+        既に終わっていた場合は偽を返す
+        """
+        job = self.__jobs.get(job_id)
+        if job is None or job.record.state not in ("queued", "running"):
+            return False
+
+        job.is_cancel_requested = True
+
+        task = job.task
+        if task is not None:
+            # 実行中の書き出しは、ワーカーが中断を受け取って状態を変える
+            task.cancel()
+            return True
+
+        job.record.state = "cancelled"
+        await self.__on_updated()
+        return True
+
+    async def join(self) -> None:
+        """追加された全ての書き出しが終わるまで待つ"""
+        await self.__job_queue.join()
+
+    async def run(self) -> None:
+        """書き出しを実行するワーカーを起動し、キャンセルされるまで動かし続ける"""
+        await asyncio.gather(*(self.__worker() for _ in range(self.max_workers)))
+
+    async def __worker(self) -> None:
+        job_queue = self.__job_queue
+
+        while True:
+            _, _, job_id = await job_queue.get()
+            try:
+                job = self.__jobs[job_id]
+                if job.record.state != "queued":
+                    # 待っている間に中止された
+                    continue
+
+                await self.__run_job(job)
+            finally:
+                job_queue.task_done()
+
+    async def __run_job(self, job: EncodeJob) -> None:
+        record = job.record
+
+        # 状態を保存している間に中止されても取りこぼさないよう、先にタスクを作る
+        record.state = "running"
+        task = asyncio.create_task(job.run(job))
+        job.task = task
+
+        try:
+            await self.__on_updated()
+            return_code = await task
+        except asyncio.CancelledError:
+            if not job.is_cancel_requested:
+                # ワーカー自体が止められた。実行中として保存したまま、次回の起動時に再開する
+                raise
+
+            logger.info(f"Encode job {record.job_id} was cancelled.")
+            record.state = "cancelled"
+        except Exception:
+            logger.error(f"Encode job {record.job_id} failed: {traceback.format_exc()}")
+            record.state = "failed"
+        else:
+            job.return_code = return_code
+            record.state = "finished" if return_code == 0 else "failed"
+            logger.info(
+                f"Encode job {record.job_id} for {record.output_path} "
+                f"finished: {return_code}"
+            )
+        finally:
+            job.task = None
+
+        await self.__on_updated()
+
+    async def __on_updated(self) -> None:
+        self.updated_count += 1
+
+        state_path = self.state_path
+        if state_path is None:
+            return
+
+        async with self.__save_lock:
+            try:
+                await asyncio.to_thread(
+                    save_encode_job_records,
+                    state_path,
+                    self.__restored_records
+                    + [job.record.model_copy() for job in self.get_active_jobs()],
+                )
+            except Exception:
+                logger.error(traceback.format_exc())
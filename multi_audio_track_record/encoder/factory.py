@@ -0,0 +1,14 @@
+from ..scene import Scene
+from ._ffmpeg import EncoderFFmpeg
+from ._wave import EncoderWave
+from .base import Encoder
+
+
+def create_encoder(scene: Scene) -> Encoder:
+    """シーンで選ばれたエンコーダを生成する"""
+    if scene.encoder_type == "ffmpeg":
+        return EncoderFFmpeg()
+    if scene.encoder_type == "wave":
+        return EncoderWave()
+
+    raise ValueError(f"Unsupported encoder type: {scene.encoder_type}")
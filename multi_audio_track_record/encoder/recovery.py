@@ -0,0 +1,178 @@
+import os
+import shutil
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+from ..recorder import (
+    SpoolJournal,
+    create_empty_spool_file,
+    get_segment_output_path,
+    get_spool_streams,
+    save_spool_journal,
+)
+from ..recording_marker import get_marker_index_path, load_marker_index
+from .factory import create_encoder
+
+logger = getLogger(__name__)
+
+
+def truncate_spool_file(path: Path, byte_count: int, frame_byte_count: int) -> None:
+    """
+    スプールファイルを byte_count 以下のフレームの区切りまで切り詰める
+    """
+    if not path.exists():
+        path.touch()
+        return
+
+    aligned_byte_count = byte_count - byte_count % frame_byte_count
+    if path.stat().st_size > aligned_byte_count:
+        os.truncate(path, aligned_byte_count)
+
+
+def offset_progress(
+    on_progress: Callable[[float], None],
+    start_seconds: float,
+) -> Callable[[float], None]:
+    """セグメントの先頭からの秒数を、録音の先頭からの秒数にして通知する"""
+
+    def on_segment_progress(progress_seconds: float) -> None:
+        on_progress(start_seconds + progress_seconds)
+
+    return on_segment_progress
+
+
+async def finalize_spool_dir(
+    spool_dir: Path,
+    spool_journal: SpoolJournal,
+    on_progress: Callable[[float], None] | None = None,
+) -> int:
+    """
+    異常終了した録音のスプールディレクトリから、ジャーナルに従って出力ファイルを書き出す。
+
+    スプールファイルはジャーナルに記録した確定済みのバイト数まで切り詰め、中身は読み直さない。
+    FLAC のスプールファイルはフレームの区切りが分からないため切り詰めず、デコードできる所までを使う。
+    録音中に出力ファイルを書き込んでいた場合は、そのファイルをそのまま残す。
+    録音中に付けたマーカーのサイドカーファイルがあれば、書き出したファイルに章として書き込む。
+    全て成功した場合はスプールディレクトリを削除し、エンコーダの終了コード (成功は 0) を返す
+    """
+    scene = spool_journal.scene
+    output_path = Path(spool_journal.output_path)
+    spool_streams = {
+        spool_stream.filename: spool_stream
+        for spool_stream in get_spool_streams(scene=scene)
+    }
+
+    # (スプールファイルのディレクトリ, 出力ファイル, 切り詰めるバイト数を使うか, 録音の先頭からの秒数) のリスト
+    encode_jobs: list[tuple[Path, Path, bool, float]] = []
+    # (出力ファイル, 録音の先頭からの秒数, 秒数) のリスト。秒数が None の場合は録音の終わりまで
+    chapter_jobs: list[tuple[Path, float, float | None]] = []
+    if spool_journal.is_streaming:
+        logger.info(f"{output_path} was written while recording. Nothing to encode.")
+        chapter_jobs.append((output_path, 0.0, None))
+    elif spool_journal.segment_seconds is not None:
+        # エンコードし終えたセグメントのディレクトリは、録音中に削除されている
+        for segment_dir in sorted(spool_dir.glob("segment*")):
+            segment_index = int(segment_dir.name.removeprefix("segment"))
+            segment_output_path = get_segment_output_path(
+                output_path=output_path,
+                segment_index=segment_index,
+            )
+            segment_start_seconds = segment_index * spool_journal.segment_seconds
+            encode_jobs.append(
+                (segment_dir, segment_output_path, False, segment_start_seconds)
+            )
+            chapter_jobs.append(
+                (
+                    segment_output_path,
+                    segment_start_seconds,
+                    spool_journal.segment_seconds,
+                )
+            )
+    else:
+        encode_jobs.append((spool_dir, output_path, True, 0.0))
+        chapter_jobs.append((output_path, 0.0, None))
+
+    spool_journal.state = "encoding"
+    save_spool_journal(spool_dir=spool_dir, spool_journal=spool_journal)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    return_code = 0
+    for (
+        encode_spool_dir,
+        encode_output_path,
+        is_byte_count_used,
+        start_seconds,
+    ) in encode_jobs:
+        for journal_stream in spool_journal.streams:
+            spool_path = encode_spool_dir / journal_stream.filename
+            if journal_stream.is_flac_compressed:
+                if not spool_path.exists():
+                    create_empty_spool_file(
+                        path=spool_path,
+                        spool_stream=spool_streams[journal_stream.filename],
+                    )
+                continue
+
+            truncate_spool_file(
+                path=spool_path,
+                byte_count=(
+                    journal_stream.byte_count
+                    if is_byte_count_used
+                    else (spool_path.stat().st_size if spool_path.exists() else 0)
+                ),
+                frame_byte_count=journal_stream.frame_byte_count,
+            )
+
+        encoder = create_encoder(scene=scene)
+        await encoder.start(
+            scene=scene,
+            spool_dir=encode_spool_dir,
+            output_path=encode_output_path,
+            is_streaming=False,
+            on_progress=(
+                offset_progress(on_progress=on_progress, start_seconds=start_seconds)
+                if on_progress is not None
+                else None
+            ),
+        )
+        encode_return_code = await encoder.wait()
+        logger.info(
+            f"Recovered {encode_output_path} (encoder return code: {encode_return_code})"
+        )
+
+        if encode_return_code != 0:
+            return_code = encode_return_code
+
+    marker_index = load_marker_index(path=get_marker_index_path(output_path))
+    if return_code == 0 and marker_index is not None:
+        for chapter_output_path, start_seconds, duration_seconds in chapter_jobs:
+            chapter_return_code = await create_encoder(scene=scene).write_chapters(
+                output_path=chapter_output_path,
+                marker_index=(
+                    marker_index.get_range(
+                        start_seconds=start_seconds,
+                        duration_seconds=duration_seconds,
+                    )
+                    if duration_seconds is not None
+                    else marker_index
+                ),
+            )
+            if chapter_return_code != 0:
+                logger.warning(
+                    f"Failed to write chapters into {chapter_output_path} "
+                    f"(return code: {chapter_return_code})."
+                )
+
+    if return_code == 0:
+        spool_journal.state = "finished"
+        save_spool_journal(spool_dir=spool_dir, spool_journal=spool_journal)
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return return_code
+
+
+def discard_spool_dir(spool_dir: Path) -> None:
+    """異常終了した録音のスプールディレクトリを、出力ファイルを書き出さずに削除する"""
+    shutil.rmtree(spool_dir, ignore_errors=True)
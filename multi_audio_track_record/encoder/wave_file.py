@@ -0,0 +1,218 @@
+import struct
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO
+
+from ..dsp import SampleFormat, get_sample_format_byte_count
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+RIFF_MAX_SIZE = 0xFFFFFFFF
+"""RIFF のチャンクの大きさの上限。超える場合は RF64 にする"""
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# KSDATAFORMAT_SUBTYPE_PCM, KSDATAFORMAT_SUBTYPE_IEEE_FLOAT の共通部分
+SUBFORMAT_GUID_SUFFIX = b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+
+DS64_CHUNK_SIZE = 28
+"""RIFF の大きさ, data の大きさ, サンプル数 (各8バイト) と、テーブルの要素数 (4バイト)"""
+
+FACT_CHUNK_SIZE = 4
+"""fact チャンクのサンプル数 (dwSampleLength)"""
+
+
+def build_wave_format_chunk(
+    sampling_rate: int,
+    channels: int,
+    sample_format: SampleFormat,
+) -> bytes:
+    """
+    fmt チャンクを返す。3チャンネル以上か24ビットの場合は WAVE_FORMAT_EXTENSIBLE にする。
+    PCM 以外 (浮動小数点) の場合は、拡張部分が無くても cbSize (0) まで書き込む
+    """
+    sample_byte_count = get_sample_format_byte_count(sample_format)
+    format_tag = WAVE_FORMAT_IEEE_FLOAT if sample_format == "f32le" else WAVE_FORMAT_PCM
+    block_align = sample_byte_count * channels
+    bits_per_sample = sample_byte_count * 8
+
+    if channels <= 2 and sample_byte_count != 3:
+        body = struct.pack(
+            "<HHIIHH",
+            format_tag,
+            channels,
+            sampling_rate,
+            sampling_rate * block_align,
+            block_align,
+            bits_per_sample,
+        )
+        if format_tag != WAVE_FORMAT_PCM:
+            body += struct.pack("<H", 0)  # cbSize
+    else:
+        body = (
+            struct.pack(
+                "<HHIIHHHHI",
+                WAVE_FORMAT_EXTENSIBLE,
+                channels,
+                sampling_rate,
+                sampling_rate * block_align,
+                block_align,
+                bits_per_sample,
+                22,  # cbSize
+                bits_per_sample,  # wValidBitsPerSample
+                0,  # dwChannelMask: スピーカー配置を指定しない
+            )
+            + struct.pack("<H", format_tag)
+            + SUBFORMAT_GUID_SUFFIX
+        )
+
+    return b"fmt " + struct.pack("<I", len(body)) + body
+
+
+class WaveFileWriter:
+    """
+    生PCMをそのまま WAV ファイルに書き込む。
+
+    ヘッダの大きさは header_update_interval_bytes ごとと close 時に書き換えるため、
+    途中で異常終了しても、それまでに書き込んだ分を読み出せる。
+    4GB を超えた場合は close 時に RF64 (EBU Tech 3306) に書き換える。
+    そのため、ヘッダには ds64 チャンクの大きさの JUNK チャンクをあらかじめ確保しておく。
+    PCM 以外 (浮動小数点) の場合は、サンプル数を書き込む fact チャンクを data の前に置く
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sampling_rate: int,
+        channels: int,
+        sample_format: SampleFormat = "f32le",
+        header_update_interval_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.path = path
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.header_update_interval_bytes = header_update_interval_bytes
+
+        self.block_align = get_sample_format_byte_count(sample_format) * channels
+        self.data_byte_count = 0
+
+        self.__fp: BinaryIO = path.open("wb")
+
+        fmt_chunk = build_wave_format_chunk(
+            sampling_rate=sampling_rate,
+            channels=channels,
+            sample_format=sample_format,
+        )
+
+        fp = self.__fp
+        fp.write(b"RIFF" + struct.pack("<I", 0) + b"WAVE")
+        fp.write(b"JUNK" + struct.pack("<I", DS64_CHUNK_SIZE) + bytes(DS64_CHUNK_SIZE))
+        fp.write(fmt_chunk)
+
+        self.__fact_sample_length_offset: int | None = None
+        if sample_format == "f32le":
+            fp.write(b"fact" + struct.pack("<I", FACT_CHUNK_SIZE))
+            self.__fact_sample_length_offset = fp.tell()
+            fp.write(struct.pack("<I", 0))
+
+        fp.write(b"data")
+        self.__data_size_offset = fp.tell()
+        fp.write(struct.pack("<I", 0))
+        self.__data_offset = fp.tell()
+
+        self.__header_updated_data_byte_count = 0
+
+    @property
+    def frame_count(self) -> int:
+        return self.data_byte_count // self.block_align
+
+    def write(self, data: "ReadableBuffer") -> None:
+        """data はフレームの区切りで渡すこと"""
+        self.data_byte_count += self.__fp.write(data)
+
+        if (
+            self.data_byte_count - self.__header_updated_data_byte_count
+            >= self.header_update_interval_bytes
+        ):
+            self.update_header()
+
+    def update_header(self) -> None:
+        """
+        これまでに書き込んだ大きさをヘッダに書き込む。
+        RIFF の上限を超えている間は、 close まで書き換えない
+        """
+        data_byte_count = self.data_byte_count
+        self.__header_updated_data_byte_count = data_byte_count
+
+        riff_size = self.__data_offset - 8 + data_byte_count + data_byte_count % 2
+        if riff_size > RIFF_MAX_SIZE:
+            return
+
+        fp = self.__fp
+        fp.seek(4)
+        fp.write(struct.pack("<I", riff_size))
+        self.__write_fact_sample_length(min(self.frame_count, 0xFFFFFFFF))
+        fp.seek(self.__data_size_offset)
+        fp.write(struct.pack("<I", data_byte_count))
+        fp.seek(0, 2)
+        fp.flush()
+
+    def close(self) -> None:
+        fp = self.__fp
+        if fp.closed:
+            return
+
+        data_byte_count = self.data_byte_count
+        if data_byte_count % 2 == 1:
+            # チャンクは2バイト境界に揃える
+            fp.write(b"\x00")
+
+        riff_size = fp.tell() - 8
+        if riff_size <= RIFF_MAX_SIZE:
+            self.update_header()
+            fp.close()
+            return
+
+        fp.seek(0)
+        fp.write(b"RF64" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE")
+        fp.write(
+            b"ds64"
+            + struct.pack(
+                "<IQQQI",
+                DS64_CHUNK_SIZE,
+                riff_size,
+                data_byte_count,
+                self.frame_count,
+                0,
+            )
+        )
+        # RF64 では fact と data の大きさに 0xFFFFFFFF を書き、 ds64 の値を使わせる
+        self.__write_fact_sample_length(0xFFFFFFFF)
+        fp.seek(self.__data_size_offset)
+        fp.write(struct.pack("<I", 0xFFFFFFFF))
+        fp.close()
+
+    def __write_fact_sample_length(self, sample_length: int) -> None:
+        """fact チャンクがあれば、サンプル数を書き込む"""
+        fact_sample_length_offset = self.__fact_sample_length_offset
+        if fact_sample_length_offset is None:
+            return
+
+        fp = self.__fp
+        fp.seek(fact_sample_length_offset)
+        fp.write(struct.pack("<I", sample_length))
+
+    def __enter__(self) -> "WaveFileWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,43 @@
+from .chapters import (
+    escape_ffmetadata_value,
+    format_ffmetadata_chapters,
+    get_chapter_mux_command,
+)
+from .filter_graph import (
+    MixdownFilterGraph,
+    build_mixdown_filter_graph,
+    build_track_mix_filter_graph,
+)
+from .mixdown_command import get_mixdown_command
+from .parallel_encode import (
+    encode_tracks_in_parallel,
+    get_mux_command,
+    get_spool_duration_seconds,
+    get_track_encode_command,
+    run_ffmpeg,
+)
+from .progress import (
+    add_progress_args,
+    parse_ffmpeg_progress_line,
+    read_ffmpeg_progress,
+)
+from .spool_input import get_spool_input_args
+
+__all__ = [
+    "MixdownFilterGraph",
+    "add_progress_args",
+    "build_mixdown_filter_graph",
+    "build_track_mix_filter_graph",
+    "encode_tracks_in_parallel",
+    "escape_ffmetadata_value",
+    "format_ffmetadata_chapters",
+    "get_chapter_mux_command",
+    "get_mixdown_command",
+    "get_mux_command",
+    "get_spool_duration_seconds",
+    "get_spool_input_args",
+    "get_track_encode_command",
+    "parse_ffmpeg_progress_line",
+    "read_ffmpeg_progress",
+    "run_ffmpeg",
+]
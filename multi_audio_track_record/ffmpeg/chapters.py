@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from ..recording_marker import RecordingMarker, RecordingMarkerIndex
+
+
+def escape_ffmetadata_value(value: str) -> str:
+    """FFMETADATA の値で特別な意味を持つ文字 (=;#\\ と改行) をエスケープする"""
+    escaped_value = ""
+    for char in value:
+        if char in "=;#\\\n":
+            escaped_value += "\\"
+        escaped_value += char
+
+    return escaped_value
+
+
+def format_ffmetadata_chapters(marker_index: RecordingMarkerIndex) -> str:
+    """
+    マーカーを章 (チャプター) にした FFMETADATA の文字列を返す。
+
+    時刻の単位はサンプリングレートの逆数とし、マーカーのフレーム位置をそのまま章の開始位置にする。
+    章は次のマーカーまで続き、最後の章は録音の終わりまで続く (録音の長さが分からない場合は長さ 0)
+    """
+    sampling_rate = marker_index.sampling_rate
+    markers = sorted(marker_index.markers, key=lambda marker: marker.position_frames)
+
+    lines = [";FFMETADATA1"]
+    next_markers: list[RecordingMarker | None] = [*markers[1:], None]
+    for marker, next_marker in zip(markers, next_markers):
+        start_frames = max(marker.position_frames, 0)
+        if next_marker is not None:
+            end_frames = next_marker.position_frames
+        elif marker_index.duration_frames is not None:
+            end_frames = marker_index.duration_frames
+        else:
+            end_frames = start_frames
+
+        lines += [
+            "[CHAPTER]",
+            f"TIMEBASE=1/{sampling_rate}",
+            f"START={start_frames}",
+            f"END={max(end_frames, start_frames)}",
+            f"title={escape_ffmetadata_value(marker.label)}",
+        ]
+
+    return "\n".join(lines) + "\n"
+
+
+def get_chapter_mux_command(
+    input_path: Path,
+    metadata_path: Path,
+    output_path: Path,
+) -> list[str]:
+    """
+    書き出したファイルに FFMETADATA の章を加えたファイルを、再エンコードせずに書き込むコマンドを返す
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+        "-i",
+        str(input_path.resolve()),
+        "-f",
+        "ffmetadata",
+        "-i",
+        str(metadata_path.resolve()),
+        "-map",
+        "0",
+        "-map_metadata",
+        "0",
+        "-map_chapters",
+        "1",
+        "-c",
+        "copy",
+        str(output_path.resolve()),
+    ]
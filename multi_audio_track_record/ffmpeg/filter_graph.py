@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+from ..recorder import get_capture_sources, get_track_mixes
+from ..scene import Scene
+
+
+@dataclass
+class MixdownFilterGraph:
+    filter_complex: str
+    """-filter_complex に渡すフィルタグラフ。フィルタが不要な場合は空文字列"""
+    track_map_specifiers: list[str]
+    """トラックごとに -map に渡す指定。入力のストリームか、フィルタグラフの出力ラベル"""
+    is_silence_used: bool
+    """終わりの無い無音のソースを使うか"""
+
+
+def build_mixdown_filter_graph(scene: Scene) -> MixdownFilterGraph:
+    """
+    シーンのトラックごとのミックスを1つのフィルタグラフにまとめる。
+
+    FFmpeg の入力番号は get_spool_streams の順番と一致させる。
+    録音中にトラックごとにミックスした場合は、各トラックの入力をそのまま出力する。
+    そうでない場合、1つの音声ソースだけのトラックはフィルタを通さずにそのまま出力し、
+    複数のトラックで使われる音声ソースは asplit で1度だけ分岐する。
+    音声ソースの無いトラックには無音を出力する。
+    """
+    track_mixes = get_track_mixes(scene=scene)
+    if track_mixes is not None:
+        return build_track_mix_filter_graph(
+            track_count=len(scene.tracks),
+            mixed_track_indexes=[track_mix.track_index for track_mix in track_mixes],
+        )
+
+    capture_sources = get_capture_sources(scene=scene)
+
+    track_input_indexes: list[list[int]] = [[] for _ in scene.tracks]
+    for input_index, capture_source in enumerate(capture_sources):
+        for track_index in capture_source.tracks:
+            if not 0 <= track_index < len(track_input_indexes):
+                continue
+
+            input_indexes = track_input_indexes[track_index]
+            if input_index not in input_indexes:
+                input_indexes.append(input_index)
+
+    filters: list[str] = []
+
+    # 入力ごとに、使うトラックの数だけストリームを用意する。
+    # ストリームは (フィルタの入力パッド, -map の指定) の組で表す
+    input_streams: dict[int, list[tuple[str, str]]] = {}
+    for input_index in range(len(capture_sources)):
+        use_count = sum(
+            1 for input_indexes in track_input_indexes if input_index in input_indexes
+        )
+        if use_count == 0:
+            continue
+
+        stream_specifier = f"{input_index}:a:0"
+        if use_count == 1:
+            input_streams[input_index] = [(f"[{stream_specifier}]", stream_specifier)]
+            continue
+
+        split_pads = [f"[s{input_index}_{i}]" for i in range(use_count)]
+        filters.append(f"[{stream_specifier}]asplit={use_count}" + "".join(split_pads))
+        input_streams[input_index] = [(pad, pad) for pad in split_pads]
+
+    track_map_specifiers: list[str] = []
+    is_silence_used = False
+    for track_index, input_indexes in enumerate(track_input_indexes):
+        output_label = f"t{track_index}"
+
+        if len(input_indexes) == 0:
+            filters.append(f"anullsrc[{output_label}]")
+            track_map_specifiers.append(f"[{output_label}]")
+            is_silence_used = True
+            continue
+
+        streams = [input_streams[input_index].pop(0) for input_index in input_indexes]
+
+        if len(streams) == 1:
+            # フィルタを通さずに入力のストリームをそのまま出力する
+            _, map_specifier = streams[0]
+            track_map_specifiers.append(map_specifier)
+            continue
+
+        filters.append(
+            "".join(pad for pad, _ in streams)
+            + f"amix=inputs={len(streams)}[{output_label}]"
+        )
+        track_map_specifiers.append(f"[{output_label}]")
+
+    return MixdownFilterGraph(
+        filter_complex=";".join(filters),
+        track_map_specifiers=track_map_specifiers,
+        is_silence_used=is_silence_used,
+    )
+
+
+def build_track_mix_filter_graph(
+    track_count: int,
+    mixed_track_indexes: list[int],
+) -> MixdownFilterGraph:
+    """
+    入力 N が mixed_track_indexes[N] のトラックをミックス済みのストリームである場合のフィルタグラフ
+    """
+    filters: list[str] = []
+    track_map_specifiers: list[str] = []
+    is_silence_used = False
+
+    for track_index in range(track_count):
+        if track_index in mixed_track_indexes:
+            input_index = mixed_track_indexes.index(track_index)
+            track_map_specifiers.append(f"{input_index}:a:0")
+            continue
+
+        output_label = f"t{track_index}"
+        filters.append(f"anullsrc[{output_label}]")
+        track_map_specifiers.append(f"[{output_label}]")
+        is_silence_used = True
+
+    return MixdownFilterGraph(
+        filter_complex=";".join(filters),
+        track_map_specifiers=track_map_specifiers,
+        is_silence_used=is_silence_used,
+    )
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+from ..recorder import get_spool_streams
+from ..scene import Scene
+from .filter_graph import build_mixdown_filter_graph
+from .spool_input import get_spool_input_args
+
+
+def get_mixdown_command(
+    scene: Scene,
+    spool_dir: Path,
+    output_path: Path,
+    is_streaming: bool = False,
+    fragment_seconds: float | None = None,
+) -> list[str]:
+    """
+    スプールファイルをトラックごとにミックスし、1つのファイルにエンコードするFFmpegのコマンドを返す。
+
+    is_streaming が真の場合、スプールファイルは録音中に書き込まれる名前付きパイプとして扱う。
+    fragment_seconds を指定した場合、その秒数ごとのフラグメント (moof/mdat) に分けた MP4 を書き込む。
+    書き込み途中のファイルも、最後に書き込んだフラグメントまで再生できる
+    """
+    spool_streams = get_spool_streams(scene=scene)
+    filter_graph = build_mixdown_filter_graph(scene=scene)
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+    ]
+
+    # 各スプールファイルを0番目以降の音声入力にする
+    for spool_stream in spool_streams:
+        spool_path = spool_dir / spool_stream.filename
+
+        if is_streaming:
+            # 入力ごとの読み出しを待たせないよう、デマルチプレクサのキューを広げる
+            cmd += [
+                "-thread_queue_size",
+                "1024",
+            ]
+
+        cmd += get_spool_input_args(spool_stream=spool_stream, spool_path=spool_path)
+
+    if filter_graph.filter_complex != "":
+        cmd += [
+            "-filter_complex",
+            filter_graph.filter_complex,
+        ]
+
+    for track_index, track in enumerate(scene.tracks):
+        cmd += [
+            "-map",
+            filter_graph.track_map_specifiers[track_index],
+            f"-c:a:{track_index}",
+            "aac",  # Native FFmpeg AAC Encoder
+            f"-b:a:{track_index}",
+            "160k",
+            f"-metadata:s:a:{track_index}",
+            f"title={track.name}",  # .mp4
+            f"-metadata:s:a:{track_index}",
+            f"handler_name={track.name}",  # .m4a (but VLC not working)
+        ]
+
+    if fragment_seconds is not None:
+        # 先頭に空の moov を書き込み、以降はフラグメントを追記していく
+        cmd += [
+            "-movflags",
+            "+empty_moov+default_base_moof",
+            "-frag_duration",
+            str(int(fragment_seconds * 1_000_000)),
+            "-flush_packets",
+            "1",
+        ]
+
+    if filter_graph.is_silence_used and len(spool_streams) > 0:
+        # 無音のソースは終わらないため、音声ソースが終わった時点で終える
+        cmd += [
+            "-shortest",
+        ]
+
+    cmd += [
+        str(output_path.resolve()),
+    ]
+
+    return cmd
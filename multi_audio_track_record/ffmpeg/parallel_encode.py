@@ -0,0 +1,233 @@
+import asyncio
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+from ..process_group import get_new_process_group_kwargs
+from ..recorder import SpoolStream, get_spool_frame_count, get_spool_streams
+from ..scene import Scene
+from .progress import add_progress_args, read_ffmpeg_progress
+from .spool_input import get_spool_input_args
+
+logger = getLogger(__name__)
+
+
+def get_spool_duration_seconds(
+    spool_dir: Path,
+    spool_streams: list[SpoolStream],
+) -> float:
+    """
+    書き終えたスプールファイルのフレーム数から、録音の長さを求める
+    """
+    durations = [
+        get_spool_frame_count(
+            path=spool_dir / spool_stream.filename,
+            spool_stream=spool_stream,
+        )
+        / spool_stream.sampling_rate
+        for spool_stream in spool_streams
+    ]
+
+    return max(durations, default=0.0)
+
+
+def get_track_encode_command(
+    scene: Scene,
+    track_index: int,
+    spool_dir: Path,
+    output_path: Path,
+    duration_seconds: float,
+) -> list[str]:
+    """
+    1つのトラックだけをエンコードするFFmpegのコマンドを返す。
+    音声ソースの無いトラックは duration_seconds 秒の無音になる
+    """
+    track_spool_streams = [
+        spool_stream
+        for spool_stream in get_spool_streams(scene=scene)
+        if track_index in spool_stream.tracks
+    ]
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+    ]
+
+    for spool_stream in track_spool_streams:
+        cmd += get_spool_input_args(
+            spool_stream=spool_stream,
+            spool_path=spool_dir / spool_stream.filename,
+        )
+
+    if len(track_spool_streams) == 0:
+        cmd += [
+            "-f",
+            "lavfi",
+            "-t",
+            f"{duration_seconds:.6f}",
+            "-i",
+            "anullsrc",
+        ]
+    elif len(track_spool_streams) > 1:
+        cmd += [
+            "-filter_complex",
+            "".join(f"[{i}:a:0]" for i in range(len(track_spool_streams)))
+            + f"amix=inputs={len(track_spool_streams)}",
+        ]
+
+    cmd += [
+        "-c:a",
+        "aac",  # Native FFmpeg AAC Encoder
+        "-b:a",
+        "160k",
+        str(output_path.resolve()),
+    ]
+
+    return cmd
+
+
+def get_mux_command(
+    scene: Scene,
+    track_paths: list[Path],
+    output_path: Path,
+) -> list[str]:
+    """
+    トラックごとにエンコードしたファイルを、再エンコードせずに1つのファイルにまとめるコマンドを返す
+    """
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+    ]
+
+    for track_path in track_paths:
+        cmd += [
+            "-i",
+            str(track_path.resolve()),
+        ]
+
+    for track_index, track in enumerate(scene.tracks):
+        cmd += [
+            "-map",
+            f"{track_index}:a:0",
+            f"-metadata:s:a:{track_index}",
+            f"title={track.name}",  # .mp4
+            f"-metadata:s:a:{track_index}",
+            f"handler_name={track.name}",  # .m4a (but VLC not working)
+        ]
+
+    cmd += [
+        "-c",
+        "copy",
+        str(output_path.resolve()),
+    ]
+
+    return cmd
+
+
+async def run_ffmpeg(
+    cmd: list[str],
+    on_progress: Callable[[float], None] | None = None,
+) -> int:
+    """
+    FFmpeg を実行して終了コードを返す。
+    on_progress を指定した場合は、エンコードし終えた秒数を通知する
+    """
+    if on_progress is not None:
+        cmd = add_progress_args(cmd)
+
+    proc = await asyncio.create_subprocess_exec(
+        cmd[0],
+        *cmd[1:],
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE if on_progress is not None else None,
+        **get_new_process_group_kwargs(),
+    )
+
+    try:
+        if on_progress is not None:
+            assert proc.stdout is not None
+            await read_ffmpeg_progress(stream=proc.stdout, on_progress=on_progress)
+
+        return await proc.wait()
+    except asyncio.CancelledError:
+        # 中断された場合は、エンコード中のFFmpegを残さない
+        proc.kill()
+        raise
+
+
+async def encode_tracks_in_parallel(
+    scene: Scene,
+    spool_dir: Path,
+    output_path: Path,
+    max_workers: int | None = None,
+    on_progress: Callable[[float], None] | None = None,
+) -> int:
+    """
+    書き終えたスプールファイルを、トラックごとに別のFFmpegプロセスで並列にエンコードし、
+    最後に再エンコードせずに1つのファイルにまとめる。
+    同時に動かすFFmpegの数は max_workers (既定ではCPUのコア数) までとする。
+    on_progress には、トラックごとのエンコードし終えた秒数の平均を通知する。
+
+    FFmpeg の終了コードを返す。途中で失敗した場合は、最初に失敗した終了コードを返す
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    duration_seconds = get_spool_duration_seconds(
+        spool_dir=spool_dir,
+        spool_streams=get_spool_streams(scene=scene),
+    )
+
+    semaphore = asyncio.Semaphore(max_workers)
+    track_paths = [
+        spool_dir / f"encoded_track{track_index}.m4a"
+        for track_index in range(len(scene.tracks))
+    ]
+
+    track_progress_seconds = [0.0] * len(scene.tracks)
+
+    def on_track_progress(track_index: int, progress_seconds: float) -> None:
+        track_progress_seconds[track_index] = progress_seconds
+        if on_progress is not None:
+            on_progress(sum(track_progress_seconds) / len(track_progress_seconds))
+
+    async def encode_track(track_index: int) -> int:
+        async with semaphore:
+            return await run_ffmpeg(
+                cmd=get_track_encode_command(
+                    scene=scene,
+                    track_index=track_index,
+                    spool_dir=spool_dir,
+                    output_path=track_paths[track_index],
+                    duration_seconds=duration_seconds,
+                ),
+                on_progress=(
+                    (
+                        lambda progress_seconds: on_track_progress(
+                            track_index=track_index,
+                            progress_seconds=progress_seconds,
+                        )
+                    )
+                    if on_progress is not None
+                    else None
+                ),
+            )
+
+    return_codes = await asyncio.gather(
+        *(encode_track(track_index) for track_index in range(len(scene.tracks)))
+    )
+    for track_index, return_code in enumerate(return_codes):
+        if return_code != 0:
+            logger.error(f"Encoding track {track_index} failed: {return_code}")
+            return return_code
+
+    return await run_ffmpeg(
+        cmd=get_mux_command(
+            scene=scene,
+            track_paths=track_paths,
+            output_path=output_path,
+        ),
+    )
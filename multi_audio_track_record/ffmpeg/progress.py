@@ -0,0 +1,51 @@
+import asyncio
+from typing import Callable
+
+
+def add_progress_args(cmd: list[str]) -> list[str]:
+    """
+    FFmpeg のコマンドに、進捗を標準出力へ key=value の行で書き出すオプションを加える
+    """
+    return [
+        cmd[0],
+        "-progress",
+        "pipe:1",
+        "-nostats",
+        *cmd[1:],
+    ]
+
+
+def parse_ffmpeg_progress_line(line: str) -> float | None:
+    """
+    -progress の1行から、エンコードし終えた秒数を返す。秒数の行でない場合は None を返す
+    """
+    key, _, value = line.strip().partition("=")
+
+    # out_time_ms も単位はマイクロ秒
+    if key not in ("out_time_us", "out_time_ms"):
+        return None
+
+    try:
+        return int(value) / 1_000_000
+    except ValueError:
+        # 最初の出力の前は N/A になる
+        return None
+
+
+async def read_ffmpeg_progress(
+    stream: asyncio.StreamReader,
+    on_progress: Callable[[float], None],
+) -> None:
+    """
+    FFmpeg の標準出力を終端まで読み、エンコードし終えた秒数を on_progress に渡す
+    """
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+
+        progress_seconds = parse_ffmpeg_progress_line(
+            line.decode("utf-8", errors="replace")
+        )
+        if progress_seconds is not None:
+            on_progress(progress_seconds)
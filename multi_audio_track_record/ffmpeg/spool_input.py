@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from ..recorder import SpoolStream
+
+
+def get_spool_input_args(spool_stream: SpoolStream, spool_path: Path) -> list[str]:
+    """
+    スプールファイルを音声入力にする FFmpeg の引数を返す。
+    生PCMの場合は形式を指定し、 FLAC の場合はファイルのヘッダから読み取らせる
+    """
+    if spool_stream.is_flac_compressed:
+        return [
+            "-f",
+            "flac",
+            "-i",
+            str(spool_path.resolve()),
+        ]
+
+    return [
+        "-f",
+        spool_stream.sample_format,
+        "-ar",
+        str(spool_stream.sampling_rate),
+        "-ac",
+        str(spool_stream.channels),
+        "-i",
+        str(spool_path.resolve()),
+    ]
@@ -0,0 +1,199 @@
+import time
+from logging import getLogger
+
+import flet as ft
+import platformdirs
+
+from .. import __version__ as APP_VERSION
+from ..app_dirs import get_config_file_path, get_default_spool_dir
+from ..audio_capture import AudioCaptureEnginePyAudio
+from ..audio_input_device_manager import (
+    AudioInputDeviceManager,
+    AudioInputDeviceManagerPyAudio,
+)
+from ..config_store_manager import ConfigStoreManager, ConfigStoreManagerFile
+from ..encoder import EncodeJobQueue
+from ..recorder import Recorder
+from ..scene import Scene, SceneDevice, SceneTrack
+from .app_state import AppState
+from .ui_update_scheduler import UIUpdateScheduler
+from .views import AddAudioInputDeviceDialog, AddSceneDialog, AddTrackDialog, Home
+
+logger = getLogger(__name__)
+
+
+async def create_default_scene(
+    audio_input_device_manager: AudioInputDeviceManager,
+) -> Scene:
+    _default_audio_input_device = (
+        await audio_input_device_manager.get_default_audio_input_device()
+    )
+    _desktop_dir = platformdirs.user_desktop_path()
+
+    _default_scene = Scene(
+        name="デフォルト",
+        output_dir=str(_desktop_dir.resolve()),
+        tracks=[
+            SceneTrack(name="デフォルト"),
+        ],
+        devices=(
+            [
+                SceneDevice(
+                    portaudio_name=_default_audio_input_device.portaudio_name,
+                    portaudio_index=_default_audio_input_device.portaudio_index,
+                    portaudio_host_api_type=_default_audio_input_device.portaudio_host_api_type,
+                    portaudio_host_api_index=_default_audio_input_device.portaudio_host_api_index,
+                    portaudio_host_api_device_index=_default_audio_input_device.portaudio_host_api_device_index,
+                    sampling_rate=int(
+                        _default_audio_input_device.default_sampling_rate
+                    ),
+                    channels=_default_audio_input_device.max_channels,
+                    gain=0,
+                    is_muted=False,
+                    tracks=[0],
+                ),
+            ]
+            if _default_audio_input_device is not None
+            else []
+        ),
+    )
+
+    return _default_scene
+
+
+async def flet_app_main(page: ft.Page, started_at: float) -> None:
+    page.title = f"Multi Audio Track Recorder v{APP_VERSION}"
+    page.window_width = 800
+    page.window_height = 600
+
+    config_file_path = get_config_file_path()
+
+    config_store_manager: ConfigStoreManager = ConfigStoreManagerFile(
+        path=config_file_path,
+    )
+    audio_input_device_manager: AudioInputDeviceManager = (
+        AudioInputDeviceManagerPyAudio()
+    )
+
+    _scenes: list[Scene] = []
+    if config_file_path.exists():
+        config = await config_store_manager.load_config()
+        for scene in config.scenes:
+            _scenes.append(scene)
+    else:
+        # 初回起動
+        default_scene = await create_default_scene(
+            audio_input_device_manager=audio_input_device_manager,
+        )
+        _scenes.append(default_scene)
+
+    app_state = AppState(
+        scenes=_scenes,
+        selected_scene_index=0 if len(_scenes) > 0 else None,
+        is_armed=False,
+        is_recording=False,
+        recording_started_at=None,
+        is_paused=False,
+        is_muted=False,
+        default_spool_dir=get_default_spool_dir(),
+    )
+
+    # 録音の書き出しは録音とは独立に、このキューで順に行う
+    encode_job_queue = EncodeJobQueue(
+        state_path=app_state.default_spool_dir / "encode_jobs.json",
+    )
+    page.run_task(encode_job_queue.run)
+
+    # デバイスの一覧を別スレッドで先に列挙しておき、ダイアログではキャッシュを表示する
+    page.run_task(audio_input_device_manager.get_audio_input_devices)
+
+    # 音声入力ストリームはアプリ全体で1つの Recorder が開く。
+    # 画面 (Home) を作り直しても、開いているストリームを残したまま開き直さない
+    recorder = Recorder(audio_capture_engine=AudioCaptureEnginePyAudio())
+
+    def prepare_audio_input_device_rescan() -> bool:
+        # 録音中やアーム中、レベルの表示中はストリームを開いているため、列挙し直さない
+        if recorder.is_running:
+            return False
+
+        # 録音エンジンの PortAudio も終了し、次にストリームを開く時に初期化し直させる。
+        # アームと競合しないよう、イベントループ上で終了する。
+        # デバイスの管理側のインスタンスが残っている間は参照を減らすだけで、列挙は伴わない
+        recorder.audio_capture_engine.terminate()
+        return True
+
+    # ストリームを開いていない間は、別スレッドで定期的にデバイスを列挙し直して抜き差しを反映する
+    page.run_task(
+        audio_input_device_manager.run_periodic_rescan,
+        prepare_audio_input_device_rescan,
+    )
+
+    # 画面の更新はこのスケジューラーを通してまとめて送信する
+    ui_update_scheduler = UIUpdateScheduler(page=page)
+    page.run_task(ui_update_scheduler.run)
+
+    async def on_route_change(event: ft.RouteChangeEvent) -> None:
+        if page.route == "/":
+            page.views.clear()
+            page.views.append(
+                Home(
+                    route="/",
+                    app_state=app_state,
+                    audio_input_device_manager=audio_input_device_manager,
+                    config_store_manager=config_store_manager,
+                    ui_update_scheduler=ui_update_scheduler,
+                    encode_job_queue=encode_job_queue,
+                    recorder=recorder,
+                ),
+            )
+
+        elif page.route == "/add_scene":
+            page.views.append(
+                AddSceneDialog(
+                    route="/add_scene",
+                    app_state=app_state,
+                    audio_input_device_manager=audio_input_device_manager,
+                    config_store_manager=config_store_manager,
+                ),
+            )
+
+        elif page.route == "/add_audio_input_device":
+            page.views.append(
+                AddAudioInputDeviceDialog(
+                    route="/add_audio_input_device",
+                    app_state=app_state,
+                    audio_input_device_manager=audio_input_device_manager,
+                    config_store_manager=config_store_manager,
+                    recorder=recorder,
+                ),
+            )
+
+        elif page.route == "/add_track":
+            page.views.append(
+                AddTrackDialog(
+                    route="/add_track",
+                    app_state=app_state,
+                    audio_input_device_manager=audio_input_device_manager,
+                    config_store_manager=config_store_manager,
+                ),
+            )
+
+        logger.info(
+            f"on_route_change: route={page.route}, view_count={len(page.views)}"
+        )
+
+        page.update()
+
+    async def on_view_pop(view: ft.View) -> None:
+        page.views.pop()
+
+        top_view = page.views[-1]
+        page.go(top_view.route)
+
+    page.on_route_change = on_route_change
+    page.on_view_pop = on_view_pop
+    page.go("/")
+
+    logger.info(
+        f"First window shown in {time.perf_counter() - started_at:.3f} seconds."
+    )
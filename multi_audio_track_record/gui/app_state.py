@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 
 from ..scene import Scene
 
@@ -8,7 +9,10 @@ from ..scene import Scene
 class AppState:
     scenes: list[Scene]
     selected_scene_index: int | None
+    is_armed: bool
     is_recording: bool
     recording_started_at: datetime | None
     is_paused: bool
     is_muted: bool
+    default_spool_dir: Path
+    """シーンで spool_dir を指定しない場合に、録音のスプールディレクトリを作るディレクトリ"""
@@ -5,8 +5,11 @@ import flet as ft
 
 from ...audio_input_device_manager import AudioInputDeviceManager
 from ...config_store_manager import ConfigStoreManager
+from ...dsp import SILENT_METER_READING, MeterReading, decibel_to_meter_value
+from ...recorder import CaptureStats
 from ...scene import Scene
 from ..app_state import AppState
+from ..ui_update_scheduler import UIUpdateScheduler
 
 logger = getLogger(__name__)
 
@@ -16,6 +19,7 @@ class AudioInputDeviceControls:
     mute_button: ft.IconButton
     edit_button: ft.IconButton
     volume_progress_bar: ft.ProgressBar
+    capture_stats_text: ft.Text
 
 
 class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
@@ -27,6 +31,7 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
         app_state: AppState,
         audio_input_device_manager: AudioInputDeviceManager,
         config_store_manager: ConfigStoreManager,
+        ui_update_scheduler: UIUpdateScheduler,
         expand: bool | int | None = None,
     ):
         super().__init__(expand=expand)
@@ -37,6 +42,7 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
         self.app_state = app_state
         self.audio_input_device_manager = audio_input_device_manager
         self.config_store_manager = config_store_manager
+        self.ui_update_scheduler = ui_update_scheduler
 
     def build(self) -> None:
         add_audio_input_device_button = ft.IconButton(
@@ -45,7 +51,6 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
             on_click=self.on_add_audio_input_device_button_clicked,
         )
 
-        # TODO: show volume level of each input devices
         # TODO: mapping configuration of input devices and tracks
         # TODO: switch muted status of each input devices
         audio_input_device_list_view = ft.ListView(
@@ -89,6 +94,7 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
             device_mute_button = ft.IconButton(icon=ft.icons.MIC, icon_size=20)
             device_edit_button = ft.IconButton(icon=ft.icons.EDIT, icon_size=20)
             device_volume_progress_bar = ft.ProgressBar(value=0, bar_height=4)
+            device_capture_stats_text = ft.Text(value="", size=10)
 
             audio_input_device_list_view.controls.append(
                 ft.Container(
@@ -110,6 +116,7 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
                                                 expand=True,
                                             ),
                                             device_volume_progress_bar,
+                                            device_capture_stats_text,
                                         ],
                                         expand=True,
                                     ),
@@ -128,7 +135,7 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
                     bgcolor=ft.colors.ON_SECONDARY,
                     alignment=ft.alignment.center,
                     padding=16,
-                    height=70,
+                    height=84,
                 ),
             )
 
@@ -136,4 +143,54 @@ class AudioInputDeviceListPanel(ft.Column):  # type:ignore[misc]
                 mute_button=device_mute_button,
                 edit_button=device_edit_button,
                 volume_progress_bar=device_volume_progress_bar,
+                capture_stats_text=device_capture_stats_text,
             )
+
+    async def on_capture_stats_updated(
+        self,
+        capture_stats_dict: dict[int, CaptureStats],
+    ) -> None:
+        audio_input_device_controls_dict = self.audio_input_device_controls_dict
+
+        for device_index, capture_stats in capture_stats_dict.items():
+            audio_input_device_controls = audio_input_device_controls_dict.get(
+                device_index
+            )
+            if audio_input_device_controls is None:
+                continue
+
+            capture_stats_text = audio_input_device_controls.capture_stats_text
+            capture_stats_text.value = (
+                f"オーバーフロー: {capture_stats.input_overflow_count}, "
+                f"欠落: {capture_stats.dropped_frame_count}, "
+                f"読み出し遅延: {capture_stats.late_read_count}"
+            )
+            capture_stats_text.color = (
+                None if capture_stats.is_glitch_free else ft.colors.ERROR
+            )
+            self.ui_update_scheduler.request_update(capture_stats_text)
+
+    def on_meter_updated(
+        self,
+        meter_readings: dict[int, MeterReading],
+    ) -> None:
+        """
+        音声入力デバイスごとのレベルをメーターに反映する。
+        表示が変わったメーターだけを画面の更新対象にする
+        """
+        audio_input_device_controls_dict = self.audio_input_device_controls_dict
+        ui_update_scheduler = self.ui_update_scheduler
+
+        for (
+            device_index,
+            audio_input_device_controls,
+        ) in audio_input_device_controls_dict.items():
+            meter_reading = meter_readings.get(device_index, SILENT_METER_READING)
+
+            # 細かな変化で画面の更新を増やさないよう、表示値を丸める
+            value = round(decibel_to_meter_value(meter_reading.peak_decibel), 2)
+
+            volume_progress_bar = audio_input_device_controls.volume_progress_bar
+            if volume_progress_bar.value != value:
+                volume_progress_bar.value = value
+                ui_update_scheduler.request_update(volume_progress_bar)
@@ -1,50 +1,95 @@
 import asyncio
-import math
-import struct
-import tempfile
 import traceback
-from datetime import datetime, timezone
 from logging import getLogger
 from pathlib import Path
+from typing import Awaitable, Callable
 
 import flet as ft
-import pyaudio
 
 from ...audio_input_device_manager import AudioInputDeviceManager
 from ...config_store_manager import ConfigStoreManager
-from ...scene import Scene, SceneDevice
+from ...encoder import ENCODE_JOB_PRIORITY_RECORDING, EncodeJob, EncodeJobQueue
+from ...recorder import CaptureStats, Recorder
+from ...recording_session import RecordingSession
+from ...scene import Scene
 from ..app_state import AppState
+from ..ui_update_scheduler import UIUpdateScheduler
 
 logger = getLogger(__name__)
 
 
 class RecordControlPanel(ft.Row):  # type:ignore[misc]
+    arm_button: ft.IconButton | None
     mute_button: ft.IconButton | None
     record_button: ft.IconButton | None
     pause_button: ft.IconButton | None
+    marker_button: ft.IconButton | None
+    encode_status_text: ft.Text | None
+    encode_cancel_button: ft.IconButton | None
 
     record_task_future: asyncio.Future | None
+    record_stop_event: asyncio.Event | None
+    recording_session: RecordingSession | None
 
     def __init__(
         self,
         app_state: AppState,
         audio_input_device_manager: AudioInputDeviceManager,
         config_store_manager: ConfigStoreManager,
+        ui_update_scheduler: UIUpdateScheduler,
+        encode_job_queue: EncodeJobQueue,
+        recorder: Recorder,
         alignment: ft.MainAxisAlignment,
+        on_capture_stats_updated: (
+            Callable[[dict[int, CaptureStats]], Awaitable[None]] | None
+        ) = None,
     ):
         super().__init__(alignment=alignment)
 
+        self.arm_button = None
         self.mute_button = None
         self.record_button = None
         self.pause_button = None
+        self.marker_button = None
+        self.encode_status_text = None
+        self.encode_cancel_button = None
 
         self.app_state = app_state
         self.audio_input_device_manager = audio_input_device_manager
         self.config_store_manager = config_store_manager
+        self.ui_update_scheduler = ui_update_scheduler
+        self.encode_job_queue = encode_job_queue
+        self.recorder = recorder
+        """
+        アプリ全体で1つの Recorder を使う。
+        Home が作り直されても、開いているストリームを引き継ぎ、開き直さない
+        """
+
+        self.on_capture_stats_updated_callback = on_capture_stats_updated
 
         self.record_task_future = None
+        self.record_stop_event = None
+        self.recording_session = None
+        self.streaming_encoder_finish_timeout_seconds = 30.0
+        """録音終了後、録音中に起動したFFmpegの終了を待つ上限"""
+        self.encode_status_string = ""
+        """画面に表示している書き出しの状況"""
+
+    def get_selected_scene(self) -> Scene:
+        app_state = self.app_state
+
+        selected_scene_index = app_state.selected_scene_index
+        assert selected_scene_index is not None
+
+        return app_state.scenes[selected_scene_index]
 
     def build(self) -> None:
+        arm_button = ft.IconButton(
+            icon=ft.icons.SENSORS_OFF,
+            icon_size=32,
+            on_click=self.on_arm_button_clicked,
+        )
+
         mute_button = ft.IconButton(
             icon=ft.icons.MIC,
             icon_size=32,
@@ -64,18 +109,97 @@ class RecordControlPanel(ft.Row):  # type:ignore[misc]
             on_click=self.on_pause_button_clicked,
         )
 
+        marker_button = ft.IconButton(
+            icon=ft.icons.BOOKMARK_ADD,
+            icon_size=32,
+            tooltip="マーカーを付ける (M)",
+            disabled=True,
+            on_click=self.on_marker_button_clicked,
+        )
+
+        encode_status_text = ft.Text(
+            value="",
+            visible=False,
+        )
+
+        encode_cancel_button = ft.IconButton(
+            icon=ft.icons.CANCEL,
+            tooltip="書き出しを中止",
+            visible=False,
+            on_click=self.on_encode_cancel_button_clicked,
+        )
+
+        self.arm_button = arm_button
         self.mute_button = mute_button
         self.record_button = record_button
         self.pause_button = pause_button
+        self.marker_button = marker_button
+        self.encode_status_text = encode_status_text
+        self.encode_cancel_button = encode_cancel_button
 
         self.controls = [
+            arm_button,
             mute_button,
             record_button,
             pause_button,
+            marker_button,
+            encode_status_text,
+            encode_cancel_button,
         ]
 
+    async def on_arm_button_clicked(self, event: ft.ControlEvent) -> None:
+        app_state = self.app_state
+
+        arm_button = self.arm_button
+        assert arm_button is not None
+
+        next_is_armed = not app_state.is_armed
+        logger.info(
+            f"arm button clicked: is_armed: {app_state.is_armed} -> {next_is_armed}"
+        )
+
+        app_state.is_armed = next_is_armed
+
+        if next_is_armed:
+            arm_button.icon = ft.icons.SENSORS
+        else:
+            arm_button.icon = ft.icons.SENSORS_OFF
+
+        self.ui_update_scheduler.request_update(self)
+
+        # 録音中は録音終了時にアーム状態が反映される
+        if not app_state.is_recording:
+            # プリロールの有無を切り替えるため、ストリームを開き直す
+            await self.close_streams()
+            await self.open_streams()
+
+    async def open_streams(self) -> None:
+        """
+        選択中のシーンの音声入力ストリームを開き、レベルの計測を始める。
+        アーム状態の場合はプリロールも保持する
+        """
+        app_state = self.app_state
+
+        recorder = self.recorder
+        if recorder.armed_scene is not None:
+            return
+
+        scene = self.get_selected_scene()
+
+        # 音声入力ストリームは録音スレッド側で開かれるため、ここではブロックしない
+        recorder.arm(
+            scene=scene,
+            is_muted=app_state.is_muted,
+            pre_roll_seconds=None if app_state.is_armed else 0.0,
+        )
+
+    async def close_streams(self) -> None:
+        recorder = self.recorder
+
+        recorder.stop()
+        await recorder.wait_stopped()
+
     async def on_mute_button_clicked(self, event: ft.ControlEvent) -> None:
-        page = self.page
         app_state = self.app_state
 
         mute_button = self.mute_button
@@ -93,18 +217,32 @@ class RecordControlPanel(ft.Row):  # type:ignore[misc]
 
         app_state.is_muted = next_is_muted
 
-        page.update()
+        recording_session = self.recording_session
+        recorder = self.recorder
+        if recording_session is not None:
+            # 一時停止中は、ミュートを解除しても無音のままにする
+            recording_session.set_muted(is_muted=next_is_muted)
+        else:
+            recorder.set_muted(is_muted=next_is_muted)
+
+        self.ui_update_scheduler.request_update(self)
 
     async def on_record_button_clicked(self, event: ft.ControlEvent) -> None:
         page = self.page
         app_state = self.app_state
 
+        arm_button = self.arm_button
+        assert arm_button is not None
+
         record_button = self.record_button
         assert record_button is not None
 
         pause_button = self.pause_button
         assert pause_button is not None
 
+        marker_button = self.marker_button
+        assert marker_button is not None
+
         next_is_recording = not app_state.is_recording
         logger.info(
             "record button clicked: is_recording: "
@@ -118,6 +256,10 @@ class RecordControlPanel(ft.Row):  # type:ignore[misc]
             pause_button.icon = ft.icons.PAUSE
             pause_button.disabled = False
 
+            marker_button.disabled = False
+
+            arm_button.disabled = True
+
             app_state.is_paused = False
             app_state.is_recording = True
 
@@ -125,17 +267,93 @@ class RecordControlPanel(ft.Row):  # type:ignore[misc]
         else:
             # 録音終了
             record_button.icon = ft.icons.FIBER_MANUAL_RECORD
+            # 録音スレッドがスプールファイルを書き終えるまで、次の録音を始めない
+            record_task_future = self.record_task_future
+            record_button.disabled = (
+                record_task_future is not None and not record_task_future.done()
+            )
 
             pause_button.icon = ft.icons.PAUSE
             pause_button.disabled = True
 
+            marker_button.disabled = True
+
+            arm_button.disabled = False
+
             app_state.is_paused = False
             app_state.is_recording = False
 
+            record_stop_event = self.record_stop_event
+            if record_stop_event is not None:
+                record_stop_event.set()
+
+        self.ui_update_scheduler.request_update(self)
+
+    async def on_encode_cancel_button_clicked(self, event: ft.ControlEvent) -> None:
+        encode_job_queue = self.encode_job_queue
+
+        # 中止するのはこのセッションで録音したテイクの書き出しだけにし、
+        # 異常終了した録音や前回の起動時から引き継いだ書き出しは続ける
+        cancellable_jobs = encode_job_queue.get_active_jobs(
+            priority=ENCODE_JOB_PRIORITY_RECORDING,
+        )
+        logger.info(f"encode cancel button clicked: {len(cancellable_jobs)} jobs")
+
+        for job in cancellable_jobs:
+            await encode_job_queue.cancel(job_id=job.record.job_id)
+
+        page = self.page
+        page.snack_bar = ft.SnackBar(
+            content=ft.Text("書き出しを中止しました。次回の起動時に書き出せます"),
+        )
+        page.snack_bar.open = True
         page.update()
 
+    def on_encode_jobs_polled(self) -> None:
+        """
+        書き出しの状況を画面に反映する。
+        進捗は書き出しのスレッドから更新されるため、一定の間隔で呼び出して変化を確かめる
+        """
+        encode_status_text = self.encode_status_text
+        assert encode_status_text is not None
+
+        encode_cancel_button = self.encode_cancel_button
+        assert encode_cancel_button is not None
+
+        encode_job_queue = self.encode_job_queue
+        active_jobs = encode_job_queue.get_active_jobs()
+        cancellable_jobs = encode_job_queue.get_active_jobs(
+            priority=ENCODE_JOB_PRIORITY_RECORDING,
+        )
+
+        status_parts: list[str] = []
+        for job in active_jobs:
+            if job.record.state != "running":
+                continue
+
+            progress_ratio = job.progress_ratio
+            status_parts.append(
+                f"書き出し中: {Path(job.record.output_path).name}"
+                + (f" {progress_ratio:.0%}" if progress_ratio is not None else "")
+            )
+
+        queued_job_count = sum(1 for job in active_jobs if job.record.state == "queued")
+        if queued_job_count > 0:
+            status_parts.append(f"待機中: {queued_job_count}件")
+
+        encode_status_string = " / ".join(status_parts)
+        if encode_status_string == self.encode_status_string:
+            return
+
+        self.encode_status_string = encode_status_string
+
+        encode_status_text.value = encode_status_string
+        encode_status_text.visible = len(active_jobs) > 0
+        encode_cancel_button.visible = len(cancellable_jobs) > 0
+
+        self.ui_update_scheduler.request_update(self)
+
     async def on_pause_button_clicked(self, event: ft.ControlEvent) -> None:
-        page = self.page
         app_state = self.app_state
 
         pause_button = self.pause_button
@@ -153,208 +371,138 @@ class RecordControlPanel(ft.Row):  # type:ignore[misc]
 
         app_state.is_paused = not app_state.is_paused
 
+        recording_session = self.recording_session
+        if recording_session is not None:
+            recording_session.set_paused(is_paused=next_is_paused)
+
+        self.ui_update_scheduler.request_update(self)
+
+    async def on_marker_button_clicked(self, event: ft.ControlEvent) -> None:
+        self.add_marker()
+
+    def add_marker(self) -> None:
+        """録音中の場合、現在の位置にマーカーを付ける。ボタンとキーボードショートカットから呼び出す"""
+        page = self.page
+
+        recording_session = self.recording_session
+        if recording_session is None or not self.app_state.is_recording:
+            return
+
+        marker = recording_session.add_marker()
+
+        page.snack_bar = ft.SnackBar(
+            content=ft.Text(
+                f"マーカーを付けました: {marker.label} ({marker.position_seconds:.1f} 秒)"
+            ),
+        )
+        page.snack_bar.open = True
         page.update()
 
     async def on_scene_loaded(
         self,
         scene: Scene,
     ) -> None:
-        pass
+        app_state = self.app_state
+
+        if app_state.is_recording:
+            return
+
+        recorder = self.recorder
+
+        # 別のシーンのストリームを開いたままにしない
+        if recorder.armed_scene is not scene:
+            await self.close_streams()
+
+            # 録音していない間もレベルを表示するため、ストリームを開いておく
+            recorder.arm(
+                scene=scene,
+                is_muted=app_state.is_muted,
+                pre_roll_seconds=None if app_state.is_armed else 0.0,
+            )
+
+    async def notify_capture_stats(
+        self,
+        recorder: Recorder,
+    ) -> dict[int, CaptureStats]:
+        capture_stats_dict = recorder.get_capture_stats()
+
+        on_capture_stats_updated_callback = self.on_capture_stats_updated_callback
+        if on_capture_stats_updated_callback is not None:
+            await on_capture_stats_updated_callback(capture_stats_dict)
+
+        return capture_stats_dict
 
     async def record_task(self) -> None:
         try:
             app_state = self.app_state
 
-            app_state.recording_started_at = datetime.now(tz=timezone.utc)
-
-            selected_scene_index = self.app_state.selected_scene_index
-            assert selected_scene_index is not None
-            scene = self.app_state.scenes[selected_scene_index]
-
-            devices = scene.devices
-            tracks = scene.tracks
-
-            pyaudio_instance = pyaudio.PyAudio()
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                tmpdir_path = Path(tmpdir)
-
-                async with asyncio.TaskGroup() as task_group:
-                    for device_index, device in enumerate(devices):
-                        temp_output_path = tmpdir_path / f"{device_index}.bin"
-
-                        task_group.create_task(
-                            self.device_record_task(
-                                pyaudio_instance=pyaudio_instance,
-                                scene_device=device,
-                                temp_output_path=temp_output_path,
-                            ),
-                        )
-
-                try:
-                    # TODO: use output dir from scene config
-                    # TODO: choice output file extension (m4a, mp4) for VLC compatibility
-                    recording_started_at = app_state.recording_started_at
-                    timestamp = (
-                        recording_started_at
-                        if recording_started_at is not None
-                        else datetime.now(tz=timezone.utc)
-                    )
-
-                    # e.g. 2024-04-01T00-00-00Z
-                    timestamp_string = (
-                        timestamp.astimezone(tz=timezone.utc)
-                        .isoformat(timespec="seconds")
-                        .replace("+00:00", "Z")
-                        .replace(":", "-")
-                    )
-                    output_path = Path(scene.output_dir) / f"rec_{timestamp_string}.m4a"
-                    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    cmd = [
-                        "ffmpeg",
-                        "-y",
-                    ]
-
-                    # 0番目の音声入力を無音にする
-                    cmd += [
-                        "-f",
-                        "lavfi",
-                        "-i",
-                        "anullsrc",
-                    ]
-
-                    # 各音声入力デバイスを1番目以降の音声入力にする
-                    for device_index, device in enumerate(devices):
-                        temp_output_path = tmpdir_path / f"{device_index}.bin"
-
-                        cmd += [
-                            "-f",
-                            "f32le",
-                            "-ar",
-                            str(device.sampling_rate),
-                            "-ac",
-                            str(device.channels),
-                            "-i",
-                            str(temp_output_path.resolve()),
-                        ]
-
-                    for track_index, track in enumerate(tracks):
-                        track_device_input_indexes: list[int] = []
-
-                        for device_index, device in enumerate(devices):
-                            if track_index in device.tracks:
-                                # 音声入力デバイスの入力は1番目以降
-                                track_device_input_indexes.append(1 + device_index)
-
-                        if len(track_device_input_indexes) == 0:
-                            # トラックに入力される音声入力デバイスが0の場合、入力番号0の無音を入力する
-                            track_device_input_indexes.append(0)
-
-                        track_device_source_string = ""
-                        for track_device_index in track_device_input_indexes:
-                            track_device_source_string += f"[{track_device_index}:a:0]"
-
-                        cmd += [
-                            "-filter_complex",
-                            f"{track_device_source_string}amix=inputs={len(track_device_input_indexes)}[t{track_index}]",
-                        ]
-
-                        cmd += [
-                            "-map",
-                            f"[t{track_index}]",
-                            "-c:a",
-                            "aac",  # Native FFmpeg AAC Encoder
-                            "-b:a",
-                            "160k",
-                            "-metadata:s:a:0",
-                            f"title={track.name}",  # .mp4
-                            "-metadata:s:a:0",
-                            f"handler_name={track.name}",  # .m4a (but VLC not working)
-                        ]
-
-                    cmd += [
-                        str(output_path.resolve()),
-                    ]
-
-                    proc = await asyncio.create_subprocess_exec(
-                        cmd[0],
-                        *cmd[1:],
-                    )
-
-                    return_code = await proc.wait()
-                    logger.info(f"FFmpeg return code: {return_code}")
-                finally:
-                    temp_output_path.unlink(missing_ok=True)
-        except Exception:
-            logger.error(traceback.format_exc())
-            raise
-
-    async def device_record_task(
-        self,
-        pyaudio_instance: pyaudio.PyAudio,
-        scene_device: SceneDevice,
-        temp_output_path: Path,
-    ) -> None:
-        app_state = self.app_state
+            scene = self.get_selected_scene()
 
-        channels = 1
-        format = pyaudio.paFloat32
-        num_frames = 1024
+            recorder = self.recorder
 
-        with temp_output_path.open("wb") as fp:
-            total_byte_count = 0
+            record_stop_event = asyncio.Event()
+            self.record_stop_event = record_stop_event
 
-            audio_input_stream = pyaudio_instance.open(
-                input=True,
-                input_device_index=scene_device.portaudio_index,
-                rate=scene_device.sampling_rate,
-                channels=channels,
-                format=format,
-                frames_per_buffer=num_frames,
+            recording_session = RecordingSession(
+                recorder=recorder,
+                scene=scene,
+                spool_root_dir=(
+                    Path(scene.spool_dir)
+                    if scene.spool_dir is not None
+                    else app_state.default_spool_dir
+                ),
+                streaming_encoder_finish_timeout_seconds=(
+                    self.streaming_encoder_finish_timeout_seconds
+                ),
             )
+            app_state.recording_started_at = recording_session.recording_started_at
+
+            await recording_session.start(is_muted=app_state.is_muted)
+            self.recording_session = recording_session
 
             try:
-                while app_state.is_recording:
-                    if not audio_input_stream.get_read_available():
-                        logger.info("waiting")
-                        await asyncio.sleep(0.01)
-                        continue
-
-                    chunk_bytes = audio_input_stream.read(num_frames=num_frames)
-
-                    is_muted = app_state.is_muted or scene_device.is_muted
-                    if not is_muted:
-                        fp.write(chunk_bytes)
-                    else:
-                        # ミュート中は -60 dB 扱い
-                        fp.write(struct.pack("<f", 1e-3) * len(chunk_bytes))
-
-                    total_byte_count += len(chunk_bytes)
-
-                    # 先頭 4 bytes (f32le)
-                    first_float_bytes = chunk_bytes[:4]
-                    first_float_value: float = struct.unpack(
-                        "<f",
-                        first_float_bytes,
-                    )[0]
-
-                    decibel_minimum_limit = -60
+                while not record_stop_event.is_set():
                     try:
-                        first_float_decibel_value = max(
-                            20 * math.log10(first_float_value),
-                            decibel_minimum_limit,
-                        )
-                    except ValueError:
-                        # ValueError: math domain error if first_float_value ~ 0.0
-                        first_float_decibel_value = decibel_minimum_limit
-
-                    logger.info(
-                        f"[recording] {total_byte_count=} "
-                        f"({first_float_decibel_value=} dB)"
-                    )
-
-                    await asyncio.sleep(0.01)
+                        await asyncio.wait_for(record_stop_event.wait(), timeout=1)
+                    except TimeoutError:
+                        pass
+
+                    recording_session.poll()
+
+                    await self.notify_capture_stats(recorder=recorder)
+            except Exception:
+                await recording_session.abort()
+                raise
             finally:
-                audio_input_stream.close()
-                logger.info("audio_input_stream closed")
+                self.record_stop_event = None
+                self.recording_session = None
+
+                # 録音スレッドがスプールファイルを書き終えるまで待つ
+                await recording_session.stop()
+                await self.notify_capture_stats(recorder=recorder)
+
+                # 書き出しを待たずに、次の録音を始められるようにする
+                record_button = self.record_button
+                assert record_button is not None
+                record_button.disabled = False
+                self.ui_update_scheduler.request_update(self)
+
+            # レベルの表示と次の録音に備えて、再びストリームを開く
+            await self.open_streams()
+
+            async def encode_job_run(job: EncodeJob) -> int:
+                return await recording_session.encode(on_progress=job.set_progress)
+
+            spool_dir = recording_session.spool_dir
+            assert spool_dir is not None
+
+            await self.encode_job_queue.submit(
+                spool_dir=spool_dir,
+                output_path=recording_session.output_path,
+                run=encode_job_run,
+                priority=ENCODE_JOB_PRIORITY_RECORDING,
+                duration_seconds=recording_session.recording_seconds,
+            )
+        except Exception:
+            logger.error(traceback.format_exc())
+            raise
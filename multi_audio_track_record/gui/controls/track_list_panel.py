@@ -5,8 +5,10 @@ import flet as ft
 
 from ...audio_input_device_manager import AudioInputDeviceManager
 from ...config_store_manager import ConfigStoreManager
+from ...dsp import SILENT_METER_READING, MeterReading, decibel_to_meter_value
 from ...scene import Scene
 from ..app_state import AppState
+from ..ui_update_scheduler import UIUpdateScheduler
 
 logger = getLogger(__name__)
 
@@ -26,6 +28,7 @@ class TrackListPanel(ft.Column):  # type:ignore[misc]
         app_state: AppState,
         audio_input_device_manager: AudioInputDeviceManager,
         config_store_manager: ConfigStoreManager,
+        ui_update_scheduler: UIUpdateScheduler,
         expand: bool | int | None = None,
     ):
         super().__init__(expand=expand)
@@ -36,6 +39,7 @@ class TrackListPanel(ft.Column):  # type:ignore[misc]
         self.app_state = app_state
         self.audio_input_device_manager = audio_input_device_manager
         self.config_store_manager = config_store_manager
+        self.ui_update_scheduler = ui_update_scheduler
 
     def build(self) -> None:
         add_track_button = ft.IconButton(
@@ -130,3 +134,25 @@ class TrackListPanel(ft.Column):  # type:ignore[misc]
                 edit_button=track_edit_button,
                 volume_progress_bar=track_volume_progress_bar,
             )
+
+    def on_meter_updated(
+        self,
+        meter_readings: dict[int, MeterReading],
+    ) -> None:
+        """
+        トラックごとのレベルをメーターに反映する。
+        表示が変わったメーターだけを画面の更新対象にする
+        """
+        track_controls_dict = self.track_controls_dict
+        ui_update_scheduler = self.ui_update_scheduler
+
+        for track_index, track_controls in track_controls_dict.items():
+            meter_reading = meter_readings.get(track_index, SILENT_METER_READING)
+
+            # 細かな変化で画面の更新を増やさないよう、表示値を丸める
+            value = round(decibel_to_meter_value(meter_reading.peak_decibel), 2)
+
+            volume_progress_bar = track_controls.volume_progress_bar
+            if volume_progress_bar.value != value:
+                volume_progress_bar.value = value
+                ui_update_scheduler.request_update(volume_progress_bar)
@@ -1,157 +1,33 @@
+import asyncio
+import importlib
+import time
 from logging import getLogger
 
 import flet as ft
-import platformdirs
-
-from .. import __version__ as APP_VERSION
-from ..audio_input_device_manager import (
-    AudioInputDeviceManager,
-    AudioInputDeviceManagerPyAudio,
-)
-from ..config_store_manager import ConfigStoreManager, ConfigStoreManagerFile
-from ..scene import Scene, SceneDevice, SceneTrack
-from .app_state import AppState
-from .views import AddAudioInputDeviceDialog, AddSceneDialog, AddTrackDialog, Home
 
 logger = getLogger(__name__)
 
 
-async def create_default_scene(
-    audio_input_device_manager: AudioInputDeviceManager,
-) -> Scene:
-    _default_audio_input_device = (
-        await audio_input_device_manager.get_default_audio_input_device()
-    )
-    _desktop_dir = platformdirs.user_desktop_path()
-
-    _default_scene = Scene(
-        name="デフォルト",
-        output_dir=str(_desktop_dir.resolve()),
-        tracks=[
-            SceneTrack(name="デフォルト"),
-        ],
-        devices=(
-            [
-                SceneDevice(
-                    portaudio_name=_default_audio_input_device.portaudio_name,
-                    portaudio_index=_default_audio_input_device.portaudio_index,
-                    portaudio_host_api_type=_default_audio_input_device.portaudio_host_api_type,
-                    portaudio_host_api_index=_default_audio_input_device.portaudio_host_api_index,
-                    portaudio_host_api_device_index=_default_audio_input_device.portaudio_host_api_device_index,
-                    sampling_rate=int(
-                        _default_audio_input_device.default_sampling_rate
-                    ),
-                    channels=_default_audio_input_device.max_channels,
-                    gain=0,
-                    is_muted=False,
-                    tracks=[0],
-                ),
-            ]
-            if _default_audio_input_device is not None
-            else []
-        ),
-    )
-
-    return _default_scene
-
-
-async def flet_app_main(page: ft.Page) -> None:
-    page.title = f"Multi Audio Track Recorder v{APP_VERSION}"
-    page.window_width = 800
-    page.window_height = 600
+async def run_app(started_at: float | None = None) -> None:
+    """
+    GUI を起動する。 started_at はプロセスの起動時刻 (time.perf_counter) で、
+    最初の画面を表示するまでにかかった時間の記録に使う。
 
-    config_dir = platformdirs.user_config_path(
-        appauthor="aoirint",
-        appname="MultiAudioTrackRecorder",
-    )
-    config_file_path = config_dir / "config.json"
+    録音に使うモジュール (numpy, PortAudio, エンコーダなど) の読み込みには時間がかかるため、
+    flet のクライアントが起動するのを待つ間に別スレッドで読み込む
+    """
+    if started_at is None:
+        started_at = time.perf_counter()
 
-    config_store_manager: ConfigStoreManager = ConfigStoreManagerFile(
-        path=config_file_path,
+    app_main_import_task = asyncio.create_task(
+        asyncio.to_thread(importlib.import_module, f"{__package__}.app_main"),
     )
-    audio_input_device_manager: AudioInputDeviceManager = (
-        AudioInputDeviceManagerPyAudio()
-    )
-
-    _scenes: list[Scene] = []
-    if config_file_path.exists():
-        config = await config_store_manager.load_config()
-        for scene in config.scenes:
-            _scenes.append(scene)
-    else:
-        # 初回起動
-        default_scene = await create_default_scene(
-            audio_input_device_manager=audio_input_device_manager,
-        )
-        _scenes.append(default_scene)
-
-    app_state = AppState(
-        scenes=_scenes,
-        selected_scene_index=0 if len(_scenes) > 0 else None,
-        is_recording=False,
-        recording_started_at=None,
-        is_paused=False,
-        is_muted=False,
-    )
-
-    async def on_route_change(event: ft.RouteChangeEvent) -> None:
-        if page.route == "/":
-            page.views.clear()
-            page.views.append(
-                Home(
-                    route="/",
-                    app_state=app_state,
-                    audio_input_device_manager=audio_input_device_manager,
-                    config_store_manager=config_store_manager,
-                ),
-            )
-
-        elif page.route == "/add_scene":
-            page.views.append(
-                AddSceneDialog(
-                    route="/add_scene",
-                    app_state=app_state,
-                    audio_input_device_manager=audio_input_device_manager,
-                    config_store_manager=config_store_manager,
-                ),
-            )
-
-        elif page.route == "/add_audio_input_device":
-            page.views.append(
-                AddAudioInputDeviceDialog(
-                    route="/add_audio_input_device",
-                    app_state=app_state,
-                    audio_input_device_manager=audio_input_device_manager,
-                    config_store_manager=config_store_manager,
-                ),
-            )
-
-        elif page.route == "/add_track":
-            page.views.append(
-                AddTrackDialog(
-                    route="/add_track",
-                    app_state=app_state,
-                    audio_input_device_manager=audio_input_device_manager,
-                    config_store_manager=config_store_manager,
-                ),
-            )
-
-        logger.info(
-            f"on_route_change: route={page.route}, view_count={len(page.views)}"
-        )
-
-        page.update()
-
-    async def on_view_pop(view: ft.View) -> None:
-        page.views.pop()
 
-        top_view = page.views[-1]
-        page.go(top_view.route)
+    async def flet_app_target(page: ft.Page) -> None:
+        await app_main_import_task
 
-    page.on_route_change = on_route_change
-    page.on_view_pop = on_view_pop
-    page.go("/")
+        from .app_main import flet_app_main
 
+        await flet_app_main(page=page, started_at=started_at)
 
-async def run_app() -> None:
-    await ft.app_async(target=flet_app_main)
+    await ft.app_async(target=flet_app_target)
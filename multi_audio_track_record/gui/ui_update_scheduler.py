@@ -0,0 +1,112 @@
+import asyncio
+import traceback
+from logging import getLogger
+
+import flet as ft
+
+logger = getLogger(__name__)
+
+
+class UIUpdateScheduler:
+    """
+    コントロールごとの画面の更新要求をまとめ、一定の頻度を上限として送信する。
+
+    request_update で更新が必要なコントロールを登録すると、
+    次の送信で変更のあったコントロールだけをまとめて送信する。
+    送信までに同じコントロールが何度登録されても、送信は1回にまとめられる。
+
+    送信に時間がかかった場合はクライアントが追いついていないとみなし、
+    送信の間隔を max_interval_seconds まで広げる。
+    """
+
+    def __init__(
+        self,
+        page: ft.Page,
+        max_updates_per_second: float = 30.0,
+        max_interval_seconds: float = 0.5,
+    ):
+        self.page = page
+        self.min_interval_seconds = 1.0 / max_updates_per_second
+        self.max_interval_seconds = max_interval_seconds
+
+        # 登録順を保ったまま重複を除くため、 id をキーにした dict で持つ
+        self.__dirty_controls: dict[int, ft.Control] = {}
+        self.__is_page_dirty = False
+        self.__dirty_event = asyncio.Event()
+
+        self.current_interval_seconds = self.min_interval_seconds
+        """直近の送信にかかった時間から決めた、次の送信までの間隔"""
+
+    def request_update(self, *controls: ft.Control) -> None:
+        """
+        イベントループ上から呼び出す。 controls を次の送信で更新する
+        """
+        dirty_controls = self.__dirty_controls
+        for control in controls:
+            dirty_controls[id(control)] = control
+
+        self.__dirty_event.set()
+
+    def request_page_update(self) -> None:
+        """
+        イベントループ上から呼び出す。次の送信でページ全体を更新する。
+        ビューの構成が変わった場合など、コントロールを特定できない場合に使う
+        """
+        self.__is_page_dirty = True
+        self.__dirty_event.set()
+
+    def flush(self) -> None:
+        """
+        登録された更新を直ちに送信する
+        """
+        page = self.page
+
+        is_page_dirty = self.__is_page_dirty
+        dirty_controls = list(self.__dirty_controls.values())
+
+        self.__is_page_dirty = False
+        self.__dirty_controls.clear()
+
+        if is_page_dirty:
+            page.update()
+            return
+
+        # 送信までにページから取り除かれたコントロールは更新できない
+        attached_controls = [
+            control for control in dirty_controls if control.page is not None
+        ]
+        if len(attached_controls) == 0:
+            return
+
+        page.update(*attached_controls)
+
+    async def run(self) -> None:
+        """
+        登録された更新を送信し続ける。ページごとに1つのタスクとして実行する
+        """
+        loop = asyncio.get_running_loop()
+        dirty_event = self.__dirty_event
+
+        next_flush_time = loop.time()
+        while True:
+            await dirty_event.wait()
+
+            # 前回の送信から間隔を空け、その間に届いた更新要求をまとめる
+            wait_seconds = next_flush_time - loop.time()
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+
+            dirty_event.clear()
+
+            flush_started_at = loop.time()
+            try:
+                self.flush()
+            except Exception:
+                logger.error(traceback.format_exc())
+            flush_seconds = loop.time() - flush_started_at
+
+            self.current_interval_seconds = min(
+                max(self.min_interval_seconds, flush_seconds * 2),
+                self.max_interval_seconds,
+            )
+            next_flush_time = loop.time() + self.current_interval_seconds
@@ -5,6 +5,7 @@ import flet as ft
 
 from ...audio_input_device_manager import AudioInputDevice, AudioInputDeviceManager
 from ...config_store_manager import ConfigStoreManager
+from ...recorder import Recorder
 from ...scene import SceneDevice
 from ..app_state import AppState
 
@@ -23,6 +24,7 @@ class AddAudioInputDeviceDialog(ft.View):  # type:ignore[misc]
         app_state: AppState,
         audio_input_device_manager: AudioInputDeviceManager,
         config_store_manager: ConfigStoreManager,
+        recorder: Recorder,
     ):
         super().__init__(
             route=route,
@@ -32,6 +34,7 @@ class AddAudioInputDeviceDialog(ft.View):  # type:ignore[misc]
         self.app_state = app_state
         self.audio_input_device_manager = audio_input_device_manager
         self.config_store_manager = config_store_manager
+        self.recorder = recorder
 
     def build(self) -> None:
         audio_input_device_dropdown = ft.Dropdown()
@@ -46,6 +49,13 @@ class AddAudioInputDeviceDialog(ft.View):  # type:ignore[misc]
             ft.AppBar(
                 title=ft.Text("音声入力デバイスを追加"),
                 bgcolor=ft.colors.SURFACE_VARIANT,
+                actions=[
+                    ft.IconButton(
+                        icon=ft.icons.REFRESH,
+                        tooltip="デバイスを検出し直す",
+                        on_click=self.on_refresh_button_clicked,
+                    ),
+                ],
             ),
             ft.Container(
                 content=ft.Column(
@@ -80,6 +90,36 @@ class AddAudioInputDeviceDialog(ft.View):  # type:ignore[misc]
             main_task_future.cancel()
 
     async def main_task(self) -> None:
+        # 列挙済みのデバイスがあれば、列挙し直さずにすぐ表示する
+        await self.load_audio_input_devices()
+
+    async def on_refresh_button_clicked(self, event: ft.ControlEvent) -> None:
+        page = self.page
+        app_state = self.app_state
+
+        # 録音中やアーム中はストリームを閉じられないため、列挙し直さない
+        if app_state.is_recording or app_state.is_armed:
+            logger.warning(
+                "Skipped rescanning audio input devices while armed or recording"
+            )
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text("録音中やアーム中はデバイスを検出し直せません"),
+            )
+            page.snack_bar.open = True
+            page.update()
+            return
+
+        # PortAudio を初期化し直せるよう、レベルの表示のストリームを閉じて録音エンジンを終了する。
+        # ストリームはホーム画面に戻った時に開き直される
+        recorder = self.recorder
+        recorder.stop()
+        await recorder.wait_stopped()
+        await asyncio.to_thread(recorder.audio_capture_engine.terminate)
+
+        self.audio_input_device_manager.invalidate_audio_input_devices()
+        await self.load_audio_input_devices()
+
+    async def load_audio_input_devices(self) -> None:
         page = self.page
 
         audio_input_device_manager = self.audio_input_device_manager
@@ -1,22 +1,33 @@
 import asyncio
 import traceback
 from logging import getLogger
+from pathlib import Path
 
 import flet as ft
 
 from ...audio_input_device_manager import AudioInputDeviceManager
 from ...config_store_manager import Config, ConfigStoreManager
+from ...encoder import (
+    ENCODE_JOB_PRIORITY_RECOVERY,
+    EncodeJob,
+    EncodeJobQueue,
+    discard_spool_dir,
+    finalize_spool_dir,
+)
+from ...recorder import CaptureStats, Recorder, SpoolJournal, find_unfinished_spool_dirs
 from ..app_state import AppState
 from ..controls.audio_input_device_list_panel import AudioInputDeviceListPanel
 from ..controls.record_control_panel import RecordControlPanel
 from ..controls.scene_selection_panel import SceneSelectionPanel
 from ..controls.track_list_panel import TrackListPanel
+from ..ui_update_scheduler import UIUpdateScheduler
 
 logger = getLogger(__name__)
 
 
 class Home(ft.View):  # type:ignore[misc]
-    main_task_future: asyncio.Future | None
+    main_task_future: asyncio.Future[None] | None
+    meter_task_future: asyncio.Future[None] | None
 
     scene_panel: SceneSelectionPanel | None
     audio_input_device_list_panel: AudioInputDeviceListPanel | None
@@ -29,12 +40,18 @@ class Home(ft.View):  # type:ignore[misc]
         app_state: AppState,
         audio_input_device_manager: AudioInputDeviceManager,
         config_store_manager: ConfigStoreManager,
+        ui_update_scheduler: UIUpdateScheduler,
+        encode_job_queue: EncodeJobQueue,
+        recorder: Recorder,
     ):
         super().__init__(
             route=route,
         )
 
         self.main_task_future = None
+        self.meter_task_future = None
+        self.meter_update_interval_seconds = 1 / 20
+        """メーターを画面に反映する間隔。画面の更新頻度の上限になる"""
 
         self.scene_panel = None
         self.audio_input_device_list_panel = None
@@ -44,11 +61,15 @@ class Home(ft.View):  # type:ignore[misc]
         self.app_state = app_state
         self.audio_input_device_manager = audio_input_device_manager
         self.config_store_manager = config_store_manager
+        self.ui_update_scheduler = ui_update_scheduler
+        self.encode_job_queue = encode_job_queue
+        self.recorder = recorder
 
     def build(self) -> None:
         app_state = self.app_state
         audio_input_device_manager = self.audio_input_device_manager
         config_store_manager = self.config_store_manager
+        ui_update_scheduler = self.ui_update_scheduler
 
         async def on_scene_index_selected(selected_scene_index: int) -> None:
             await self.load_scene(index=selected_scene_index)
@@ -65,6 +86,7 @@ class Home(ft.View):  # type:ignore[misc]
             app_state=app_state,
             audio_input_device_manager=audio_input_device_manager,
             config_store_manager=config_store_manager,
+            ui_update_scheduler=ui_update_scheduler,
             expand=True,
         )
         self.audio_input_device_list_panel = audio_input_device_list_panel
@@ -73,15 +95,27 @@ class Home(ft.View):  # type:ignore[misc]
             app_state=app_state,
             audio_input_device_manager=audio_input_device_manager,
             config_store_manager=config_store_manager,
+            ui_update_scheduler=ui_update_scheduler,
             expand=True,
         )
         self.track_list_panel = track_list_panel
 
+        async def on_capture_stats_updated(
+            capture_stats_dict: dict[int, CaptureStats],
+        ) -> None:
+            await audio_input_device_list_panel.on_capture_stats_updated(
+                capture_stats_dict=capture_stats_dict,
+            )
+
         record_control_panel = RecordControlPanel(
             app_state=app_state,
             audio_input_device_manager=audio_input_device_manager,
             config_store_manager=config_store_manager,
+            ui_update_scheduler=ui_update_scheduler,
+            encode_job_queue=self.encode_job_queue,
+            recorder=self.recorder,
             alignment=ft.MainAxisAlignment.CENTER,
+            on_capture_stats_updated=on_capture_stats_updated,
         )
         self.record_control_panel = record_control_panel
 
@@ -109,14 +143,33 @@ class Home(ft.View):  # type:ignore[misc]
         main_task_future = page.run_task(self.main_task)
         self.main_task_future = main_task_future
 
+        meter_task_future = page.run_task(self.meter_task)
+        self.meter_task_future = meter_task_future
+
+        page.on_keyboard_event = self.on_keyboard_event
+
     def will_unmount(self) -> None:
+        self.page.on_keyboard_event = None
+
         main_task_future = self.main_task_future
         if main_task_future is not None:
             main_task_future.cancel()
 
+        meter_task_future = self.meter_task_future
+        if meter_task_future is not None:
+            meter_task_future.cancel()
+
+    async def on_keyboard_event(self, event: ft.KeyboardEvent) -> None:
+        # 修飾キー無しの M で、録音中にマーカーを付ける
+        if event.key != "M" or event.shift or event.ctrl or event.alt or event.meta:
+            return
+
+        record_control_panel = self.record_control_panel
+        if record_control_panel is not None:
+            record_control_panel.add_marker()
+
     async def load_scene(self, index: int) -> None:
         app_state = self.app_state
-        page = self.page
 
         audio_input_device_list_panel = self.audio_input_device_list_panel
         assert audio_input_device_list_panel is not None
@@ -145,7 +198,13 @@ class Home(ft.View):  # type:ignore[misc]
         app_state.is_paused = False
 
         app_state.selected_scene_index = index
-        page.update()
+
+        # シーンに合わせて作り直したコントロールだけを更新する
+        self.ui_update_scheduler.request_update(
+            audio_input_device_list_panel,
+            track_list_panel,
+            record_control_panel,
+        )
 
     async def save_config(self) -> None:
         config_store_manager = self.config_store_manager
@@ -167,6 +226,155 @@ class Home(ft.View):  # type:ignore[misc]
             assert selected_scene_index is not None
 
             await self.load_scene(index=selected_scene_index)
+
+            await self.check_unfinished_spool_dirs()
+        except Exception:
+            logger.error(traceback.format_exc())
+            raise
+
+    async def check_unfinished_spool_dirs(self) -> None:
+        """
+        前回までに異常終了した録音のスプールディレクトリを探し、出力ファイルを書き出すか確認する
+        """
+        page = self.page
+        app_state = self.app_state
+
+        spool_root_dirs = {app_state.default_spool_dir} | {
+            Path(scene.spool_dir)
+            for scene in app_state.scenes
+            if scene.spool_dir is not None
+        }
+
+        unfinished_spool_dirs: list[tuple[Path, SpoolJournal]] = []
+        for spool_root_dir in sorted(spool_root_dirs):
+            unfinished_spool_dirs += await asyncio.to_thread(
+                find_unfinished_spool_dirs,
+                spool_root_dir,
+            )
+
+        # 前回の起動時に書き出しを待っていた録音は、確認せずに書き出しを再開する
+        restored_spool_dirs = {
+            Path(record.spool_dir)
+            for record in self.encode_job_queue.pop_restored_records()
+        }
+        for spool_dir, spool_journal in unfinished_spool_dirs:
+            if spool_dir.resolve() in restored_spool_dirs:
+                await self.submit_finalize_job(
+                    spool_dir=spool_dir,
+                    spool_journal=spool_journal,
+                )
+
+        # 書き出しを待っている録音は、このアプリで書き出している途中のため除く
+        active_spool_dirs = {
+            Path(job.record.spool_dir)
+            for job in self.encode_job_queue.get_active_jobs()
+        }
+        unfinished_spool_dirs = [
+            (spool_dir, spool_journal)
+            for spool_dir, spool_journal in unfinished_spool_dirs
+            if spool_dir.resolve() not in active_spool_dirs
+        ]
+        if len(unfinished_spool_dirs) == 0:
+            return
+
+        async def on_finalize_button_clicked(event: ft.ControlEvent) -> None:
+            page.close_dialog()
+
+            for spool_dir, spool_journal in unfinished_spool_dirs:
+                await self.submit_finalize_job(
+                    spool_dir=spool_dir,
+                    spool_journal=spool_journal,
+                )
+
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text("未完了の録音の書き出しを始めました"),
+            )
+            page.snack_bar.open = True
+            page.update()
+
+        async def on_discard_button_clicked(event: ft.ControlEvent) -> None:
+            page.close_dialog()
+
+            for spool_dir, _ in unfinished_spool_dirs:
+                await asyncio.to_thread(discard_spool_dir, spool_dir)
+
+        async def on_later_button_clicked(event: ft.ControlEvent) -> None:
+            page.close_dialog()
+
+        page.show_dialog(
+            ft.AlertDialog(
+                modal=True,
+                title=ft.Text("未完了の録音"),
+                content=ft.Text(
+                    "前回までに終了しなかった録音があります。書き出しますか？\n\n"
+                    + "\n".join(
+                        Path(spool_journal.output_path).name
+                        for _, spool_journal in unfinished_spool_dirs
+                    ),
+                ),
+                actions=[
+                    ft.TextButton("書き出す", on_click=on_finalize_button_clicked),
+                    ft.TextButton("破棄する", on_click=on_discard_button_clicked),
+                    ft.TextButton("後で", on_click=on_later_button_clicked),
+                ],
+            ),
+        )
+
+    async def submit_finalize_job(
+        self,
+        spool_dir: Path,
+        spool_journal: SpoolJournal,
+    ) -> EncodeJob:
+        """異常終了した録音の書き出しを、録音し終えたテイクより後に実行する"""
+
+        async def finalize_job_run(job: EncodeJob) -> int:
+            return_code = await finalize_spool_dir(
+                spool_dir=spool_dir,
+                spool_journal=spool_journal,
+                on_progress=job.set_progress,
+            )
+            if return_code != 0:
+                logger.error(f"Failed to finalize {spool_dir}: {return_code}")
+
+            return return_code
+
+        return await self.encode_job_queue.submit(
+            spool_dir=spool_dir,
+            output_path=Path(spool_journal.output_path),
+            run=finalize_job_run,
+            priority=ENCODE_JOB_PRIORITY_RECOVERY,
+            duration_seconds=None,
+        )
+
+    async def meter_task(self) -> None:
+        """
+        録音スレッドが計測したレベルを一定の間隔で読み出し、メーターに反映する。
+        録音スレッドとは公開されたレベルを読むだけで、録音の処理を待たせない
+        """
+        try:
+            audio_input_device_list_panel = self.audio_input_device_list_panel
+            assert audio_input_device_list_panel is not None
+
+            track_list_panel = self.track_list_panel
+            assert track_list_panel is not None
+
+            record_control_panel = self.record_control_panel
+            assert record_control_panel is not None
+
+            while True:
+                await asyncio.sleep(self.meter_update_interval_seconds)
+
+                record_control_panel.on_encode_jobs_polled()
+
+                recorder = record_control_panel.recorder
+
+                # 画面への送信は UIUpdateScheduler がまとめて行う
+                audio_input_device_list_panel.on_meter_updated(
+                    meter_readings=recorder.get_device_meter_readings(),
+                )
+                track_list_panel.on_meter_updated(
+                    meter_readings=recorder.get_track_meter_readings(),
+                )
         except Exception:
             logger.error(traceback.format_exc())
             raise
@@ -0,0 +1,14 @@
+from .interrupt_event import InterruptEvent
+from .list_commands import print_audio_input_devices, print_scenes
+from .record_command import format_elapsed_seconds, format_track_levels, record_scene
+from .serve_command import serve_control_api
+
+__all__ = [
+    "InterruptEvent",
+    "format_elapsed_seconds",
+    "format_track_levels",
+    "print_audio_input_devices",
+    "print_scenes",
+    "record_scene",
+    "serve_control_api",
+]
@@ -0,0 +1,45 @@
+import asyncio
+import signal
+
+
+class InterruptEvent:
+    """
+    SIGINT (Ctrl+C) と SIGTERM を受け取るイベント。
+    シグナルハンドラを登録できない環境 (Windows) では signal.signal で代用する
+    """
+
+    def __init__(self) -> None:
+        self.event = asyncio.Event()
+        self.__loop = asyncio.get_running_loop()
+        self.__signal_numbers = [signal.SIGINT]
+        if hasattr(signal, "SIGTERM"):
+            self.__signal_numbers.append(signal.SIGTERM)
+
+    def __enter__(self) -> "InterruptEvent":
+        loop = self.__loop
+        for signal_number in self.__signal_numbers:
+            try:
+                loop.add_signal_handler(signal_number, self.event.set)
+            except NotImplementedError:
+                signal.signal(
+                    signal_number,
+                    lambda *_: loop.call_soon_threadsafe(self.event.set),
+                )
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        loop = self.__loop
+        for signal_number in self.__signal_numbers:
+            try:
+                loop.remove_signal_handler(signal_number)
+            except NotImplementedError:
+                signal.signal(signal_number, signal.SIG_DFL)
+
+    async def wait(self, timeout_seconds: float) -> bool:
+        """シグナルを受け取るか timeout_seconds 秒経つまで待ち、受け取ったかを返す"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout=timeout_seconds)
+        except TimeoutError:
+            pass
+
+        return self.event.is_set()
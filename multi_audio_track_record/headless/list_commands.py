@@ -0,0 +1,51 @@
+from typing import TextIO
+
+from ..audio_input_device_manager import AudioInputDeviceManager
+from ..scene import Scene
+
+
+async def print_audio_input_devices(
+    audio_input_device_manager: AudioInputDeviceManager,
+    output: TextIO,
+) -> None:
+    """
+    シーンに追加できる音声入力デバイスを1行ずつ表示する。既定のデバイスには * を付ける
+    """
+    audio_input_devices = await audio_input_device_manager.get_audio_input_devices()
+    default_audio_input_device = (
+        await audio_input_device_manager.get_default_audio_input_device()
+    )
+
+    for audio_input_device in audio_input_devices:
+        is_default = (
+            audio_input_device.portaudio_index
+            == default_audio_input_device.portaudio_index
+        )
+        print(
+            f"{'*' if is_default else ' '} "
+            f"{audio_input_device.portaudio_index}\t"
+            f"{audio_input_device.portaudio_name}\t"
+            f"{audio_input_device.max_channels}ch\t"
+            f"{int(audio_input_device.default_sampling_rate)}Hz",
+            file=output,
+        )
+
+
+def print_scenes(
+    scenes: list[Scene],
+    selected_scene_index: int | None,
+    output: TextIO,
+) -> None:
+    """
+    設定されたシーンを1行ずつ表示する。GUI で選択中のシーンには * を付ける
+    """
+    for scene_index, scene in enumerate(scenes):
+        track_names = ", ".join(track.name for track in scene.tracks)
+        print(
+            f"{'*' if scene_index == selected_scene_index else ' '} "
+            f"{scene_index}\t"
+            f"{scene.name}\t"
+            f"{len(scene.devices)} devices\t"
+            f"tracks: {track_names}",
+            file=output,
+        )
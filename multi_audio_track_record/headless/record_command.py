@@ -0,0 +1,144 @@
+import asyncio
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import TextIO
+
+from ..audio_capture import AudioCaptureEnginePyAudio
+from ..dsp import MeterReading
+from ..recorder import Recorder
+from ..recording_session import RecordingSession
+from ..scene import Scene
+from .interrupt_event import InterruptEvent
+
+logger = getLogger(__name__)
+
+
+def format_elapsed_seconds(elapsed_seconds: float) -> str:
+    """e.g. 01:02:03"""
+    total_seconds = int(elapsed_seconds)
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def format_track_levels(
+    scene: Scene,
+    track_meter_readings: dict[int, MeterReading],
+) -> str:
+    """トラックごとのピークを1行にまとめる。 e.g. voice -12.3 dB | bgm -30.0 dB"""
+    return " | ".join(
+        f"{track.name} {track_meter_readings[track_index].peak_decibel:.1f} dB"
+        for track_index, track in enumerate(scene.tracks)
+        if track_index in track_meter_readings
+    )
+
+
+async def record_scene(
+    scene: Scene,
+    spool_root_dir: Path,
+    duration_seconds: float | None,
+    is_muted: bool,
+    status_interval_seconds: float,
+    status_output: TextIO,
+) -> tuple[int, Path]:
+    """
+    GUI を使わずにシーンを録音し、書き出しの終了コード (成功は 0) と出力ファイルのパスを返す。
+
+    duration_seconds 秒経つか、 SIGINT (Ctrl+C) を受け取ると録音を終了して書き出す。
+    書き出し中にもう一度受け取ると書き出しを中止し、スプールディレクトリを残す。
+    残したスプールディレクトリは GUI の次回の起動時に書き出せる。
+    録音中は経過時間とトラックごとのレベルを、書き出し中は進捗を status_output に表示する
+    """
+    audio_capture_engine = AudioCaptureEnginePyAudio()
+    recorder = Recorder(audio_capture_engine=audio_capture_engine)
+
+    recording_session = RecordingSession(
+        recorder=recorder,
+        scene=scene,
+        spool_root_dir=spool_root_dir,
+    )
+    output_path = recording_session.output_path
+
+    with InterruptEvent() as interrupt_event:
+        await recording_session.start(is_muted=is_muted)
+        print(f"Recording scene '{scene.name}' to {output_path}", file=status_output)
+
+        recording_started_at = time.monotonic()
+        try:
+            while True:
+                elapsed_seconds = time.monotonic() - recording_started_at
+
+                timeout_seconds = status_interval_seconds
+                if duration_seconds is not None:
+                    remaining_seconds = duration_seconds - elapsed_seconds
+                    if remaining_seconds <= 0:
+                        break
+                    timeout_seconds = min(timeout_seconds, remaining_seconds)
+
+                if await interrupt_event.wait(timeout_seconds=timeout_seconds):
+                    break
+
+                recording_session.poll()
+
+                elapsed_seconds = time.monotonic() - recording_started_at
+                print(
+                    f"[{format_elapsed_seconds(elapsed_seconds)}] "
+                    + format_track_levels(
+                        scene=scene,
+                        track_meter_readings=recorder.get_track_meter_readings(),
+                    ),
+                    file=status_output,
+                )
+        except Exception:
+            await recording_session.abort()
+            raise
+        finally:
+            # 録音スレッドがスプールファイルを書き終えるまで待つ
+            capture_stats_dict = await recording_session.stop()
+
+        for device_index, capture_stats in capture_stats_dict.items():
+            logger.info(f"[capture stats] device {device_index}: {capture_stats}")
+
+        print("Encoding...", file=status_output)
+        interrupt_event.event.clear()
+
+        progress_seconds = 0.0
+
+        def on_progress(next_progress_seconds: float) -> None:
+            nonlocal progress_seconds
+            progress_seconds = next_progress_seconds
+
+        encode_task = asyncio.create_task(
+            recording_session.encode(on_progress=on_progress)
+        )
+        recording_seconds = recording_session.recording_seconds
+        while not encode_task.done():
+            done, _ = await asyncio.wait(
+                {encode_task},
+                timeout=status_interval_seconds,
+            )
+            if len(done) > 0:
+                break
+
+            if interrupt_event.event.is_set():
+                encode_task.cancel()
+                break
+
+            if recording_seconds is not None and recording_seconds > 0:
+                print(
+                    f"Encoding {min(progress_seconds / recording_seconds, 1.0):.0%}",
+                    file=status_output,
+                )
+
+        try:
+            return_code = await encode_task
+        except asyncio.CancelledError:
+            print(
+                "Encoding cancelled. "
+                f"The spool directory {recording_session.spool_dir} is kept.",
+                file=status_output,
+            )
+            return 130, output_path
+
+    return return_code, output_path
@@ -0,0 +1,122 @@
+import asyncio
+from logging import getLogger
+from pathlib import Path
+from typing import TextIO
+
+from ..audio_capture import AudioCaptureEnginePyAudio
+from ..control_server import ControlHttpServer, RecordingController
+from ..encoder import EncodeJobQueue
+from ..recorder import Recorder
+from ..scene import Scene
+from .interrupt_event import InterruptEvent
+
+logger = getLogger(__name__)
+
+
+async def serve_control_api(
+    scenes: list[Scene],
+    scene: Scene,
+    spool_root_dir: Path,
+    host: str,
+    port: int,
+    unix_socket_path: Path | None,
+    is_armed: bool,
+    event_interval_seconds: float,
+    status_output: TextIO,
+) -> int:
+    """
+    録音を操作する制御APIを、 SIGINT (Ctrl+C) を受け取るまで提供する。
+
+    終了時に録音中の場合は録音を終え、書き出しが終わるまで待つ。
+    書き出し中にもう一度受け取ると書き出しを中止し、スプールディレクトリを残す。
+    残したスプールディレクトリは GUI の次回の起動時に書き出せる。
+    全ての書き出しに成功した場合は 0 を返す
+    """
+    audio_capture_engine = AudioCaptureEnginePyAudio()
+    recorder = Recorder(audio_capture_engine=audio_capture_engine)
+    encode_job_queue = EncodeJobQueue()
+
+    controller = RecordingController(
+        recorder=recorder,
+        scenes=scenes,
+        scene=scene,
+        spool_root_dir=spool_root_dir,
+        encode_job_queue=encode_job_queue,
+        event_interval_seconds=event_interval_seconds,
+    )
+    http_server = ControlHttpServer(controller=controller)
+
+    with InterruptEvent() as interrupt_event:
+        # レベルを配信するため、録音していない間もストリームを開いておく
+        if is_armed:
+            await controller.arm()
+        else:
+            await controller.disarm()
+
+        server = await http_server.start_server(
+            host=host,
+            port=port,
+            unix_socket_path=unix_socket_path,
+        )
+        print(
+            "Listening on "
+            + (
+                f"unix:{unix_socket_path}"
+                if unix_socket_path is not None
+                else f"http://{host}:{port}"
+            ),
+            file=status_output,
+        )
+
+        background_tasks = [
+            asyncio.create_task(controller.run()),
+            asyncio.create_task(encode_job_queue.run()),
+        ]
+        try:
+            await interrupt_event.event.wait()
+
+            # 新しいコマンドを受け付けずに、録音を終える
+            server.close()
+            await controller.shutdown()
+
+            active_jobs = encode_job_queue.get_active_jobs()
+            if len(active_jobs) > 0:
+                print(
+                    f"Waiting for {len(active_jobs)} encode jobs...",
+                    file=status_output,
+                )
+
+            interrupt_event.event.clear()
+            join_task = asyncio.create_task(encode_job_queue.join())
+            interrupt_task = asyncio.create_task(interrupt_event.event.wait())
+            await asyncio.wait(
+                {join_task, interrupt_task},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            interrupt_task.cancel()
+
+            if not join_task.done():
+                for job in encode_job_queue.get_active_jobs():
+                    await encode_job_queue.cancel(job_id=job.record.job_id)
+                await join_task
+
+                print(
+                    "Encoding cancelled. The spool directories are kept.",
+                    file=status_output,
+                )
+        finally:
+            server.close()
+            # 開いている /events の接続にも終わりを伝えて閉じる
+            await http_server.close_event_streams()
+            for background_task in background_tasks:
+                background_task.cancel()
+
+    failed_jobs = [
+        job for job in encode_job_queue.get_jobs() if job.record.state != "finished"
+    ]
+    for job in failed_jobs:
+        logger.warning(
+            f"Encode job for {job.record.output_path} ended as {job.record.state}."
+        )
+
+    return 0 if len(failed_jobs) == 0 else 1
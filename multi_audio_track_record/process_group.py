@@ -0,0 +1,17 @@
+import subprocess
+import sys
+from typing import Any
+
+
+def get_new_process_group_kwargs() -> dict[str, Any]:
+    """
+    子プロセス (FFmpeg) を端末とは別のプロセスグループで起動する
+    subprocess.Popen / asyncio.create_subprocess_exec の引数を返す。
+
+    Ctrl+C (SIGINT) は端末のフォアグラウンドのプロセスグループ全体に送られるため、
+    同じグループのままだと FFmpeg も中断され、録音を終えて書き出すまで待てなくなる
+    """
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+    return {"start_new_session": True}
@@ -0,0 +1,107 @@
+from .capture_output import CaptureOutput, CaptureOutputMixBus, CaptureOutputSpoolFile
+from .capture_source import CaptureSource, get_capture_sources
+from .capture_stats import CaptureStats, save_capture_stats
+from .capture_worker import (
+    CaptureWorker,
+    CaptureWorkerCommand,
+    CaptureWorkerSetMutedCommand,
+    CaptureWorkerStartRecordingCommand,
+    CaptureWorkerStatus,
+    CaptureWorkerStopCommand,
+)
+from .mix_bus_writer import MixBusWriter
+from .recorder import Recorder
+from .spool import (
+    FlacSpoolFile,
+    SpoolStream,
+    create_empty_spool_file,
+    create_spool_fifos,
+    get_flac_spool_command,
+    get_spool_frame_count,
+    get_spool_streams,
+    is_spool_fifo,
+    is_spool_fifo_supported,
+    is_spool_flac_compressed,
+    open_spool_file,
+    read_flac_frame_count,
+)
+from .spool_disk_writer import (
+    SpoolDiskWriter,
+    SpoolDiskWriterFile,
+    SpoolDiskWriterStats,
+)
+from .spool_journal import (
+    SPOOL_JOURNAL_FILENAME,
+    SpoolJournal,
+    SpoolJournalStream,
+    SpoolJournalWriter,
+    create_spool_journal,
+    find_unfinished_spool_dirs,
+    load_spool_journal,
+    save_spool_journal,
+)
+from .spool_segmenter import (
+    SegmentedSpoolFile,
+    SpoolSegment,
+    SpoolSegmenter,
+    SpoolSegmentStream,
+    get_segment_dir,
+    get_segment_output_path,
+    get_segment_seconds,
+    save_segment_manifest,
+)
+from .track_metering import get_track_meter_readings
+from .track_mix import TrackMix, get_track_mixes, get_widest_sample_format
+
+__all__ = [
+    "SPOOL_JOURNAL_FILENAME",
+    "CaptureOutput",
+    "CaptureOutputMixBus",
+    "CaptureOutputSpoolFile",
+    "CaptureSource",
+    "CaptureStats",
+    "CaptureWorker",
+    "CaptureWorkerCommand",
+    "CaptureWorkerSetMutedCommand",
+    "CaptureWorkerStartRecordingCommand",
+    "CaptureWorkerStatus",
+    "CaptureWorkerStopCommand",
+    "FlacSpoolFile",
+    "MixBusWriter",
+    "Recorder",
+    "SegmentedSpoolFile",
+    "SpoolDiskWriter",
+    "SpoolDiskWriterFile",
+    "SpoolDiskWriterStats",
+    "SpoolJournal",
+    "SpoolJournalStream",
+    "SpoolJournalWriter",
+    "SpoolSegment",
+    "SpoolSegmentStream",
+    "SpoolSegmenter",
+    "SpoolStream",
+    "TrackMix",
+    "create_empty_spool_file",
+    "create_spool_fifos",
+    "create_spool_journal",
+    "find_unfinished_spool_dirs",
+    "get_capture_sources",
+    "get_flac_spool_command",
+    "get_segment_dir",
+    "get_segment_output_path",
+    "get_segment_seconds",
+    "get_spool_frame_count",
+    "get_spool_streams",
+    "get_track_meter_readings",
+    "get_track_mixes",
+    "get_widest_sample_format",
+    "is_spool_fifo",
+    "is_spool_fifo_supported",
+    "is_spool_flac_compressed",
+    "load_spool_journal",
+    "open_spool_file",
+    "read_flac_frame_count",
+    "save_capture_stats",
+    "save_segment_manifest",
+    "save_spool_journal",
+]
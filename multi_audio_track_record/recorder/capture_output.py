@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from ..dsp import MixBus, SampleFormatConverter
+
+
+class CaptureOutput(ABC):
+    """
+    録音スレッドが音声ソース1つ分のブロックを書き出す先
+    """
+
+    @abstractmethod
+    def write(self, frames: npt.NDArray[np.float32]) -> None: ...
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+
+class CaptureOutputSpoolFile(CaptureOutput):
+    """
+    スプールファイルに生PCMとして書き込む
+    """
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        sample_format_converter: SampleFormatConverter,
+    ):
+        self.fp = fp
+        self.sample_format_converter = sample_format_converter
+
+    def write(self, frames: npt.NDArray[np.float32]) -> None:
+        self.fp.write(self.sample_format_converter.convert(frames))
+
+    def close(self) -> None:
+        self.fp.close()
+
+
+class CaptureOutputMixBus(CaptureOutput):
+    """
+    トラックのミックスバスに加算する
+    """
+
+    def __init__(
+        self,
+        mix_bus: MixBus,
+        input_index: int,
+        on_written: Callable[[], None],
+    ):
+        self.mix_bus = mix_bus
+        self.input_index = input_index
+        self.on_written = on_written
+
+    def write(self, frames: npt.NDArray[np.float32]) -> None:
+        self.mix_bus.add(input_index=self.input_index, frames=frames)
+        self.on_written()
+
+    def close(self) -> None:
+        self.mix_bus.finish_input(input_index=self.input_index)
+        self.on_written()
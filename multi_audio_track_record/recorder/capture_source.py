@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+
+from ..dsp import SampleFormat
+from ..scene import Scene
+
+
+@dataclass
+class CaptureSource:
+    """
+    スプールファイル1つ分の音声ソース。
+
+    channel_index が None の場合はデバイスの全チャンネルをインターリーブしたまま、
+    そうでない場合はデバイスの1チャンネルだけをモノラルとして扱う。
+    """
+
+    device_index: int
+    channel_index: int | None
+    sampling_rate: int
+    channels: int
+    tracks: list[int]
+    sample_format: SampleFormat = "f32le"
+    """スプールファイルに書き込むサンプル形式"""
+
+    @property
+    def spool_filename(self) -> str:
+        if self.channel_index is None:
+            return f"{self.device_index}.bin"
+
+        return f"{self.device_index}_ch{self.channel_index}.bin"
+
+
+def get_capture_sources(scene: Scene) -> list[CaptureSource]:
+    capture_sources: list[CaptureSource] = []
+
+    for device_index, device in enumerate(scene.devices):
+        channel_tracks = device.channel_tracks
+
+        if channel_tracks is None:
+            capture_sources.append(
+                CaptureSource(
+                    device_index=device_index,
+                    channel_index=None,
+                    sampling_rate=device.sampling_rate,
+                    channels=device.channels,
+                    tracks=list(device.tracks),
+                    sample_format=device.spool_sample_format,
+                ),
+            )
+            continue
+
+        if len(channel_tracks) > device.channels:
+            raise ValueError(
+                f"Device {device_index} has {device.channels} channels, "
+                f"but channel_tracks has {len(channel_tracks)} entries."
+            )
+
+        for channel_index, tracks in enumerate(channel_tracks):
+            if len(tracks) == 0:
+                # どのトラックにも割り当てられていないチャンネルは保存しない
+                continue
+
+            capture_sources.append(
+                CaptureSource(
+                    device_index=device_index,
+                    channel_index=channel_index,
+                    sampling_rate=device.sampling_rate,
+                    channels=1,
+                    tracks=list(tracks),
+                    sample_format=device.spool_sample_format,
+                ),
+            )
+
+    return capture_sources
@@ -0,0 +1,66 @@
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .spool_disk_writer import SpoolDiskWriterStats
+
+
+@dataclass
+class CaptureStats:
+    """
+    音声入力デバイス1つ分の取りこぼしの集計
+    """
+
+    device_index: int
+    portaudio_name: str
+    sampling_rate: int
+    total_frame_count: int
+    callback_count: int
+    input_overflow_count: int
+    """ホストAPIが入力オーバーフローを報告した回数"""
+    dropped_frame_count: int
+    """リングバッファが満杯で捨てられたフレーム数"""
+    late_read_count: int
+    """録音スレッドの読み出しが遅れ、リングバッファに多くのブロックが溜まっていた回数"""
+    gap_filled_frame_count: int
+    """捨てられたフレームの代わりに無音で埋めたフレーム数"""
+    callback_seconds_average: float
+    callback_seconds_max: float
+
+    @property
+    def is_glitch_free(self) -> bool:
+        return (
+            self.input_overflow_count == 0
+            and self.dropped_frame_count == 0
+            and self.gap_filled_frame_count == 0
+        )
+
+
+def save_capture_stats(
+    path: Path,
+    capture_stats_list: list[CaptureStats],
+    spool_disk_writer_stats: SpoolDiskWriterStats | None = None,
+) -> None:
+    """
+    録音ごとの集計をJSONのサイドカーファイルとして保存する
+    """
+    stats_dict: dict[str, Any] = {
+        "is_glitch_free": all(
+            capture_stats.is_glitch_free for capture_stats in capture_stats_list
+        ),
+        "devices": [
+            {
+                **asdict(capture_stats),
+                "is_glitch_free": capture_stats.is_glitch_free,
+            }
+            for capture_stats in capture_stats_list
+        ],
+    }
+
+    if spool_disk_writer_stats is not None:
+        stats_dict["spool_disk_writer"] = asdict(spool_disk_writer_stats)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open(mode="w", encoding="utf-8") as fp:
+        json.dump(stats_dict, fp, ensure_ascii=False, indent=2)
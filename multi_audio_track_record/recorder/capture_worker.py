@@ -0,0 +1,649 @@
+import queue
+import threading
+import traceback
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from ..audio_capture import AudioCaptureEngine, AudioCaptureStream
+from ..dsp import (
+    AudioRingBuffer,
+    ClockDriftEstimator,
+    GainProcessor,
+    LevelMeter,
+    MeterReading,
+    SampleFormatConverter,
+    StreamingResampler,
+    get_clock_correction_ratio,
+)
+from ..scene import SceneDevice
+from .capture_output import CaptureOutput, CaptureOutputMixBus, CaptureOutputSpoolFile
+from .capture_source import CaptureSource
+from .capture_stats import CaptureStats
+from .mix_bus_writer import MixBusWriter
+from .spool import SpoolStream, open_spool_file
+from .spool_disk_writer import SpoolDiskWriter
+from .spool_segmenter import SpoolSegmenter
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class CaptureWorkerSetMutedCommand:
+    is_muted: bool
+
+
+@dataclass
+class CaptureWorkerStartRecordingCommand:
+    spool_dir: Path
+    reference_start_time: float
+    """録音の先頭フレームに対応する基準時計の時刻"""
+    mix_bus_writer: MixBusWriter | None = None
+    """
+    指定された場合、スプールファイルに書き込む代わりに、
+    音声ソースを入力先のトラックのミックスバスに加算する
+    """
+    spool_segmenter: SpoolSegmenter | None = None
+    """指定された場合、スプールファイルをセグメントに分けて書き込む"""
+    spool_disk_writer: SpoolDiskWriter | None = None
+    """指定された場合、スプールファイルへの書き込みをI/Oスレッドに任せる"""
+    spool_streams: list[SpoolStream] = field(default_factory=list)
+    """スプールファイルの形式。 FLAC で圧縮するかどうかをファイル名から引く"""
+
+
+@dataclass
+class CaptureWorkerStopCommand:
+    pass
+
+
+CaptureWorkerCommand = (
+    CaptureWorkerSetMutedCommand
+    | CaptureWorkerStartRecordingCommand
+    | CaptureWorkerStopCommand
+)
+
+
+@dataclass
+class CaptureWorkerStatus:
+    device_index: int
+    is_recording: bool
+    capture_stats: CaptureStats
+    start_offset_frames: int | None
+    """
+    基準時刻に対する最初のフレームの位置。
+    正の場合は先頭を無音で埋め、負の場合は先頭のフレームを捨てて揃えた
+    """
+    clock_ratio: float
+    is_finished: bool
+    error: str | None
+
+
+class CaptureWorker(threading.Thread):
+    """
+    1つの音声入力デバイスを担当する録音スレッド。
+
+    音声入力ストリームとスプールファイルへの書き込みを所有し、
+    GUI (asyncio) 側とはスレッドセーフなコマンドキューとステータスキューだけでやりとりする。
+
+    起動直後はアーム状態で、音声入力ストリームを開いたまま直近 pre_roll_frames
+    フレームだけをリングバッファに保持する。録音開始コマンドを受け取ると、
+    保持していたプリロールを含めてスプールファイルに書き込み始める。
+
+    ブロックの取り込み時刻からクロックのずれを逐次推定し、
+    reference_clock_drift_estimator が与えられた場合は、
+    基準デバイスのクロックに合わせてリサンプリングしながら書き込む。
+
+    アーム中も録音中も、リングバッファに届いたブロックを読み込み位置を進めずに覗いて
+    レベルを計測し、 meter_readings に公開する。計測はスプールファイルへの書き込みとは独立している。
+    """
+
+    def __init__(
+        self,
+        device_index: int,
+        scene_device: SceneDevice,
+        capture_sources: list[CaptureSource],
+        audio_capture_engine: AudioCaptureEngine,
+        status_queue: "queue.SimpleQueue[CaptureWorkerStatus]",
+        is_muted: bool,
+        reference_clock_drift_estimator: ClockDriftEstimator | None = None,
+        pre_roll_frames: int = 0,
+        frames_per_buffer: int = 1024,
+        status_interval_frames: int | None = None,
+    ):
+        super().__init__(
+            name=f"CaptureWorker-{device_index}",
+            daemon=True,
+        )
+
+        self.device_index = device_index
+        self.scene_device = scene_device
+        self.capture_sources = capture_sources
+        self.audio_capture_engine = audio_capture_engine
+        self.status_queue = status_queue
+        self.reference_clock_drift_estimator = reference_clock_drift_estimator
+        self.pre_roll_frames = pre_roll_frames
+        self.frames_per_buffer = frames_per_buffer
+        self.late_read_threshold_frames = frames_per_buffer * 4
+        self.status_interval_frames = (
+            status_interval_frames
+            if status_interval_frames is not None
+            else scene_device.sampling_rate
+        )
+
+        self.__command_queue: "queue.SimpleQueue[CaptureWorkerCommand]" = (
+            queue.SimpleQueue()
+        )
+        self.__wakeup_event = threading.Event()
+
+        self.clock_drift_estimator = ClockDriftEstimator(
+            nominal_sampling_rate=scene_device.sampling_rate,
+        )
+
+        self.__is_muted = is_muted
+        self.__spool_dir: Path | None = None
+        self.__mix_bus_writer: MixBusWriter | None = None
+        self.__spool_segmenter: SpoolSegmenter | None = None
+        self.__spool_disk_writer: SpoolDiskWriter | None = None
+        self.__spool_streams: list[SpoolStream] = []
+        self.__reference_start_time = 0.0
+        self.__is_stop_requested = False
+        self.__start_offset_frames: int | None = None
+        self.__pending_skip_frame_count = 0
+
+        self.__audio_capture_stream: AudioCaptureStream | None = None
+        self.__total_frame_count = 0
+        self.__late_read_count = 0
+        self.__dropped_frame_count = 0
+        self.__gap_filled_frame_count = 0
+        # 録音開始時点のカウンタの値。集計は録音開始以降の差分とする
+        self.__baseline_callback_count = 0
+        self.__baseline_input_overflow_count = 0
+        self.__baseline_callback_seconds_total = 0.0
+        self.__pre_roll_end_position = 0
+
+        self.__meter_position = 0
+        self.meter_readings: list[MeterReading] = []
+        """
+        チャンネルごとの入力レベル (ゲイン適用前)。
+        録音スレッドがリストごと差し替えるため、任意のスレッドから読み出せる
+        """
+
+    def send_command(self, command: CaptureWorkerCommand) -> None:
+        """任意のスレッドから呼び出せる"""
+        self.__command_queue.put(command)
+        self.__wakeup_event.set()
+
+    def __process_commands(self) -> None:
+        while True:
+            try:
+                command = self.__command_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if isinstance(command, CaptureWorkerSetMutedCommand):
+                self.__is_muted = command.is_muted
+            elif isinstance(command, CaptureWorkerStartRecordingCommand):
+                self.__spool_dir = command.spool_dir
+                self.__mix_bus_writer = command.mix_bus_writer
+                self.__spool_segmenter = command.spool_segmenter
+                self.__spool_disk_writer = command.spool_disk_writer
+                self.__spool_streams = command.spool_streams
+                self.__reference_start_time = command.reference_start_time
+            elif isinstance(command, CaptureWorkerStopCommand):
+                self.__is_stop_requested = True
+
+    def __get_capture_stats(self) -> CaptureStats:
+        scene_device = self.scene_device
+
+        callback_count = 0
+        input_overflow_count = 0
+        callback_seconds_total = 0.0
+        callback_seconds_max = 0.0
+
+        audio_capture_stream = self.__audio_capture_stream
+        if audio_capture_stream is not None:
+            callback_count = (
+                audio_capture_stream.callback_count - self.__baseline_callback_count
+            )
+            input_overflow_count = (
+                audio_capture_stream.input_overflow_count
+                - self.__baseline_input_overflow_count
+            )
+            callback_seconds_total = (
+                audio_capture_stream.callback_seconds_total
+                - self.__baseline_callback_seconds_total
+            )
+            callback_seconds_max = audio_capture_stream.callback_seconds_max
+
+        return CaptureStats(
+            device_index=self.device_index,
+            portaudio_name=scene_device.portaudio_name,
+            sampling_rate=scene_device.sampling_rate,
+            total_frame_count=self.__total_frame_count,
+            callback_count=callback_count,
+            input_overflow_count=input_overflow_count,
+            dropped_frame_count=self.__dropped_frame_count,
+            late_read_count=self.__late_read_count,
+            gap_filled_frame_count=self.__gap_filled_frame_count,
+            callback_seconds_average=(
+                callback_seconds_total / callback_count if callback_count > 0 else 0.0
+            ),
+            callback_seconds_max=callback_seconds_max,
+        )
+
+    def __put_status(self, is_finished: bool, error: str | None = None) -> None:
+        self.status_queue.put(
+            CaptureWorkerStatus(
+                device_index=self.device_index,
+                is_recording=self.__spool_dir is not None,
+                capture_stats=self.__get_capture_stats(),
+                start_offset_frames=self.__start_offset_frames,
+                clock_ratio=self.clock_drift_estimator.clock_ratio,
+                is_finished=is_finished,
+                error=error,
+            ),
+        )
+
+    def run(self) -> None:
+        error: str | None = None
+        try:
+            self.__record()
+        except Exception:
+            error = traceback.format_exc()
+            logger.error(error)
+        finally:
+            self.__put_status(is_finished=True, error=error)
+
+    def __record(self) -> None:
+        scene_device = self.scene_device
+        frames_per_buffer = self.frames_per_buffer
+        pre_roll_frames = self.pre_roll_frames
+
+        # 多チャンネルのデバイスも1つのストリームとして開く
+        channels = scene_device.channels
+        # プリロールに加えて約1秒分をリングバッファとして確保する。
+        # アーム中のメモリ使用量はこの容量で上限が決まる
+        ring_buffer_frames = pre_roll_frames + max(
+            scene_device.sampling_rate,
+            frames_per_buffer * 4,
+        )
+
+        audio_capture_stream = self.audio_capture_engine.open_stream(
+            portaudio_index=scene_device.portaudio_index,
+            sampling_rate=scene_device.sampling_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+            ring_buffer_frames=ring_buffer_frames,
+        )
+        audio_capture_stream.add_data_listener(self.__wakeup_event.set)
+        self.__audio_capture_stream = audio_capture_stream
+        ring_buffer = audio_capture_stream.ring_buffer
+
+        resampler: StreamingResampler | None = None
+        max_block_frames = frames_per_buffer
+        if self.reference_clock_drift_estimator is not None:
+            resampler = StreamingResampler(
+                channels=channels,
+                max_input_frames=frames_per_buffer,
+            )
+            max_block_frames = resampler.max_output_frames
+
+        self.__chunk_array = np.empty((frames_per_buffer, channels), dtype=np.float32)
+        self.__resampled_array = np.empty(
+            (max_block_frames, channels),
+            dtype=np.float32,
+        )
+        self.__silence_array = np.zeros(
+            (max_block_frames, channels),
+            dtype=np.float32,
+        )
+        # チャンネルごとに連続したメモリ配置で取り出すためのバッファ
+        self.__deinterleaved_array = np.empty(
+            (channels, max_block_frames),
+            dtype=np.float32,
+        )
+        self.__resampler = resampler
+        self.__gain_processor = GainProcessor(
+            sampling_rate=scene_device.sampling_rate,
+            max_frames=max_block_frames,
+            gain_decibel=scene_device.gain,
+            is_muted=self.__is_muted or scene_device.is_muted,
+        )
+        # ゲインやリサンプリングは float32 のまま行い、スプールファイルに書き込む直前に変換する
+        self.__sample_format_converter = SampleFormatConverter(
+            sample_format=scene_device.spool_sample_format,
+            max_samples=max_block_frames * channels,
+        )
+        self.__level_meter = LevelMeter(
+            sampling_rate=scene_device.sampling_rate,
+            channels=channels,
+            max_frames=frames_per_buffer,
+        )
+
+        try:
+            with ExitStack() as exit_stack:
+                source_outputs: (
+                    list[tuple[CaptureSource, list[CaptureOutput]]] | None
+                ) = None
+                next_status_frame_count = self.status_interval_frames
+
+                audio_capture_stream.start()
+
+                while not self.__is_stop_requested:
+                    self.__wakeup_event.wait(timeout=0.5)
+                    self.__wakeup_event.clear()
+
+                    self.__process_commands()
+                    self.__update_clock_drift_estimator(audio_capture_stream)
+                    self.__meter(ring_buffer)
+
+                    spool_dir = self.__spool_dir
+                    if spool_dir is None:
+                        # アーム中: プリロール分だけを残して古いフレームを捨てる
+                        excess_frame_count = (
+                            ring_buffer.readable_frame_count - pre_roll_frames
+                        )
+                        if excess_frame_count > 0:
+                            ring_buffer.skip(excess_frame_count)
+                        continue
+
+                    if source_outputs is None:
+                        source_outputs = self.__open_outputs(spool_dir, exit_stack)
+
+                        self.__reset_capture_stats(audio_capture_stream)
+                        self.__align_start(ring_buffer, source_outputs)
+
+                    self.__drain(ring_buffer, source_outputs)
+
+                    if self.__total_frame_count >= next_status_frame_count:
+                        self.__put_status(is_finished=False)
+                        next_status_frame_count += self.status_interval_frames
+
+                audio_capture_stream.stop()
+
+                if source_outputs is not None:
+                    # 停止までに書き込まれた残りのブロックを書き出す
+                    self.__update_clock_drift_estimator(audio_capture_stream)
+                    self.__drain(ring_buffer, source_outputs)
+                    # 最後のブロックより後に捨てられたフレームは、末尾を無音で埋める
+                    self.__fill_dropped_frames(
+                        ring_buffer.pending_overflow_frame_count,
+                        source_outputs,
+                    )
+        finally:
+            audio_capture_stream.close()
+            logger.info(f"[{self.name}] audio_capture_stream closed")
+
+    def __open_outputs(
+        self,
+        spool_dir: Path,
+        exit_stack: ExitStack,
+    ) -> list[tuple[CaptureSource, list[CaptureOutput]]]:
+        mix_bus_writer = self.__mix_bus_writer
+        spool_segmenter = self.__spool_segmenter
+        spool_disk_writer = self.__spool_disk_writer
+        spool_streams = {
+            spool_stream.filename: spool_stream for spool_stream in self.__spool_streams
+        }
+
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]] = []
+        for capture_source in self.capture_sources:
+            outputs: list[CaptureOutput] = []
+
+            if mix_bus_writer is None:
+                if spool_segmenter is None:
+                    fp = open_spool_file(
+                        path=spool_dir / capture_source.spool_filename,
+                        spool_stream=spool_streams.get(capture_source.spool_filename),
+                    )
+                else:
+                    fp = spool_segmenter.open_spool_file(capture_source.spool_filename)
+
+                if spool_disk_writer is not None:
+                    fp = spool_disk_writer.wrap(fp)
+
+                outputs.append(
+                    CaptureOutputSpoolFile(
+                        fp=fp,
+                        sample_format_converter=self.__sample_format_converter,
+                    ),
+                )
+            else:
+                for track_mix, mix_bus in mix_bus_writer.track_mix_buses:
+                    if track_mix.track_index not in capture_source.tracks:
+                        continue
+
+                    outputs.append(
+                        CaptureOutputMixBus(
+                            mix_bus=mix_bus,
+                            input_index=track_mix.get_input_index(capture_source),
+                            on_written=mix_bus_writer.wakeup,
+                        ),
+                    )
+
+            for output in outputs:
+                exit_stack.callback(output.close)
+
+            source_outputs.append((capture_source, outputs))
+
+        return source_outputs
+
+    def __update_clock_drift_estimator(
+        self,
+        audio_capture_stream: AudioCaptureStream,
+    ) -> None:
+        block_timestamp_ring = audio_capture_stream.block_timestamp_ring
+        clock_drift_estimator = self.clock_drift_estimator
+
+        while True:
+            block_timestamp = block_timestamp_ring.pop()
+            if block_timestamp is None:
+                break
+
+            frame_position, capture_time = block_timestamp
+            clock_drift_estimator.add(
+                frame_position=frame_position,
+                capture_time=capture_time,
+            )
+
+    def __meter(self, ring_buffer: AudioRingBuffer) -> None:
+        """
+        前回の計測以降に届いたブロックのレベルを計測する。読み込み位置は進めない
+        """
+        chunk_array = self.__chunk_array
+        level_meter = self.__level_meter
+
+        # 計測前に読み捨てられたフレームは飛ばす
+        meter_position = max(self.__meter_position, ring_buffer.read_position)
+        is_metered = False
+        while True:
+            frame_count = ring_buffer.peek_into(chunk_array, meter_position)
+            if frame_count == 0:
+                break
+
+            level_meter.process(chunk_array[:frame_count])
+            meter_position += frame_count
+            is_metered = True
+
+        self.__meter_position = meter_position
+        if is_metered:
+            self.meter_readings = level_meter.get_readings()
+
+    def __reset_capture_stats(self, audio_capture_stream: AudioCaptureStream) -> None:
+        self.__pre_roll_end_position = audio_capture_stream.ring_buffer.write_position
+        self.__baseline_callback_count = audio_capture_stream.callback_count
+        self.__baseline_input_overflow_count = audio_capture_stream.input_overflow_count
+        self.__baseline_callback_seconds_total = (
+            audio_capture_stream.callback_seconds_total
+        )
+
+    def __write_silence(
+        self,
+        frame_count: int,
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]],
+    ) -> None:
+        silence_array = self.__silence_array
+
+        remaining_frame_count = frame_count
+        while remaining_frame_count > 0:
+            block_frame_count = min(remaining_frame_count, len(silence_array))
+            self.__write_block(silence_array[:block_frame_count], source_outputs)
+            remaining_frame_count -= block_frame_count
+
+    def __align_start(
+        self,
+        ring_buffer: AudioRingBuffer,
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]],
+    ) -> None:
+        """
+        最初に書き込むフレームの取り込み時刻を基準時刻に揃える
+        """
+        sampling_rate = self.scene_device.sampling_rate
+
+        capture_time = self.clock_drift_estimator.get_capture_time(
+            frame_position=ring_buffer.read_position,
+        )
+        if capture_time is None:
+            self.__start_offset_frames = 0
+            return
+
+        start_offset_frames = round(
+            (capture_time - self.__reference_start_time) * sampling_rate
+        )
+        self.__start_offset_frames = start_offset_frames
+
+        logger.info(f"[{self.name}] start offset: {start_offset_frames} frames")
+
+        if start_offset_frames < 0:
+            # 基準時刻より前のフレームを捨てる。まだ届いていない分は後で捨てる
+            skipped_frame_count = ring_buffer.skip(-start_offset_frames)
+            self.__pending_skip_frame_count = -start_offset_frames - skipped_frame_count
+        elif start_offset_frames > 0:
+            # 基準時刻より後に始まったデバイスは、先頭を無音で埋める
+            self.__write_silence(start_offset_frames, source_outputs)
+
+    def __drain(
+        self,
+        ring_buffer: AudioRingBuffer,
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]],
+    ) -> None:
+        chunk_array = self.__chunk_array
+        resampler = self.__resampler
+
+        if self.__pending_skip_frame_count > 0:
+            self.__pending_skip_frame_count -= ring_buffer.skip(
+                self.__pending_skip_frame_count,
+            )
+
+        # プリロールとして溜まっていたフレームは遅れとみなさない
+        pending_frame_count = ring_buffer.write_position - max(
+            ring_buffer.read_position,
+            self.__pre_roll_end_position,
+        )
+        if pending_frame_count > self.late_read_threshold_frames:
+            self.__late_read_count += 1
+
+        gain_processor = self.__gain_processor
+        gain_processor.set_muted(self.__is_muted or self.scene_device.is_muted)
+        gain_processor.set_gain_decibel(self.scene_device.gain)
+
+        while True:
+            read_frame_count = len(chunk_array)
+
+            overflow_event = ring_buffer.peek_overflow_event()
+            if overflow_event is not None:
+                overflow_position, dropped_frame_count = overflow_event
+                if overflow_position <= ring_buffer.read_position:
+                    # 捨てられた位置まで読み進めたので、後続のフレームより先に無音を挟む
+                    ring_buffer.pop_overflow_event()
+                    self.__fill_dropped_frames(dropped_frame_count, source_outputs)
+                    continue
+
+                # 捨てられた位置をまたいで読み込まない
+                read_frame_count = min(
+                    read_frame_count,
+                    overflow_position - ring_buffer.read_position,
+                )
+
+            frame_count = ring_buffer.read_into(chunk_array[:read_frame_count])
+            if frame_count == 0:
+                break
+
+            block_array = chunk_array[:frame_count]
+
+            reference_clock_drift_estimator = self.reference_clock_drift_estimator
+            if resampler is not None and reference_clock_drift_estimator is not None:
+                # 基準デバイスのクロックで同じ時間に相当するフレーム数に変換する
+                ratio = get_clock_correction_ratio(
+                    reference_clock_ratio=reference_clock_drift_estimator.clock_ratio,
+                    clock_ratio=self.clock_drift_estimator.clock_ratio,
+                    max_ratio=resampler.max_ratio,
+                )
+                resampled_frame_count = resampler.process(
+                    frames=block_array,
+                    ratio=ratio,
+                    out=self.__resampled_array,
+                )
+                block_array = self.__resampled_array[:resampled_frame_count]
+
+            # ゲインとミュートをその場で適用する
+            gain_processor.process(block_array)
+
+            self.__write_block(block_array, source_outputs)
+
+    def __fill_dropped_frames(
+        self,
+        dropped_frame_count: int,
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]],
+    ) -> None:
+        """
+        リングバッファが満杯で捨てられたフレームを、長さと同期を保つため無音で埋める
+        """
+        if dropped_frame_count <= 0:
+            return
+
+        logger.warning(
+            f"[{self.name}] {dropped_frame_count} frames dropped. "
+            "Filling the gap with silence."
+        )
+        self.__dropped_frame_count += dropped_frame_count
+
+        gap_filled_frame_count = self.__total_frame_count
+        self.__write_silence(dropped_frame_count, source_outputs)
+        self.__gap_filled_frame_count += (
+            self.__total_frame_count - gap_filled_frame_count
+        )
+
+    def __write_block(
+        self,
+        block_array: npt.NDArray[np.float32],
+        source_outputs: list[tuple[CaptureSource, list[CaptureOutput]]],
+    ) -> None:
+        deinterleaved_array = self.__deinterleaved_array
+        frame_count = len(block_array)
+
+        is_deinterleaved = False
+        for capture_source, outputs in source_outputs:
+            channel_index = capture_source.channel_index
+
+            if channel_index is None:
+                source_array = block_array
+            else:
+                if not is_deinterleaved:
+                    # 全チャンネルを1回の転置コピーで分離する
+                    np.copyto(
+                        deinterleaved_array[:, :frame_count],
+                        block_array.T,
+                    )
+                    is_deinterleaved = True
+
+                source_array = deinterleaved_array[channel_index, :frame_count]
+
+            for output in outputs:
+                output.write(source_array)
+
+        self.__total_frame_count += frame_count
@@ -0,0 +1,190 @@
+import threading
+import traceback
+from contextlib import ExitStack
+from logging import getLogger
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+import numpy.typing as npt
+
+from ..dsp import (
+    LevelMeter,
+    MeterReading,
+    MixBus,
+    SampleFormatConverter,
+    merge_meter_readings,
+)
+from .spool import SpoolStream, open_spool_file
+from .spool_disk_writer import SpoolDiskWriter
+from .spool_segmenter import SpoolSegmenter
+from .track_mix import TrackMix
+
+logger = getLogger(__name__)
+
+
+class MixBusWriter(threading.Thread):
+    """
+    トラックごとのミックスバスから、全てのデバイスが加算し終えたフレームを読み出し、
+    トラックごとのスプールファイルに書き込むスレッド。
+
+    全てのミックスバスの入力が終わり、読み出し終えると終了する。
+    書き込んだトラックのレベルを meter_readings に公開する。
+    """
+
+    def __init__(
+        self,
+        track_mixes: list[TrackMix],
+        spool_dir: Path,
+        spool_segmenter: SpoolSegmenter | None = None,
+        spool_disk_writer: SpoolDiskWriter | None = None,
+        spool_streams: list[SpoolStream] | None = None,
+        capacity_seconds: float = 2.0,
+        frames_per_block: int = 1024,
+    ):
+        super().__init__(
+            name="MixBusWriter",
+            daemon=True,
+        )
+
+        self.spool_dir = spool_dir
+        self.spool_segmenter = spool_segmenter
+        self.spool_disk_writer = spool_disk_writer
+        self.spool_streams = spool_streams if spool_streams is not None else []
+        self.frames_per_block = frames_per_block
+
+        self.track_mix_buses: list[tuple[TrackMix, MixBus]] = [
+            (
+                track_mix,
+                MixBus(
+                    channels=track_mix.channels,
+                    input_count=len(track_mix.inputs),
+                    capacity_frames=int(track_mix.sampling_rate * capacity_seconds),
+                ),
+            )
+            for track_mix in track_mixes
+        ]
+
+        self.__wakeup_event = threading.Event()
+
+        self.meter_readings: dict[int, MeterReading] = {}
+        """
+        トラックごとのレベル。キーはシーンのトラック番号。
+        書き込みスレッドが dict ごと差し替えるため、任意のスレッドから読み出せる
+        """
+        self.error: str | None = None
+
+    def wakeup(self) -> None:
+        """任意のスレッドから呼び出せる"""
+        self.__wakeup_event.set()
+
+    def finish_all_inputs(self) -> None:
+        """
+        録音スレッドが入力を終える前に終了した場合に備え、残っている入力を終わらせる
+        """
+        for track_mix, mix_bus in self.track_mix_buses:
+            for input_index in range(len(track_mix.inputs)):
+                mix_bus.finish_input(input_index=input_index)
+
+        self.wakeup()
+
+    def run(self) -> None:
+        try:
+            self.__write()
+        except Exception:
+            self.error = traceback.format_exc()
+            logger.error(self.error)
+
+    def __write(self) -> None:
+        frames_per_block = self.frames_per_block
+        spool_segmenter = self.spool_segmenter
+        spool_disk_writer = self.spool_disk_writer
+        spool_streams = {
+            spool_stream.filename: spool_stream for spool_stream in self.spool_streams
+        }
+
+        with ExitStack() as exit_stack:
+            outputs: list[
+                tuple[
+                    TrackMix,
+                    MixBus,
+                    BinaryIO,
+                    npt.NDArray[np.float32],
+                    LevelMeter,
+                    SampleFormatConverter,
+                ]
+            ] = []
+            for track_mix, mix_bus in self.track_mix_buses:
+                if spool_segmenter is None:
+                    fp = open_spool_file(
+                        path=self.spool_dir / track_mix.spool_filename,
+                        spool_stream=spool_streams.get(track_mix.spool_filename),
+                    )
+                else:
+                    fp = spool_segmenter.open_spool_file(track_mix.spool_filename)
+                if spool_disk_writer is not None:
+                    fp = spool_disk_writer.wrap(fp)
+                exit_stack.enter_context(fp)
+                outputs.append(
+                    (
+                        track_mix,
+                        mix_bus,
+                        fp,
+                        np.empty((frames_per_block, track_mix.channels), np.float32),
+                        LevelMeter(
+                            sampling_rate=track_mix.sampling_rate,
+                            channels=track_mix.channels,
+                            max_frames=frames_per_block,
+                        ),
+                        SampleFormatConverter(
+                            sample_format=track_mix.sample_format,
+                            max_samples=frames_per_block * track_mix.channels,
+                        ),
+                    )
+                )
+
+            while True:
+                # 全ての入力が終わってから読み出しきるまで続ける
+                is_finished = all(mix_bus.is_finished for _, mix_bus, *_ in outputs)
+
+                self.__wakeup_event.wait(timeout=0.5)
+                self.__wakeup_event.clear()
+
+                is_metered = False
+                for (
+                    _,
+                    mix_bus,
+                    fp,
+                    block_array,
+                    level_meter,
+                    sample_format_converter,
+                ) in outputs:
+                    while True:
+                        frame_count = mix_bus.read_into(block_array)
+                        if frame_count == 0:
+                            break
+
+                        mixed_array = block_array[:frame_count]
+                        level_meter.process(mixed_array)
+                        fp.write(sample_format_converter.convert(mixed_array))
+                        is_metered = True
+
+                if is_metered:
+                    self.meter_readings = {
+                        track_mix.track_index: merge_meter_readings(
+                            level_meter.get_readings()
+                        )
+                        for track_mix, _, _, _, level_meter, _ in outputs
+                    }
+
+                if is_finished:
+                    break
+
+        for track_mix, mix_bus in self.track_mix_buses:
+            if mix_bus.overflow_frame_count > 0 or mix_bus.lagged_frame_count > 0:
+                logger.warning(
+                    f"[{self.name}] track {track_mix.track_index}: "
+                    f"{mix_bus.overflow_frame_count} frames overflowed, "
+                    f"{mix_bus.lagged_frame_count} frames of lagging inputs "
+                    "were mixed as silence."
+                )
@@ -0,0 +1,366 @@
+import asyncio
+import queue
+from logging import getLogger
+from pathlib import Path
+
+from ..audio_capture import AudioCaptureEngine, get_reference_time
+from ..dsp import (
+    SILENT_METER_READING,
+    ClockDriftEstimator,
+    MeterReading,
+    merge_meter_readings,
+)
+from ..scene import Scene
+from .capture_source import CaptureSource, get_capture_sources
+from .capture_stats import CaptureStats
+from .capture_worker import (
+    CaptureWorker,
+    CaptureWorkerSetMutedCommand,
+    CaptureWorkerStartRecordingCommand,
+    CaptureWorkerStatus,
+    CaptureWorkerStopCommand,
+)
+from .mix_bus_writer import MixBusWriter
+from .spool import SpoolStream, get_spool_streams, is_spool_fifo
+from .spool_disk_writer import SpoolDiskWriter, SpoolDiskWriterStats
+from .spool_segmenter import SpoolSegment, SpoolSegmenter, get_segment_seconds
+from .track_metering import get_track_meter_readings
+from .track_mix import get_track_mixes
+
+logger = getLogger(__name__)
+
+
+class Recorder:
+    """
+    シーンの音声入力デバイスごとに録音スレッド (CaptureWorker) を起動し、管理する。
+
+    GUIなどの asyncio 側から呼び出す。録音スレッドへの指示はコマンドキュー経由で送り、
+    録音スレッドの状態はステータスキューから受け取る。
+
+    arm で音声入力ストリームを先に開いておくと、 start で即座に録音を開始でき、
+    シーンの pre_roll_seconds 秒前からの音声を含めて録音できる。
+
+    各デバイスの先頭は共通の基準時刻に揃えられ、
+    シーンの is_drift_compensation_enabled が有効な場合は、
+    最初のデバイスのクロックに合わせて他のデバイスのずれを録音中に補正する。
+
+    ストリームを開いている間は、録音中でなくてもデバイスとトラックごとのレベルを取得できる。
+
+    シーンの is_mix_bus_enabled が有効でミックスできる場合は、録音中にデバイスから
+    トラックへのミックスを行い (MixBusWriter) 、トラックごとに1つのスプールファイルを書き込む。
+    """
+
+    def __init__(
+        self,
+        audio_capture_engine: AudioCaptureEngine,
+        spool_write_batch_byte_count: int = 1024 * 1024,
+    ):
+        self.audio_capture_engine = audio_capture_engine
+        self.spool_write_batch_byte_count = spool_write_batch_byte_count
+        """スプールファイルをディスクに書き込む単位"""
+
+        self.__armed_scene: Scene | None = None
+        self.__armed_pre_roll_seconds = 0.0
+        self.__is_muted = False
+        self.__capture_sources: list[CaptureSource] = []
+        self.__capture_workers: list[CaptureWorker] = []
+        self.__status_queue: "queue.SimpleQueue[CaptureWorkerStatus]" = (
+            queue.SimpleQueue()
+        )
+        self.__latest_statuses: dict[int, CaptureWorkerStatus] = {}
+        self.__mix_bus_writer: MixBusWriter | None = None
+        self.__spool_segmenter: SpoolSegmenter | None = None
+        self.__spool_disk_writer: SpoolDiskWriter | None = None
+        self.__reference_start_time: float | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return any(
+            capture_worker.is_alive() for capture_worker in self.__capture_workers
+        )
+
+    @property
+    def armed_scene(self) -> Scene | None:
+        return self.__armed_scene
+
+    @property
+    def reference_start_time(self) -> float | None:
+        """
+        直近の録音の先頭 (プリロールを含む) に当たる基準時刻 (get_reference_time)。
+        録音ファイル上の位置は、基準時刻からこの値を引いた秒数になる
+        """
+        return self.__reference_start_time
+
+    def arm(
+        self,
+        scene: Scene,
+        is_muted: bool,
+        pre_roll_seconds: float | None = None,
+    ) -> None:
+        """
+        音声入力ストリームを開き、プリロールの保持を開始する。
+        pre_roll_seconds が None の場合はシーンの pre_roll_seconds を使う。
+        0 を指定すると、プリロールを保持せずにレベルの計測だけを行う
+        """
+        if pre_roll_seconds is None:
+            pre_roll_seconds = scene.pre_roll_seconds
+
+        if self.is_running:
+            raise Exception("Recorder is already running.")
+
+        self.__capture_workers.clear()
+        self.__latest_statuses.clear()
+
+        capture_sources = get_capture_sources(scene=scene)
+
+        # 最初に開くデバイスを基準とし、他のデバイスはそのクロックに合わせて補正する
+        reference_clock_drift_estimator: ClockDriftEstimator | None = None
+
+        for device_index, device in enumerate(scene.devices):
+            device_capture_sources = [
+                capture_source
+                for capture_source in capture_sources
+                if capture_source.device_index == device_index
+            ]
+            if len(device_capture_sources) == 0:
+                # どのトラックにも使われないデバイスは開かない
+                continue
+
+            capture_worker = CaptureWorker(
+                device_index=device_index,
+                scene_device=device,
+                capture_sources=device_capture_sources,
+                audio_capture_engine=self.audio_capture_engine,
+                status_queue=self.__status_queue,
+                is_muted=is_muted,
+                reference_clock_drift_estimator=reference_clock_drift_estimator,
+                pre_roll_frames=int(pre_roll_seconds * device.sampling_rate),
+            )
+            self.__capture_workers.append(capture_worker)
+
+            if (
+                scene.is_drift_compensation_enabled
+                and reference_clock_drift_estimator is None
+            ):
+                reference_clock_drift_estimator = capture_worker.clock_drift_estimator
+
+        for capture_worker in self.__capture_workers:
+            capture_worker.start()
+
+        self.__armed_scene = scene
+        self.__armed_pre_roll_seconds = pre_roll_seconds
+        self.__capture_sources = capture_sources
+        self.__is_muted = is_muted
+
+    def start(
+        self,
+        scene: Scene,
+        spool_dir: Path,
+        is_muted: bool,
+    ) -> list[SpoolStream]:
+        """
+        録音を開始し、書き込まれるスプールファイルを返す。
+        スプールファイルは spool_dir / SpoolStream.filename に書き込まれる。
+        シーンでセグメントに分ける設定の場合は、セグメントごとのディレクトリに書き込まれ、
+        書き終えたセグメントを poll_finished_segments で取り出せる。
+
+        アームされていない場合は、音声入力ストリームを開いてから録音を開始する。
+        """
+        armed_scene = self.__armed_scene
+        if armed_scene is None:
+            # ここで開いたストリームにはプリロールが無い
+            self.arm(scene=scene, is_muted=is_muted, pre_roll_seconds=0.0)
+        elif armed_scene is not scene:
+            raise Exception("Recorder is armed with another scene.")
+
+        pre_roll_seconds = self.__armed_pre_roll_seconds
+
+        spool_streams = get_spool_streams(scene=scene)
+
+        spool_segmenter: SpoolSegmenter | None = None
+        segment_seconds = get_segment_seconds(scene=scene)
+        if segment_seconds is not None:
+            spool_segmenter = SpoolSegmenter(
+                spool_dir=spool_dir,
+                spool_streams=spool_streams,
+                segment_seconds=segment_seconds,
+            )
+        self.__spool_segmenter = spool_segmenter
+
+        # ディスクへの書き込みはI/Oスレッドにまとめ、録音スレッドを待たせない。
+        # 名前付きパイプはディスクに書き込まないため、そのまま書き込む
+        spool_disk_writer: SpoolDiskWriter | None = None
+        if not any(
+            is_spool_fifo(spool_dir / spool_stream.filename)
+            for spool_stream in spool_streams
+        ):
+            spool_disk_writer = SpoolDiskWriter(
+                batch_byte_count=self.spool_write_batch_byte_count,
+            )
+            spool_disk_writer.start()
+        self.__spool_disk_writer = spool_disk_writer
+
+        mix_bus_writer: MixBusWriter | None = None
+        track_mixes = get_track_mixes(scene=scene)
+        if track_mixes is not None:
+            mix_bus_writer = MixBusWriter(
+                track_mixes=track_mixes,
+                spool_dir=spool_dir,
+                spool_segmenter=spool_segmenter,
+                spool_disk_writer=spool_disk_writer,
+                spool_streams=spool_streams,
+            )
+            mix_bus_writer.start()
+        self.__mix_bus_writer = mix_bus_writer
+
+        # 全デバイスの先頭をこの時刻に揃える。プリロールの分だけさかのぼる
+        reference_start_time = get_reference_time() - pre_roll_seconds
+        self.__reference_start_time = reference_start_time
+
+        for capture_worker in self.__capture_workers:
+            capture_worker.send_command(
+                CaptureWorkerStartRecordingCommand(
+                    spool_dir=spool_dir,
+                    reference_start_time=reference_start_time,
+                    mix_bus_writer=mix_bus_writer,
+                    spool_segmenter=spool_segmenter,
+                    spool_disk_writer=spool_disk_writer,
+                    spool_streams=spool_streams,
+                ),
+            )
+
+        return spool_streams
+
+    def set_muted(self, is_muted: bool) -> None:
+        self.__is_muted = is_muted
+
+        for capture_worker in self.__capture_workers:
+            capture_worker.send_command(
+                CaptureWorkerSetMutedCommand(is_muted=is_muted),
+            )
+
+    def stop(self) -> None:
+        """
+        録音を停止し、音声入力ストリームを閉じる。アームも解除される
+        """
+        self.__armed_scene = None
+
+        for capture_worker in self.__capture_workers:
+            capture_worker.send_command(CaptureWorkerStopCommand())
+
+    async def wait_stopped(self) -> None:
+        for capture_worker in self.__capture_workers:
+            await asyncio.to_thread(capture_worker.join)
+
+        mix_bus_writer = self.__mix_bus_writer
+        if mix_bus_writer is not None:
+            # 録音スレッドが全て終わったので、ミックスバスの残りを書き出させる
+            mix_bus_writer.finish_all_inputs()
+            await asyncio.to_thread(mix_bus_writer.join)
+            self.__mix_bus_writer = None
+
+        spool_disk_writer = self.__spool_disk_writer
+        if spool_disk_writer is not None:
+            # 溜まっている書き込みを終えるまで待つ
+            spool_disk_writer.finish()
+            await asyncio.to_thread(spool_disk_writer.join)
+
+            if spool_disk_writer.error is not None:
+                logger.error(f"spool disk writer failed: {spool_disk_writer.error}")
+
+        self.poll_statuses()
+
+    def poll_finished_segments(self) -> list[SpoolSegment]:
+        """
+        前回の呼び出し以降に書き終えたセグメントを返す。ブロックしない。
+        セグメントに分けていない場合は常に空
+        """
+        spool_segmenter = self.__spool_segmenter
+        if spool_segmenter is None:
+            return []
+
+        return spool_segmenter.poll_finished_segments()
+
+    def poll_statuses(self) -> dict[int, CaptureWorkerStatus]:
+        """
+        ステータスキューに届いた状態を取り込み、デバイスごとの最新の状態を返す。
+        ブロックしない。
+        """
+        latest_statuses = self.__latest_statuses
+
+        while True:
+            try:
+                status = self.__status_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            latest_statuses[status.device_index] = status
+
+            if status.error is not None:
+                logger.error(
+                    f"capture worker {status.device_index} failed: {status.error}"
+                )
+
+        return dict(latest_statuses)
+
+    def get_capture_stats(self) -> dict[int, CaptureStats]:
+        """
+        デバイスごとの取りこぼしの集計を返す。キーはシーンのデバイス番号
+        """
+        return {
+            device_index: status.capture_stats
+            for device_index, status in self.poll_statuses().items()
+        }
+
+    def get_spool_disk_writer_stats(self) -> SpoolDiskWriterStats | None:
+        """
+        直近の録音のスプールファイルへの書き込みの集計を返す。
+        名前付きパイプに書き込んだ場合は None を返す
+        """
+        spool_disk_writer = self.__spool_disk_writer
+        if spool_disk_writer is None:
+            return None
+
+        return spool_disk_writer.get_stats()
+
+    def get_device_meter_readings(self) -> dict[int, MeterReading]:
+        """
+        デバイスごとの入力レベル (ゲイン適用前) を返す。キーはシーンのデバイス番号
+        """
+        return {
+            capture_worker.device_index: merge_meter_readings(
+                capture_worker.meter_readings
+            )
+            for capture_worker in self.__capture_workers
+            if capture_worker.is_alive()
+        }
+
+    def get_track_meter_readings(self) -> dict[int, MeterReading]:
+        """
+        トラックごとのレベルを返す。キーはシーンのトラック番号
+        """
+        armed_scene = self.__armed_scene
+        if armed_scene is None:
+            return {}
+
+        mix_bus_writer = self.__mix_bus_writer
+        if mix_bus_writer is not None and mix_bus_writer.is_alive():
+            # 録音中はミックスしたトラックのレベルをそのまま使う
+            mix_bus_meter_readings = mix_bus_writer.meter_readings
+            return {
+                track_index: mix_bus_meter_readings.get(
+                    track_index, SILENT_METER_READING
+                )
+                for track_index in range(len(armed_scene.tracks))
+            }
+
+        return get_track_meter_readings(
+            scene=armed_scene,
+            capture_sources=self.__capture_sources,
+            device_meter_readings={
+                capture_worker.device_index: capture_worker.meter_readings
+                for capture_worker in self.__capture_workers
+                if capture_worker.is_alive()
+            },
+            is_muted=self.__is_muted,
+        )
@@ -0,0 +1,337 @@
+import io
+import os
+import select
+import stat
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from ..dsp import SampleFormat, get_sample_format_byte_count
+from ..process_group import get_new_process_group_kwargs
+from ..scene import Scene
+from .capture_source import get_capture_sources
+from .track_mix import get_track_mixes
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+
+def is_spool_fifo_supported() -> bool:
+    """
+    名前付きパイプ (FIFO) をスプールファイルとして使えるか
+    """
+    return hasattr(os, "mkfifo")
+
+
+@dataclass
+class SpoolStream:
+    """
+    録音中に書き込まれるスプールファイル1つ分の生PCMのストリーム
+    """
+
+    filename: str
+    sampling_rate: int
+    channels: int
+    tracks: list[int]
+    """このストリームを入力するトラック番号のリスト"""
+    sample_format: SampleFormat = "f32le"
+    is_flac_compressed: bool = False
+    """生PCMを FLAC で可逆圧縮して書き込むか"""
+
+    @property
+    def frame_byte_count(self) -> int:
+        """圧縮する前の1フレームのバイト数"""
+        return get_sample_format_byte_count(self.sample_format) * self.channels
+
+
+def is_spool_flac_compressed(scene: Scene, sample_format: SampleFormat) -> bool:
+    """FLAC は浮動小数点数を扱えないため、整数形式のスプールファイルだけを圧縮する"""
+    return scene.is_spool_flac_enabled and sample_format != "f32le"
+
+
+def get_spool_streams(scene: Scene) -> list[SpoolStream]:
+    """
+    録音で書き込まれるスプールファイルを返す。
+
+    アプリ内でミックスする場合はトラックごと、そうでない場合は音声ソースごとのストリームになる
+    """
+    track_mixes = get_track_mixes(scene=scene)
+    if track_mixes is not None:
+        return [
+            SpoolStream(
+                filename=track_mix.spool_filename,
+                sampling_rate=track_mix.sampling_rate,
+                channels=track_mix.channels,
+                tracks=[track_mix.track_index],
+                sample_format=track_mix.sample_format,
+                is_flac_compressed=is_spool_flac_compressed(
+                    scene=scene,
+                    sample_format=track_mix.sample_format,
+                ),
+            )
+            for track_mix in track_mixes
+        ]
+
+    return [
+        SpoolStream(
+            filename=capture_source.spool_filename,
+            sampling_rate=capture_source.sampling_rate,
+            channels=capture_source.channels,
+            tracks=list(capture_source.tracks),
+            sample_format=capture_source.sample_format,
+            is_flac_compressed=is_spool_flac_compressed(
+                scene=scene,
+                sample_format=capture_source.sample_format,
+            ),
+        )
+        for capture_source in get_capture_sources(scene=scene)
+    ]
+
+
+def is_spool_fifo(path: Path) -> bool:
+    """スプールファイルが名前付きパイプとして作成されているか"""
+    return path.exists() and stat.S_ISFIFO(path.stat().st_mode)
+
+
+def create_spool_fifos(
+    spool_dir: Path,
+    spool_streams: list[SpoolStream],
+) -> None:
+    """
+    スプールファイルの代わりに名前付きパイプを作成する。
+
+    録音スレッドはスプールファイルが名前付きパイプの場合、
+    ディスクに書き込まずに読み出し側のプロセス (FFmpeg) へ直接PCMを流す。
+    """
+    for spool_stream in spool_streams:
+        os.mkfifo(spool_dir / spool_stream.filename)
+
+
+class SpoolFifoWriter(io.RawIOBase):
+    """
+    名前付きパイプへの書き込み。
+
+    読み出し側 (FFmpeg) が追いつかない場合は書き込みで待つが、
+    write_timeout_seconds 秒以上書き込めない場合は読み出し側が止まったとみなして例外を送出する。
+
+    placeholder_reader_fd は、読み出し側が開く前に書き込んだ分を残すため、
+    パイプを読み書き両用で開いたままにしておく fd。
+    閉じる時は先にこれを閉じ、読み出し側が開くまで (最大 write_timeout_seconds 秒) 待ってから fd を閉じる。
+    読み出し側が開く前に全て閉じると、パイプに残したデータが失われ、
+    読み出し側は書き込み側が現れるまで開くのを待ち続ける
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        placeholder_reader_fd: int,
+        write_timeout_seconds: float,
+    ):
+        super().__init__()
+
+        self.fd = fd
+        self.placeholder_reader_fd = placeholder_reader_fd
+        self.write_timeout_seconds = write_timeout_seconds
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: "ReadableBuffer") -> int:
+        _, writable_fds, _ = select.select(
+            [], [self.fd], [], self.write_timeout_seconds
+        )
+        if len(writable_fds) == 0:
+            raise TimeoutError(
+                "The reader of the spool FIFO stalled "
+                f"for {self.write_timeout_seconds} seconds."
+            )
+
+        return os.write(self.fd, data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        try:
+            os.close(self.placeholder_reader_fd)
+            self.__wait_reader_opened()
+        finally:
+            os.close(self.fd)
+            super().close()
+
+    def __wait_reader_opened(self) -> None:
+        """
+        読み出し側がパイプを開くまで待つ。
+        読み出し側がいない間は、書き込み用の fd の poll が POLLERR を返す
+        """
+        poller = select.poll()
+        poller.register(self.fd, select.POLLOUT)
+
+        deadline = time.monotonic() + self.write_timeout_seconds
+        while True:
+            events = poller.poll(0)
+            if not any(event & select.POLLERR for _, event in events):
+                return
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    "The reader did not open the spool FIFO "
+                    f"for {self.write_timeout_seconds} seconds."
+                )
+
+            # 読み出し側が開いても通知されないため、間隔を空けて確かめる
+            time.sleep(0.01)
+
+
+def get_flac_spool_command(spool_stream: SpoolStream, path: Path) -> list[str]:
+    """標準入力の生PCMを FLAC に圧縮して path に書き込むFFmpegのコマンドを返す"""
+    return [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-f",
+        spool_stream.sample_format,
+        "-ar",
+        str(spool_stream.sampling_rate),
+        "-ac",
+        str(spool_stream.channels),
+        "-i",
+        "pipe:0",
+        "-c:a",
+        "flac",
+        "-compression_level",
+        "0",  # 録音中の CPU 負荷を抑える
+        "-f",
+        "flac",
+        str(path.resolve()),
+    ]
+
+
+class FlacSpoolFile(io.RawIOBase):
+    """
+    FLAC で可逆圧縮するスプールファイル。
+    書き込んだ生PCMを FFmpeg のプロセスの標準入力に渡し、圧縮したファイルを書き込ませる
+    """
+
+    def __init__(
+        self,
+        spool_stream: SpoolStream,
+        path: Path,
+    ):
+        super().__init__()
+
+        self.spool_stream = spool_stream
+        self.path = path
+
+        self.__proc = subprocess.Popen(
+            get_flac_spool_command(spool_stream=spool_stream, path=path),
+            stdin=subprocess.PIPE,
+            **get_new_process_group_kwargs(),
+        )
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: "ReadableBuffer") -> int:
+        stdin = self.__proc.stdin
+        assert stdin is not None
+
+        view = memoryview(data).cast("B")
+        stdin.write(view)
+        return len(view)
+
+    def close(self) -> None:
+        if not self.closed:
+            proc = self.__proc
+            if proc.stdin is not None:
+                proc.stdin.close()
+
+            return_code = proc.wait()
+            if return_code != 0:
+                raise OSError(
+                    f"Compressing the spool file {self.path} failed: {return_code}"
+                )
+
+        super().close()
+
+
+def read_flac_frame_count(path: Path) -> int | None:
+    """
+    FLAC ファイルの STREAMINFO から総フレーム数を読み取る。
+    書き込みの途中で総フレーム数が記録されていない場合は None を返す
+    """
+    with path.open("rb") as fp:
+        header = fp.read(26)
+
+    # "fLaC" (4) + メタデータブロックのヘッダ (4) + STREAMINFO の先頭 10 バイトに続く
+    # サンプリングレート (20 bit), チャンネル数 (3 bit), ビット数 (5 bit), 総フレーム数 (36 bit)
+    if len(header) < 26 or header[:4] != b"fLaC":
+        return None
+
+    frame_count = int.from_bytes(header[18:26], "big") & ((1 << 36) - 1)
+    if frame_count == 0:
+        return None
+
+    return frame_count
+
+
+def get_spool_frame_count(path: Path, spool_stream: SpoolStream) -> int:
+    """書き終えたスプールファイルのフレーム数を返す"""
+    if spool_stream.is_flac_compressed:
+        return read_flac_frame_count(path) or 0
+
+    return path.stat().st_size // spool_stream.frame_byte_count
+
+
+def create_empty_spool_file(path: Path, spool_stream: SpoolStream) -> None:
+    """
+    フレームを含まないスプールファイルを作成する。
+    FLAC の場合は、空のファイルではなくヘッダだけのファイルにする
+    """
+    open_spool_file(path=path, spool_stream=spool_stream).close()
+
+
+def open_spool_file(
+    path: Path,
+    spool_stream: SpoolStream | None = None,
+    fifo_write_timeout_seconds: float = 10.0,
+) -> BinaryIO:
+    """
+    スプールファイルを書き込み用に開く。
+
+    spool_stream の is_flac_compressed が真の場合は、FLAC で圧縮して書き込む。
+    名前付きパイプの場合は読み書き両用でも開いておく (Linux と macOS で動作する)。
+    読み出し側がまだ開いていなくてもブロックせず、パイプのバッファに収まる分は先に書き込める。
+    閉じる時は、読み出し側が開いて書き込んだ分を受け取れるようになるまで待つ。
+    FFmpeg は入力を1つずつ開くため、書き込み用に開く際に読み出し側を待つと、
+    1つの録音スレッドが複数のパイプを開く場合に互いを待ち合って止まることがある
+    """
+    if spool_stream is not None and spool_stream.is_flac_compressed:
+        return io.BufferedWriter(
+            FlacSpoolFile(
+                spool_stream=spool_stream,
+                path=path,
+            ),
+        )
+
+    if not is_spool_fifo(path):
+        return path.open("wb")
+
+    # 読み書き両用で開いている間は読み出し側がいるとみなされ、書き込み専用でも待たずに開ける
+    placeholder_reader_fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+
+    return io.BufferedWriter(
+        SpoolFifoWriter(
+            fd=fd,
+            placeholder_reader_fd=placeholder_reader_fd,
+            write_timeout_seconds=fifo_write_timeout_seconds,
+        ),
+    )
@@ -0,0 +1,232 @@
+import io
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from logging import getLogger
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class SpoolDiskWriterStats:
+    """
+    スプールファイルへの書き込みの集計
+    """
+
+    write_count: int
+    written_byte_count: int
+    write_seconds_average: float
+    write_seconds_max: float
+    queue_depth: int
+    """書き込みを待っているバッファの数"""
+    max_queue_depth: int
+    allocated_buffer_count: int
+    """空きが無く、録音中に追加で確保したバッファの数"""
+
+
+@dataclass
+class _SpoolDiskWriterWriteItem:
+    fp: BinaryIO
+    buffer: bytearray
+    byte_count: int
+
+
+@dataclass
+class _SpoolDiskWriterCloseItem:
+    fp: BinaryIO
+
+
+_SpoolDiskWriterItem = _SpoolDiskWriterWriteItem | _SpoolDiskWriterCloseItem | None
+
+
+class SpoolDiskWriter(threading.Thread):
+    """
+    スプールファイルへの書き込みを1つのI/Oスレッドにまとめる。
+
+    録音スレッドからの書き込みは batch_byte_count ごとにバッファに溜め、
+    溜まったバッファをI/Oスレッドがまとめて書き込む。
+    バッファはあらかじめ buffer_count 個確保しておき、書き込み終えたものを使い回す。
+    空きが無い場合も録音スレッドを待たせないよう、新たにバッファを確保する。
+
+    閉じる操作もI/Oスレッドで書き込みの後に行うため、
+    セグメントの切り替えなどファイルを閉じた後の処理は、書き込みを終えてから行われる。
+    """
+
+    def __init__(
+        self,
+        batch_byte_count: int = 1024 * 1024,
+        buffer_count: int = 8,
+    ):
+        super().__init__(
+            name="SpoolDiskWriter",
+            daemon=True,
+        )
+
+        if batch_byte_count <= 0:
+            raise ValueError(f"batch_byte_count must be positive: {batch_byte_count}")
+
+        self.batch_byte_count = batch_byte_count
+
+        self.__item_queue: "queue.SimpleQueue[_SpoolDiskWriterItem]" = (
+            queue.SimpleQueue()
+        )
+        self.__free_buffers: "queue.SimpleQueue[bytearray]" = queue.SimpleQueue()
+        for _ in range(buffer_count):
+            self.__free_buffers.put(bytearray(batch_byte_count))
+
+        self.__stats_lock = threading.Lock()
+        self.__write_count = 0
+        self.__written_byte_count = 0
+        self.__write_seconds_total = 0.0
+        self.__write_seconds_max = 0.0
+        self.__max_queue_depth = 0
+        self.__allocated_buffer_count = 0
+
+        self.error: str | None = None
+
+    def wrap(self, fp: BinaryIO) -> BinaryIO:
+        """
+        fp への書き込みをI/Oスレッドで行うファイルを返す。
+        返したファイルを閉じると、書き込みを終えた後に fp も閉じられる
+        """
+        return io.BufferedWriter(
+            SpoolDiskWriterFile(spool_disk_writer=self, fp=fp),
+            buffer_size=self.batch_byte_count,
+        )
+
+    def enqueue_write(self, fp: BinaryIO, data: "ReadableBuffer") -> int:
+        """
+        録音スレッドから呼び出す。 data の先頭から最大 batch_byte_count バイトを
+        バッファに写してI/Oスレッドに渡し、渡したバイト数を返す
+        """
+        self.__raise_if_failed()
+
+        try:
+            buffer = self.__free_buffers.get_nowait()
+        except queue.Empty:
+            buffer = bytearray(self.batch_byte_count)
+            with self.__stats_lock:
+                self.__allocated_buffer_count += 1
+
+        view = memoryview(data).cast("B")
+        byte_count = min(len(view), len(buffer))
+        buffer[:byte_count] = view[:byte_count]
+
+        self.__put(
+            _SpoolDiskWriterWriteItem(fp=fp, buffer=buffer, byte_count=byte_count)
+        )
+
+        return byte_count
+
+    def enqueue_close(self, fp: BinaryIO) -> None:
+        self.__put(_SpoolDiskWriterCloseItem(fp=fp))
+
+    def finish(self) -> None:
+        """任意のスレッドから呼び出せる。溜まっている書き込みを終えてからスレッドを終了させる"""
+        self.__item_queue.put(None)
+
+    def __put(self, item: _SpoolDiskWriterItem) -> None:
+        item_queue = self.__item_queue
+        item_queue.put(item)
+
+        queue_depth = item_queue.qsize()
+        if queue_depth > self.__max_queue_depth:
+            with self.__stats_lock:
+                self.__max_queue_depth = max(self.__max_queue_depth, queue_depth)
+
+    def __raise_if_failed(self) -> None:
+        if self.error is not None:
+            raise OSError(f"The spool disk writer failed: {self.error}")
+
+    def get_stats(self) -> SpoolDiskWriterStats:
+        """任意のスレッドから呼び出せる"""
+        with self.__stats_lock:
+            write_count = self.__write_count
+            return SpoolDiskWriterStats(
+                write_count=write_count,
+                written_byte_count=self.__written_byte_count,
+                write_seconds_average=(
+                    self.__write_seconds_total / write_count if write_count > 0 else 0.0
+                ),
+                write_seconds_max=self.__write_seconds_max,
+                queue_depth=self.__item_queue.qsize(),
+                max_queue_depth=self.__max_queue_depth,
+                allocated_buffer_count=self.__allocated_buffer_count,
+            )
+
+    def run(self) -> None:
+        item_queue = self.__item_queue
+        free_buffers = self.__free_buffers
+
+        while True:
+            item = item_queue.get()
+            if item is None:
+                break
+
+            if isinstance(item, _SpoolDiskWriterCloseItem):
+                self.__close(item.fp)
+                continue
+
+            if self.error is not None:
+                # 失敗した後は書き込まずに、ファイルを閉じるだけにする
+                free_buffers.put(item.buffer)
+                continue
+
+            write_started_at = time.perf_counter()
+            try:
+                item.fp.write(memoryview(item.buffer)[: item.byte_count])
+            except Exception:
+                self.error = traceback.format_exc()
+                logger.error(self.error)
+                continue
+            finally:
+                free_buffers.put(item.buffer)
+            write_seconds = time.perf_counter() - write_started_at
+
+            with self.__stats_lock:
+                self.__write_count += 1
+                self.__written_byte_count += item.byte_count
+                self.__write_seconds_total += write_seconds
+                self.__write_seconds_max = max(self.__write_seconds_max, write_seconds)
+
+    def __close(self, fp: BinaryIO) -> None:
+        try:
+            fp.close()
+        except Exception:
+            if self.error is None:
+                self.error = traceback.format_exc()
+            logger.error(traceback.format_exc())
+
+
+class SpoolDiskWriterFile(io.RawIOBase):
+    """
+    SpoolDiskWriter のI/Oスレッドを通して fp に書き込むファイル
+    """
+
+    def __init__(
+        self,
+        spool_disk_writer: SpoolDiskWriter,
+        fp: BinaryIO,
+    ):
+        super().__init__()
+
+        self.spool_disk_writer = spool_disk_writer
+        self.fp = fp
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: "ReadableBuffer") -> int:
+        return self.spool_disk_writer.enqueue_write(fp=self.fp, data=data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.spool_disk_writer.enqueue_close(fp=self.fp)
+
+        super().close()
@@ -0,0 +1,212 @@
+import os
+import stat
+import tempfile
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+
+from ..dsp import SampleFormat, get_sample_format_byte_count
+from ..scene import Scene
+from .spool import SpoolStream
+
+logger = getLogger(__name__)
+
+SPOOL_JOURNAL_FILENAME = "journal.json"
+
+
+class SpoolJournalStream(BaseModel):
+    filename: str
+    sampling_rate: int
+    channels: int
+    tracks: list[int]
+    sample_format: SampleFormat = "f32le"
+    is_flac_compressed: bool = False
+    byte_count: int = 0
+    """ディスクへの書き込みを確定 (fsync) したバイト数。 FLAC の場合は圧縮した後のバイト数"""
+
+    @property
+    def frame_byte_count(self) -> int:
+        return get_sample_format_byte_count(self.sample_format) * self.channels
+
+
+class SpoolJournal(BaseModel):
+    """
+    録音1回分のスプールディレクトリの状態。
+    アプリが異常終了した場合に、次回の起動時にスプールファイルから出力ファイルを作り直すために使う
+    """
+
+    struct_version: int
+    scene: Scene
+    output_path: str
+    is_streaming: bool
+    """録音中にエンコーダへ直接流し、出力ファイルを書き込んでいたか"""
+    segment_seconds: float | None
+    state: Literal["recording", "encoding", "finished"]
+    streams: list[SpoolJournalStream]
+    updated_at: datetime
+
+
+def create_spool_journal(
+    scene: Scene,
+    output_path: Path,
+    is_streaming: bool,
+    segment_seconds: float | None,
+    spool_streams: list[SpoolStream],
+) -> SpoolJournal:
+    return SpoolJournal(
+        struct_version=1,
+        scene=scene,
+        output_path=str(output_path.resolve()),
+        is_streaming=is_streaming,
+        segment_seconds=segment_seconds,
+        state="recording",
+        streams=[
+            SpoolJournalStream(
+                filename=spool_stream.filename,
+                sampling_rate=spool_stream.sampling_rate,
+                channels=spool_stream.channels,
+                tracks=spool_stream.tracks,
+                sample_format=spool_stream.sample_format,
+                is_flac_compressed=spool_stream.is_flac_compressed,
+            )
+            for spool_stream in spool_streams
+        ],
+        updated_at=datetime.now(tz=timezone.utc),
+    )
+
+
+def load_spool_journal(spool_dir: Path) -> SpoolJournal:
+    path = spool_dir / SPOOL_JOURNAL_FILENAME
+
+    return SpoolJournal.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def save_spool_journal(spool_dir: Path, spool_journal: SpoolJournal) -> None:
+    """
+    ジャーナルを書き込み、ディスクへの書き込みを確定する。
+    書き込み途中で異常終了しても古いジャーナルが残るよう、一時ファイルから置き換える
+    """
+    path = spool_dir / SPOOL_JOURNAL_FILENAME
+
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        encoding="utf-8",
+        dir=spool_dir,
+        prefix=f"{SPOOL_JOURNAL_FILENAME}.",
+        delete=False,
+    ) as fp:
+        fp.write(spool_journal.model_dump_json())
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    os.replace(fp.name, path)
+
+
+def find_unfinished_spool_dirs(
+    spool_root_dir: Path,
+) -> list[tuple[Path, SpoolJournal]]:
+    """
+    spool_root_dir 以下から、出力ファイルを書き終えていない録音のスプールディレクトリを探す。
+    スプールファイルの中身は読まない
+    """
+    if not spool_root_dir.is_dir():
+        return []
+
+    unfinished_spool_dirs: list[tuple[Path, SpoolJournal]] = []
+    for spool_dir in sorted(spool_root_dir.iterdir()):
+        if not (spool_dir / SPOOL_JOURNAL_FILENAME).is_file():
+            continue
+
+        try:
+            spool_journal = load_spool_journal(spool_dir=spool_dir)
+        except Exception:
+            logger.warning(
+                f"Failed to load the spool journal in {spool_dir}: "
+                f"{traceback.format_exc()}"
+            )
+            continue
+
+        if spool_journal.state == "finished":
+            continue
+
+        unfinished_spool_dirs.append((spool_dir, spool_journal))
+
+    return unfinished_spool_dirs
+
+
+class SpoolJournalWriter(threading.Thread):
+    """
+    sync_interval_seconds 秒ごとにスプールファイルのディスクへの書き込みを確定 (fsync) し、
+    確定したバイト数をジャーナルに記録するスレッド。
+
+    スプールファイルは録音スレッドが書き込んでいるため、別に開いたファイルディスクリプタで fsync する。
+    名前付きパイプとセグメントに分けたスプールファイルは、バイト数を記録しない
+    """
+
+    def __init__(
+        self,
+        spool_dir: Path,
+        spool_journal: SpoolJournal,
+        sync_interval_seconds: float = 1.0,
+    ):
+        super().__init__(
+            name="SpoolJournalWriter",
+            daemon=True,
+        )
+
+        self.spool_dir = spool_dir
+        self.spool_journal = spool_journal
+        self.sync_interval_seconds = sync_interval_seconds
+
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self.__stop_event.wait(timeout=self.sync_interval_seconds):
+            try:
+                self.sync()
+            except Exception:
+                logger.error(traceback.format_exc())
+
+    def sync(self) -> None:
+        """任意のスレッドから呼び出せる"""
+        with self.__lock:
+            spool_dir = self.spool_dir
+            spool_journal = self.spool_journal
+
+            if spool_journal.segment_seconds is None:
+                for journal_stream in spool_journal.streams:
+                    spool_path = spool_dir / journal_stream.filename
+                    if not spool_path.exists() or not stat.S_ISREG(
+                        spool_path.stat().st_mode
+                    ):
+                        continue
+
+                    fd = os.open(spool_path, os.O_RDONLY)
+                    try:
+                        # fsync の前の大きさまでは、書き込みが確定している
+                        byte_count = os.fstat(fd).st_size
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+
+                    journal_stream.byte_count = byte_count
+
+            spool_journal.updated_at = datetime.now(tz=timezone.utc)
+            save_spool_journal(spool_dir=spool_dir, spool_journal=spool_journal)
+
+    def set_state(self, state: Literal["recording", "encoding", "finished"]) -> None:
+        """任意のスレッドから呼び出せる。状態を変え、直ちにジャーナルを書き込む"""
+        with self.__lock:
+            self.spool_journal.state = state
+
+        self.sync()
+
+    def stop(self) -> None:
+        """任意のスレッドから呼び出せる。スレッドの終了は join で待つ"""
+        self.__stop_event.set()
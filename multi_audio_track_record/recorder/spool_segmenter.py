@@ -0,0 +1,332 @@
+import io
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from ..scene import Scene
+from .spool import (
+    SpoolStream,
+    create_empty_spool_file,
+    get_spool_streams,
+    open_spool_file,
+)
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+
+def get_segment_seconds(scene: Scene) -> float | None:
+    """
+    シーンの設定から、録音を区切る秒数を求める。区切らない場合は None を返す。
+
+    segment_max_bytes は、1つのセグメントの全スプールファイルの合計の大きさの上限として扱う。
+    FLAC で圧縮する場合も、圧縮する前の大きさで計算する
+    """
+    candidates: list[float] = []
+
+    if scene.segment_seconds is not None:
+        candidates.append(scene.segment_seconds)
+
+    if scene.segment_max_bytes is not None:
+        bytes_per_second = sum(
+            spool_stream.frame_byte_count * spool_stream.sampling_rate
+            for spool_stream in get_spool_streams(scene=scene)
+        )
+        if bytes_per_second > 0:
+            candidates.append(scene.segment_max_bytes / bytes_per_second)
+
+    return min(candidates, default=None)
+
+
+def get_segment_dir(spool_dir: Path, segment_index: int) -> Path:
+    return spool_dir / f"segment{segment_index:04d}"
+
+
+def get_segment_output_path(output_path: Path, segment_index: int) -> Path:
+    """例: rec_2024-04-01T00-00-00Z.m4a -> rec_2024-04-01T00-00-00Z.part0000.m4a"""
+    return output_path.with_name(
+        f"{output_path.stem}.part{segment_index:04d}{output_path.suffix}"
+    )
+
+
+@dataclass
+class SpoolSegmentStream:
+    """
+    セグメントに含まれる、スプールファイル1つ分の範囲
+    """
+
+    spool_stream: SpoolStream
+    start_frame: int
+    """録音の先頭からのフレーム位置"""
+    frame_count: int
+
+
+@dataclass
+class SpoolSegment:
+    """
+    書き終えたセグメント。 spool_dir には通常の録音と同じ名前でスプールファイルが置かれる
+    """
+
+    segment_index: int
+    spool_dir: Path
+    start_seconds: float
+    streams: list[SpoolSegmentStream]
+
+
+class SpoolSegmenter:
+    """
+    スプールファイルを segment_seconds 秒ごとのセグメントに分けて書き込む。
+
+    セグメントの境界は、サンプリングレートごとに録音の先頭からのフレーム位置で決めるため、
+    同じサンプリングレートの全てのスプールファイルが同じフレームで切り替わる。
+    全てのスプールファイルが書き終えたセグメントは、 poll_finished_segments で取り出せる。
+
+    書き込みは各スプールファイルの書き込みスレッドから、 poll_finished_segments は任意のスレッドから呼び出せる
+    """
+
+    def __init__(
+        self,
+        spool_dir: Path,
+        spool_streams: list[SpoolStream],
+        segment_seconds: float,
+    ):
+        if segment_seconds <= 0:
+            raise ValueError(f"segment_seconds must be positive: {segment_seconds}")
+
+        self.spool_dir = spool_dir
+        self.spool_streams = spool_streams
+        self.segment_seconds = segment_seconds
+
+        self.__lock = threading.Lock()
+        self.__stream_segment_frame_counts: list[dict[int, int]] = [
+            {} for _ in spool_streams
+        ]
+        self.__stream_finished_segment_counts = [0] * len(spool_streams)
+        self.__is_stream_closed = [False] * len(spool_streams)
+        self.__next_segment_index = 0
+
+    def get_segment_dir(self, segment_index: int) -> Path:
+        return get_segment_dir(spool_dir=self.spool_dir, segment_index=segment_index)
+
+    def get_segment_start_frame(self, sampling_rate: int, segment_index: int) -> int:
+        return round(segment_index * self.segment_seconds * sampling_rate)
+
+    def open_spool_file(self, filename: str) -> BinaryIO:
+        """
+        スプールファイルを書き込み用に開く。 filename は get_spool_streams のいずれかであること
+        """
+        stream_index = [
+            spool_stream.filename for spool_stream in self.spool_streams
+        ].index(filename)
+
+        return io.BufferedWriter(
+            SegmentedSpoolFile(
+                spool_segmenter=self,
+                stream_index=stream_index,
+            ),
+        )
+
+    def on_segment_finished(
+        self,
+        stream_index: int,
+        segment_index: int,
+        frame_count: int,
+    ) -> None:
+        with self.__lock:
+            self.__stream_segment_frame_counts[stream_index][
+                segment_index
+            ] = frame_count
+            self.__stream_finished_segment_counts[stream_index] = segment_index + 1
+
+    def on_stream_closed(self, stream_index: int) -> None:
+        with self.__lock:
+            self.__is_stream_closed[stream_index] = True
+
+    def poll_finished_segments(self) -> list[SpoolSegment]:
+        """
+        前回の呼び出し以降に、全てのスプールファイルが書き終えたセグメントを返す。
+        閉じられたスプールファイルは、以降のセグメントには含まれないものとして扱う
+        """
+        finished_segments: list[SpoolSegment] = []
+
+        with self.__lock:
+            finished_segment_counts = self.__stream_finished_segment_counts
+            is_stream_closed = self.__is_stream_closed
+
+            while True:
+                segment_index = self.__next_segment_index
+                if segment_index >= max(finished_segment_counts, default=0):
+                    break
+
+                if not all(
+                    finished_segment_count > segment_index or is_closed
+                    for finished_segment_count, is_closed in zip(
+                        finished_segment_counts, is_stream_closed
+                    )
+                ):
+                    break
+
+                finished_segments.append(
+                    SpoolSegment(
+                        segment_index=segment_index,
+                        spool_dir=self.get_segment_dir(segment_index),
+                        start_seconds=segment_index * self.segment_seconds,
+                        streams=[
+                            SpoolSegmentStream(
+                                spool_stream=spool_stream,
+                                start_frame=self.get_segment_start_frame(
+                                    sampling_rate=spool_stream.sampling_rate,
+                                    segment_index=segment_index,
+                                ),
+                                frame_count=segment_frame_counts.get(segment_index, 0),
+                            )
+                            for spool_stream, segment_frame_counts in zip(
+                                self.spool_streams,
+                                self.__stream_segment_frame_counts,
+                            )
+                        ],
+                    ),
+                )
+                self.__next_segment_index += 1
+
+        for segment in finished_segments:
+            # 先に閉じられたスプールファイルは、空のファイルとしてエンコードできるようにする
+            segment.spool_dir.mkdir(parents=True, exist_ok=True)
+            for spool_stream in self.spool_streams:
+                spool_path = segment.spool_dir / spool_stream.filename
+                if not spool_path.exists():
+                    create_empty_spool_file(path=spool_path, spool_stream=spool_stream)
+
+        return finished_segments
+
+
+class SegmentedSpoolFile(io.RawIOBase):
+    """
+    セグメントの境界でファイルを切り替えながら書き込むスプールファイル。
+    境界はバイト位置で判定するため、フレームの途中で区切られたデータも書き込める
+    """
+
+    def __init__(
+        self,
+        spool_segmenter: SpoolSegmenter,
+        stream_index: int,
+    ):
+        super().__init__()
+
+        self.spool_segmenter = spool_segmenter
+        self.stream_index = stream_index
+
+        spool_stream = spool_segmenter.spool_streams[stream_index]
+        self.spool_stream = spool_stream
+        self.frame_byte_count = spool_stream.frame_byte_count
+
+        self.__segment_index = 0
+        self.__byte_position = 0
+        self.__segment_end_byte_position = self.__get_segment_start_byte_position(1)
+        self.__fp: BinaryIO | None = None
+
+    def __get_segment_start_byte_position(self, segment_index: int) -> int:
+        return self.frame_byte_count * self.spool_segmenter.get_segment_start_frame(
+            sampling_rate=self.spool_stream.sampling_rate,
+            segment_index=segment_index,
+        )
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: "ReadableBuffer") -> int:
+        spool_segmenter = self.spool_segmenter
+
+        view = memoryview(data).cast("B")
+        byte_count = len(view)
+
+        while len(view) > 0:
+            fp = self.__fp
+            if fp is None:
+                segment_dir = spool_segmenter.get_segment_dir(self.__segment_index)
+                segment_dir.mkdir(parents=True, exist_ok=True)
+                fp = open_spool_file(
+                    path=segment_dir / self.spool_stream.filename,
+                    spool_stream=self.spool_stream,
+                )
+                self.__fp = fp
+
+            chunk_byte_count = min(
+                len(view),
+                self.__segment_end_byte_position - self.__byte_position,
+            )
+            fp.write(view[:chunk_byte_count])
+            view = view[chunk_byte_count:]
+            self.__byte_position += chunk_byte_count
+
+            if self.__byte_position >= self.__segment_end_byte_position:
+                self.__finish_segment()
+
+                self.__segment_index += 1
+                self.__segment_end_byte_position = (
+                    self.__get_segment_start_byte_position(self.__segment_index + 1)
+                )
+
+        return byte_count
+
+    def __finish_segment(self) -> None:
+        fp = self.__fp
+        if fp is None:
+            return
+
+        fp.close()
+        self.__fp = None
+
+        segment_byte_count = self.__byte_position - (
+            self.__get_segment_start_byte_position(self.__segment_index)
+        )
+        self.spool_segmenter.on_segment_finished(
+            stream_index=self.stream_index,
+            segment_index=self.__segment_index,
+            frame_count=segment_byte_count // self.frame_byte_count,
+        )
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__finish_segment()
+            self.spool_segmenter.on_stream_closed(stream_index=self.stream_index)
+
+        super().close()
+
+
+def save_segment_manifest(
+    path: Path,
+    segment_seconds: float,
+    segment_output_paths: list[tuple[SpoolSegment, Path]],
+) -> None:
+    """
+    セグメントごとの出力ファイルと、録音の先頭からのフレーム位置をJSONのサイドカーファイルとして保存する
+    """
+    manifest_dict = {
+        "segment_seconds": segment_seconds,
+        "segments": [
+            {
+                "segment_index": segment.segment_index,
+                "path": output_path.name,
+                "start_seconds": segment.start_seconds,
+                "streams": [
+                    {
+                        "filename": segment_stream.spool_stream.filename,
+                        "sampling_rate": segment_stream.spool_stream.sampling_rate,
+                        "channels": segment_stream.spool_stream.channels,
+                        "tracks": segment_stream.spool_stream.tracks,
+                        "start_frame": segment_stream.start_frame,
+                        "frame_count": segment_stream.frame_count,
+                    }
+                    for segment_stream in segment.streams
+                ],
+            }
+            for segment, output_path in segment_output_paths
+        ],
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open(mode="w", encoding="utf-8") as fp:
+        json.dump(manifest_dict, fp, ensure_ascii=False, indent=2)
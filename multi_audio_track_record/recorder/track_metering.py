@@ -0,0 +1,51 @@
+from ..dsp import SILENT_METER_READING, MeterReading, merge_meter_readings
+from ..scene import Scene
+from .capture_source import CaptureSource
+
+
+def get_track_meter_readings(
+    scene: Scene,
+    capture_sources: list[CaptureSource],
+    device_meter_readings: dict[int, list[MeterReading]],
+    is_muted: bool,
+) -> dict[int, MeterReading]:
+    """
+    デバイスのチャンネルごとの入力レベルを、シーンのトラックごとのレベルにまとめる。
+    デバイスのゲインとミュートを反映する。キーはシーンのトラック番号
+    """
+    track_source_readings: dict[int, list[MeterReading]] = {
+        track_index: [] for track_index in range(len(scene.tracks))
+    }
+
+    for capture_source in capture_sources:
+        device = scene.devices[capture_source.device_index]
+        if is_muted or device.is_muted:
+            continue
+
+        channel_readings = device_meter_readings.get(capture_source.device_index)
+        if channel_readings is None:
+            continue
+
+        channel_index = capture_source.channel_index
+        if channel_index is not None:
+            if len(channel_readings) <= channel_index:
+                continue
+
+            channel_readings = [channel_readings[channel_index]]
+
+        source_reading = merge_meter_readings(
+            channel_readings,
+            gain_decibel=device.gain,
+        )
+        for track_index in capture_source.tracks:
+            if track_index in track_source_readings:
+                track_source_readings[track_index].append(source_reading)
+
+    return {
+        track_index: (
+            merge_meter_readings(source_readings)
+            if len(source_readings) > 0
+            else SILENT_METER_READING
+        )
+        for track_index, source_readings in track_source_readings.items()
+    }
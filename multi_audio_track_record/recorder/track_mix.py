@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from logging import getLogger
+
+from ..dsp import SampleFormat
+from ..scene import Scene
+from .capture_source import CaptureSource, get_capture_sources
+
+logger = getLogger(__name__)
+
+# 精度の低い順
+_SAMPLE_FORMAT_ORDER: list[SampleFormat] = ["s16le", "s24le", "f32le"]
+
+
+def get_widest_sample_format(sample_formats: list[SampleFormat]) -> SampleFormat:
+    """
+    ミックスの入力のうち、最も精度の高いサンプル形式を返す。
+    入力の精度を落とさないよう、ミックスしたトラックはこの形式で書き込む
+    """
+    return max(
+        sample_formats,
+        key=_SAMPLE_FORMAT_ORDER.index,
+        default="f32le",
+    )
+
+
+@dataclass
+class TrackMix:
+    """
+    録音中にアプリ内でミックスする、トラック1つ分のストリーム
+    """
+
+    track_index: int
+    sampling_rate: int
+    channels: int
+    inputs: list[tuple[int, int | None]]
+    """ミックスする音声ソースの (デバイス番号, チャンネル番号) のリスト"""
+    sample_format: SampleFormat = "f32le"
+    """スプールファイルに書き込むサンプル形式"""
+
+    @property
+    def spool_filename(self) -> str:
+        return f"track{self.track_index}.bin"
+
+    def get_input_index(self, capture_source: CaptureSource) -> int:
+        return self.inputs.index(
+            (capture_source.device_index, capture_source.channel_index)
+        )
+
+
+def get_track_mixes(scene: Scene) -> list[TrackMix] | None:
+    """
+    音声ソースが入力されるトラックごとのミックスを返す。
+    アプリ内でミックスできない場合は None を返す。
+
+    トラックに入力される音声ソースのサンプリングレートが揃っていること、
+    チャンネル数がモノラルか、トラックの最大のチャンネル数と等しいことが条件となる
+    """
+    if not scene.is_mix_bus_enabled:
+        return None
+
+    capture_sources = get_capture_sources(scene=scene)
+
+    track_mixes: list[TrackMix] = []
+    for track_index in range(len(scene.tracks)):
+        track_capture_sources = [
+            capture_source
+            for capture_source in capture_sources
+            if track_index in capture_source.tracks
+        ]
+        if len(track_capture_sources) == 0:
+            continue
+
+        sampling_rates = {
+            capture_source.sampling_rate for capture_source in track_capture_sources
+        }
+        if len(sampling_rates) != 1:
+            logger.info(
+                f"Track {track_index} has mixed sampling rates {sorted(sampling_rates)}. "
+                "Falling back to per-device spool files."
+            )
+            return None
+
+        channels = max(
+            capture_source.channels for capture_source in track_capture_sources
+        )
+        if any(
+            capture_source.channels not in (1, channels)
+            for capture_source in track_capture_sources
+        ):
+            logger.info(
+                f"Track {track_index} has incompatible channel counts. "
+                "Falling back to per-device spool files."
+            )
+            return None
+
+        track_mixes.append(
+            TrackMix(
+                track_index=track_index,
+                sampling_rate=sampling_rates.pop(),
+                channels=channels,
+                inputs=[
+                    (capture_source.device_index, capture_source.channel_index)
+                    for capture_source in track_capture_sources
+                ],
+                sample_format=get_widest_sample_format(
+                    [
+                        capture_source.sample_format
+                        for capture_source in track_capture_sources
+                    ]
+                ),
+            ),
+        )
+
+    return track_mixes
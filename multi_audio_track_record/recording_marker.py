@@ -0,0 +1,94 @@
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class RecordingMarker(BaseModel):
+    """
+    録音中に付けた目印 (マーカー)
+    """
+
+    position_seconds: float
+    """録音ファイルの先頭 (プリロールを含む) からの秒数"""
+    position_frames: int
+    """録音ファイルの先頭からのフレーム位置。単位は RecordingMarkerIndex.sampling_rate"""
+    label: str
+    created_at: datetime
+
+
+class RecordingMarkerIndex(BaseModel):
+    """
+    1回の録音に付けたマーカーの一覧。出力ファイルのサイドカーファイルとして保存する
+    """
+
+    recording_started_at: datetime
+    sampling_rate: int
+    """position_frames と duration_frames のサンプリングレート"""
+    duration_frames: int | None = None
+    """録音ファイルの長さ。録音中や、異常終了して分からない場合は None"""
+    markers: list[RecordingMarker]
+
+    def get_range(
+        self,
+        start_seconds: float,
+        duration_seconds: float,
+    ) -> "RecordingMarkerIndex":
+        """
+        録音の一部 (セグメント) に含まれるマーカーを、その先頭からの位置に直して返す
+        """
+        sampling_rate = self.sampling_rate
+        start_frames = round(start_seconds * sampling_rate)
+        end_frames = start_frames + round(duration_seconds * sampling_rate)
+        if self.duration_frames is not None:
+            end_frames = min(end_frames, self.duration_frames)
+
+        return RecordingMarkerIndex(
+            recording_started_at=self.recording_started_at,
+            sampling_rate=sampling_rate,
+            duration_frames=max(end_frames - start_frames, 0),
+            markers=[
+                marker.model_copy(
+                    update={
+                        "position_seconds": marker.position_seconds - start_seconds,
+                        "position_frames": marker.position_frames - start_frames,
+                    },
+                )
+                for marker in self.markers
+                if start_frames <= marker.position_frames < end_frames
+            ],
+        )
+
+
+def get_marker_index_path(output_path: Path) -> Path:
+    """e.g. rec_2024-04-01T00-00-00Z.markers.json"""
+    return output_path.with_suffix(".markers.json")
+
+
+def save_marker_index(path: Path, marker_index: RecordingMarkerIndex) -> None:
+    """
+    マーカーの一覧を書き込む。
+    録音中に異常終了しても壊れたファイルが残らないよう、一時ファイルから置き換える
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        encoding="utf-8",
+        dir=path.parent,
+        prefix=f"{path.name}.",
+        delete=False,
+    ) as fp:
+        fp.write(marker_index.model_dump_json(indent=2))
+
+    os.replace(fp.name, path)
+
+
+def load_marker_index(path: Path) -> RecordingMarkerIndex | None:
+    """マーカーの一覧を読み込む。ファイルが無い場合は None"""
+    if not path.exists():
+        return None
+
+    return RecordingMarkerIndex.model_validate_json(path.read_text(encoding="utf-8"))
@@ -0,0 +1,6 @@
+from .recording_session import RecordingSession, get_recording_output_path
+
+__all__ = [
+    "RecordingSession",
+    "get_recording_output_path",
+]
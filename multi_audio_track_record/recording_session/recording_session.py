@@ -0,0 +1,459 @@
+import asyncio
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+from ..audio_capture import get_reference_time
+from ..encoder import create_encoder
+from ..recorder import (
+    CaptureStats,
+    Recorder,
+    SpoolJournalWriter,
+    SpoolSegment,
+    create_spool_fifos,
+    create_spool_journal,
+    get_segment_output_path,
+    get_segment_seconds,
+    get_spool_streams,
+    is_spool_fifo_supported,
+    save_capture_stats,
+    save_segment_manifest,
+)
+from ..recording_marker import (
+    RecordingMarker,
+    RecordingMarkerIndex,
+    get_marker_index_path,
+    save_marker_index,
+)
+from ..scene import Scene
+
+logger = getLogger(__name__)
+
+
+def get_recording_output_path(
+    output_dir: Path,
+    recording_started_at: datetime,
+    suffix: str,
+) -> Path:
+    """録音の開始時刻から出力ファイルのパスを決める。 e.g. rec_2024-04-01T00-00-00Z.m4a"""
+    timestamp_string = (
+        recording_started_at.astimezone(tz=timezone.utc)
+        .isoformat(timespec="seconds")
+        .replace("+00:00", "Z")
+        .replace(":", "-")
+    )
+    return output_dir / f"rec_{timestamp_string}{suffix}"
+
+
+class RecordingSession:
+    """
+    1回の録音 (テイク) の準備から書き出しまでの手順をまとめる。
+
+    start で録音を始め、録音中は poll を定期的に呼び出し、 stop で録音スレッドが書き終えるのを待つ。
+    書き出しは encode で行う。録音とは独立に実行できるため、書き出しを待たずに次の録音を始められる。
+    GUI とヘッドレスの CLI は、このクラスを通して同じ手順で録音する
+    """
+
+    def __init__(
+        self,
+        recorder: Recorder,
+        scene: Scene,
+        spool_root_dir: Path,
+        recording_started_at: datetime | None = None,
+        streaming_encoder_finish_timeout_seconds: float = 30.0,
+    ):
+        self.recorder = recorder
+        self.scene = scene
+        self.spool_root_dir = spool_root_dir
+        self.recording_started_at = (
+            recording_started_at
+            if recording_started_at is not None
+            else datetime.now(tz=timezone.utc)
+        )
+        self.streaming_encoder_finish_timeout_seconds = (
+            streaming_encoder_finish_timeout_seconds
+        )
+        """録音終了後、録音中に起動したFFmpegの終了を待つ上限"""
+
+        self.__encoder = create_encoder(scene=scene)
+        # TODO: choice output file extension (m4a, mp4) for VLC compatibility
+        self.output_path = get_recording_output_path(
+            output_dir=Path(scene.output_dir),
+            recording_started_at=self.recording_started_at,
+            suffix=self.__encoder.get_output_suffix(),
+        )
+
+        self.spool_streams = get_spool_streams(scene=scene)
+
+        # マーカーの位置は、最も細かく区切れるサンプリングレートのフレームで表す
+        self.marker_index_path = get_marker_index_path(output_path=self.output_path)
+        self.marker_sampling_rate = max(
+            (spool_stream.sampling_rate for spool_stream in self.spool_streams),
+            default=48000,
+        )
+
+        # セグメントに分ける場合は、書き終えたセグメントから録音中にエンコードする
+        self.segment_seconds = get_segment_seconds(scene=scene)
+
+        # 名前付きパイプを使える場合は、録音中にエンコーダへPCMを流してエンコードする。
+        # 使えない場合は、スプールファイルに書き込み、録音終了後にエンコードする。
+        # FLAC で圧縮する場合は、ディスクへの書き込みを減らすことが目的のため流さない
+        self.is_streaming = (
+            self.segment_seconds is None
+            and not any(
+                spool_stream.is_flac_compressed for spool_stream in self.spool_streams
+            )
+            and is_spool_fifo_supported()
+            and self.__encoder.is_streaming_supported()
+        )
+
+        self.spool_dir: Path | None = None
+        self.recording_seconds: float | None = None
+        """録音の長さ。 stop するまでは None"""
+        self.is_muted = False
+        self.is_paused = False
+        self.markers: list[RecordingMarker] = []
+        self.duration_frames: int | None = None
+        """録音ファイルの長さ。 request_stop するまでは None"""
+
+        self.__reference_start_time: float | None = None
+        self.__is_stop_requested = False
+        self.__spool_journal_writer: SpoolJournalWriter | None = None
+        self.__segment_queue: "asyncio.Queue[SpoolSegment | None]" = asyncio.Queue()
+        self.__segment_encode_task: asyncio.Task[int] | None = None
+
+    async def start(self, is_muted: bool) -> None:
+        self.is_muted = is_muted
+
+        scene = self.scene
+        recorder = self.recorder
+        encoder = self.__encoder
+        output_path = self.output_path
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 異常終了しても次回の起動時に書き出せるよう、スプールファイルは削除されない場所に置き、
+        # 状態をジャーナルに記録する。 e.g. rec_2024-04-01T00-00-00Z_xxxxxxxx
+        spool_root_dir = self.spool_root_dir
+        spool_root_dir.mkdir(parents=True, exist_ok=True)
+        spool_dir = Path(
+            tempfile.mkdtemp(prefix=f"{output_path.stem}_", dir=spool_root_dir)
+        )
+        self.spool_dir = spool_dir
+
+        spool_journal_writer = SpoolJournalWriter(
+            spool_dir=spool_dir,
+            spool_journal=create_spool_journal(
+                scene=scene,
+                output_path=output_path,
+                is_streaming=self.is_streaming,
+                segment_seconds=self.segment_seconds,
+                spool_streams=self.spool_streams,
+            ),
+            sync_interval_seconds=scene.spool_journal_sync_interval_seconds,
+        )
+        await asyncio.to_thread(spool_journal_writer.sync)
+        spool_journal_writer.start()
+        self.__spool_journal_writer = spool_journal_writer
+
+        try:
+            if self.is_streaming:
+                create_spool_fifos(
+                    spool_dir=spool_dir,
+                    spool_streams=self.spool_streams,
+                )
+                await encoder.start(
+                    scene=scene,
+                    spool_dir=spool_dir,
+                    output_path=output_path,
+                    is_streaming=True,
+                )
+
+            segment_seconds = self.segment_seconds
+            if segment_seconds is not None:
+                self.__segment_encode_task = asyncio.create_task(
+                    self.__encode_segments(segment_seconds=segment_seconds),
+                )
+
+            recorder.start(
+                scene=scene,
+                spool_dir=spool_dir,
+                is_muted=is_muted,
+            )
+            self.__reference_start_time = recorder.reference_start_time
+        except Exception:
+            await self.abort()
+            spool_journal_writer.stop()
+            raise
+
+    def poll(self) -> None:
+        """録音中に定期的に呼び出し、録音スレッドの状態を記録し、書き終えたセグメントをエンコードに回す"""
+        recorder = self.recorder
+
+        for status in recorder.poll_statuses().values():
+            logger.info(f"[recording] {status}")
+
+        for segment in recorder.poll_finished_segments():
+            self.__segment_queue.put_nowait(segment)
+
+    def set_muted(self, is_muted: bool) -> None:
+        self.is_muted = is_muted
+        self.__apply_muted()
+
+    def set_paused(self, is_paused: bool) -> None:
+        """
+        一時停止中は無音を書き込む。
+        録音を止めずに無音にすることで、デバイス間の時刻の揃えと録音の長さを保つ
+        """
+        self.is_paused = is_paused
+        self.__apply_muted()
+
+    def __apply_muted(self) -> None:
+        self.recorder.set_muted(is_muted=self.is_muted or self.is_paused)
+
+    def get_position_seconds(self) -> float | None:
+        """録音ファイルの先頭 (プリロールを含む) から現在までの秒数。録音中でない場合は None"""
+        reference_start_time = self.__reference_start_time
+        if reference_start_time is None or self.__is_stop_requested:
+            return None
+
+        return get_reference_time() - reference_start_time
+
+    def add_marker(self, label: str | None = None) -> RecordingMarker:
+        """
+        現在の位置にマーカーを付ける。 label を省略すると通し番号を付ける。
+        異常終了しても残るよう、付けるたびにマーカーの一覧をサイドカーファイルに書き込む
+        """
+        position_seconds = self.get_position_seconds()
+        if position_seconds is None:
+            raise RuntimeError("Not recording.")
+
+        marker = RecordingMarker(
+            position_seconds=position_seconds,
+            position_frames=round(position_seconds * self.marker_sampling_rate),
+            label=label if label is not None else f"Marker {len(self.markers) + 1}",
+            created_at=datetime.now(tz=timezone.utc),
+        )
+        self.markers.append(marker)
+        logger.info(f"Marker added: {marker}")
+
+        self.save_marker_index()
+
+        return marker
+
+    def get_marker_index(self) -> RecordingMarkerIndex:
+        return RecordingMarkerIndex(
+            recording_started_at=self.recording_started_at,
+            sampling_rate=self.marker_sampling_rate,
+            duration_frames=self.duration_frames,
+            markers=self.markers,
+        )
+
+    def save_marker_index(self) -> None:
+        save_marker_index(
+            path=self.marker_index_path,
+            marker_index=self.get_marker_index(),
+        )
+
+    async def abort(self) -> None:
+        """録音中に失敗した場合に、録音中に始めたエンコードを止める"""
+        if self.is_streaming:
+            await self.__encoder.kill()
+
+        segment_encode_task = self.__segment_encode_task
+        if segment_encode_task is not None:
+            segment_encode_task.cancel()
+
+    def request_stop(self) -> None:
+        """録音スレッドに停止を伝える。ブロックしない。書き終えるのを待つには続けて stop を呼び出す"""
+        if self.__is_stop_requested:
+            return
+
+        position_seconds = self.get_position_seconds()
+        if position_seconds is not None:
+            self.duration_frames = round(position_seconds * self.marker_sampling_rate)
+
+        self.__is_stop_requested = True
+        self.recorder.stop()
+
+    async def stop(self) -> dict[int, CaptureStats]:
+        """
+        録音スレッドがスプールファイルを書き終えるまで待ち、デバイスごとの取りこぼしの集計を返す。
+        戻った後は、書き出しを待たずに次の録音を始められる
+        """
+        recorder = self.recorder
+
+        self.request_stop()
+        await recorder.wait_stopped()
+
+        self.recording_seconds = (
+            datetime.now(tz=timezone.utc) - self.recording_started_at
+        ).total_seconds()
+
+        capture_stats_dict = recorder.get_capture_stats()
+
+        # 書き終えたスプールファイルの大きさを記録する
+        spool_journal_writer = self.__spool_journal_writer
+        if spool_journal_writer is not None:
+            spool_journal_writer.stop()
+            await asyncio.to_thread(spool_journal_writer.join)
+            await asyncio.to_thread(spool_journal_writer.set_state, "encoding")
+
+        save_capture_stats(
+            path=self.output_path.with_suffix(".stats.json"),
+            capture_stats_list=list(capture_stats_dict.values()),
+            spool_disk_writer_stats=recorder.get_spool_disk_writer_stats(),
+        )
+
+        if len(self.markers) > 0:
+            # 録音の長さを加え、最後の章の終わりを決められるようにする
+            await asyncio.to_thread(self.save_marker_index)
+
+        if self.__segment_encode_task is not None:
+            # 録音の終了で閉じられた最後のセグメントまでエンコードする
+            for segment in recorder.poll_finished_segments():
+                self.__segment_queue.put_nowait(segment)
+            self.__segment_queue.put_nowait(None)
+
+        return capture_stats_dict
+
+    async def encode(
+        self,
+        on_progress: Callable[[float], None] | None = None,
+    ) -> int:
+        """
+        stop した後に呼び出し、録音を書き出して終了コード (成功は 0) を返す。
+        成功した場合はスプールディレクトリを削除する。
+        中断された場合や失敗した場合は、次回の起動時に書き出せるようスプールディレクトリを残す
+        """
+        encoder = self.__encoder
+        spool_dir = self.spool_dir
+        assert spool_dir is not None
+
+        segment_encode_task = self.__segment_encode_task
+
+        try:
+            if segment_encode_task is not None:
+                return_code = await segment_encode_task
+            elif self.is_streaming:
+                # 録音スレッドがパイプを閉じると、エンコーダは残りをエンコードして終了する
+                return_code = await encoder.wait(
+                    timeout_seconds=self.streaming_encoder_finish_timeout_seconds,
+                )
+            else:
+                await encoder.start(
+                    scene=self.scene,
+                    spool_dir=spool_dir,
+                    output_path=self.output_path,
+                    is_streaming=False,
+                    on_progress=on_progress,
+                )
+                return_code = await encoder.wait()
+        except asyncio.CancelledError:
+            await self.abort()
+            raise
+
+        logger.info(f"Encoder return code: {return_code}")
+
+        if return_code == 0 and segment_encode_task is None:
+            await self.__write_chapters(
+                output_path=self.output_path,
+                marker_index=self.get_marker_index(),
+            )
+
+        if return_code == 0:
+            spool_journal_writer = self.__spool_journal_writer
+            if spool_journal_writer is not None:
+                await asyncio.to_thread(spool_journal_writer.set_state, "finished")
+            shutil.rmtree(spool_dir, ignore_errors=True)
+        else:
+            logger.warning(
+                f"Keeping the spool directory {spool_dir} to finalize it later."
+            )
+
+        return return_code
+
+    async def __encode_segments(self, segment_seconds: float) -> int:
+        """
+        録音中に書き終えたセグメントを順にエンコードし、セグメントの一覧を更新する。
+        None を受け取ると終了し、最後に失敗したエンコードの終了コード (全て成功した場合は 0) を返す
+        """
+        scene = self.scene
+        output_path = self.output_path
+        segment_queue = self.__segment_queue
+
+        manifest_path = output_path.with_suffix(".segments.json")
+        segment_output_paths: list[tuple[SpoolSegment, Path]] = []
+
+        return_code = 0
+        while True:
+            segment = await segment_queue.get()
+            if segment is None:
+                break
+
+            segment_output_path = get_segment_output_path(
+                output_path=output_path,
+                segment_index=segment.segment_index,
+            )
+
+            encoder = create_encoder(scene=scene)
+            await encoder.start(
+                scene=scene,
+                spool_dir=segment.spool_dir,
+                output_path=segment_output_path,
+                is_streaming=False,
+            )
+            segment_return_code = await encoder.wait()
+            logger.info(
+                f"Segment {segment.segment_index} encoder return code: "
+                f"{segment_return_code}"
+            )
+
+            if segment_return_code == 0:
+                await self.__write_chapters(
+                    output_path=segment_output_path,
+                    marker_index=self.get_marker_index().get_range(
+                        start_seconds=segment.start_seconds,
+                        duration_seconds=segment_seconds,
+                    ),
+                )
+
+                # エンコードし終えたスプールファイルは消し、長時間の録音でもディスクの使用量を抑える
+                shutil.rmtree(segment.spool_dir, ignore_errors=True)
+            else:
+                return_code = segment_return_code
+
+            segment_output_paths.append((segment, segment_output_path))
+            save_segment_manifest(
+                path=manifest_path,
+                segment_seconds=segment_seconds,
+                segment_output_paths=segment_output_paths,
+            )
+
+        return return_code
+
+    async def __write_chapters(
+        self,
+        output_path: Path,
+        marker_index: RecordingMarkerIndex,
+    ) -> None:
+        """
+        マーカーを出力ファイルの章として書き込む。
+        失敗しても録音は書き出せているため、警告に留める (マーカーはサイドカーファイルに残る)
+        """
+        if len(marker_index.markers) == 0:
+            return
+
+        return_code = await create_encoder(scene=self.scene).write_chapters(
+            output_path=output_path,
+            marker_index=marker_index,
+        )
+        if return_code != 0:
+            logger.warning(
+                f"Failed to write chapters into {output_path} "
+                f"(return code: {return_code}). "
+                f"The markers are kept in {self.marker_index_path}."
+            )
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
 
 
 class SceneTrack(BaseModel):
@@ -16,6 +18,17 @@ class SceneDevice(BaseModel):
     gain: float
     is_muted: bool
     tracks: list[int]
+    channel_tracks: list[list[int]] | None = None
+    """
+    チャンネルごとのトラック割り当て。 channel_tracks[N] はチャンネルNを入力するトラック番号のリスト。
+
+    None の場合、全チャンネルをまとめて tracks のトラックに入力する。
+    """
+    spool_sample_format: Literal["f32le", "s16le", "s24le"] = "f32le"
+    """
+    録音中のスプールファイルに書き込むサンプル形式。
+    s16le と s24le は f32le に比べて、ディスクへの書き込み量がそれぞれ 1/2 と 3/4 になる
+    """
 
 
 class Scene(BaseModel):
@@ -23,3 +36,64 @@ class Scene(BaseModel):
     output_dir: str
     tracks: list[SceneTrack]
     devices: list[SceneDevice]
+    pre_roll_seconds: float = 0.0
+    """アーム中に保持し、録音開始時にさかのぼって録音する秒数"""
+    is_drift_compensation_enabled: bool = True
+    """デバイス間のクロックのずれを録音中にリサンプリングで補正するかどうか"""
+    is_mix_bus_enabled: bool = True
+    """
+    デバイスからトラックへのミックスを録音中にアプリ内で行い、トラックごとに1つのストリームを書き込むかどうか。
+
+    トラックに入力される音声ソースのサンプリングレートが揃っていない場合などは、
+    有効でもデバイスごとに書き込み、エンコード時にFFmpegでミックスする。
+    """
+    output_fragment_seconds: float | None = 2.0
+    """
+    録音中にFFmpegでエンコードする場合に、出力する MP4 をフラグメントに分ける秒数。
+    アプリが異常終了しても、最後に書き込んだフラグメントまでのファイルが残る。
+    None の場合は断片化せず、録音の終了時に moov を書き込む
+    """
+    segment_seconds: float | None = None
+    """
+    録音をこの秒数ごとのセグメント (別々の出力ファイル) に分ける。
+    書き終えたセグメントは、録音を続けながら順にエンコードする。 None の場合は分けない
+    """
+    segment_max_bytes: int | None = None
+    """
+    1つのセグメントのスプールファイルの合計の大きさの上限。
+    segment_seconds と両方指定した場合は、短い方で分ける。 None の場合は大きさで分けない
+    """
+    spool_dir: str | None = None
+    """
+    録音中のスプールファイルを置くディレクトリ。高速なディスクや tmpfs を指定できる。
+    None の場合はユーザーのキャッシュディレクトリを使う
+    """
+    spool_journal_sync_interval_seconds: Annotated[float, Field(gt=0)] = 1.0
+    """
+    録音中にスプールファイルの書き込みを確定 (fsync) し、ジャーナルを更新する間隔。
+    短いほど異常終了した時に失う録音が減るが、ディスクへの書き込みが増える
+    """
+    encoder_type: Literal["ffmpeg", "wave"] = "ffmpeg"
+    """
+    録音の出力形式。 "ffmpeg" は FFmpeg で AAC にエンコードした .m4a、
+    "wave" はトラックごとに変換せずに書き込む WAV (4GB を超える場合は RF64)
+    """
+    is_spool_flac_enabled: bool = False
+    """
+    整数形式 (s16le, s24le) のスプールファイルを FLAC で可逆圧縮して書き込むかどうか。
+    圧縮は FFmpeg のプロセスで行う。録音中にエンコーダへ直接流す書き出しは使えなくなる
+    """
+
+
+def find_scene(scenes: list[Scene], scene_name: str) -> Scene:
+    """
+    名前でシーンを探す。同じ名前が無い場合は、シーン番号として解釈する
+    """
+    for scene in scenes:
+        if scene.name == scene_name:
+            return scene
+
+    if scene_name.isdecimal() and int(scene_name) < len(scenes):
+        return scenes[int(scene_name)]
+
+    raise ValueError(f"Scene not found: {scene_name}")
@@ -0,0 +1,102 @@
+import numpy as np
+
+from multi_audio_track_record.dsp import (
+    ClockDriftEstimator,
+    StreamingResampler,
+    get_clock_correction_ratio,
+)
+
+
+def test_clock_drift_estimator_estimates_clock_ratio() -> None:
+    sampling_rate = 48000
+    actual_clock_ratio = 1.0002
+
+    clock_drift_estimator = ClockDriftEstimator(nominal_sampling_rate=sampling_rate)
+    for frame_position in range(0, sampling_rate * 20, 480):
+        capture_time = 100.0 + frame_position / (sampling_rate * actual_clock_ratio)
+        clock_drift_estimator.add(
+            frame_position=frame_position,
+            capture_time=capture_time,
+        )
+
+    assert abs(clock_drift_estimator.clock_ratio - actual_clock_ratio) < 1e-6
+
+    origin_capture_time = clock_drift_estimator.get_capture_time(frame_position=0)
+    assert origin_capture_time is not None
+    assert abs(origin_capture_time - 100.0) < 1e-4
+
+
+def test_clock_correction_ratio_stays_in_resampler_range() -> None:
+    sampling_rate = 48000
+
+    # 大きくずれた2つのデバイスで、推定値がそれぞれ逆向きの上限に張り付く
+    clock_drift_estimators: list[ClockDriftEstimator] = []
+    for actual_clock_ratio in [1.02, 0.98]:
+        clock_drift_estimator = ClockDriftEstimator(
+            nominal_sampling_rate=sampling_rate,
+        )
+        for frame_position in range(0, sampling_rate * 5, 480):
+            clock_drift_estimator.add(
+                frame_position=frame_position,
+                capture_time=frame_position / (sampling_rate * actual_clock_ratio),
+            )
+        clock_drift_estimators.append(clock_drift_estimator)
+
+    reference_clock_drift_estimator, clock_drift_estimator = clock_drift_estimators
+    assert reference_clock_drift_estimator.clock_ratio == 1.005
+    assert clock_drift_estimator.clock_ratio == 0.995
+
+    resampler = StreamingResampler(channels=1, max_input_frames=480)
+    out = np.empty((resampler.max_output_frames, 1), dtype=np.float32)
+
+    for reference, device in [
+        (reference_clock_drift_estimator, clock_drift_estimator),
+        (clock_drift_estimator, reference_clock_drift_estimator),
+    ]:
+        ratio = get_clock_correction_ratio(
+            reference_clock_ratio=reference.clock_ratio,
+            clock_ratio=device.clock_ratio,
+            max_ratio=resampler.max_ratio,
+        )
+        assert 1 / resampler.max_ratio <= ratio <= resampler.max_ratio
+
+        resampler.process(
+            frames=np.zeros((480, 1), dtype=np.float32),
+            ratio=ratio,
+            out=out,
+        )
+
+
+def test_streaming_resampler_is_continuous_across_blocks() -> None:
+    resampler = StreamingResampler(channels=1, max_input_frames=1000)
+    frames = np.arange(10000, dtype=np.float32).reshape(-1, 1)
+    out = np.empty((resampler.max_output_frames, 1), dtype=np.float32)
+
+    output_blocks: list[np.ndarray] = []
+    for start in range(0, len(frames), 1000):
+        output_frame_count = resampler.process(
+            frames=frames[start : start + 1000],
+            ratio=1.001,
+            out=out,
+        )
+        output_blocks.append(out[:output_frame_count, 0].copy())
+
+    output = np.concatenate(output_blocks)
+
+    assert abs(len(output) - 10010) <= 1
+    np.testing.assert_allclose(np.diff(output), 1 / 1.001, atol=1e-3)
+
+
+def test_streaming_resampler_passes_through_at_unity_ratio() -> None:
+    resampler = StreamingResampler(channels=2, max_input_frames=256)
+    frames = np.random.default_rng(0).random((512, 2), dtype=np.float32)
+    out = np.empty((resampler.max_output_frames, 2), dtype=np.float32)
+
+    # 補間のため、最後の1フレームは次のブロックで出力される
+    output_frame_count = resampler.process(frames=frames[:256], ratio=1.0, out=out)
+    assert output_frame_count == 255
+    np.testing.assert_array_equal(out[:255], frames[:255])
+
+    output_frame_count = resampler.process(frames=frames[256:], ratio=1.0, out=out)
+    assert output_frame_count == 256
+    np.testing.assert_array_equal(out[:256], frames[255:511])
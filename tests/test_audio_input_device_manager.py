@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import types
+from typing import Any
+
+import pytest
+
+from multi_audio_track_record.audio_input_device_manager import (
+    AudioInputDeviceManagerPyAudio,
+)
+
+
+class FakePyAudio:
+    """接続されているデバイスを差し替えられる PyAudio の代わり"""
+
+    device_names: list[str] = ["mic"]
+    instance_count = 0
+    device_info_count = 0
+    thread_ids: set[int] = set()
+
+    def __init__(self) -> None:
+        FakePyAudio.instance_count += 1
+        FakePyAudio.thread_ids.add(threading.get_ident())
+        self.device_names = list(FakePyAudio.device_names)
+
+    def terminate(self) -> None:
+        pass
+
+    def get_default_host_api_info(self) -> dict[str, Any]:
+        return {
+            "index": 0,
+            "structVersion": 1,
+            "type": 8,
+            "name": "ALSA",
+            "deviceCount": len(self.device_names),
+            "defaultInputDevice": 0,
+            "defaultOutputDevice": 0,
+        }
+
+    def get_device_info_by_host_api_device_index(
+        self,
+        host_api_index: int,
+        host_api_device_index: int,
+    ) -> dict[str, Any]:
+        FakePyAudio.device_info_count += 1
+        return {
+            "index": host_api_device_index,
+            "structVersion": 2,
+            "name": self.device_names[host_api_device_index],
+            "hostApi": host_api_index,
+            "maxInputChannels": 2,
+            "maxOutputChannels": 0,
+            "defaultLowInputLatency": 0.01,
+            "defaultLowOutputLatency": 0.01,
+            "defaultHighInputLatency": 0.1,
+            "defaultHighOutputLatency": 0.1,
+            "defaultSampleRate": 48000.0,
+        }
+
+
+def test_audio_input_devices_are_cached_until_invalidated(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setitem(
+        sys.modules,
+        "pyaudio",
+        types.SimpleNamespace(PyAudio=FakePyAudio),
+    )
+
+    async def main() -> None:
+        manager = AudioInputDeviceManagerPyAudio()
+
+        # 同時に呼び出しても列挙は1回で済む
+        devices, default_device = await asyncio.gather(
+            manager.get_audio_input_devices(),
+            manager.get_default_audio_input_device(),
+        )
+        assert [device.portaudio_name for device in devices] == ["mic"]
+        assert default_device.portaudio_name == "mic"
+        assert (FakePyAudio.instance_count, FakePyAudio.device_info_count) == (1, 1)
+
+        # キャッシュを使い、 PortAudio を呼び出さない
+        await manager.get_audio_input_devices()
+        await manager.get_default_audio_input_device()
+        assert (FakePyAudio.instance_count, FakePyAudio.device_info_count) == (1, 1)
+
+        # デバイスを接続し、キャッシュを破棄すると PortAudio を初期化し直して列挙する
+        FakePyAudio.device_names = ["mic", "usb"]
+        manager.invalidate_audio_input_devices()
+        devices = await manager.get_audio_input_devices()
+        assert [device.portaudio_name for device in devices] == ["mic", "usb"]
+        assert FakePyAudio.instance_count == 2
+
+    asyncio.run(main())
+
+    # 列挙はイベントループのスレッドで行わない
+    assert threading.get_ident() not in FakePyAudio.thread_ids
+
+
+def test_periodic_rescan_picks_up_hot_plugged_devices_while_idle(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setitem(
+        sys.modules,
+        "pyaudio",
+        types.SimpleNamespace(PyAudio=FakePyAudio),
+    )
+    monkeypatch.setattr(FakePyAudio, "device_names", ["mic"])
+
+    async def main() -> None:
+        manager = AudioInputDeviceManagerPyAudio()
+        assert [
+            device.portaudio_name for device in await manager.get_audio_input_devices()
+        ] == ["mic"]
+
+        is_streaming = True
+        prepare_rescan_count = 0
+
+        def prepare_rescan() -> bool:
+            nonlocal prepare_rescan_count
+            prepare_rescan_count += 1
+            return not is_streaming
+
+        rescan_task = asyncio.create_task(
+            manager.run_periodic_rescan(
+                prepare_rescan=prepare_rescan,
+                interval_seconds=0.01,
+            )
+        )
+
+        # ストリームを開いている間は、デバイスを接続しても列挙し直さない
+        FakePyAudio.device_names = ["mic", "usb"]
+        instance_count = FakePyAudio.instance_count
+        while prepare_rescan_count < 3:
+            await asyncio.sleep(0.01)
+        assert FakePyAudio.instance_count == instance_count
+        assert [
+            device.portaudio_name for device in await manager.get_audio_input_devices()
+        ] == ["mic"]
+
+        # ストリームを閉じると、手動で列挙し直さなくても接続したデバイスが現れる
+        is_streaming = False
+        for _ in range(100):
+            devices = await manager.get_audio_input_devices()
+            if len(devices) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        rescan_task.cancel()
+
+        assert [device.portaudio_name for device in devices] == ["mic", "usb"]
+
+    asyncio.run(main())
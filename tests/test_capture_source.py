@@ -0,0 +1,56 @@
+from multi_audio_track_record.recorder import get_capture_sources
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def create_scene_device(
+    channels: int,
+    tracks: list[int],
+    channel_tracks: list[list[int]] | None = None,
+) -> SceneDevice:
+    return SceneDevice(
+        portaudio_name="device",
+        portaudio_index=0,
+        portaudio_host_api_type=8,
+        portaudio_host_api_index=0,
+        portaudio_host_api_device_index=0,
+        sampling_rate=48000,
+        channels=channels,
+        gain=0,
+        is_muted=False,
+        tracks=tracks,
+        channel_tracks=channel_tracks,
+    )
+
+
+def test_get_capture_sources_routes_channels() -> None:
+    scene = Scene(
+        name="scene",
+        output_dir=".",
+        tracks=[SceneTrack(name="a"), SceneTrack(name="b")],
+        devices=[
+            create_scene_device(channels=2, tracks=[0]),
+            create_scene_device(
+                channels=4,
+                tracks=[],
+                channel_tracks=[[0], [], [1], [0, 1]],
+            ),
+        ],
+    )
+
+    capture_sources = get_capture_sources(scene=scene)
+
+    assert [
+        (
+            capture_source.device_index,
+            capture_source.channel_index,
+            capture_source.channels,
+            capture_source.tracks,
+        )
+        for capture_source in capture_sources
+    ] == [
+        (0, None, 2, [0]),
+        (1, 0, 1, [0]),
+        (1, 2, 1, [1]),
+        (1, 3, 1, [0, 1]),
+    ]
+    assert capture_sources[2].spool_filename == "1_ch2.bin"
@@ -0,0 +1,175 @@
+import queue
+import time
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from multi_audio_track_record.audio_capture import (
+    AudioCaptureEngine,
+    AudioCaptureStream,
+)
+from multi_audio_track_record.dsp import AudioRingBuffer, BlockTimestampRing
+from multi_audio_track_record.recorder.capture_source import CaptureSource
+from multi_audio_track_record.recorder.capture_worker import (
+    CaptureWorker,
+    CaptureWorkerStartRecordingCommand,
+    CaptureWorkerStatus,
+    CaptureWorkerStopCommand,
+)
+from multi_audio_track_record.scene import SceneDevice
+
+
+class ScriptedRingBuffer(AudioRingBuffer):
+    """
+    最初に容量を超えるフレームを書き込んで一部を捨て、
+    以降は読み込まれるたびに、読み込まれた分だけ続きのフレームを書き込む
+    """
+
+    def __init__(self, frames: npt.NDArray[np.float32], capacity_frames: int):
+        super().__init__(capacity_frames=capacity_frames, channels=frames.shape[1])
+
+        self.frames = frames
+        self.frame_index = 0
+
+    def write_next(self, frame_count: int) -> None:
+        frames = self.frames[self.frame_index : self.frame_index + frame_count]
+        self.frame_index += len(frames)
+        self.write(frames)
+
+    def read_into(self, out: npt.NDArray[np.generic]) -> int:
+        frame_count = super().read_into(out)
+        if frame_count > 0:
+            self.write_next(frame_count)
+
+        return frame_count
+
+
+class ScriptedAudioCaptureStream(AudioCaptureStream):
+    def __init__(self, ring_buffer: ScriptedRingBuffer):
+        super().__init__(
+            ring_buffer=ring_buffer,
+            block_timestamp_ring=BlockTimestampRing(capacity=16),
+        )
+        self.scripted_ring_buffer = ring_buffer
+
+    def feed(self, dropped_frame_count: int) -> None:
+        ring_buffer = self.scripted_ring_buffer
+        ring_buffer.write_next(ring_buffer.capacity_frames + dropped_frame_count)
+        self._notify_data_written()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ScriptedAudioCaptureEngine(AudioCaptureEngine):
+    def __init__(self, frames: npt.NDArray[np.float32]):
+        self.frames = frames
+        self.stream: ScriptedAudioCaptureStream | None = None
+
+    def open_stream(
+        self,
+        portaudio_index: int,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ) -> AudioCaptureStream:
+        self.stream = ScriptedAudioCaptureStream(
+            ring_buffer=ScriptedRingBuffer(
+                frames=self.frames,
+                capacity_frames=ring_buffer_frames,
+            ),
+        )
+        return self.stream
+
+    def terminate(self) -> None:
+        pass
+
+
+def test_capture_worker_fills_dropped_frames_where_they_were_dropped(
+    tmp_path: Path,
+) -> None:
+    sampling_rate = 8000
+    dropped_frame_count = 100
+    # 0 と区別できるよう、1 から始まる連番のフレームを流す
+    frames = np.arange(1, sampling_rate * 3 + 1, dtype=np.float32).reshape(-1, 1)
+
+    audio_capture_engine = ScriptedAudioCaptureEngine(frames=frames)
+    status_queue: "queue.SimpleQueue[CaptureWorkerStatus]" = queue.SimpleQueue()
+    capture_worker = CaptureWorker(
+        device_index=0,
+        scene_device=SceneDevice(
+            portaudio_name="device",
+            portaudio_index=0,
+            portaudio_host_api_type=8,
+            portaudio_host_api_index=0,
+            portaudio_host_api_device_index=0,
+            sampling_rate=sampling_rate,
+            channels=1,
+            gain=0,
+            is_muted=False,
+            tracks=[0],
+        ),
+        capture_sources=[
+            CaptureSource(
+                device_index=0,
+                channel_index=None,
+                sampling_rate=sampling_rate,
+                channels=1,
+                tracks=[0],
+            ),
+        ],
+        audio_capture_engine=audio_capture_engine,
+        status_queue=status_queue,
+        is_muted=False,
+    )
+    capture_worker.start()
+    capture_worker.send_command(
+        CaptureWorkerStartRecordingCommand(
+            spool_dir=tmp_path,
+            reference_start_time=0.0,
+        ),
+    )
+
+    # スプールファイルが開かれた後に流したフレームは、すべて録音される
+    spool_path = tmp_path / "0.bin"
+    deadline = time.monotonic() + 5.0
+    while not spool_path.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    stream = audio_capture_engine.stream
+    assert stream is not None
+    ring_buffer = stream.scripted_ring_buffer
+    capacity_frames = ring_buffer.capacity_frames
+    stream.feed(dropped_frame_count=dropped_frame_count)
+
+    # 捨てた位置より後のフレームも、同じ読み出しの間にリングバッファに届く
+    while ring_buffer.frame_index < len(frames) or ring_buffer.readable_frame_count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    capture_worker.send_command(CaptureWorkerStopCommand())
+    capture_worker.join(timeout=5.0)
+    assert not capture_worker.is_alive()
+
+    status = status_queue.get_nowait()
+    while not status.is_finished:
+        status = status_queue.get_nowait()
+    assert status.error is None
+    assert status.capture_stats.dropped_frame_count == dropped_frame_count
+    assert status.capture_stats.gap_filled_frame_count == dropped_frame_count
+
+    expected = frames[:, 0].copy()
+    expected[capacity_frames : capacity_frames + dropped_frame_count] = 0.0
+    np.testing.assert_array_equal(
+        np.fromfile(spool_path, dtype="<f4"),
+        expected,
+    )
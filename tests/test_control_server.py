@@ -0,0 +1,277 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from multi_audio_track_record.audio_capture import (
+    AudioCaptureEngine,
+    AudioCaptureStream,
+    get_reference_time,
+)
+from multi_audio_track_record.control_server import (
+    ControlHttpServer,
+    RecordingController,
+)
+from multi_audio_track_record.dsp import AudioRingBuffer, BlockTimestampRing
+from multi_audio_track_record.encoder import EncodeJobQueue
+from multi_audio_track_record.recorder import Recorder
+from multi_audio_track_record.recording_marker import load_marker_index
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+class SilentAudioCaptureStream(AudioCaptureStream):
+    """音声入力デバイスの代わりに、実時間で無音のブロックを書き込む"""
+
+    def __init__(
+        self,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ):
+        super().__init__(
+            ring_buffer=AudioRingBuffer(
+                capacity_frames=ring_buffer_frames,
+                channels=channels,
+            ),
+            block_timestamp_ring=BlockTimestampRing(
+                capacity=ring_buffer_frames // frames_per_buffer * 2 + 16,
+            ),
+        )
+
+        self.frames = np.zeros((frames_per_buffer, channels), dtype=np.float32)
+        self.block_seconds = frames_per_buffer / sampling_rate
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.block_seconds):
+            self.block_timestamp_ring.push(
+                frame_position=self.ring_buffer.write_position,
+                capture_time=get_reference_time() - self.block_seconds,
+            )
+            self.ring_buffer.write(self.frames)
+            self._notify_data_written()
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def close(self) -> None:
+        self.stop_event.set()
+
+
+class SilentAudioCaptureEngine(AudioCaptureEngine):
+    def open_stream(
+        self,
+        portaudio_index: int,
+        sampling_rate: int,
+        channels: int,
+        frames_per_buffer: int,
+        ring_buffer_frames: int,
+    ) -> AudioCaptureStream:
+        return SilentAudioCaptureStream(
+            sampling_rate=sampling_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+            ring_buffer_frames=ring_buffer_frames,
+        )
+
+    def terminate(self) -> None:
+        pass
+
+
+async def request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    path: str,
+    payload: dict[str, Any] | None = None,
+) -> tuple[int, dict[str, Any]]:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    header_lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(header_lines[0].split(" ")[1])
+    content_length = next(
+        int(line.split(":", 1)[1])
+        for line in header_lines
+        if line.lower().startswith("content-length:")
+    )
+    return status, json.loads(await reader.readexactly(content_length))
+
+
+def test_control_server_records_a_take(tmp_path: Path) -> None:
+    scene = Scene(
+        name="show",
+        output_dir=str(tmp_path / "out"),
+        tracks=[SceneTrack(name="voice")],
+        devices=[
+            SceneDevice(
+                portaudio_name="device",
+                portaudio_index=0,
+                portaudio_host_api_type=8,
+                portaudio_host_api_index=0,
+                portaudio_host_api_device_index=0,
+                sampling_rate=48000,
+                channels=1,
+                gain=0,
+                is_muted=False,
+                tracks=[0],
+            ),
+        ],
+        encoder_type="wave",
+    )
+
+    async def main() -> list[dict[str, Any]]:
+        encode_job_queue = EncodeJobQueue()
+        controller = RecordingController(
+            recorder=Recorder(audio_capture_engine=SilentAudioCaptureEngine()),
+            scenes=[scene],
+            scene=scene,
+            spool_root_dir=tmp_path / "spool",
+            encode_job_queue=encode_job_queue,
+            event_interval_seconds=0.05,
+        )
+        server = await ControlHttpServer(controller=controller).start_server(port=0)
+        port = server.sockets[0].getsockname()[1]
+        background_tasks = [
+            asyncio.create_task(controller.run()),
+            asyncio.create_task(encode_job_queue.run()),
+        ]
+
+        event_reader, event_writer = await asyncio.open_connection("127.0.0.1", port)
+        event_writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await event_reader.readuntil(b"\r\n\r\n")
+
+        # 1つの接続でコマンドを続けて送る
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        status, payload = await request(reader, writer, "POST", "/arm")
+        assert (status, payload["state"]) == (200, "armed")
+
+        status, payload = await request(reader, writer, "POST", "/markers")
+        assert status == 409
+
+        status, payload = await request(reader, writer, "POST", "/start")
+        assert (status, payload["state"]) == (200, "recording")
+
+        status, payload = await request(reader, writer, "POST", "/start")
+        assert status == 409
+
+        await asyncio.sleep(0.2)
+        status, marker = await request(
+            reader, writer, "POST", "/markers", {"label": "intro"}
+        )
+        assert status == 200
+        assert marker["label"] == "intro"
+        assert marker["position_seconds"] > 0
+
+        status, payload = await request(reader, writer, "POST", "/pause")
+        assert (status, payload["is_paused"]) == (200, True)
+
+        status, payload = await request(
+            reader, writer, "POST", "/markers", {"label": 1}
+        )
+        assert status == 400
+
+        status, payload = await request(reader, writer, "GET", "/start")
+        assert status == 405
+
+        status, payload = await request(reader, writer, "POST", "/stop")
+        assert (status, payload["state"]) == (200, "stopping")
+
+        await controller.wait_stopped()
+        await encode_job_queue.join()
+
+        status, payload = await request(reader, writer, "GET", "/status")
+        assert (status, payload["state"]) == (200, "armed")
+
+        await asyncio.sleep(0.1)
+        event_writer.close()
+        events = [
+            json.loads(line.removeprefix(b"data: "))
+            for line in (await event_reader.read(1024 * 1024)).splitlines()
+            if line.startswith(b"data: ")
+        ]
+
+        writer.close()
+        server.close()
+        for background_task in background_tasks:
+            background_task.cancel()
+        await controller.shutdown()
+
+        assert [job.record.state for job in encode_job_queue.get_jobs()] == ["finished"]
+        return events
+
+    events = asyncio.run(main())
+
+    event_types = {event["type"] for event in events}
+    assert {"status", "meter", "marker", "encode"} <= event_types
+    assert [
+        event["marker"]["label"] for event in events if event["type"] == "marker"
+    ] == ["intro"]
+    assert [event["state"] for event in events if event["type"] == "status"][:4] == [
+        "idle",
+        "armed",
+        "recording",
+        "recording",
+    ]
+
+    assert len(list((tmp_path / "out").glob("*.wav"))) == 1
+    marker_index = load_marker_index(
+        path=next((tmp_path / "out").glob("*.markers.json")),
+    )
+    assert marker_index is not None
+    assert [marker.label for marker in marker_index.markers] == ["intro"]
+    assert marker_index.duration_frames is not None
+    assert 0 < marker_index.markers[0].position_frames < marker_index.duration_frames
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+def test_control_server_ends_event_streams_on_close(tmp_path: Path) -> None:
+    scene = Scene(
+        name="show",
+        output_dir=str(tmp_path / "out"),
+        tracks=[SceneTrack(name="voice")],
+        devices=[],
+    )
+
+    async def main() -> bytes:
+        controller = RecordingController(
+            recorder=Recorder(audio_capture_engine=SilentAudioCaptureEngine()),
+            scenes=[scene],
+            scene=scene,
+            spool_root_dir=tmp_path / "spool",
+            encode_job_queue=EncodeJobQueue(),
+        )
+        http_server = ControlHttpServer(controller=controller)
+        server = await http_server.start_server(port=0)
+        port = server.sockets[0].getsockname()[1]
+
+        event_reader, event_writer = await asyncio.open_connection("127.0.0.1", port)
+        event_writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await event_reader.readuntil(b"\r\n\r\n")
+
+        server.close()
+        await http_server.close_event_streams()
+
+        # 送り残したイベントを受け取った後、サーバーから接続が閉じられる
+        event_bytes = await asyncio.wait_for(event_reader.read(), timeout=1.0)
+        assert event_reader.at_eof()
+        event_writer.close()
+
+        return event_bytes
+
+    event_bytes = asyncio.run(main())
+
+    assert b"event: status\n" in event_bytes
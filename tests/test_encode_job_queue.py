@@ -0,0 +1,182 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Callable, Coroutine
+
+from multi_audio_track_record.encoder import (
+    ENCODE_JOB_PRIORITY_RECORDING,
+    ENCODE_JOB_PRIORITY_RECOVERY,
+    EncodeJob,
+    EncodeJobQueue,
+    load_encode_job_records,
+)
+from multi_audio_track_record.ffmpeg import parse_ffmpeg_progress_line
+
+
+def test_encode_job_queue_runs_jobs_by_priority(tmp_path: Path) -> None:
+    state_path = tmp_path / "encode_jobs.json"
+
+    async def main() -> tuple[list[str], list[EncodeJob]]:
+        encode_job_queue = EncodeJobQueue(state_path=state_path, max_workers=1)
+        run_order: list[str] = []
+        blocker_event = asyncio.Event()
+
+        def create_run(
+            name: str,
+            return_code: int,
+        ) -> Callable[[EncodeJob], Coroutine[Any, Any, int]]:
+            async def run(job: EncodeJob) -> int:
+                run_order.append(name)
+                if name == "blocker":
+                    await blocker_event.wait()
+                job.set_progress(1.0)
+                return return_code
+
+            return run
+
+        run_task = asyncio.create_task(encode_job_queue.run())
+
+        jobs = [
+            await encode_job_queue.submit(
+                spool_dir=tmp_path / name,
+                output_path=tmp_path / f"{name}.m4a",
+                run=create_run(name, return_code),
+                priority=priority,
+                duration_seconds=2.0,
+            )
+            for name, priority, return_code in [
+                ("blocker", ENCODE_JOB_PRIORITY_RECORDING, 0),
+                ("recovery", ENCODE_JOB_PRIORITY_RECOVERY, 1),
+                ("take", ENCODE_JOB_PRIORITY_RECORDING, 0),
+            ]
+        ]
+        await asyncio.sleep(0.01)
+
+        # 待っている間と実行中の書き出しが保存されている
+        assert [
+            Path(record.spool_dir).name
+            for record in load_encode_job_records(path=state_path)
+        ] == ["blocker", "recovery", "take"]
+
+        blocker_event.set()
+        await encode_job_queue.join()
+
+        run_task.cancel()
+        return run_order, jobs
+
+    run_order, jobs = asyncio.run(main())
+
+    # 後から追加された優先度の高い書き出しが先に実行される
+    assert run_order == ["blocker", "take", "recovery"]
+    assert [job.record.state for job in jobs] == ["finished", "failed", "finished"]
+    assert jobs[0].progress_ratio == 0.5
+    assert load_encode_job_records(path=state_path) == []
+
+
+def test_encode_job_queue_cancels_jobs(tmp_path: Path) -> None:
+    state_path = tmp_path / "encode_jobs.json"
+
+    async def main() -> list[EncodeJob]:
+        encode_job_queue = EncodeJobQueue(state_path=state_path, max_workers=1)
+        started_event = asyncio.Event()
+
+        async def run_forever(job: EncodeJob) -> int:
+            started_event.set()
+            await asyncio.sleep(60)
+            return 0
+
+        async def run_never(job: EncodeJob) -> int:
+            raise AssertionError("A cancelled job must not run.")
+
+        run_task = asyncio.create_task(encode_job_queue.run())
+
+        running_job = await encode_job_queue.submit(
+            spool_dir=tmp_path / "running",
+            output_path=tmp_path / "running.m4a",
+            run=run_forever,
+        )
+        queued_job = await encode_job_queue.submit(
+            spool_dir=tmp_path / "queued",
+            output_path=tmp_path / "queued.m4a",
+            run=run_never,
+        )
+        await started_event.wait()
+
+        assert await encode_job_queue.cancel(job_id=queued_job.record.job_id)
+        assert await encode_job_queue.cancel(job_id=running_job.record.job_id)
+        await encode_job_queue.join()
+
+        assert not await encode_job_queue.cancel(job_id=running_job.record.job_id)
+
+        run_task.cancel()
+        return [running_job, queued_job]
+
+    jobs = asyncio.run(main())
+
+    assert [job.record.state for job in jobs] == ["cancelled", "cancelled"]
+    assert load_encode_job_records(path=state_path) == []
+
+
+def test_encode_job_queue_filters_active_jobs_by_priority(tmp_path: Path) -> None:
+    async def main() -> None:
+        encode_job_queue = EncodeJobQueue(max_workers=1)
+
+        async def run(job: EncodeJob) -> int:
+            return 0
+
+        recovery_job = await encode_job_queue.submit(
+            spool_dir=tmp_path / "recovery",
+            output_path=tmp_path / "recovery.m4a",
+            run=run,
+            priority=ENCODE_JOB_PRIORITY_RECOVERY,
+        )
+        take_job = await encode_job_queue.submit(
+            spool_dir=tmp_path / "take",
+            output_path=tmp_path / "take.m4a",
+            run=run,
+        )
+
+        assert encode_job_queue.get_active_jobs() == [recovery_job, take_job]
+        assert encode_job_queue.get_active_jobs(
+            priority=ENCODE_JOB_PRIORITY_RECORDING,
+        ) == [take_job]
+
+        # 録音したテイクの書き出しだけを中止しても、復旧の書き出しは残る
+        for job in encode_job_queue.get_active_jobs(
+            priority=ENCODE_JOB_PRIORITY_RECORDING,
+        ):
+            await encode_job_queue.cancel(job_id=job.record.job_id)
+
+        assert encode_job_queue.get_active_jobs() == [recovery_job]
+
+    asyncio.run(main())
+
+
+def test_encode_job_queue_restores_unfinished_jobs(tmp_path: Path) -> None:
+    state_path = tmp_path / "encode_jobs.json"
+
+    async def submit() -> None:
+        encode_job_queue = EncodeJobQueue(state_path=state_path)
+
+        async def run(job: EncodeJob) -> int:
+            return 0
+
+        # ワーカーを起動しないまま終了した
+        await encode_job_queue.submit(
+            spool_dir=tmp_path / "spool",
+            output_path=tmp_path / "rec.m4a",
+            run=run,
+        )
+
+    asyncio.run(submit())
+
+    encode_job_queue = EncodeJobQueue(state_path=state_path)
+    restored_records = encode_job_queue.pop_restored_records()
+    assert [Path(record.spool_dir).name for record in restored_records] == ["spool"]
+    assert encode_job_queue.pop_restored_records() == []
+
+
+def test_parse_ffmpeg_progress_line() -> None:
+    assert parse_ffmpeg_progress_line("out_time_us=1500000\n") == 1.5
+    assert parse_ffmpeg_progress_line("out_time_ms=2000000") == 2.0
+    assert parse_ffmpeg_progress_line("out_time_us=N/A") is None
+    assert parse_ffmpeg_progress_line("progress=continue") is None
@@ -0,0 +1,140 @@
+from pathlib import Path
+
+from multi_audio_track_record.ffmpeg import (
+    build_mixdown_filter_graph,
+    get_mixdown_command,
+)
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def create_scene_device(
+    tracks: list[int],
+    channel_tracks: list[list[int]] | None = None,
+) -> SceneDevice:
+    return SceneDevice(
+        portaudio_name="device",
+        portaudio_index=0,
+        portaudio_host_api_type=8,
+        portaudio_host_api_index=0,
+        portaudio_host_api_device_index=0,
+        sampling_rate=48000,
+        channels=2,
+        gain=0,
+        is_muted=False,
+        tracks=tracks,
+        channel_tracks=channel_tracks,
+    )
+
+
+def create_scene(
+    track_count: int,
+    devices: list[SceneDevice],
+    is_mix_bus_enabled: bool = False,
+) -> Scene:
+    return Scene(
+        name="scene",
+        output_dir=".",
+        tracks=[SceneTrack(name=f"track{i}") for i in range(track_count)],
+        devices=devices,
+        is_mix_bus_enabled=is_mix_bus_enabled,
+    )
+
+
+def test_build_mixdown_filter_graph_passes_single_source_through() -> None:
+    scene = create_scene(
+        track_count=2,
+        devices=[
+            create_scene_device(tracks=[0]),
+            create_scene_device(tracks=[1]),
+        ],
+    )
+
+    filter_graph = build_mixdown_filter_graph(scene=scene)
+
+    assert filter_graph.filter_complex == ""
+    assert filter_graph.track_map_specifiers == ["0:a:0", "1:a:0"]
+    assert not filter_graph.is_silence_used
+
+
+def test_build_mixdown_filter_graph_splits_shared_inputs_once() -> None:
+    scene = create_scene(
+        track_count=4,
+        devices=[
+            create_scene_device(tracks=[0, 1, 2]),
+            create_scene_device(tracks=[1]),
+            create_scene_device(tracks=[], channel_tracks=[[2], []]),
+        ],
+    )
+
+    filter_graph = build_mixdown_filter_graph(scene=scene)
+
+    assert filter_graph.filter_complex.split(";") == [
+        "[0:a:0]asplit=3[s0_0][s0_1][s0_2]",
+        "[s0_1][1:a:0]amix=inputs=2[t1]",
+        "[s0_2][2:a:0]amix=inputs=2[t2]",
+        "anullsrc[t3]",
+    ]
+    assert filter_graph.track_map_specifiers == ["[s0_0]", "[t1]", "[t2]", "[t3]"]
+    assert filter_graph.is_silence_used
+
+
+def test_get_mixdown_command_maps_every_track() -> None:
+    scene = create_scene(
+        track_count=3,
+        devices=[
+            create_scene_device(tracks=[0, 1]),
+            create_scene_device(tracks=[1]),
+        ],
+    )
+
+    cmd = get_mixdown_command(
+        scene=scene,
+        spool_dir=Path("spool"),
+        output_path=Path("out.m4a"),
+    )
+
+    assert cmd.count("-filter_complex") == 1
+    assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"] == [
+        "[s0_0]",
+        "[t1]",
+        "[t2]",
+    ]
+    assert "title=track2" == cmd[cmd.index("-metadata:s:a:2") + 1]
+    assert "-shortest" in cmd
+    assert "-movflags" not in cmd
+
+
+def test_get_mixdown_command_writes_fragments() -> None:
+    scene = create_scene(
+        track_count=1,
+        devices=[create_scene_device(tracks=[0])],
+    )
+
+    cmd = get_mixdown_command(
+        scene=scene,
+        spool_dir=Path("spool"),
+        output_path=Path("out.m4a"),
+        is_streaming=True,
+        fragment_seconds=2.5,
+    )
+
+    assert cmd[cmd.index("-movflags") + 1] == "+empty_moov+default_base_moof"
+    assert cmd[cmd.index("-frag_duration") + 1] == "2500000"
+    assert cmd[-1] == str(Path("out.m4a").resolve())
+
+
+def test_build_mixdown_filter_graph_maps_mixed_tracks() -> None:
+    scene = create_scene(
+        track_count=3,
+        devices=[
+            create_scene_device(tracks=[0, 2]),
+            create_scene_device(tracks=[], channel_tracks=[[2], []]),
+        ],
+        is_mix_bus_enabled=True,
+    )
+
+    filter_graph = build_mixdown_filter_graph(scene=scene)
+
+    # 録音中にミックスしたトラック0と2が入力0と1になる
+    assert filter_graph.filter_complex == "anullsrc[t1]"
+    assert filter_graph.track_map_specifiers == ["0:a:0", "[t1]", "1:a:0"]
@@ -0,0 +1,58 @@
+import numpy as np
+
+from multi_audio_track_record.dsp import GainProcessor, SampleFormatConverter
+
+
+def test_gain_processor_applies_decibel_gain() -> None:
+    gain_processor = GainProcessor(
+        sampling_rate=48000,
+        max_frames=256,
+        gain_decibel=-6.0,
+    )
+    frames = np.ones((256, 2), dtype=np.float32)
+
+    gain_processor.process(frames)
+
+    np.testing.assert_allclose(frames, 10 ** (-6.0 / 20), rtol=1e-6)
+
+
+def test_gain_processor_ramps_mute() -> None:
+    gain_processor = GainProcessor(
+        sampling_rate=1000,
+        max_frames=32,
+        ramp_seconds=0.016,
+    )
+    gain_processor.set_muted(True)
+
+    frames = np.ones((32, 1), dtype=np.float32)
+    gain_processor.process(frames)
+
+    # 16フレームかけて 1.0 から 0.0 に単調に下がり、その後は無音
+    ramp = frames[:16, 0]
+    assert np.all(np.diff(ramp) < 0)
+    assert ramp[-1] == 0.0
+    np.testing.assert_array_equal(frames[16:], 0.0)
+
+
+def test_sample_format_converter_sizes() -> None:
+    samples = np.array([[0.0, 1.0], [-1.0, 0.5]], dtype=np.float32)
+
+    for sample_format, sample_byte_count in [
+        ("f32le", 4),
+        ("s16le", 2),
+        ("s24le", 3),
+    ]:
+        sample_format_converter = SampleFormatConverter(
+            sample_format=sample_format,  # type:ignore[arg-type]
+            max_samples=4,
+        )
+        converted = sample_format_converter.convert(samples)
+        assert converted.nbytes == 4 * sample_byte_count
+
+    sample_format_converter = SampleFormatConverter(
+        sample_format="s24le",
+        max_samples=4,
+    )
+    converted_bytes = bytes(sample_format_converter.convert(samples))
+    assert converted_bytes[3:6] == (8388607).to_bytes(3, "little", signed=True)
+    assert converted_bytes[6:9] == (-8388607).to_bytes(3, "little", signed=True)
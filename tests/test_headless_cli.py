@@ -0,0 +1,251 @@
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from multi_audio_track_record.config_store_manager import Config
+from multi_audio_track_record.dsp import MeterReading
+from multi_audio_track_record.headless import (
+    format_elapsed_seconds,
+    format_track_levels,
+)
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack, find_scene
+
+
+def create_scene(name: str) -> Scene:
+    return Scene(
+        name=name,
+        output_dir=".",
+        tracks=[SceneTrack(name="voice"), SceneTrack(name="bgm")],
+        devices=[],
+    )
+
+
+def test_find_scene() -> None:
+    scenes = [create_scene(name="podcast"), create_scene(name="1")]
+
+    assert find_scene(scenes=scenes, scene_name="podcast") is scenes[0]
+    # 名前が一致するシーンを番号より優先する
+    assert find_scene(scenes=scenes, scene_name="1") is scenes[1]
+    assert find_scene(scenes=scenes, scene_name="0") is scenes[0]
+
+    with pytest.raises(ValueError):
+        find_scene(scenes=scenes, scene_name="2")
+
+
+def test_format_track_levels() -> None:
+    scene = create_scene(name="podcast")
+    reading = MeterReading(
+        peak_decibel=-12.34,
+        rms_decibel=-20.0,
+        peak_hold_decibel=-10.0,
+    )
+
+    assert format_elapsed_seconds(3723.9) == "01:02:03"
+    assert (
+        format_track_levels(scene=scene, track_meter_readings={1: reading})
+        == "bgm -12.3 dB"
+    )
+
+
+def test_list_scenes_does_not_import_flet(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        Config(
+            struct_version=1,
+            scenes=[create_scene(name="podcast")],
+            selected_scene_index=0,
+        ).model_dump_json(),
+        encoding="utf-8",
+    )
+
+    # 録音サーバーなど flet を使えない環境でも動くよう、GUI を読み込まない
+    code = (
+        "import asyncio, sys\n"
+        "from multi_audio_track_record.cli import main\n"
+        "import multi_audio_track_record.headless\n"
+        "return_code = asyncio.run(main())\n"
+        "assert 'flet' not in sys.modules, 'flet was imported'\n"
+        "sys.exit(return_code)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, "--config", str(config_path), "list-scenes"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "podcast" in result.stdout
+
+
+def write_silent_scene_config(tmp_path: Path) -> Path:
+    scene = Scene(
+        name="podcast",
+        output_dir=str(tmp_path / "out"),
+        tracks=[SceneTrack(name="voice")],
+        devices=[
+            SceneDevice(
+                portaudio_name="device",
+                portaudio_index=0,
+                portaudio_host_api_type=8,
+                portaudio_host_api_index=0,
+                portaudio_host_api_device_index=0,
+                sampling_rate=48000,
+                channels=1,
+                gain=0,
+                is_muted=False,
+                tracks=[0],
+            ),
+        ],
+        spool_dir=str(tmp_path / "spool"),
+    )
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        Config(
+            struct_version=1, scenes=[scene], selected_scene_index=0
+        ).model_dump_json(),
+        encoding="utf-8",
+    )
+    return config_path
+
+
+def get_silent_cli_code(module_name: str) -> str:
+    """音声入力デバイスの代わりに無音を録音して CLI を実行するコード"""
+    return (
+        "import asyncio, sys\n"
+        "from multi_audio_track_record.cli import main\n"
+        f"from multi_audio_track_record.headless import {module_name}\n"
+        "from tests.test_control_server import SilentAudioCaptureEngine\n"
+        f"{module_name}.AudioCaptureEnginePyAudio = SilentAudioCaptureEngine\n"
+        "sys.exit(asyncio.run(main()))\n"
+    )
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "killpg") or shutil.which("ffmpeg") is None,
+    reason="Process groups or FFmpeg are not available.",
+)
+def test_record_finishes_encoding_on_sigint_to_process_group(tmp_path: Path) -> None:
+    scene = Scene(
+        name="podcast",
+        output_dir=str(tmp_path / "out"),
+        tracks=[SceneTrack(name="voice")],
+        devices=[
+            SceneDevice(
+                portaudio_name="device",
+                portaudio_index=0,
+                portaudio_host_api_type=8,
+                portaudio_host_api_index=0,
+                portaudio_host_api_device_index=0,
+                sampling_rate=48000,
+                channels=1,
+                gain=0,
+                is_muted=False,
+                tracks=[0],
+            ),
+        ],
+        spool_dir=str(tmp_path / "spool"),
+    )
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        Config(
+            struct_version=1, scenes=[scene], selected_scene_index=0
+        ).model_dump_json(),
+        encoding="utf-8",
+    )
+
+    # 音声入力デバイスの代わりに無音を録音する
+    code = (
+        "import asyncio, sys\n"
+        "from multi_audio_track_record.cli import main\n"
+        "from multi_audio_track_record.headless import record_command\n"
+        "from tests.test_control_server import SilentAudioCaptureEngine\n"
+        "record_command.AudioCaptureEnginePyAudio = SilentAudioCaptureEngine\n"
+        "sys.exit(asyncio.run(main()))\n"
+    )
+    # 端末で Ctrl+C を押した時と同じく、プロセスグループ全体に SIGINT を送れるようにする
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code, "--config", str(config_path), "record"]
+        + ["--status-interval", "0.1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+        start_new_session=True,
+    )
+    try:
+        assert proc.stderr is not None
+        for line in proc.stderr:
+            # 録音を始め、経過時間を表示した後に止める
+            if line.startswith("[00:00:"):
+                break
+        os.killpg(proc.pid, signal.SIGINT)
+
+        stdout, stderr = proc.communicate(timeout=30)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+    # FFmpeg は SIGINT を受け取らず、録音の終わりまでエンコードする
+    assert proc.returncode == 0, stderr
+    output_path = Path(stdout.strip())
+    assert output_path.is_file()
+    assert output_path.stat().st_size > 0
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "killpg")
+    or not hasattr(socket, "AF_UNIX")
+    or shutil.which("ffmpeg") is None,
+    reason="Process groups, UNIX domain sockets or FFmpeg are not available.",
+)
+def test_serve_finishes_encoding_on_sigint_to_process_group(tmp_path: Path) -> None:
+    config_path = write_silent_scene_config(tmp_path=tmp_path)
+    unix_socket_path = tmp_path / "control.sock"
+
+    proc = subprocess.Popen(
+        [sys.executable, "-c", get_silent_cli_code(module_name="serve_command")]
+        + ["--config", str(config_path), "serve", "--arm"]
+        + ["--unix-socket", str(unix_socket_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "XDG_CACHE_HOME": str(tmp_path / "cache")},
+        start_new_session=True,
+    )
+    try:
+        assert proc.stderr is not None
+        for line in proc.stderr:
+            if line.startswith("Listening on"):
+                break
+
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(unix_socket_path))
+            client.sendall(
+                b"POST /start HTTP/1.1\r\nHost: localhost\r\n"
+                b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+            assert client.recv(1024).startswith(b"HTTP/1.1 200 ")
+
+        time.sleep(0.5)
+        # 1回目の Ctrl+C では、録音を終えて書き出しを待つ
+        os.killpg(proc.pid, signal.SIGINT)
+
+        _, stderr = proc.communicate(timeout=30)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+    assert proc.returncode == 0, stderr
+    output_paths = list((tmp_path / "out").glob("rec_*.m4a"))
+    assert len(output_paths) == 1
+    assert output_paths[0].stat().st_size > 0
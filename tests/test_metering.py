@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from multi_audio_track_record.dsp import (
+    MIN_METER_DECIBEL,
+    LevelMeter,
+    MeterReading,
+    decibel_to_meter_value,
+)
+from multi_audio_track_record.recorder import (
+    get_capture_sources,
+    get_track_meter_readings,
+)
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def test_level_meter_measures_peak_and_rms() -> None:
+    level_meter = LevelMeter(sampling_rate=1000, channels=2, max_frames=100)
+
+    frames = np.zeros((100, 2), dtype=np.float32)
+    frames[:, 0] = 0.5
+    level_meter.process(frames)
+
+    readings = level_meter.get_readings()
+    assert readings[0].peak_decibel == pytest.approx(-6.02, abs=0.01)
+    assert readings[0].rms_decibel == pytest.approx(-6.02, abs=0.01)
+    assert readings[1].peak_decibel == MIN_METER_DECIBEL
+    assert readings[1].rms_decibel == MIN_METER_DECIBEL
+
+
+def test_level_meter_holds_and_decays_peak() -> None:
+    level_meter = LevelMeter(
+        sampling_rate=1000,
+        channels=1,
+        max_frames=100,
+        decay_decibel_per_second=20.0,
+        hold_seconds=0.25,
+    )
+
+    level_meter.process(np.ones((100, 1), dtype=np.float32))
+    silence = np.zeros((100, 1), dtype=np.float32)
+    for _ in range(2):
+        level_meter.process(silence)
+
+    # 0.2秒後: ピークは 4 dB 減衰し、ピークホールドは保持されている
+    reading = level_meter.get_readings()[0]
+    assert reading.peak_decibel == pytest.approx(-4.0)
+    assert reading.peak_hold_decibel == pytest.approx(0.0)
+
+    for _ in range(3):
+        level_meter.process(silence)
+
+    # 0.5秒後: ピークホールドも保持時間を過ぎて減衰している
+    reading = level_meter.get_readings()[0]
+    assert reading.peak_decibel == pytest.approx(-10.0)
+    assert -10.0 <= reading.peak_hold_decibel < 0.0
+
+
+def test_decibel_to_meter_value() -> None:
+    assert decibel_to_meter_value(MIN_METER_DECIBEL) == 0.0
+    assert decibel_to_meter_value(-30.0) == pytest.approx(0.5)
+    assert decibel_to_meter_value(3.0) == 1.0
+
+
+def test_get_track_meter_readings_applies_routing_and_gain() -> None:
+    def create_scene_device(
+        gain: float,
+        is_muted: bool,
+        channel_tracks: list[list[int]] | None,
+    ) -> SceneDevice:
+        return SceneDevice(
+            portaudio_name="device",
+            portaudio_index=0,
+            portaudio_host_api_type=8,
+            portaudio_host_api_index=0,
+            portaudio_host_api_device_index=0,
+            sampling_rate=48000,
+            channels=2,
+            gain=gain,
+            is_muted=is_muted,
+            tracks=[0],
+            channel_tracks=channel_tracks,
+        )
+
+    scene = Scene(
+        name="scene",
+        output_dir=".",
+        tracks=[SceneTrack(name="a"), SceneTrack(name="b"), SceneTrack(name="c")],
+        devices=[
+            create_scene_device(gain=-6.0, is_muted=False, channel_tracks=None),
+            create_scene_device(gain=0.0, is_muted=False, channel_tracks=[[], [1]]),
+            create_scene_device(gain=0.0, is_muted=True, channel_tracks=None),
+        ],
+    )
+    scene.devices[2].tracks = [2]
+
+    def create_meter_reading(decibel: float) -> MeterReading:
+        return MeterReading(
+            peak_decibel=decibel,
+            rms_decibel=decibel,
+            peak_hold_decibel=decibel,
+        )
+
+    track_meter_readings = get_track_meter_readings(
+        scene=scene,
+        capture_sources=get_capture_sources(scene=scene),
+        device_meter_readings={
+            0: [create_meter_reading(-10.0), create_meter_reading(-20.0)],
+            1: [create_meter_reading(-3.0), create_meter_reading(-12.0)],
+            2: [create_meter_reading(0.0), create_meter_reading(0.0)],
+        },
+        is_muted=False,
+    )
+
+    assert track_meter_readings[0].peak_decibel == pytest.approx(-16.0)
+    assert track_meter_readings[1].peak_decibel == pytest.approx(-12.0)
+    assert track_meter_readings[2].peak_decibel == MIN_METER_DECIBEL
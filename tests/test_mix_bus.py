@@ -0,0 +1,61 @@
+import numpy as np
+
+from multi_audio_track_record.dsp import MixBus
+
+
+def test_mix_bus_sums_aligned_inputs() -> None:
+    mix_bus = MixBus(
+        channels=2,
+        input_count=2,
+        capacity_frames=64,
+        is_normalized=False,
+    )
+    out = np.empty((64, 2), dtype=np.float32)
+
+    mix_bus.add(input_index=0, frames=np.full((16, 2), 0.25, dtype=np.float32))
+    # もう一方の入力が加算するまで読み出せない
+    assert mix_bus.read_into(out) == 0
+
+    # モノラルの入力は全チャンネルに加算する
+    mix_bus.add(input_index=1, frames=np.full(8, 0.5, dtype=np.float32))
+    assert mix_bus.read_into(out) == 8
+    np.testing.assert_allclose(out[:8], 0.75)
+
+    mix_bus.finish_input(input_index=1)
+    assert mix_bus.read_into(out) == 8
+    np.testing.assert_allclose(out[:8], 0.25)
+
+    mix_bus.finish_input(input_index=0)
+    assert mix_bus.is_finished
+
+
+def test_mix_bus_normalizes_by_input_count_by_default() -> None:
+    mix_bus = MixBus(channels=1, input_count=2, capacity_frames=64)
+    out = np.empty((64, 1), dtype=np.float32)
+
+    # FFmpeg の amix と同じく、入力の平均にする
+    mix_bus.add(input_index=0, frames=np.full((8, 1), 0.5, dtype=np.float32))
+    mix_bus.add(input_index=1, frames=np.full((8, 1), 1.0, dtype=np.float32))
+    assert mix_bus.read_into(out) == 8
+    np.testing.assert_allclose(out[:8], 0.75)
+
+
+def test_mix_bus_advances_lagging_input() -> None:
+    mix_bus = MixBus(
+        channels=1,
+        input_count=2,
+        capacity_frames=64,
+        max_lag_frames=16,
+        is_normalized=False,
+    )
+    out = np.empty((64, 1), dtype=np.float32)
+
+    mix_bus.add(input_index=0, frames=np.ones((24, 1), dtype=np.float32))
+    # 遅れた入力を無音とみなし、最も進んだ入力から16フレーム以内まで読み出せる
+    assert mix_bus.read_into(out) == 8
+    assert mix_bus.lagged_frame_count == 8
+
+    # 遅れて届いた先頭の8フレームは読み捨て、続きから位置を揃えて加算する
+    mix_bus.add(input_index=1, frames=np.full((24, 1), 2.0, dtype=np.float32))
+    assert mix_bus.read_into(out) == 16
+    np.testing.assert_allclose(out[:16], 3.0)
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+from multi_audio_track_record.ffmpeg import get_mux_command, get_track_encode_command
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def create_scene_device(tracks: list[int]) -> SceneDevice:
+    return SceneDevice(
+        portaudio_name="device",
+        portaudio_index=0,
+        portaudio_host_api_type=8,
+        portaudio_host_api_index=0,
+        portaudio_host_api_device_index=0,
+        sampling_rate=48000,
+        channels=2,
+        gain=0,
+        is_muted=False,
+        tracks=tracks,
+    )
+
+
+def create_scene(track_count: int, devices: list[SceneDevice]) -> Scene:
+    return Scene(
+        name="scene",
+        output_dir=".",
+        tracks=[SceneTrack(name=f"track{i}") for i in range(track_count)],
+        devices=devices,
+        is_mix_bus_enabled=False,
+    )
+
+
+def test_get_track_encode_command_uses_only_track_inputs() -> None:
+    scene = create_scene(
+        track_count=3,
+        devices=[
+            create_scene_device(tracks=[0, 1]),
+            create_scene_device(tracks=[1]),
+        ],
+    )
+
+    cmd = get_track_encode_command(
+        scene=scene,
+        track_index=0,
+        spool_dir=Path("spool"),
+        output_path=Path("track0.m4a"),
+        duration_seconds=1.0,
+    )
+    assert cmd.count("-i") == 1
+    assert "-filter_complex" not in cmd
+
+    cmd = get_track_encode_command(
+        scene=scene,
+        track_index=1,
+        spool_dir=Path("spool"),
+        output_path=Path("track1.m4a"),
+        duration_seconds=1.0,
+    )
+    assert cmd.count("-i") == 2
+    assert cmd[cmd.index("-filter_complex") + 1] == "[0:a:0][1:a:0]amix=inputs=2"
+
+    cmd = get_track_encode_command(
+        scene=scene,
+        track_index=2,
+        spool_dir=Path("spool"),
+        output_path=Path("track2.m4a"),
+        duration_seconds=1.5,
+    )
+    assert cmd[cmd.index("-i") + 1] == "anullsrc"
+    assert cmd[cmd.index("-t") + 1] == "1.500000"
+
+
+def test_get_mux_command_copies_streams_with_track_names() -> None:
+    scene = create_scene(
+        track_count=2,
+        devices=[create_scene_device(tracks=[0, 1])],
+    )
+
+    cmd = get_mux_command(
+        scene=scene,
+        track_paths=[Path("track0.m4a"), Path("track1.m4a")],
+        output_path=Path("out.m4a"),
+    )
+
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"] == [
+        "0:a:0",
+        "1:a:0",
+    ]
+    assert "title=track1" in cmd
+    assert "handler_name=track1" in cmd
+    assert "-filter_complex" not in cmd
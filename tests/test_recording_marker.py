@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+from multi_audio_track_record.ffmpeg import format_ffmetadata_chapters
+from multi_audio_track_record.recording_marker import (
+    RecordingMarker,
+    RecordingMarkerIndex,
+    get_marker_index_path,
+    load_marker_index,
+    save_marker_index,
+)
+
+
+def create_marker_index(duration_frames: int | None) -> RecordingMarkerIndex:
+    created_at = datetime(2024, 4, 1, tzinfo=timezone.utc)
+    return RecordingMarkerIndex(
+        recording_started_at=created_at,
+        sampling_rate=48000,
+        duration_frames=duration_frames,
+        markers=[
+            RecordingMarker(
+                position_seconds=position_frames / 48000,
+                position_frames=position_frames,
+                label=label,
+                created_at=created_at,
+            )
+            for position_frames, label in [
+                (96000, "intro"),
+                (4_800_000, "Q&A; part=2"),
+            ]
+        ],
+    )
+
+
+def test_format_ffmetadata_chapters() -> None:
+    assert format_ffmetadata_chapters(
+        marker_index=create_marker_index(duration_frames=9_600_000),
+    ) == (
+        ";FFMETADATA1\n"
+        "[CHAPTER]\nTIMEBASE=1/48000\nSTART=96000\nEND=4800000\ntitle=intro\n"
+        "[CHAPTER]\nTIMEBASE=1/48000\nSTART=4800000\nEND=9600000\n"
+        "title=Q&A\\; part\\=2\n"
+    )
+
+
+def test_marker_index_get_range() -> None:
+    marker_index = create_marker_index(duration_frames=None)
+
+    first_segment = marker_index.get_range(start_seconds=0.0, duration_seconds=60.0)
+    assert [marker.label for marker in first_segment.markers] == ["intro"]
+    assert first_segment.duration_frames == 2_880_000
+
+    second_segment = marker_index.get_range(
+        start_seconds=60.0,
+        duration_seconds=60.0,
+    )
+    assert [
+        (marker.label, marker.position_frames) for marker in second_segment.markers
+    ] == [("Q&A; part=2", 4_800_000 - 2_880_000)]
+
+
+def test_save_and_load_marker_index(tmp_path: Path) -> None:
+    path = get_marker_index_path(tmp_path / "rec_2024-04-01T00-00-00Z.m4a")
+    assert path.name == "rec_2024-04-01T00-00-00Z.markers.json"
+    assert load_marker_index(path=path) is None
+
+    marker_index = create_marker_index(duration_frames=9_600_000)
+    save_marker_index(path=path, marker_index=marker_index)
+
+    assert load_marker_index(path=path) == marker_index
+    assert [child.name for child in tmp_path.iterdir()] == [path.name]
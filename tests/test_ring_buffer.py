@@ -0,0 +1,95 @@
+import numpy as np
+
+from multi_audio_track_record.dsp import AudioRingBuffer
+
+
+def test_ring_buffer_wraps_around() -> None:
+    ring_buffer = AudioRingBuffer(capacity_frames=4, channels=2)
+    out = np.zeros((4, 2), dtype=np.float32)
+
+    frames = np.arange(6, dtype=np.float32).reshape(3, 2)
+    assert ring_buffer.write(frames) == 3
+    assert ring_buffer.read_into(out[:2]) == 2
+
+    frames = np.arange(6, 12, dtype=np.float32).reshape(3, 2)
+    assert ring_buffer.write(frames) == 3
+    assert ring_buffer.readable_frame_count == 4
+
+    assert ring_buffer.read_into(out) == 4
+    np.testing.assert_array_equal(
+        out,
+        np.array([[4, 5], [6, 7], [8, 9], [10, 11]], dtype=np.float32),
+    )
+
+
+def test_ring_buffer_counts_overflow() -> None:
+    ring_buffer = AudioRingBuffer(capacity_frames=4, channels=1)
+
+    frames = np.ones((6, 1), dtype=np.float32)
+    assert ring_buffer.write(frames) == 4
+    assert ring_buffer.overflow_frame_count == 2
+
+    assert ring_buffer.skip(10) == 4
+    assert ring_buffer.readable_frame_count == 0
+
+
+def test_ring_buffer_records_overflow_position() -> None:
+    ring_buffer = AudioRingBuffer(capacity_frames=4, channels=1)
+    out = np.zeros((4, 1), dtype=np.float32)
+
+    # 続けて捨てた分は、次に書き込めたブロックの直前で1つにまとめて公開する
+    assert ring_buffer.write(np.ones((6, 1), dtype=np.float32)) == 4
+    assert ring_buffer.write(np.ones((3, 1), dtype=np.float32)) == 0
+    assert ring_buffer.peek_overflow_event() is None
+    assert ring_buffer.pending_overflow_frame_count == 5
+
+    assert ring_buffer.read_into(out[:2]) == 2
+    assert ring_buffer.write(np.ones((2, 1), dtype=np.float32)) == 2
+    assert ring_buffer.peek_overflow_event() == (4, 5)
+    assert ring_buffer.pending_overflow_frame_count == 0
+
+    ring_buffer.pop_overflow_event()
+    assert ring_buffer.peek_overflow_event() is None
+    assert ring_buffer.overflow_frame_count == 5
+
+
+def test_ring_buffer_holds_writes_while_overflow_events_are_full() -> None:
+    ring_buffer = AudioRingBuffer(
+        capacity_frames=2,
+        channels=1,
+        overflow_event_capacity=1,
+    )
+    out = np.zeros((2, 1), dtype=np.float32)
+    frames = np.ones((3, 1), dtype=np.float32)
+
+    assert ring_buffer.write(frames) == 2
+    assert ring_buffer.read_into(out) == 2
+    assert ring_buffer.write(frames) == 2
+    assert ring_buffer.peek_overflow_event() == (2, 1)
+
+    # 記録が取り出されるまでは、位置がずれないよう書き込まずに捨てる
+    assert ring_buffer.read_into(out) == 2
+    assert ring_buffer.write(frames) == 0
+    assert ring_buffer.pending_overflow_frame_count == 4
+
+    ring_buffer.pop_overflow_event()
+    assert ring_buffer.write(frames) == 2
+    assert ring_buffer.peek_overflow_event() == (4, 4)
+    assert ring_buffer.pending_overflow_frame_count == 1
+
+
+def test_ring_buffer_skip_discards_overflow_events() -> None:
+    ring_buffer = AudioRingBuffer(capacity_frames=2, channels=1)
+    out = np.zeros((2, 1), dtype=np.float32)
+    frames = np.ones((3, 1), dtype=np.float32)
+
+    assert ring_buffer.write(frames) == 2
+    assert ring_buffer.read_into(out[:1]) == 1
+    assert ring_buffer.write(frames[:1]) == 1
+    assert ring_buffer.peek_overflow_event() == (2, 1)
+
+    # 捨てた位置の直前までを読み捨てた場合は、後続のフレームのために記録を残す
+    assert ring_buffer.skip(1) == 1
+    assert ring_buffer.peek_overflow_event() == (2, 1)
+    assert ring_buffer.skip(1) == 1
+    assert ring_buffer.peek_overflow_event() is None
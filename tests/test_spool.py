@@ -0,0 +1,96 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from multi_audio_track_record.recorder import (
+    SpoolStream,
+    create_spool_fifos,
+    is_spool_fifo_supported,
+    open_spool_file,
+)
+
+
+@pytest.mark.skipif(
+    not is_spool_fifo_supported(),
+    reason="Named pipes are not supported on this platform.",
+)
+def test_open_spool_file_streams_to_fifo_reader(tmp_path: Path) -> None:
+    spool_stream = SpoolStream(
+        filename="track0.bin",
+        sampling_rate=48000,
+        channels=2,
+        tracks=[0],
+    )
+    create_spool_fifos(spool_dir=tmp_path, spool_streams=[spool_stream])
+    spool_path = tmp_path / spool_stream.filename
+
+    data = bytes(range(256)) * 1024
+
+    # 読み出し側より先に開いてもブロックしない
+    with open_spool_file(spool_path) as fp:
+        received: list[bytes] = []
+
+        def read_all() -> None:
+            with spool_path.open("rb") as reader:
+                received.append(reader.read())
+
+        reader_thread = threading.Thread(target=read_all)
+        reader_thread.start()
+
+        fp.write(memoryview(data))
+
+    reader_thread.join(timeout=10)
+
+    assert received == [data]
+
+
+@pytest.mark.skipif(
+    not is_spool_fifo_supported(),
+    reason="Named pipes are not supported on this platform.",
+)
+def test_open_spool_file_waits_for_late_fifo_reader_on_close(tmp_path: Path) -> None:
+    spool_stream = SpoolStream(
+        filename="track0.bin",
+        sampling_rate=48000,
+        channels=2,
+        tracks=[0],
+    )
+    create_spool_fifos(spool_dir=tmp_path, spool_streams=[spool_stream])
+    spool_path = tmp_path / spool_stream.filename
+
+    data = b"short take"
+    received: list[bytes] = []
+
+    def read_all_later() -> None:
+        # FFmpeg が前の入力を開いている間に、録音スレッドが書き終えて閉じる場合
+        time.sleep(0.2)
+        with spool_path.open("rb") as reader:
+            received.append(reader.read())
+
+    reader_thread = threading.Thread(target=read_all_later)
+    reader_thread.start()
+
+    # 読み出し側が開くまで閉じ終えず、書き込んだ分はパイプに残る
+    with open_spool_file(spool_path) as fp:
+        fp.write(data)
+
+    reader_thread.join(timeout=10)
+
+    assert received == [data]
+
+    # 読み出し側が開かないまま時間が経つと、閉じる時に例外を送出する
+    fp = open_spool_file(spool_path, fifo_write_timeout_seconds=0.05)
+    fp.write(data)
+    with pytest.raises(TimeoutError):
+        fp.close()
+
+
+def test_open_spool_file_creates_regular_file(tmp_path: Path) -> None:
+    spool_path = tmp_path / "0.bin"
+
+    with open_spool_file(spool_path) as fp:
+        fp.write(b"abc")
+
+    assert spool_path.read_bytes() == b"abc"
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import numpy as np
+
+from multi_audio_track_record.recorder import SpoolDiskWriter
+
+
+def test_spool_disk_writer_writes_in_batches(tmp_path: Path) -> None:
+    spool_disk_writer = SpoolDiskWriter(batch_byte_count=4096, buffer_count=1)
+    spool_disk_writer.start()
+
+    samples = np.arange(10000, dtype="<f4")
+    data = samples.tobytes()
+
+    paths = [tmp_path / "0.bin", tmp_path / "1.bin"]
+    fps = [spool_disk_writer.wrap(path.open("wb")) for path in paths]
+    for offset in range(0, len(data), 1000):
+        for fp in fps:
+            fp.write(data[offset : offset + 1000])
+
+    for fp in fps:
+        fp.close()
+
+    spool_disk_writer.finish()
+    spool_disk_writer.join()
+
+    assert spool_disk_writer.error is None
+    for path in paths:
+        assert path.read_bytes() == data
+
+    stats = spool_disk_writer.get_stats()
+    assert stats.written_byte_count == len(data) * 2
+    # 1000 バイトずつの書き込みが、 4096 バイトずつにまとめられる
+    assert stats.write_count == 2 * -(-len(data) // 4096)
+    assert stats.queue_depth == 0
+    assert stats.max_queue_depth >= 1
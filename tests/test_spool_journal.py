@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from multi_audio_track_record.encoder import finalize_spool_dir
+from multi_audio_track_record.recorder import (
+    Recorder,
+    SpoolJournalWriter,
+    create_spool_journal,
+    find_unfinished_spool_dirs,
+    get_spool_streams,
+    load_spool_journal,
+)
+from multi_audio_track_record.recording_session import RecordingSession
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+from .test_control_server import SilentAudioCaptureEngine
+
+
+def create_scene(output_dir: Path) -> Scene:
+    return Scene(
+        name="scene",
+        output_dir=str(output_dir),
+        tracks=[SceneTrack(name="track0")],
+        devices=[
+            SceneDevice(
+                portaudio_name="device",
+                portaudio_index=0,
+                portaudio_host_api_type=8,
+                portaudio_host_api_index=0,
+                portaudio_host_api_device_index=0,
+                sampling_rate=48000,
+                channels=2,
+                gain=0,
+                is_muted=False,
+                tracks=[0],
+            ),
+        ],
+        encoder_type="wave",
+    )
+
+
+def test_finalize_spool_dir_uses_synced_byte_counts(tmp_path: Path) -> None:
+    scene = create_scene(output_dir=tmp_path / "output")
+    spool_root_dir = tmp_path / "spool"
+    spool_dir = spool_root_dir / "rec"
+    spool_dir.mkdir(parents=True)
+
+    spool_streams = get_spool_streams(scene=scene)
+    spool_path = spool_dir / spool_streams[0].filename
+    spool_path.write_bytes(np.zeros((1000, 2), dtype="<f4").tobytes())
+
+    spool_journal_writer = SpoolJournalWriter(
+        spool_dir=spool_dir,
+        spool_journal=create_spool_journal(
+            scene=scene,
+            output_path=tmp_path / "output" / "rec.wav",
+            is_streaming=False,
+            segment_seconds=None,
+            spool_streams=spool_streams,
+        ),
+    )
+    spool_journal_writer.sync()
+
+    # 最後の同期より後に書き込まれた、フレームの途中までのデータは捨てられる
+    with spool_path.open("ab") as fp:
+        fp.write(b"\x00" * 6)
+
+    unfinished_spool_dirs = find_unfinished_spool_dirs(spool_root_dir=spool_root_dir)
+    assert [spool_dir for spool_dir, _ in unfinished_spool_dirs] == [spool_dir]
+
+    _, spool_journal = unfinished_spool_dirs[0]
+    assert spool_journal.streams[0].byte_count == 1000 * 2 * 4
+
+    return_code = asyncio.run(
+        finalize_spool_dir(spool_dir=spool_dir, spool_journal=spool_journal)
+    )
+    assert return_code == 0
+    assert not spool_dir.exists()
+    assert find_unfinished_spool_dirs(spool_root_dir=spool_root_dir) == []
+
+    output = (tmp_path / "output" / "rec.track0.wav").read_bytes()
+    data_chunk_offset = output.index(b"data")
+    assert len(output) - data_chunk_offset - 8 == 1000 * 2 * 4
+
+
+def test_recording_session_syncs_journal_at_scene_interval(tmp_path: Path) -> None:
+    scene = create_scene(output_dir=tmp_path / "output").model_copy(
+        update={"spool_journal_sync_interval_seconds": 0.05},
+    )
+
+    async def main() -> list[datetime]:
+        recording_session = RecordingSession(
+            recorder=Recorder(audio_capture_engine=SilentAudioCaptureEngine()),
+            scene=scene,
+            spool_root_dir=tmp_path / "spool",
+        )
+        await recording_session.start(is_muted=False)
+        spool_dir = recording_session.spool_dir
+        assert spool_dir is not None
+
+        # 既定の 1 秒より短い間隔で、録音中にジャーナルが更新される
+        updated_ats = [load_spool_journal(spool_dir=spool_dir).updated_at]
+        for _ in range(3):
+            await asyncio.sleep(0.1)
+            updated_ats.append(load_spool_journal(spool_dir=spool_dir).updated_at)
+
+        await recording_session.stop()
+        assert await recording_session.encode() == 0
+
+        return updated_ats
+
+    updated_ats = asyncio.run(main())
+
+    assert len(set(updated_ats)) == len(updated_ats)
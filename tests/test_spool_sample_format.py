@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import numpy as np
+
+from multi_audio_track_record.dsp import SampleFormat, SampleFormatConverter
+from multi_audio_track_record.encoder import decode_spool_samples
+from multi_audio_track_record.ffmpeg import get_spool_input_args
+from multi_audio_track_record.recorder import get_spool_streams, read_flac_frame_count
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def create_scene_device(
+    tracks: list[int],
+    spool_sample_format: SampleFormat,
+) -> SceneDevice:
+    return SceneDevice(
+        portaudio_name="device",
+        portaudio_index=0,
+        portaudio_host_api_type=8,
+        portaudio_host_api_index=0,
+        portaudio_host_api_device_index=0,
+        sampling_rate=48000,
+        channels=2,
+        gain=0,
+        is_muted=False,
+        tracks=tracks,
+        spool_sample_format=spool_sample_format,
+    )
+
+
+def test_get_spool_streams_uses_device_sample_format() -> None:
+    devices = [
+        create_scene_device(tracks=[0], spool_sample_format="s16le"),
+        create_scene_device(tracks=[0, 1], spool_sample_format="s24le"),
+    ]
+    scene = Scene(
+        name="scene",
+        output_dir=".",
+        tracks=[SceneTrack(name="track0"), SceneTrack(name="track1")],
+        devices=devices,
+        is_mix_bus_enabled=False,
+        is_spool_flac_enabled=True,
+    )
+
+    spool_streams = get_spool_streams(scene=scene)
+    assert [spool_stream.sample_format for spool_stream in spool_streams] == [
+        "s16le",
+        "s24le",
+    ]
+    assert [spool_stream.frame_byte_count for spool_stream in spool_streams] == [4, 6]
+    assert all(spool_stream.is_flac_compressed for spool_stream in spool_streams)
+
+    # ミックスしたトラックは、入力のうち最も精度の高い形式で書き込む
+    scene.is_mix_bus_enabled = True
+    scene.is_spool_flac_enabled = False
+    spool_streams = get_spool_streams(scene=scene)
+    assert [spool_stream.sample_format for spool_stream in spool_streams] == [
+        "s24le",
+        "s24le",
+    ]
+    assert not any(spool_stream.is_flac_compressed for spool_stream in spool_streams)
+
+    cmd = get_spool_input_args(
+        spool_stream=spool_streams[0],
+        spool_path=Path("track0.bin"),
+    )
+    assert cmd[:6] == ["-f", "s24le", "-ar", "48000", "-ac", "2"]
+
+    spool_streams[0].is_flac_compressed = True
+    cmd = get_spool_input_args(
+        spool_stream=spool_streams[0],
+        spool_path=Path("track0.bin"),
+    )
+    assert cmd[:3] == ["-f", "flac", "-i"]
+
+
+def test_decode_spool_samples_restores_converted_samples() -> None:
+    samples = np.array(
+        [[0.0, 0.5], [-0.5, 1.0], [-1.0, 0.25]],
+        dtype=np.float32,
+    )
+
+    for sample_format, tolerance in [
+        ("f32le", 0.0),
+        ("s16le", 1 / 32767),
+        ("s24le", 1 / 8388607),
+    ]:
+        converter = SampleFormatConverter(
+            sample_format=sample_format,  # type: ignore[arg-type]
+            max_samples=samples.size,
+        )
+        decoded = decode_spool_samples(
+            data=bytes(converter.convert(samples)),
+            sample_format=sample_format,  # type: ignore[arg-type]
+            channels=2,
+        )
+
+        assert decoded.dtype == np.float32
+        assert decoded.shape == samples.shape
+        assert np.allclose(decoded, samples, atol=tolerance)
+
+
+def test_read_flac_frame_count(tmp_path: Path) -> None:
+    path = tmp_path / "0.bin"
+
+    # STREAMINFO: 48000 Hz, 2 channels, 16 bit, 123456 frames
+    stream_info = (
+        bytes(10)
+        + ((48000 << 44) | ((2 - 1) << 41) | ((16 - 1) << 36) | 123456).to_bytes(
+            8, "big"
+        )
+        + bytes(16)
+    )
+    path.write_bytes(b"fLaC" + bytes([0x80, 0, 0, 34]) + stream_info)
+    assert read_flac_frame_count(path) == 123456
+
+    # 書き込み途中で総フレーム数が記録されていない
+    path.write_bytes(b"fLaC" + bytes([0x80, 0, 0, 34]) + bytes(34))
+    assert read_flac_frame_count(path) is None
@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from multi_audio_track_record.recorder import (
+    SpoolSegmenter,
+    SpoolStream,
+    save_segment_manifest,
+)
+
+
+def test_spool_segmenter_splits_streams_on_frame_boundaries(tmp_path: Path) -> None:
+    spool_streams = [
+        SpoolStream(filename="track0.bin", sampling_rate=100, channels=2, tracks=[0]),
+        SpoolStream(filename="track1.bin", sampling_rate=50, channels=1, tracks=[1]),
+    ]
+    spool_segmenter = SpoolSegmenter(
+        spool_dir=tmp_path,
+        spool_streams=spool_streams,
+        segment_seconds=1.0,
+    )
+
+    track0_samples = np.arange(250 * 2, dtype="<f4")
+    track1_samples = np.arange(120, dtype="<f4")
+
+    track0_fp = spool_segmenter.open_spool_file("track0.bin")
+    track1_fp = spool_segmenter.open_spool_file("track1.bin")
+
+    # フレームの途中で区切られた書き込みも、境界で正しく分ける
+    track0_bytes = track0_samples.tobytes()
+    for offset in range(0, len(track0_bytes), 333):
+        track0_fp.write(track0_bytes[offset : offset + 333])
+        track0_fp.flush()
+
+    # track1 が書き終えるまで、セグメントは終わらない
+    assert spool_segmenter.poll_finished_segments() == []
+
+    track1_fp.write(track1_samples.tobytes())
+    track1_fp.flush()
+
+    finished_segments = spool_segmenter.poll_finished_segments()
+    assert [segment.segment_index for segment in finished_segments] == [0, 1]
+    assert [stream.frame_count for stream in finished_segments[1].streams] == [
+        100,
+        50,
+    ]
+    assert [stream.start_frame for stream in finished_segments[1].streams] == [
+        100,
+        50,
+    ]
+
+    track0_fp.close()
+    track1_fp.close()
+
+    last_segments = spool_segmenter.poll_finished_segments()
+    assert [segment.segment_index for segment in last_segments] == [2]
+    assert [stream.frame_count for stream in last_segments[0].streams] == [50, 20]
+
+    segment1_track0 = np.frombuffer(
+        (tmp_path / "segment0001" / "track0.bin").read_bytes(), dtype="<f4"
+    )
+    assert np.array_equal(segment1_track0, track0_samples[200:400])
+
+    manifest_path = tmp_path / "rec.segments.json"
+    save_segment_manifest(
+        path=manifest_path,
+        segment_seconds=1.0,
+        segment_output_paths=[
+            (segment, tmp_path / f"rec.part{segment.segment_index:04d}.m4a")
+            for segment in finished_segments + last_segments
+        ],
+    )
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert [segment["path"] for segment in manifest["segments"]] == [
+        "rec.part0000.m4a",
+        "rec.part0001.m4a",
+        "rec.part0002.m4a",
+    ]
+    assert manifest["segments"][2]["streams"][1]["start_frame"] == 100
+
+
+def test_spool_segmenter_creates_empty_files_for_closed_streams(
+    tmp_path: Path,
+) -> None:
+    spool_streams = [
+        SpoolStream(filename="0.bin", sampling_rate=10, channels=1, tracks=[0]),
+        SpoolStream(filename="1.bin", sampling_rate=10, channels=1, tracks=[1]),
+    ]
+    spool_segmenter = SpoolSegmenter(
+        spool_dir=tmp_path,
+        spool_streams=spool_streams,
+        segment_seconds=1.0,
+    )
+
+    fp0 = spool_segmenter.open_spool_file("0.bin")
+    fp1 = spool_segmenter.open_spool_file("1.bin")
+    fp1.close()
+
+    fp0.write(np.zeros(25, dtype="<f4").tobytes())
+    fp0.close()
+
+    finished_segments = spool_segmenter.poll_finished_segments()
+    assert [segment.segment_index for segment in finished_segments] == [0, 1, 2]
+    assert (tmp_path / "segment0002" / "1.bin").read_bytes() == b""
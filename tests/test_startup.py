@@ -0,0 +1,99 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+HEAVY_MODULES = ["flet", "numpy", "pyaudio", "pydantic"]
+"""起動時に読み込むと時間がかかるモジュール"""
+
+
+def parse_import_times(importtime_output: str) -> dict[str, float]:
+    """python -X importtime の出力から、モジュールごとの読み込み時間 (秒, 依存を含む) を返す"""
+    import_times: dict[str, float] = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative_microseconds, module_name = line.split("|")
+        import_times[module_name.strip()] = int(cumulative_microseconds) / 1_000_000
+
+    return import_times
+
+
+def test_version_does_not_import_heavy_modules(
+    record_property: Callable[[str, object], None],
+) -> None:
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "multi_audio_track_record"]
+        + ["--version"],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_DIR,
+    )
+    elapsed_seconds = time.perf_counter() - started_at
+
+    assert result.returncode == 0, result.stderr
+    assert "MultiAudioTrackRecorder" in result.stdout
+
+    import_times = parse_import_times(result.stderr)
+    cli_import_seconds = import_times["multi_audio_track_record.cli"]
+
+    record_property("version_seconds", elapsed_seconds)
+    record_property("cli_import_seconds", cli_import_seconds)
+
+    for module_name in HEAVY_MODULES:
+        assert module_name not in import_times
+
+
+def test_gui_startup_time(
+    record_property: Callable[[str, object], None],
+) -> None:
+    pytest.importorskip("flet")
+
+    # flet のクライアントを起動する代わりに、起動を始めるまでの時間と
+    # 別スレッドで録音に使うモジュールを読み込み終えるまでの時間を計る
+    code = """
+import asyncio, importlib, sys, time
+started_at = time.perf_counter()
+
+import flet
+
+async def app_async(target):
+    launched_seconds = time.perf_counter() - started_at
+    is_app_main_loaded = "multi_audio_track_record.gui.app_main" in sys.modules
+    # 読み込み中のモジュールは、読み込み終えるまで import が待つ
+    await asyncio.to_thread(
+        importlib.import_module, "multi_audio_track_record.gui.app_main"
+    )
+    preloaded_seconds = time.perf_counter() - started_at
+    print(f"{launched_seconds} {preloaded_seconds} {int(is_app_main_loaded)}")
+
+flet.app_async = app_async
+
+from multi_audio_track_record.gui.run_app import run_app
+asyncio.run(run_app(started_at=started_at))
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_DIR,
+    )
+    assert result.returncode == 0, result.stderr
+
+    launched_seconds, preloaded_seconds, is_app_main_loaded = map(
+        float, result.stdout.split()
+    )
+
+    record_property("gui_client_launch_seconds", launched_seconds)
+    record_property("gui_preload_seconds", preloaded_seconds)
+
+    # flet のクライアントの起動は、録音に使うモジュールの読み込みを待たない
+    assert not is_app_main_loaded
+    assert launched_seconds <= preloaded_seconds
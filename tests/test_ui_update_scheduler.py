@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any
+
+from multi_audio_track_record.gui.ui_update_scheduler import UIUpdateScheduler
+
+
+class RecordingPage:
+    def __init__(self) -> None:
+        self.update_calls: list[tuple[Any, ...]] = []
+
+    def update(self, *controls: Any) -> None:
+        self.update_calls.append(controls)
+
+
+class RecordingControl:
+    def __init__(self, name: str, page: RecordingPage | None) -> None:
+        self.name = name
+        self.page = page
+
+
+def test_ui_update_scheduler_coalesces_updates() -> None:
+    async def main() -> list[tuple[str, ...]]:
+        page = RecordingPage()
+        ui_update_scheduler = UIUpdateScheduler(
+            page=page,
+            max_updates_per_second=20.0,
+        )
+        control_a = RecordingControl(name="a", page=page)
+        control_b = RecordingControl(name="b", page=page)
+        # ページから取り除かれたコントロール
+        detached_control = RecordingControl(name="detached", page=None)
+
+        run_task = asyncio.create_task(ui_update_scheduler.run())
+        try:
+            for _ in range(10):
+                ui_update_scheduler.request_update(
+                    control_a,
+                    detached_control,
+                )
+                ui_update_scheduler.request_update(
+                    control_b,
+                    control_a,
+                )
+                await asyncio.sleep(0.001)
+
+            await asyncio.sleep(0.2)
+        finally:
+            run_task.cancel()
+
+        return [
+            tuple(control.name for control in controls)
+            for controls in page.update_calls
+        ]
+
+    update_calls = asyncio.run(main())
+
+    # 最初の要求はすぐに送信し、送信間隔内に届いた残りの要求は次の1回にまとめる
+    assert update_calls == [("a", "b"), ("a", "b")]
@@ -0,0 +1,142 @@
+import asyncio
+import struct
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from multi_audio_track_record.encoder import EncoderWave, WaveFileWriter
+from multi_audio_track_record.encoder import wave_file as wave_file_module
+from multi_audio_track_record.scene import Scene, SceneDevice, SceneTrack
+
+
+def test_wave_file_writer_writes_readable_pcm(tmp_path: Path) -> None:
+    path = tmp_path / "a.wav"
+    samples = np.arange(-100, 100, dtype="<i2").reshape(-1, 2)
+
+    with WaveFileWriter(
+        path=path,
+        sampling_rate=48000,
+        channels=2,
+        sample_format="s16le",
+    ) as writer:
+        writer.write(samples.tobytes())
+
+    with wave.open(str(path), "rb") as fp:
+        assert fp.getnchannels() == 2
+        assert fp.getframerate() == 48000
+        assert fp.getsampwidth() == 2
+        assert fp.getnframes() == 100
+        assert fp.readframes(100) == samples.tobytes()
+
+
+def test_wave_file_writer_writes_float_format_and_fact_chunk(tmp_path: Path) -> None:
+    path = tmp_path / "a.wav"
+    samples = np.linspace(-1.0, 1.0, 200, dtype="<f4")
+
+    with WaveFileWriter(path=path, sampling_rate=48000, channels=2) as writer:
+        writer.write(samples.tobytes())
+
+    data = path.read_bytes()
+    fmt_chunk_offset = data.index(b"fmt ")
+    (fmt_size,) = struct.unpack("<I", data[fmt_chunk_offset + 4 : fmt_chunk_offset + 8])
+    assert fmt_size == 18
+    fmt_body = data[fmt_chunk_offset + 8 : fmt_chunk_offset + 8 + fmt_size]
+    assert struct.unpack("<HHIIHHH", fmt_body) == (3, 2, 48000, 384000, 8, 32, 0)
+
+    fact_chunk_offset = fmt_chunk_offset + 8 + fmt_size
+    assert data[fact_chunk_offset : fact_chunk_offset + 4] == b"fact"
+    assert struct.unpack(
+        "<II", data[fact_chunk_offset + 4 : fact_chunk_offset + 12]
+    ) == (4, 100)
+
+    data_chunk_offset = fact_chunk_offset + 12
+    assert data[data_chunk_offset : data_chunk_offset + 4] == b"data"
+    assert struct.unpack("<I", data[4:8])[0] == len(data) - 8
+    assert data[data_chunk_offset + 8 :] == samples.tobytes()
+
+
+def test_wave_file_writer_switches_to_rf64(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(wave_file_module, "RIFF_MAX_SIZE", 100)
+
+    path = tmp_path / "a.wav"
+    with WaveFileWriter(path=path, sampling_rate=48000, channels=1) as writer:
+        writer.write(np.zeros(100, dtype="<f4").tobytes())
+
+    data = path.read_bytes()
+    assert data[0:4] == b"RF64"
+    assert data[12:16] == b"ds64"
+    riff_size, data_size, sample_count = struct.unpack("<QQQ", data[20:44])
+    assert riff_size == len(data) - 8
+    assert data_size == 400
+    assert sample_count == 100
+    fact_chunk_offset = data.index(b"fact")
+    assert data[fact_chunk_offset + 8 : fact_chunk_offset + 12] == b"\xff\xff\xff\xff"
+    data_chunk_offset = data.index(b"data")
+    assert data_chunk_offset == fact_chunk_offset + 12
+    assert data[data_chunk_offset + 4 : data_chunk_offset + 8] == b"\xff\xff\xff\xff"
+    assert len(data) == data_chunk_offset + 8 + data_size
+
+
+def create_scene_device(tracks: list[int], channels: int) -> SceneDevice:
+    return SceneDevice(
+        portaudio_name="device",
+        portaudio_index=0,
+        portaudio_host_api_type=8,
+        portaudio_host_api_index=0,
+        portaudio_host_api_device_index=0,
+        sampling_rate=48000,
+        channels=channels,
+        gain=0,
+        is_muted=False,
+        tracks=tracks,
+    )
+
+
+def test_encoder_wave_mixes_tracks_from_spool_files(tmp_path: Path) -> None:
+    scene = Scene(
+        name="scene",
+        output_dir=str(tmp_path),
+        tracks=[SceneTrack(name=f"track{i}") for i in range(3)],
+        devices=[
+            create_scene_device(tracks=[0, 1], channels=2),
+            create_scene_device(tracks=[1], channels=1),
+        ],
+        is_mix_bus_enabled=False,
+        encoder_type="wave",
+    )
+
+    stereo_samples = np.full((4800, 2), 0.25, dtype="<f4")
+    mono_samples = np.full(2400, 0.5, dtype="<f4")
+    (tmp_path / "0.bin").write_bytes(stereo_samples.tobytes())
+    (tmp_path / "1.bin").write_bytes(mono_samples.tobytes())
+
+    async def encode() -> int:
+        encoder = EncoderWave(block_seconds=0.01)
+        await encoder.start(
+            scene=scene,
+            spool_dir=tmp_path,
+            output_path=tmp_path / "rec.wav",
+            is_streaming=False,
+        )
+        return await encoder.wait()
+
+    assert asyncio.run(encode()) == 0
+
+    track0 = (tmp_path / "rec.track0.wav").read_bytes()
+    assert track0.endswith(stereo_samples.tobytes())
+
+    track1 = (tmp_path / "rec.track1.wav").read_bytes()
+    mixed_samples = np.frombuffer(track1[-4800 * 2 * 4 :], dtype="<f4").reshape(-1, 2)
+    assert np.allclose(mixed_samples[:2400], 0.75)
+    assert np.allclose(mixed_samples[2400:], 0.25)
+
+    track2 = (tmp_path / "rec.track2.wav").read_bytes()
+    data_chunk_offset = track2.index(b"data")
+    assert struct.unpack("<I", track2[data_chunk_offset + 4 : data_chunk_offset + 8])[
+        0
+    ] == (4800 * 4)